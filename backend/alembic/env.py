@@ -25,9 +25,12 @@ if not database_url or database_url.startswith("sqlite"):
     raise RuntimeError("Alembic: DATABASE_URL must be Postgres")
 config.set_main_option("sqlalchemy.url", database_url)
 
+# Connection handed over by app.services.migrations, which holds the migration lock on it
+provided_connection = config.attributes.get("connection")
+
 # Interpret the config file for Python logging.
-# This line sets up loggers basically.
-if config.config_file_name is not None:
+# This line sets up loggers basically. Skipped in-process, where the app owns logging.
+if config.config_file_name is not None and provided_connection is None:
     fileConfig(config.config_file_name)
 
 # add your model's MetaData object here
@@ -71,6 +74,15 @@ def run_migrations_online() -> None:
     and associate a connection with the context.
 
     """
+    if provided_connection is not None:
+        context.configure(
+            connection=provided_connection, target_metadata=target_metadata
+        )
+
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
     # Get connection args for Supabase (same as in models_sqlalchemy)
     connect_args = {}
     # database_url is set above from settings.DATABASE_URL
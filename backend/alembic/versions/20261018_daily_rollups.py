@@ -0,0 +1,121 @@
+"""Daily sales rollup tables
+
+daily_order_rollups keeps order counts and gross sales per user, UTC day of the
+order's creation date, currency, payment status and fulfillment status.
+daily_financial_rollups keeps sales, fees, payouts and refunds per user, day,
+currency and kind. The summary endpoints read these instead of aggregating the
+raw tables on every request. Both are filled from the existing rows here; the
+same backfill is available as `python -m app.services.rollups`.
+
+Revision ID: daily_rollups_001
+Revises: messages_fulltext_001
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+# revision identifiers, used by Alembic.
+revision = 'daily_rollups_001'
+down_revision = 'messages_fulltext_001'
+branch_labels = None
+depends_on = None
+
+ORDER_ROLLUP_BACKFILL_SQL = r"""
+    INSERT INTO daily_order_rollups
+        (user_id, day, currency, payment_status, fulfillment_status, order_count, gross_sales, updated_at)
+    SELECT user_id,
+           (created AT TIME ZONE 'UTC')::date,
+           COALESCE(total_currency, ''),
+           COALESCE(order_payment_status, ''),
+           COALESCE(order_fulfillment_status, ''),
+           COUNT(*),
+           COALESCE(SUM(total_amount), 0),
+           now()
+    FROM (
+        -- creation_date is varchar; rows that do not hold a date are skipped, not cast
+        SELECT *, CASE WHEN creation_date ~ '^\d{4}-\d{2}-\d{2}' THEN creation_date::timestamptz END AS created
+        FROM ebay_orders
+    ) orders
+    WHERE created IS NOT NULL
+    GROUP BY 1, 2, 3, 4, 5
+"""
+
+FINANCIAL_ROLLUP_BACKFILL_SQL = """
+    INSERT INTO daily_financial_rollups (user_id, day, currency, kind, entry_count, amount, updated_at)
+    SELECT user_id, day, currency, kind, COUNT(*), COALESCE(SUM(amount), 0), now()
+    FROM (
+        SELECT user_id, (sale_date AT TIME ZONE 'UTC')::date AS day, COALESCE(currency, '') AS currency,
+               'sales' AS kind, sale_value AS amount
+        FROM transactions WHERE sale_date IS NOT NULL
+        UNION ALL
+        SELECT user_id, (assessed_at AT TIME ZONE 'UTC')::date, COALESCE(currency, ''), 'fees', amount
+        FROM fees WHERE assessed_at IS NOT NULL
+        UNION ALL
+        SELECT user_id, (payout_date AT TIME ZONE 'UTC')::date, COALESCE(currency, ''), 'payouts', total_amount
+        FROM payouts WHERE payout_date IS NOT NULL
+        UNION ALL
+        SELECT p.user_id, (p.payout_date AT TIME ZONE 'UTC')::date, COALESCE(pi.currency, p.currency, ''),
+               'refunds', ABS(pi.amount)
+        FROM payout_items pi JOIN payouts p ON p.payout_id = pi.payout_id
+        WHERE pi.type = 'REFUND' AND p.payout_date IS NOT NULL
+    ) entries
+    GROUP BY user_id, day, currency, kind
+"""
+
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    tables = set(inspector.get_table_names())
+
+    if 'daily_order_rollups' not in tables:
+        op.create_table(
+            'daily_order_rollups',
+            sa.Column('user_id', sa.String(36), nullable=False),
+            sa.Column('day', sa.Date(), nullable=False),
+            sa.Column('currency', sa.String(10), nullable=False, server_default=''),
+            sa.Column('payment_status', sa.String(50), nullable=False, server_default=''),
+            sa.Column('fulfillment_status', sa.String(50), nullable=False, server_default=''),
+            sa.Column('order_count', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('gross_sales', sa.Numeric(14, 2), nullable=False, server_default='0'),
+            sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+            sa.PrimaryKeyConstraint('user_id', 'day', 'currency', 'payment_status', 'fulfillment_status'),
+        )
+
+    if 'daily_financial_rollups' not in tables:
+        op.create_table(
+            'daily_financial_rollups',
+            sa.Column('user_id', sa.String(36), nullable=False),
+            sa.Column('day', sa.Date(), nullable=False),
+            sa.Column('currency', sa.String(10), nullable=False, server_default=''),
+            sa.Column('kind', sa.String(20), nullable=False),
+            sa.Column('entry_count', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('amount', sa.Numeric(14, 2), nullable=False, server_default='0'),
+            sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+            sa.PrimaryKeyConstraint('user_id', 'day', 'currency', 'kind'),
+        )
+
+    # Backfill only tables created just now; existing rollups are maintained by the app
+    if 'daily_order_rollups' not in tables:
+        if 'ebay_orders' in tables:
+            op.execute(ORDER_ROLLUP_BACKFILL_SQL)
+        else:
+            print("⚠️ ebay_orders table does not exist, daily_order_rollups left empty")
+
+    if 'daily_financial_rollups' not in tables:
+        if {'transactions', 'fees', 'payouts', 'payout_items'} <= tables:
+            op.execute(FINANCIAL_ROLLUP_BACKFILL_SQL)
+        else:
+            print("⚠️ financial tables missing, daily_financial_rollups left empty")
+
+
+def downgrade():
+    conn = op.get_bind()
+    tables = set(inspect(conn).get_table_names())
+
+    if 'daily_financial_rollups' in tables:
+        op.drop_table('daily_financial_rollups')
+    if 'daily_order_rollups' in tables:
+        op.drop_table('daily_order_rollups')
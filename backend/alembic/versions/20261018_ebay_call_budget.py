@@ -0,0 +1,44 @@
+"""eBay API call budget ledger
+
+ebay_api_call_budget counts eBay API calls per UTC day, API family and user.
+The app accumulates calls in memory and adds them here periodically; the sync
+planner compares the day's totals with the shared daily limits.
+
+Revision ID: call_budget_001
+Revises: sync_profiling_001
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+# revision identifiers, used by Alembic.
+revision = 'call_budget_001'
+down_revision = 'sync_profiling_001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    tables = set(inspect(conn).get_table_names())
+
+    if 'ebay_api_call_budget' not in tables:
+        op.create_table(
+            'ebay_api_call_budget',
+            sa.Column('day', sa.Date(), nullable=False),
+            sa.Column('api', sa.String(64), nullable=False),
+            sa.Column('user_id', sa.String(64), nullable=False),
+            sa.Column('calls', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+            sa.PrimaryKeyConstraint('day', 'api', 'user_id'),
+        )
+
+
+def downgrade():
+    conn = op.get_bind()
+    tables = set(inspect(conn).get_table_names())
+
+    if 'ebay_api_call_budget' in tables:
+        op.drop_table('ebay_api_call_budget')
@@ -0,0 +1,60 @@
+"""Unique index on ebay_messages (user_id, message_id) for bulk message ingest
+
+Revision ID: messages_user_msg_unique_001
+Revises: inventory_sku_unique_001
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+# revision identifiers, used by Alembic.
+revision = 'messages_user_msg_unique_001'
+down_revision = 'inventory_sku_unique_001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = inspect(conn)
+
+    if 'ebay_messages' not in inspector.get_table_names():
+        return
+
+    existing_indexes = [idx['name'] for idx in inspector.get_indexes('ebay_messages')]
+    if 'uq_ebay_messages_user_message' in existing_indexes:
+        return
+
+    duplicates = conn.execute(sa.text("""
+        SELECT COUNT(*) FROM (
+            SELECT user_id, message_id FROM ebay_messages
+            GROUP BY user_id, message_id
+            HAVING COUNT(*) > 1
+        ) d
+    """)).scalar()
+
+    if duplicates:
+        print(f"⚠️ ebay_messages has {duplicates} duplicated (user_id, message_id) pairs; "
+              f"skipping uq_ebay_messages_user_message until they are resolved")
+        return
+
+    op.create_index(
+        'uq_ebay_messages_user_message',
+        'ebay_messages',
+        ['user_id', 'message_id'],
+        unique=True
+    )
+
+
+def downgrade():
+    conn = op.get_bind()
+    inspector = inspect(conn)
+
+    if 'ebay_messages' not in inspector.get_table_names():
+        return
+
+    existing_indexes = [idx['name'] for idx in inspector.get_indexes('ebay_messages')]
+    if 'uq_ebay_messages_user_message' in existing_indexes:
+        op.drop_index('uq_ebay_messages_user_message', 'ebay_messages')
@@ -0,0 +1,59 @@
+"""Unique index on inventory.sku_code for set-based inventory upserts
+
+Also merges the outstanding heads so `alembic upgrade head` resolves to a
+single revision again.
+
+Revision ID: inventory_sku_unique_001
+Revises: add_refresh_expires_at_20251113, a1592f74ff82, a655622d4724
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+# revision identifiers, used by Alembic.
+revision = 'inventory_sku_unique_001'
+down_revision = ('add_refresh_expires_at_20251113', 'a1592f74ff82', 'a655622d4724')
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = inspect(conn)
+
+    if 'inventory' not in inspector.get_table_names():
+        return
+
+    existing_indexes = [idx['name'] for idx in inspector.get_indexes('inventory')]
+    if 'uq_inventory_sku_code' in existing_indexes:
+        return
+
+    duplicates = conn.execute(sa.text("""
+        SELECT COUNT(*) FROM (
+            SELECT sku_code FROM inventory
+            WHERE sku_code IS NOT NULL
+            GROUP BY sku_code
+            HAVING COUNT(*) > 1
+        ) d
+    """)).scalar()
+
+    if duplicates:
+        print(f"⚠️ inventory has {duplicates} duplicated sku_code values; "
+              f"skipping uq_inventory_sku_code until they are resolved")
+        return
+
+    op.create_index('uq_inventory_sku_code', 'inventory', ['sku_code'], unique=True)
+
+
+def downgrade():
+    conn = op.get_bind()
+    inspector = inspect(conn)
+
+    if 'inventory' not in inspector.get_table_names():
+        return
+
+    existing_indexes = [idx['name'] for idx in inspector.get_indexes('inventory')]
+    if 'uq_inventory_sku_code' in existing_indexes:
+        op.drop_index('uq_inventory_sku_code', 'inventory')
@@ -0,0 +1,127 @@
+"""Single JSONB payload for ebay_orders and ebay_disputes
+
+ebay_orders kept the same order twice (order_data text + raw_payload JSONB) and
+ebay_disputes kept its payload as text that the list endpoint parsed per row.
+raw_payload becomes the only payload, the disputes fields the UI shows are
+extracted into columns, and the old text columns are emptied in batches.
+
+Revision ID: jsonb_payloads_001
+Revises: messages_user_msg_unique_001
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+from sqlalchemy.dialects.postgresql import JSONB
+
+# revision identifiers, used by Alembic.
+revision = 'jsonb_payloads_001'
+down_revision = 'messages_user_msg_unique_001'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 5000
+
+
+def _backfill(statement: str, label: str):
+    """Run an UPDATE ... LIMIT batch repeatedly, committing each batch, until no rows are left"""
+    total = 0
+    with op.get_context().autocommit_block():
+        conn = op.get_bind()
+        while True:
+            updated = conn.execute(sa.text(statement), {'batch_size': BACKFILL_BATCH_SIZE}).rowcount
+            if not updated:
+                break
+            total += updated
+            print(f"[migration] {label}: {total} rows backfilled", flush=True)
+
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    tables = inspector.get_table_names()
+
+    if 'ebay_orders' in tables:
+        order_columns = {c['name'] for c in inspector.get_columns('ebay_orders')}
+        if 'raw_payload' not in order_columns:
+            op.add_column('ebay_orders', sa.Column('raw_payload', JSONB, nullable=True))
+        if 'order_data' in order_columns:
+            op.alter_column('ebay_orders', 'order_data', nullable=True)
+
+    if 'ebay_disputes' in tables:
+        dispute_columns = {c['name'] for c in inspector.get_columns('ebay_disputes')}
+        if 'raw_payload' not in dispute_columns:
+            op.add_column('ebay_disputes', sa.Column('raw_payload', JSONB, nullable=True))
+        if 'buyer_username' not in dispute_columns:
+            op.add_column('ebay_disputes', sa.Column('buyer_username', sa.String(100), nullable=True))
+        if 'amount_value' not in dispute_columns:
+            op.add_column('ebay_disputes', sa.Column('amount_value', sa.Numeric(14, 2), nullable=True))
+        if 'amount_currency' not in dispute_columns:
+            op.add_column('ebay_disputes', sa.Column('amount_currency', sa.String(10), nullable=True))
+        if 'dispute_data' in dispute_columns:
+            op.alter_column('ebay_disputes', 'dispute_data', nullable=True)
+
+    if 'ebay_orders' in tables and 'order_data' in order_columns:
+        _backfill("""
+            UPDATE ebay_orders o
+            SET raw_payload = COALESCE(o.raw_payload, o.order_data::jsonb),
+                order_data = NULL
+            WHERE o.ctid = ANY(ARRAY(
+                SELECT ctid FROM ebay_orders
+                WHERE order_data IS NOT NULL
+                LIMIT :batch_size
+            ))
+        """, 'ebay_orders')
+
+    if 'ebay_disputes' in tables and 'dispute_data' in dispute_columns:
+        _backfill("""
+            UPDATE ebay_disputes d
+            SET raw_payload = p.payload,
+                buyer_username = p.payload->>'buyerUsername',
+                amount_value = NULLIF(p.payload #>> '{monetaryTransactions,0,totalPrice,value}', '')::numeric,
+                amount_currency = p.payload #>> '{monetaryTransactions,0,totalPrice,currency}',
+                dispute_data = NULL
+            FROM (
+                SELECT ctid, dispute_data::jsonb AS payload
+                FROM ebay_disputes
+                WHERE dispute_data IS NOT NULL
+                LIMIT :batch_size
+            ) p
+            WHERE d.ctid = p.ctid
+        """, 'ebay_disputes')
+
+
+def downgrade():
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    tables = inspector.get_table_names()
+
+    if 'ebay_orders' in tables:
+        order_columns = {c['name'] for c in inspector.get_columns('ebay_orders')}
+        if 'order_data' in order_columns:
+            _backfill("""
+                UPDATE ebay_orders o
+                SET order_data = o.raw_payload::text
+                WHERE o.ctid = ANY(ARRAY(
+                    SELECT ctid FROM ebay_orders
+                    WHERE order_data IS NULL AND raw_payload IS NOT NULL
+                    LIMIT :batch_size
+                ))
+            """, 'ebay_orders')
+
+    if 'ebay_disputes' in tables:
+        dispute_columns = {c['name'] for c in inspector.get_columns('ebay_disputes')}
+        if 'dispute_data' in dispute_columns and 'raw_payload' in dispute_columns:
+            _backfill("""
+                UPDATE ebay_disputes d
+                SET dispute_data = d.raw_payload::text
+                WHERE d.ctid = ANY(ARRAY(
+                    SELECT ctid FROM ebay_disputes
+                    WHERE dispute_data IS NULL AND raw_payload IS NOT NULL
+                    LIMIT :batch_size
+                ))
+            """, 'ebay_disputes')
+        for column in ('amount_currency', 'amount_value', 'buyer_username', 'raw_payload'):
+            if column in dispute_columns:
+                op.drop_column('ebay_disputes', column)
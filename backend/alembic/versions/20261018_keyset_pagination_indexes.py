@@ -0,0 +1,74 @@
+"""Composite (sort column, id) indexes for keyset pagination on the grid endpoints
+
+Each index matches an ORDER BY <sort column>, <id> the list endpoints can issue,
+prefixed with user_id where the grid is per user, so cursor pages are a single
+index range scan regardless of depth. Built CONCURRENTLY so the grids stay writable.
+
+Revision ID: keyset_indexes_001
+Revises: jsonb_payloads_001
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+from sqlalchemy import inspect
+
+# revision identifiers, used by Alembic.
+revision = 'keyset_indexes_001'
+down_revision = 'jsonb_payloads_001'
+branch_labels = None
+depends_on = None
+
+KEYSET_INDEXES = [
+    ('idx_inventory_keyset_rec_created', 'inventory', ['rec_created', 'id']),
+    ('idx_inventory_keyset_price_value', 'inventory', ['price_value', 'id']),
+    ('idx_inventory_keyset_sku_code', 'inventory', ['sku_code', 'id']),
+    ('idx_inventory_keyset_title', 'inventory', ['title', 'id']),
+    ('idx_inventory_keyset_status', 'inventory', ['status', 'id']),
+    ('idx_inventory_keyset_ebay_status', 'inventory', ['ebay_status', 'id']),
+    ('idx_txn_keyset_sale_date', 'transactions', ['user_id', 'sale_date', 'transaction_id']),
+    ('idx_txn_keyset_sale_value', 'transactions', ['user_id', 'sale_value', 'transaction_id']),
+    ('idx_txn_keyset_buyer', 'transactions', ['user_id', 'buyer_username', 'transaction_id']),
+    ('idx_purchase_keyset_creation_date', 'purchases', ['user_id', 'creation_date', 'purchase_id']),
+    ('idx_purchase_keyset_total_value', 'purchases', ['user_id', 'total_value', 'purchase_id']),
+    ('idx_purchase_keyset_buyer', 'purchases', ['user_id', 'buyer_username', 'purchase_id']),
+    ('idx_purchase_keyset_seller', 'purchases', ['user_id', 'seller_username', 'purchase_id']),
+    ('idx_fee_keyset_assessed_at', 'fees', ['user_id', 'assessed_at', 'id']),
+    ('idx_payout_keyset_payout_date', 'payouts', ['user_id', 'payout_date', 'payout_id']),
+    ('idx_ebay_messages_keyset_date', 'ebay_messages', ['user_id', 'message_date', 'id']),
+    ('idx_ebay_orders_keyset_creation_date', 'ebay_orders', ['user_id', 'creation_date', 'order_id']),
+    ('idx_ebay_disputes_keyset_open_date', 'ebay_disputes', ['user_id', 'open_date', 'dispute_id']),
+]
+
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    tables = set(inspector.get_table_names())
+
+    pending = []
+    for name, table, columns in KEYSET_INDEXES:
+        if table not in tables:
+            continue
+        existing_columns = {c['name'] for c in inspector.get_columns(table)}
+        missing = [c for c in columns if c not in existing_columns]
+        if missing:
+            print(f"⚠️ {table} has no {', '.join(missing)} column; skipping {name}")
+            continue
+        if name in {idx['name'] for idx in inspector.get_indexes(table)}:
+            continue
+        pending.append((name, table, columns))
+
+    with op.get_context().autocommit_block():
+        for name, table, columns in pending:
+            op.create_index(name, table, columns, postgresql_concurrently=True)
+
+
+def downgrade():
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    tables = set(inspector.get_table_names())
+
+    with op.get_context().autocommit_block():
+        for name, table, _ in KEYSET_INDEXES:
+            if table in tables and name in {idx['name'] for idx in inspector.get_indexes(table)}:
+                op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,71 @@
+"""Full-text search vector on ebay_messages
+
+Adds a stored generated tsvector over subject, sender and the HTML-stripped body
+(subject and sender weighted A, body B) with a GIN index, replacing the
+LIKE '%term%' scans of /messages/ search. Being a generated column it is kept
+current by every insert and update, including the bulk ingest upsert.
+
+Revision ID: messages_fulltext_001
+Revises: search_trgm_001
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+from sqlalchemy.dialects.postgresql import TSVECTOR
+
+# revision identifiers, used by Alembic.
+revision = 'messages_fulltext_001'
+down_revision = 'search_trgm_001'
+branch_labels = None
+depends_on = None
+
+MESSAGE_BODY_TEXT_SQL = (
+    "regexp_replace(regexp_replace(coalesce(body, ''), '<[^>]*>', ' ', 'g'), '&[#a-zA-Z0-9]+;', ' ', 'g')"
+)
+MESSAGE_SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('english', coalesce(subject, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(sender_username, '')), 'A') || "
+    f"setweight(to_tsvector('english', {MESSAGE_BODY_TEXT_SQL}), 'B')"
+)
+
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = inspect(conn)
+
+    if 'ebay_messages' not in inspector.get_table_names():
+        return
+
+    columns = {c['name'] for c in inspector.get_columns('ebay_messages')}
+    if 'search_vector' not in columns:
+        op.add_column('ebay_messages', sa.Column(
+            'search_vector', TSVECTOR(), sa.Computed(MESSAGE_SEARCH_VECTOR_SQL, persisted=True)
+        ))
+
+    existing_indexes = [idx['name'] for idx in inspector.get_indexes('ebay_messages')]
+    if 'idx_ebay_messages_search_vector' not in existing_indexes:
+        with op.get_context().autocommit_block():
+            op.create_index(
+                'idx_ebay_messages_search_vector',
+                'ebay_messages',
+                ['search_vector'],
+                postgresql_using='gin',
+                postgresql_concurrently=True
+            )
+
+
+def downgrade():
+    conn = op.get_bind()
+    inspector = inspect(conn)
+
+    if 'ebay_messages' not in inspector.get_table_names():
+        return
+
+    existing_indexes = [idx['name'] for idx in inspector.get_indexes('ebay_messages')]
+    if 'idx_ebay_messages_search_vector' in existing_indexes:
+        op.drop_index('idx_ebay_messages_search_vector', 'ebay_messages')
+
+    if 'search_vector' in {c['name'] for c in inspector.get_columns('ebay_messages')}:
+        op.drop_column('ebay_messages', 'search_vector')
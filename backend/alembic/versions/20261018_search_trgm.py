@@ -0,0 +1,93 @@
+"""pg_trgm GIN indexes for substring search on inventory, transactions and purchases
+
+ILIKE '%term%' cannot use the existing btree indexes. gin_trgm_ops indexes let
+Postgres answer those filters from the index instead of a sequential scan.
+inventory.search_text is a generated column combining the fields the grid's `q`
+box searches, so a single trigram index serves the multi-field search.
+
+Adding a STORED generated column rewrites the whole inventory table under an
+ACCESS EXCLUSIVE lock, so inventory reads and writes wait until the rewrite is
+done; run this upgrade in a quiet window on large installs. The index builds
+that follow are CONCURRENTLY and do not block.
+
+Revision ID: search_trgm_001
+Revises: keyset_indexes_001
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+# revision identifiers, used by Alembic.
+revision = 'search_trgm_001'
+down_revision = 'keyset_indexes_001'
+branch_labels = None
+depends_on = None
+
+INVENTORY_SEARCH_TEXT_SQL = (
+    "lower(coalesce(sku_code, '') || E'\\n' || coalesce(title, '') || E'\\n' || "
+    "coalesce(part_number, '') || E'\\n' || coalesce(model, ''))"
+)
+
+TRIGRAM_INDEXES = [
+    ('idx_inventory_search_trgm', 'inventory', 'search_text'),
+    ('idx_inventory_sku_code_trgm', 'inventory', 'sku_code'),
+    ('idx_inventory_part_number_trgm', 'inventory', 'part_number'),
+    ('idx_inventory_ebay_listing_trgm', 'inventory', 'ebay_listing_id'),
+    ('idx_inventory_author_trgm', 'inventory', 'author'),
+    ('idx_inventory_tracking_trgm', 'inventory', 'tracking_number'),
+    ('idx_txn_buyer_trgm', 'transactions', 'buyer_username'),
+    ('idx_txn_sku_trgm', 'transactions', 'sku'),
+    ('idx_purchase_buyer_trgm', 'purchases', 'buyer_username'),
+    ('idx_purchase_seller_trgm', 'purchases', 'seller_username'),
+]
+
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    tables = set(inspector.get_table_names())
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    if 'inventory' in tables:
+        inventory_columns = {c['name'] for c in inspector.get_columns('inventory')}
+        if 'search_text' not in inventory_columns:
+            op.add_column('inventory', sa.Column(
+                'search_text', sa.Text(), sa.Computed(INVENTORY_SEARCH_TEXT_SQL, persisted=True)
+            ))
+
+    pending = []
+    for name, table, column in TRIGRAM_INDEXES:
+        if table not in tables:
+            continue
+        if column not in {c['name'] for c in inspect(conn).get_columns(table)}:
+            print(f"⚠️ {table} has no {column} column; skipping {name}")
+            continue
+        if name in {idx['name'] for idx in inspector.get_indexes(table)}:
+            continue
+        pending.append((name, table, column))
+
+    with op.get_context().autocommit_block():
+        for name, table, column in pending:
+            op.create_index(
+                name, table, [column],
+                postgresql_using='gin',
+                postgresql_ops={column: 'gin_trgm_ops'},
+                postgresql_concurrently=True
+            )
+
+
+def downgrade():
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    tables = set(inspector.get_table_names())
+
+    with op.get_context().autocommit_block():
+        for name, table, _ in TRIGRAM_INDEXES:
+            if table in tables and name in {idx['name'] for idx in inspector.get_indexes(table)}:
+                op.drop_index(name, table_name=table, postgresql_concurrently=True)
+
+    if 'inventory' in tables and 'search_text' in {c['name'] for c in inspector.get_columns('inventory')}:
+        op.drop_column('inventory', 'search_text')
@@ -0,0 +1,59 @@
+"""Sync run phase timings and sampling profiles
+
+ebay_sync_jobs.phase_timings holds the milliseconds a finished run spent per
+phase (HTTP, JSON decoding, normalization, DB writes, cancellation checks, event
+logging, sleeps). sync_run_profiles stores the sampling profile of runs started
+with profiling enabled, as collapsed stacks.
+
+Revision ID: sync_profiling_001
+Revises: daily_rollups_001
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'sync_profiling_001'
+down_revision = 'daily_rollups_001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    tables = set(inspector.get_table_names())
+
+    if 'ebay_sync_jobs' in tables:
+        if 'phase_timings' not in {c['name'] for c in inspector.get_columns('ebay_sync_jobs')}:
+            op.add_column('ebay_sync_jobs', sa.Column('phase_timings', postgresql.JSONB(), nullable=True))
+    else:
+        print("⚠️ ebay_sync_jobs table does not exist, skipping phase_timings")
+
+    if 'sync_run_profiles' not in tables:
+        op.create_table(
+            'sync_run_profiles',
+            sa.Column('run_id', sa.String(100), primary_key=True),
+            sa.Column('user_id', sa.String(36), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+            sa.Column('sync_type', sa.String(50), nullable=False),
+            sa.Column('sample_count', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('interval_ms', sa.Float(), nullable=False),
+            sa.Column('duration_ms', sa.Integer(), nullable=True),
+            sa.Column('folded_stacks', sa.Text(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        )
+        op.create_index('ix_sync_run_profiles_user_id', 'sync_run_profiles', ['user_id'])
+
+
+def downgrade():
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    tables = set(inspector.get_table_names())
+
+    if 'sync_run_profiles' in tables:
+        op.drop_table('sync_run_profiles')
+    if 'ebay_sync_jobs' in tables and 'phase_timings' in {c['name'] for c in inspector.get_columns('ebay_sync_jobs')}:
+        op.drop_column('ebay_sync_jobs', 'phase_timings')
@@ -10,6 +10,14 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     DEBUG: bool = False
     
+    # Logging: root level, per-module overrides ("name=LEVEL,..."), json|text output,
+    # 1-in-N sampling of DEBUG lines per call site, and SQL statement echo
+    LOG_LEVEL: str = "INFO"
+    LOG_LEVELS: str = ""
+    LOG_FORMAT: str = "json"
+    LOG_DEBUG_SAMPLE_RATE: int = 100
+    SQL_ECHO: bool = False
+    
     @property
     def secret_key(self) -> str:
         return self.JWT_SECRET or self.SECRET_KEY
@@ -28,9 +36,40 @@ class Settings(BaseSettings):
     EBAY_PRODUCTION_REDIRECT_URI: Optional[str] = None
     EBAY_PRODUCTION_RUNAME: Optional[str] = None
     
+    # upgrade | check | off, see app.services.migrations
+    STARTUP_MIGRATIONS: str = "upgrade"
+    
     # DATABASE_URL must be provided via environment from Railway (Supabase/Postgres)
     DATABASE_URL: str = os.getenv("DATABASE_URL", "")
     
+    # Tracing, see app.utils.tracing: share of traces kept (0 disables), and where
+    # spans go (file: OTLP/JSON lines in TRACE_FILE, otlp: POST to TRACE_OTLP_ENDPOINT)
+    TRACE_SAMPLE_RATE: float = 0.0
+    TRACE_EXPORTER: str = "file"
+    TRACE_FILE: str = "traces.jsonl"
+    TRACE_OTLP_ENDPOINT: str = "http://localhost:4318/v1/traces"
+    TRACE_SERVICE_NAME: str = "ebay-connector-api"
+    
+    # eBay call budget, see app.services.call_budget: per-API daily limit overrides
+    # ("sell.inventory=2000000,trading=5000") and the share kept for interactive calls
+    EBAY_CALL_BUDGET_ENABLED: bool = True
+    EBAY_API_DAILY_LIMITS: str = ""
+    EBAY_CALL_BUDGET_RESERVE_PCT: int = 10
+    
+    # Statement stats, see app.utils.query_stats: statements at or over the threshold
+    # are slow and a share of them gets an EXPLAIN plan
+    SLOW_QUERY_THRESHOLD_MS: int = 500
+    SLOW_QUERY_EXPLAIN_SAMPLE_RATE: float = 0.1
+    SLOW_QUERY_MAX_STATEMENTS: int = 500
+    
+    # Bearer token the Prometheus scraper sends to /metrics; admins' JWTs work too
+    METRICS_TOKEN: str = ""
+    
+    # Authenticated-user cache; NOTIFY also drops entries on other replicas
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    PRINCIPAL_CACHE_MAX_SIZE: int = 1024
+    PRINCIPAL_CACHE_NOTIFY: bool = False
+    
     ALLOWED_ORIGINS: str = "http://localhost:5173,http://localhost:3000"
     FRONTEND_URL: str = "http://localhost:5173"
     
@@ -1,6 +1,9 @@
-from sqlalchemy import Column, String, DateTime, Text, Boolean, ForeignKey
+from sqlalchemy import Column, String, DateTime, Text, Boolean, ForeignKey, Index, Computed
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred
 from sqlalchemy.sql import func
 from app.database import Base
+from app.models_sqlalchemy.models import MESSAGE_SEARCH_VECTOR_SQL
 import uuid
 
 class Message(Base):
@@ -35,3 +38,10 @@ class Message(Base):
     raw_data = Column(Text)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    search_vector = deferred(Column(TSVECTOR, Computed(MESSAGE_SEARCH_VECTOR_SQL, persisted=True)))
+
+    __table_args__ = (
+        Index('uq_ebay_messages_user_message', 'user_id', 'message_id', unique=True),
+        Index('idx_ebay_messages_keyset_date', 'user_id', 'message_date', 'id'),
+        Index('idx_ebay_messages_search_vector', 'search_vector', postgresql_using='gin'),
+    )
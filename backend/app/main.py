@@ -1,23 +1,16 @@
-import logging
-import sys
+import time
 import uuid
 import traceback
-from fastapi import FastAPI, Request
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from app.routers import auth, ebay, orders, messages, offers, migration, buying, inventory, transactions, financials, admin, offers_v2, inventory_v2, ebay_accounts
-from app.utils.logger import logger
+from app.services.auth import metrics_reader
+from app.utils.logger import logger, request_id_var
+from app.utils.tracing import SPAN_KIND_SERVER, start_span
 import os
 import asyncio
-from sqlalchemy import create_engine, text, inspect
-
-# Global logging configuration
-logging.basicConfig(
-    level=logging.DEBUG,
-    format="%(asctime)s %(levelname)s %(name)s :: %(message)s",
-    handlers=[logging.StreamHandler(sys.stdout)],
-    force=True,
-)
+from sqlalchemy import text
 
 app = FastAPI(title="eBay Connector API", version="1.0.0")
 
@@ -45,15 +38,28 @@ app.add_middleware(
 async def request_logger(request: Request, call_next):
     rid = uuid.uuid4().hex[:8]
     request.state.rid = rid
-    logging.info("→ %s %s rid=%s", request.method, request.url.path, rid)
+    request_id_var.set(rid)
+    started = time.perf_counter()
+    request_span = start_span(
+        "http.request", root=True, kind=SPAN_KIND_SERVER,
+        request_id=rid, http_method=request.method, http_path=request.url.path,
+    )
     try:
         resp = await call_next(request)
-        logging.info("← %s status=%s rid=%s", request.url.path, resp.status_code, rid)
+        if request_span is not None:
+            request_span.set_attribute("http_status", resp.status_code)
+            request_span.end()
+        logger.info(
+            "%s %s %s", request.method, request.url.path, resp.status_code,
+            extra={"status": resp.status_code, "duration_ms": round((time.perf_counter() - started) * 1000, 1)}
+        )
         # Add Request ID to response headers for easier debugging
         resp.headers["X-Request-ID"] = rid
         return resp
     except Exception as e:
-        logging.exception("Unhandled error rid=%s: %s", rid, str(e))
+        if request_span is not None:
+            request_span.end(e)
+        logger.exception("Unhandled error rid=%s: %s", rid, str(e))
         error_resp = JSONResponse(
             {"error": "internal_error", "rid": rid, "message": str(e), "type": type(e).__name__},
             status_code=500
@@ -80,6 +86,9 @@ app.include_router(inventory_v2.router)
 async def startup_event():
     logger.info("eBay Connector API starting up...")
     
+    from app.utils.metrics import monitor_event_loop_lag
+    asyncio.create_task(monitor_event_loop_lag())
+    
     from app.config import settings
     database_url = settings.DATABASE_URL
     
@@ -90,57 +99,16 @@ async def startup_event():
     
     if "postgresql" in database_url:
         logger.info("🐘 Using PostgreSQL database (Supabase)")
-        logger.info("📊 Running database migrations...")
+        logger.info(f"📊 Checking database migrations (STARTUP_MIGRATIONS={settings.STARTUP_MIGRATIONS})...")
         
         try:
-            import signal
-            import warnings
-            
-            def timeout_handler(signum, frame):
-                raise TimeoutError("Database connection timeout")
-            
-            # Suppress all Alembic warnings globally
-            warnings.filterwarnings("ignore", category=UserWarning, module="alembic")
-            warnings.filterwarnings("ignore", message=".*revision.*not present.*", category=UserWarning)
-            
-            signal.signal(signal.SIGALRM, timeout_handler)
-            signal.alarm(10)
+            from app.models_sqlalchemy import DATABASE_URL
+            from app.services.migrations import run_startup_migrations
             
-            try:
-                from alembic.config import Config
-                from alembic import command
-                
-                alembic_cfg = Config("/app/alembic.ini")
-                alembic_cfg.set_main_option("sqlalchemy.url", database_url)
-                
-                # Suppress warnings during migration
-                with warnings.catch_warnings():
-                    warnings.simplefilter("ignore")
-                    command.upgrade(alembic_cfg, "head")
-                
-                logger.info("✅ Database migrations completed successfully!")
-                
-            except TimeoutError:
-                logger.error("⏱️  Database connection timed out - migrations skipped")
-            except Exception as e:
-                logger.warning(f"⚠️  Alembic migration failed: {e}")
-                logger.warning("⚠️  Continuing startup - tables may already exist or will be created manually")
-                logger.info("🔨 Creating tables manually...")
-                
-                try:
-                    engine = create_engine(database_url, connect_args={"connect_timeout": 5})
-                    from app.models_sqlalchemy.models import Base
-                    Base.metadata.create_all(bind=engine)
-                    logger.info("✅ Tables created successfully!")
-                    
-                except Exception as e2:
-                    logger.error(f"❌ Failed to create tables: {e2}")
-            finally:
-                signal.alarm(0)  # Cancel alarm
-        
-        except Exception as outer_e:
-            logger.error(f"❌ Startup database initialization failed: {outer_e}")
-            logger.warning("⚠️  Continuing startup despite migration errors - application may still work")
+            await asyncio.to_thread(run_startup_migrations, DATABASE_URL, settings.STARTUP_MIGRATIONS)
+        except Exception as e:
+            logger.error(f"❌ Startup migration check failed: {e}")
+            logger.warning("⚠️  Continuing startup - run `python -m app.services.migrations` to migrate")
         
         logger.info("✅ PostgreSQL configured - attempting to connect...")
         start_workers = True
@@ -161,22 +129,58 @@ async def startup_event():
             asyncio.create_task(run_health_check_worker_loop())
             logger.info("✅ Health check worker started (runs every 15 minutes)")
             
+            from app.services.call_budget import run_call_budget_flush_loop
+            
+            asyncio.create_task(run_call_budget_flush_loop())
+            logger.info("✅ eBay call budget flush loop started")
+            
+            if settings.PRINCIPAL_CACHE_NOTIFY:
+                from app.models_sqlalchemy import DATABASE_URL
+                from app.services.principal_cache import run_principal_invalidation_listener
+                
+                asyncio.create_task(run_principal_invalidation_listener(DATABASE_URL))
+                logger.info("✅ Principal cache invalidation listener started")
+            
         except Exception as e:
             logger.error(f"⚠️  Failed to start background workers: {e}")
             logger.info("Workers can be run separately if needed")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    from app.services.call_budget import call_ledger
+    
+    await call_ledger.flush()
+    
+    from app.models_sqlalchemy import dispose_engines
+    
+    await dispose_engines()
+    logger.info("🔌 Database connection pools closed")
+    
+    from app.utils.tracing import shutdown_tracing
+    shutdown_tracing()
+    
+    from app.utils.logger import shutdown_logging
+    shutdown_logging()
+
 @app.get("/healthz")
 async def healthz():
     return {"status": "ok"}
 
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(metrics_reader)])
+async def metrics():
+    """Prometheus text exposition of this process's metrics"""
+    from fastapi.responses import PlainTextResponse
+    from app.utils.metrics import render_metrics
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 @app.get("/healthz/db")
 async def healthz_db():
     """Database health check endpoint"""
     from fastapi import HTTPException, status
     try:
-        from app.models_sqlalchemy import engine
-        with engine.connect() as conn:
-            result = conn.execute(text("SELECT 1"))
+        from app.models_sqlalchemy import async_engine
+        async with async_engine.connect() as conn:
+            result = await conn.execute(text("SELECT 1"))
             result.fetchone()
         return {"status": "ok", "database": "connected"}
     except Exception as e:
@@ -1,7 +1,10 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import settings
+from app.utils.query_stats import track_query_stats
+from app.utils.tracing import instrument_engine
 from urllib.parse import urlparse, urlunparse, parse_qs, urlencode
 
 DATABASE_URL = settings.DATABASE_URL
@@ -51,7 +54,7 @@ else:
 engine = create_engine(
     DATABASE_URL,
     connect_args=connect_args,
-    echo=True,  # Enable SQL query logging for debugging
+    echo=False,  # Statement logging follows the sqlalchemy.engine level, see set_sql_echo
     pool_pre_ping=True,  # Verify connections before using
     pool_size=5,  # Reduced pool size for Supabase (free tier limit ~60 connections)
     max_overflow=10,  # Allow up to 10 additional connections
@@ -59,6 +62,9 @@ engine = create_engine(
     pool_timeout=30,  # Wait up to 30s for a connection from pool
 )
 
+instrument_engine(engine)
+track_query_stats(engine)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -70,3 +76,40 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# Async engine for code running on the event loop, on the psycopg 3 driver.
+# psycopg 3 binds str parameters as untyped literals the way psycopg2 does, so the
+# raw SQL writers behave the same on both engines.
+ASYNC_DATABASE_URL = DATABASE_URL.replace("postgresql+psycopg2://", "postgresql+psycopg://", 1)
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    connect_args={
+        **connect_args,
+        # Never use server-side prepared statements: they break behind PgBouncer
+        # in transaction mode (Supabase pooler)
+        "prepare_threshold": None,
+    },
+    pool_pre_ping=True,
+    pool_size=5,
+    max_overflow=10,
+    pool_recycle=3600,
+    pool_timeout=30,
+)
+
+instrument_engine(async_engine.sync_engine)
+track_query_stats(async_engine.sync_engine)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def dispose_engines():
+    """Release pooled connections of both engines (called on app shutdown)"""
+    await async_engine.dispose()
+    engine.dispose()
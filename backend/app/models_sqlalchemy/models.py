@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, ForeignKey, Enum, Boolean, Index, Numeric, CHAR, desc
-from sqlalchemy.dialects.postgresql import JSONB
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Text, ForeignKey, Enum, Boolean, Index, Numeric, CHAR, desc, Computed
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
 from datetime import datetime
 import enum
@@ -270,6 +270,15 @@ class Listing(Base):
     )
 
 
+# Generated inventory.search_text: the fields the grid's `q` box searches, lower-cased and
+# joined by newlines, which the one-line search box cannot send, so a term never matches
+# across the end of one field and the start of the next
+INVENTORY_SEARCH_TEXT_SQL = (
+    "lower(coalesce(sku_code, '') || E'\\n' || coalesce(title, '') || E'\\n' || "
+    "coalesce(part_number, '') || E'\\n' || coalesce(model, ''))"
+)
+
+
 class Inventory(Base):
     __tablename__ = "inventory"
     
@@ -306,12 +315,16 @@ class Inventory(Base):
     tracking_number = Column(String(100), nullable=True, index=True)
     raw_payload = Column(JSONB, nullable=True)
     
+    # Combined sku/title/part number/model text for the grid's `q` box (trigram indexed)
+    search_text = deferred(Column(Text, Computed(INVENTORY_SEARCH_TEXT_SQL, persisted=True)))
+    
     sku = relationship("SKU", back_populates="inventory_items")
     warehouse = relationship("Warehouse", back_populates="inventory_items")
     
     __table_args__ = (
         Index('idx_inventory_sku_id', 'sku_id'),
         Index('idx_inventory_sku_code', 'sku_code'),
+        Index('uq_inventory_sku_code', 'sku_code', unique=True),
         Index('idx_inventory_category', 'category'),
         Index('idx_inventory_condition', 'condition'),
         Index('idx_inventory_status', 'status'),
@@ -326,6 +339,20 @@ class Inventory(Base):
         Index('idx_inventory_created_desc', desc(rec_created)),
         Index('idx_composite_status_warehouse', 'status', 'warehouse_id'),
         Index('idx_composite_storage_status', 'storage_id', 'status'),
+        # Keyset pagination: one (sort column, id) index per sortable grid column
+        Index('idx_inventory_keyset_rec_created', 'rec_created', 'id'),
+        Index('idx_inventory_keyset_price_value', 'price_value', 'id'),
+        Index('idx_inventory_keyset_sku_code', 'sku_code', 'id'),
+        Index('idx_inventory_keyset_title', 'title', 'id'),
+        Index('idx_inventory_keyset_status', 'status', 'id'),
+        Index('idx_inventory_keyset_ebay_status', 'ebay_status', 'id'),
+        # pg_trgm indexes for ILIKE '%term%' search
+        Index('idx_inventory_search_trgm', 'search_text', postgresql_using='gin', postgresql_ops={'search_text': 'gin_trgm_ops'}),
+        Index('idx_inventory_sku_code_trgm', 'sku_code', postgresql_using='gin', postgresql_ops={'sku_code': 'gin_trgm_ops'}),
+        Index('idx_inventory_part_number_trgm', 'part_number', postgresql_using='gin', postgresql_ops={'part_number': 'gin_trgm_ops'}),
+        Index('idx_inventory_ebay_listing_trgm', 'ebay_listing_id', postgresql_using='gin', postgresql_ops={'ebay_listing_id': 'gin_trgm_ops'}),
+        Index('idx_inventory_author_trgm', 'author', postgresql_using='gin', postgresql_ops={'author': 'gin_trgm_ops'}),
+        Index('idx_inventory_tracking_trgm', 'tracking_number', postgresql_using='gin', postgresql_ops={'tracking_number': 'gin_trgm_ops'}),
     )
 
 
@@ -431,6 +458,31 @@ class SyncEventLog(Base):
     )
 
 
+class EbayApiCallBudget(Base):
+    """eBay API calls per UTC day, API family and user, flushed from app.services.call_budget"""
+    __tablename__ = "ebay_api_call_budget"
+    
+    day = Column(Date, primary_key=True)
+    api = Column(String(64), primary_key=True)
+    user_id = Column(String(64), primary_key=True)
+    calls = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+
+class SyncRunProfile(Base):
+    """Sampling profile of a sync run, captured on request, as collapsed stacks"""
+    __tablename__ = "sync_run_profiles"
+    
+    run_id = Column(String(100), primary_key=True)
+    user_id = Column(String(36), ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    sync_type = Column(String(50), nullable=False)
+    sample_count = Column(Integer, nullable=False, default=0)
+    interval_ms = Column(Float, nullable=False)
+    duration_ms = Column(Integer, nullable=True)
+    folded_stacks = Column(Text, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
 class EbayConnectLog(Base):
     __tablename__ = "ebay_connect_logs"
 
@@ -531,6 +583,12 @@ class Purchase(Base):
         Index('idx_purchase_payment_status', 'payment_status'),
         Index('idx_purchase_fulfillment_status', 'fulfillment_status'),
         Index('idx_purchase_user_id', 'user_id'),
+        Index('idx_purchase_keyset_creation_date', 'user_id', 'creation_date', 'purchase_id'),
+        Index('idx_purchase_keyset_total_value', 'user_id', 'total_value', 'purchase_id'),
+        Index('idx_purchase_keyset_buyer', 'user_id', 'buyer_username', 'purchase_id'),
+        Index('idx_purchase_keyset_seller', 'user_id', 'seller_username', 'purchase_id'),
+        Index('idx_purchase_buyer_trgm', 'buyer_username', postgresql_using='gin', postgresql_ops={'buyer_username': 'gin_trgm_ops'}),
+        Index('idx_purchase_seller_trgm', 'seller_username', postgresql_using='gin', postgresql_ops={'seller_username': 'gin_trgm_ops'}),
     )
 
 
@@ -595,6 +653,11 @@ class Transaction(Base):
         Index('idx_txn_buyer', 'buyer_username'),
         Index('idx_txn_sku', 'sku'),
         Index('idx_txn_user_id', 'user_id'),
+        Index('idx_txn_keyset_sale_date', 'user_id', 'sale_date', 'transaction_id'),
+        Index('idx_txn_keyset_sale_value', 'user_id', 'sale_value', 'transaction_id'),
+        Index('idx_txn_keyset_buyer', 'user_id', 'buyer_username', 'transaction_id'),
+        Index('idx_txn_buyer_trgm', 'buyer_username', postgresql_using='gin', postgresql_ops={'buyer_username': 'gin_trgm_ops'}),
+        Index('idx_txn_sku_trgm', 'sku', postgresql_using='gin', postgresql_ops={'sku': 'gin_trgm_ops'}),
     )
 
 
@@ -621,6 +684,7 @@ class Fee(Base):
         Index('idx_fee_type', 'fee_type'),
         Index('idx_fee_assessed_at', 'assessed_at'),
         Index('idx_fee_user_id', 'user_id'),
+        Index('idx_fee_keyset_assessed_at', 'user_id', 'assessed_at', 'id'),
     )
 
 
@@ -644,6 +708,7 @@ class Payout(Base):
     __table_args__ = (
         Index('idx_payout_date', 'payout_date'),
         Index('idx_payout_user_id', 'user_id'),
+        Index('idx_payout_keyset_payout_date', 'user_id', 'payout_date', 'payout_id'),
     )
 
 
@@ -670,6 +735,35 @@ class PayoutItem(Base):
     )
 
 
+class DailyOrderRollup(Base):
+    """ebay_orders aggregated per UTC day of creation; kept current by the order batch writers"""
+    __tablename__ = "daily_order_rollups"
+    
+    user_id = Column(String(36), primary_key=True)
+    day = Column(Date, primary_key=True)
+    currency = Column(String(10), primary_key=True, default='')
+    payment_status = Column(String(50), primary_key=True, default='')
+    fulfillment_status = Column(String(50), primary_key=True, default='')
+    
+    order_count = Column(Integer, nullable=False, default=0)
+    gross_sales = Column(Numeric(14, 2), nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class DailyFinancialRollup(Base):
+    """Sales, fees, payouts and refunds per UTC day; rebuilt per user after the finance syncs"""
+    __tablename__ = "daily_financial_rollups"
+    
+    user_id = Column(String(36), primary_key=True)
+    day = Column(Date, primary_key=True)
+    currency = Column(String(10), primary_key=True, default='')
+    kind = Column(String(20), primary_key=True)
+    
+    entry_count = Column(Integer, nullable=False, default=0)
+    amount = Column(Numeric(14, 2), nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 class Offer(Base):
     __tablename__ = "offers"
     
@@ -838,6 +932,18 @@ class EbayHealthEvent(Base):
     )
 
 
+# Generated ebay_messages.search_vector: subject and sender weighted above the
+# body, with HTML tags and entities stripped from the body before parsing
+MESSAGE_BODY_TEXT_SQL = (
+    "regexp_replace(regexp_replace(coalesce(body, ''), '<[^>]*>', ' ', 'g'), '&[#a-zA-Z0-9]+;', ' ', 'g')"
+)
+MESSAGE_SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('english', coalesce(subject, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(sender_username, '')), 'A') || "
+    f"setweight(to_tsvector('english', {MESSAGE_BODY_TEXT_SQL}), 'B')"
+)
+
+
 class Message(Base):
     __tablename__ = "ebay_messages"
     
@@ -863,6 +969,7 @@ class Message(Base):
     raw_data = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
     updated_at = Column(DateTime(timezone=True), nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    search_vector = deferred(Column(TSVECTOR, Computed(MESSAGE_SEARCH_VECTOR_SQL, persisted=True)))
     
     __table_args__ = (
         Index('idx_ebay_messages_account_id', 'ebay_account_id'),
@@ -871,4 +978,7 @@ class Message(Base):
         Index('idx_ebay_messages_thread_id', 'thread_id'),
         Index('idx_ebay_messages_is_read', 'is_read'),
         Index('idx_ebay_messages_message_date', 'message_date'),
+        Index('uq_ebay_messages_user_message', 'user_id', 'message_id', unique=True),
+        Index('idx_ebay_messages_keyset_date', 'user_id', 'message_date', 'id'),
+        Index('idx_ebay_messages_search_vector', 'search_vector', postgresql_using='gin'),
     )
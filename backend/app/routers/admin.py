@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, Query, HTTPException, status
 from sqlalchemy.orm import Session
 from sqlalchemy import desc
 from typing import Optional
+import logging
 import os
 from datetime import datetime, timezone
 
@@ -9,8 +10,12 @@ from ..models_sqlalchemy import get_db
 from ..models_sqlalchemy.models import SyncLog, EbayAccount, EbayToken, EbayAuthorization
 from ..services.auth import admin_required
 from ..models.user import User
-from ..utils.logger import logger
+from ..config import settings
+from ..utils.logger import logger, parse_log_levels, set_log_levels, set_sql_echo, sql_echo_enabled
 from ..services.ebay import ebay_service
+from ..utils.metrics import bind_ebay_user, token_refreshes
+from ..utils.query_stats import query_stats
+from ..services.call_budget import call_ledger, daily_call_limits
 from ..services.ebay_connect_logger import ebay_connect_logger
 
 FEATURE_TOKEN_INFO = os.getenv('FEATURE_TOKEN_INFO', 'false').lower() == 'true'
@@ -61,6 +66,81 @@ async def get_sync_jobs(
     }
 
 
+@router.get("/logging")
+async def get_logging_config(current_user: User = Depends(admin_required)):
+    """Current SQL echo state and the levels of explicitly configured loggers (this process)"""
+    levels = {
+        name: logging.getLevelName(lg.level)
+        for name, lg in logging.root.manager.loggerDict.items()
+        if isinstance(lg, logging.Logger) and lg.level != logging.NOTSET
+    }
+    return {
+        "sql_echo": sql_echo_enabled(),
+        "root": logging.getLevelName(logging.getLogger().level),
+        "levels": dict(sorted(levels.items())),
+    }
+
+
+@router.put("/logging")
+async def update_logging_config(
+    sql_echo: Optional[bool] = Query(None),
+    levels: Optional[str] = Query(None, description="name=LEVEL,name=LEVEL"),
+    current_user: User = Depends(admin_required)
+):
+    """Toggle SQL echo and change logger levels at runtime, for this process only"""
+    parsed = parse_log_levels(levels or "")
+    invalid = [level for level in parsed.values() if not isinstance(logging.getLevelName(level), int)]
+    if invalid:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown log level: {', '.join(invalid)}")
+
+    if sql_echo is not None:
+        set_sql_echo(sql_echo)
+    set_log_levels(parsed)
+    logger.info(f"Logging updated by {current_user.email}: sql_echo={sql_echo}, levels={parsed}")
+    return await get_logging_config(current_user)
+
+
+@router.get("/slow-queries")
+async def get_slow_queries(
+    limit: int = Query(50, ge=1, le=500),
+    order_by: str = Query("total_ms", regex="^(total_ms|mean_ms|max_ms|calls|slow_calls)$"),
+    plans: bool = Query(True, description="Include sampled EXPLAIN plans"),
+    current_user: User = Depends(admin_required)
+):
+    """Slowest normalized SQL statements of this process, with sampled EXPLAIN plans"""
+    return {
+        "since": datetime.fromtimestamp(query_stats.started_at, timezone.utc).isoformat(),
+        "threshold_ms": settings.SLOW_QUERY_THRESHOLD_MS,
+        "explain_sample_rate": settings.SLOW_QUERY_EXPLAIN_SAMPLE_RATE,
+        "tracked": len(query_stats),
+        "statements": query_stats.top(limit, order_by, plans),
+    }
+
+
+@router.delete("/slow-queries")
+async def reset_slow_queries(current_user: User = Depends(admin_required)):
+    """Start collecting statement stats afresh (this process only)"""
+    query_stats.reset()
+    logger.info(f"Statement stats reset by {current_user.email}")
+    return {"status": "reset"}
+
+
+@router.get("/ebay/call-budget")
+async def get_ebay_call_budget(current_user: User = Depends(admin_required)):
+    """Today's eBay calls per API against the shared daily limits"""
+    usage = await call_ledger.usage_today()
+    limits = daily_call_limits()
+    return {
+        "day": datetime.now(timezone.utc).date().isoformat(),
+        "reserve_pct": settings.EBAY_CALL_BUDGET_RESERVE_PCT,
+        "apis": [
+            {"api": api, "calls": usage.get(api, 0), "limit": limits.get(api),
+             "remaining": limits[api] - usage.get(api, 0) if api in limits else None}
+            for api in sorted(set(usage) | set(limits))
+        ],
+    }
+
+
 @router.get("/ebay/tokens/logs")
 async def get_ebay_token_logs(
     env: str = Query(..., description="production only"),
@@ -196,6 +276,7 @@ async def refresh_ebay_access_token(
     # Execute refresh
     try:
         from datetime import timezone, timedelta
+        bind_ebay_user(account.org_id)
         new_resp = await ebay_service.refresh_access_token(token.refresh_token)
         # Update storage (access token only; refresh token remains long-lived)
         token.access_token = new_resp.access_token
@@ -214,6 +295,7 @@ async def refresh_ebay_access_token(
             )
         except Exception:
             pass
+        token_refreshes.inc(source="admin", outcome="refreshed")
         logger.info(f"Admin token refresh for account {account.id}")
     except Exception as e:
         try:
@@ -226,6 +308,7 @@ async def refresh_ebay_access_token(
             )
         except Exception:
             pass
+        token_refreshes.inc(source="admin", outcome="failed")
         logger.error(f"Admin token refresh failed: {e}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="refresh_failed")
 
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, asc
+from sqlalchemy import func
 from typing import Optional, List
 from datetime import datetime
 import uuid
@@ -9,6 +9,9 @@ from ..models_sqlalchemy import get_db
 from ..models_sqlalchemy.models import Purchase, PurchaseLineItem, PaymentStatus, FulfillmentStatus, SyncLog
 from ..services.auth import get_current_user, admin_required
 from ..models.user import User
+from ..services.grid_counts import COUNT_STRATEGY_PATTERN, count_rows
+from ..services.search import substring_match
+from ..utils.pagination import decode_cursor, keyset_filter, keyset_order_by, next_cursor
 
 router = APIRouter(prefix="/api/buying", tags=["buying"])
 
@@ -119,31 +122,16 @@ async def get_buying_sync_job_status(
     }
 
 
-@router.get("")
-async def get_purchases(
-    buyer: Optional[str] = Query(None),
-    seller: Optional[str] = Query(None),
-    status: Optional[str] = Query(None),
-    from_date: Optional[str] = Query(None, alias="from"),
-    to_date: Optional[str] = Query(None, alias="to"),
-    limit: int = Query(50, ge=1, le=500),
-    offset: int = Query(0, ge=0),
-    sort: str = Query("creation_date", regex="^(creation_date|total_value|buyer_username|seller_username)$"),
-    dir: str = Query("desc", regex="^(asc|desc)$"),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """
-    Get purchases with filtering, pagination, and sorting.
-    Server-side pagination for performance.
-    """
-    query = db.query(Purchase).filter(Purchase.user_id == current_user.id)
+def _purchases_query(db: Session, user_id: str, buyer: Optional[str], seller: Optional[str],
+                     status: Optional[str], from_date: Optional[str], to_date: Optional[str]):
+    """Build the filtered purchases query"""
+    query = db.query(Purchase).filter(Purchase.user_id == user_id)
     
     # Apply filters
     if buyer:
-        query = query.filter(Purchase.buyer_username.ilike(f"%{buyer}%"))
+        query = query.filter(substring_match(Purchase.buyer_username, buyer))
     if seller:
-        query = query.filter(Purchase.seller_username.ilike(f"%{seller}%"))
+        query = query.filter(substring_match(Purchase.seller_username, seller))
     if status:
         try:
             payment_status = PaymentStatus[status.upper()]
@@ -163,26 +151,61 @@ async def get_purchases(
         except:
             pass
     
+    return query
+
+
+@router.get("")
+async def get_purchases(
+    buyer: Optional[str] = Query(None),
+    seller: Optional[str] = Query(None),
+    status: Optional[str] = Query(None),
+    from_date: Optional[str] = Query(None, alias="from"),
+    to_date: Optional[str] = Query(None, alias="to"),
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    sort: str = Query("creation_date", regex="^(creation_date|total_value|buyer_username|seller_username)$"),
+    dir: str = Query("desc", regex="^(asc|desc)$"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from next_cursor; replaces offset"),
+    count: str = Query("exact", regex=COUNT_STRATEGY_PATTERN, description="Total count strategy: exact, estimated, cached or none"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get purchases with filtering, pagination, and sorting.
+    Server-side pagination for performance; pass next_cursor back as `cursor` for deep pages.
+    """
+    query = _purchases_query(db, current_user.id, buyer, seller, status, from_date, to_date)
+    filters = {"user_id": current_user.id, "buyer": buyer, "seller": seller, "status": status,
+               "from": from_date, "to": to_date}
+    
     # Get total count before pagination
-    total_count = query.count()
+    total_count = count_rows(db, query, count, "purchases", filters)
     
     # Apply sorting
     order_col = getattr(Purchase, sort)
-    if dir == "desc":
-        query = query.order_by(desc(order_col))
-    else:
-        query = query.order_by(asc(order_col))
+    query = query.order_by(*keyset_order_by(order_col, Purchase.purchase_id, dir))
     
     # Apply pagination
-    purchases = query.offset(offset).limit(limit).all()
+    if cursor:
+        after_value, after_id = decode_cursor(cursor, sort, dir)
+        query = query.filter(keyset_filter(order_col, Purchase.purchase_id, dir, after_value, after_id))
+    else:
+        query = query.offset(offset)
+    purchases = query.limit(limit + 1).all()
+    has_more = len(purchases) > limit
+    purchases = purchases[:limit]
+    
+    # Line item counts for the whole page in one grouped query
+    line_item_counts = dict(
+        db.query(PurchaseLineItem.purchase_id, func.count(PurchaseLineItem.id))
+        .filter(PurchaseLineItem.purchase_id.in_([p.purchase_id for p in purchases]))
+        .group_by(PurchaseLineItem.purchase_id)
+        .all()
+    ) if purchases else {}
     
     # Convert to dict
     results = []
     for purchase in purchases:
-        line_items_count = db.query(PurchaseLineItem).filter(
-            PurchaseLineItem.purchase_id == purchase.purchase_id
-        ).count()
-        
         results.append({
             "purchase_id": purchase.purchase_id,
             "buyer_username": purchase.buyer_username,
@@ -193,7 +216,7 @@ async def get_purchases(
             "fulfillment_status": purchase.fulfillment_status.value if purchase.fulfillment_status else "UNKNOWN",
             "creation_date": purchase.creation_date.isoformat() if purchase.creation_date else None,
             "tracking_number": purchase.tracking_number,
-            "line_items_count": line_items_count,
+            "line_items_count": line_item_counts.get(purchase.purchase_id, 0),
             "ship_to_name": purchase.ship_to_name,
             "ship_to_city": purchase.ship_to_city,
             "ship_to_state": purchase.ship_to_state,
@@ -202,9 +225,32 @@ async def get_purchases(
     return {
         "purchases": results,
         "total": total_count,
+        "count_strategy": count,
         "limit": limit,
         "offset": offset,
-        "has_more": (offset + limit) < total_count
+        "has_more": has_more,
+        "next_cursor": next_cursor(purchases, limit, sort, dir, lambda p: (getattr(p, sort), p.purchase_id), has_more)
+    }
+
+
+@router.get("/count")
+async def count_purchases(
+    buyer: Optional[str] = Query(None),
+    seller: Optional[str] = Query(None),
+    status: Optional[str] = Query(None),
+    from_date: Optional[str] = Query(None, alias="from"),
+    to_date: Optional[str] = Query(None, alias="to"),
+    count: str = Query("exact", regex="^(exact|estimated|cached)$"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Total for a purchases query, for the grid to fetch in parallel with the page"""
+    query = _purchases_query(db, current_user.id, buyer, seller, status, from_date, to_date)
+    filters = {"user_id": current_user.id, "buyer": buyer, "seller": seller, "status": status,
+               "from": from_date, "to": to_date}
+    return {
+        "total": count_rows(db, query, count, "purchases", filters),
+        "count_strategy": count
     }
 
 
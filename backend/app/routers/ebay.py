@@ -1,16 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks, Response
 from fastapi.responses import StreamingResponse
 from typing import Optional, List
 from app.models.ebay import EbayAuthRequest, EbayAuthCallback, EbayConnectionStatus
 from app.services.auth import get_current_active_user, get_user_from_header_or_query
 from app.services.ebay import ebay_service
 from app.services.ebay_connect_logger import ebay_connect_logger
+from app.services.call_budget import SyncPlan, plan_sync
 from app.models.user import User
 from app.utils.logger import logger, ebay_logger
 
 router = APIRouter(prefix="/ebay", tags=["ebay"])
 
 
+async def _plan_or_defer(user_id: str, sync_type: str) -> SyncPlan:
+    """The call budget plan for a sync, or HTTP 429 when the planner defers it to tomorrow"""
+    budget = await plan_sync(user_id, sync_type)
+    if budget.decision == "defer":
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=budget.reason,
+            headers={"Retry-After": str(budget.retry_after_seconds)}
+        )
+    return budget
+
+
 @router.post("/auth/start")
 async def start_ebay_auth(
     auth_request: EbayAuthRequest,
@@ -437,6 +450,7 @@ async def test_fetch_transactions(
 async def sync_all_orders(
     background_tasks: BackgroundTasks,
     environment: str = Query(None, description="eBay environment: sandbox or production (default: user's current environment)"),
+    profile: bool = Query(False, description="Capture a sampling profile of the run, downloadable from /sync/logs/{run_id}/profile"),
     current_user: User = Depends(get_current_active_user)
 ):
     """
@@ -461,6 +475,8 @@ async def sync_all_orders(
             detail=f"eBay access token not found for {env} environment"
         )
     
+    budget = await _plan_or_defer(current_user.id, 'orders')
+    
     event_logger = SyncEventLogger(current_user.id, 'orders')
     run_id = event_logger.run_id
     
@@ -471,26 +487,32 @@ async def sync_all_orders(
         current_user.id,
         access_token,
         env,
-        run_id
+        run_id,
+        profile,
+        budget.max_pages
     )
     
     return {
         "run_id": run_id,
         "status": "started",
-        "message": f"Orders sync started in background ({env})"
+        "message": f"Orders sync started in background ({env})",
+        "budget": budget.to_dict()
     }
 
 
-async def _run_orders_sync(user_id: str, access_token: str, ebay_environment: str, run_id: str):
+async def _run_orders_sync(user_id: str, access_token: str, ebay_environment: str, run_id: str,
+                           profile: bool = False, max_pages: Optional[int] = None):
     """Background task to run orders sync with error handling"""
     from app.config import settings
+    from app.services.sync_event_logger import profiled_run
     
     original_env = settings.EBAY_ENVIRONMENT
     settings.EBAY_ENVIRONMENT = ebay_environment
     
     try:
         # Pass run_id to sync_all_orders so it uses the same run_id for events
-        await ebay_service.sync_all_orders(user_id, access_token, run_id=run_id)
+        async with profiled_run(run_id, user_id, 'orders', profile):
+            await ebay_service.sync_all_orders(user_id, access_token, run_id=run_id, max_pages=max_pages)
     except Exception as e:
         logger.error(f"Background orders sync failed for run_id {run_id}: {str(e)}")
     finally:
@@ -505,8 +527,8 @@ async def get_orders(
 ):
     from app.services.ebay_database import ebay_db
     
-    orders = ebay_db.get_orders(current_user.id, limit, offset)
-    total = ebay_db.get_order_count(current_user.id)
+    orders = await ebay_db.get_orders_async(current_user.id, limit, offset)
+    total = await ebay_db.get_order_count_async(current_user.id)
     
     return {
         "orders": orders,
@@ -535,6 +557,7 @@ async def get_sync_jobs(
 async def sync_all_transactions(
     background_tasks: BackgroundTasks,
     environment: str = Query(None, description="eBay environment: sandbox or production (default: user's current environment)"),
+    profile: bool = Query(False, description="Capture a sampling profile of the run, downloadable from /sync/logs/{run_id}/profile"),
     current_user: User = Depends(get_current_active_user)
 ):
     from app.utils.ebay_token_helper import get_user_ebay_token, is_user_ebay_connected
@@ -556,6 +579,8 @@ async def sync_all_transactions(
     
     from app.services.sync_event_logger import SyncEventLogger
     
+    budget = await _plan_or_defer(current_user.id, 'transactions')
+    
     event_logger = SyncEventLogger(current_user.id, 'transactions')
     run_id = event_logger.run_id
     
@@ -566,25 +591,31 @@ async def sync_all_transactions(
         current_user.id,
         access_token,
         env,
-        run_id
+        run_id,
+        profile,
+        budget.max_pages
     )
     
     return {
         "run_id": run_id,
         "status": "started",
-        "message": f"Transactions sync started in background ({env})"
+        "message": f"Transactions sync started in background ({env})",
+        "budget": budget.to_dict()
     }
 
 
-async def _run_transactions_sync(user_id: str, access_token: str, ebay_environment: str, run_id: str):
+async def _run_transactions_sync(user_id: str, access_token: str, ebay_environment: str, run_id: str,
+                                 profile: bool = False, max_pages: Optional[int] = None):
     from app.config import settings
+    from app.services.sync_event_logger import profiled_run
     
     original_env = settings.EBAY_ENVIRONMENT
     settings.EBAY_ENVIRONMENT = ebay_environment
     
     try:
         # Pass run_id to sync_all_transactions so it uses the same run_id for events
-        await ebay_service.sync_all_transactions(user_id, access_token, run_id=run_id)
+        async with profiled_run(run_id, user_id, 'transactions', profile):
+            await ebay_service.sync_all_transactions(user_id, access_token, run_id=run_id, max_pages=max_pages)
     except Exception as e:
         logger.error(f"Background transactions sync failed for run_id {run_id}: {str(e)}")
     finally:
@@ -595,6 +626,7 @@ async def _run_transactions_sync(user_id: str, access_token: str, ebay_environme
 async def sync_all_disputes(
     background_tasks: BackgroundTasks,
     environment: str = Query(None, description="eBay environment: sandbox or production (default: user's current environment)"),
+    profile: bool = Query(False, description="Capture a sampling profile of the run, downloadable from /sync/logs/{run_id}/profile"),
     current_user: User = Depends(get_current_active_user)
 ):
     from app.services.sync_event_logger import SyncEventLogger
@@ -615,6 +647,8 @@ async def sync_all_disputes(
             detail=f"eBay access token not found for {env} environment"
         )
     
+    budget = await _plan_or_defer(current_user.id, 'disputes')
+    
     event_logger = SyncEventLogger(current_user.id, 'disputes')
     run_id = event_logger.run_id
     
@@ -625,25 +659,30 @@ async def sync_all_disputes(
         current_user.id,
         access_token,
         env,
-        run_id
+        run_id,
+        profile
     )
     
     return {
         "run_id": run_id,
         "status": "started",
-        "message": f"Disputes sync started in background ({env})"
+        "message": f"Disputes sync started in background ({env})",
+        "budget": budget.to_dict()
     }
 
 
-async def _run_disputes_sync(user_id: str, access_token: str, ebay_environment: str, run_id: str):
+async def _run_disputes_sync(user_id: str, access_token: str, ebay_environment: str, run_id: str,
+                             profile: bool = False):
     from app.config import settings
+    from app.services.sync_event_logger import profiled_run
     
     original_env = settings.EBAY_ENVIRONMENT
     settings.EBAY_ENVIRONMENT = ebay_environment
     
     try:
         # Pass run_id to sync_all_disputes so it uses the same run_id for events
-        await ebay_service.sync_all_disputes(user_id, access_token, run_id=run_id)
+        async with profiled_run(run_id, user_id, 'disputes', profile):
+            await ebay_service.sync_all_disputes(user_id, access_token, run_id=run_id)
     except Exception as e:
         logger.error(f"Background disputes sync failed for run_id {run_id}: {str(e)}")
     finally:
@@ -652,20 +691,31 @@ async def _run_disputes_sync(user_id: str, access_token: str, ebay_environment:
 
 @router.get("/disputes")
 async def get_disputes(
+    response: Response,
     limit: int = Query(100, description="Number of disputes to return"),
     offset: int = Query(0, description="Offset for pagination"),
+    cursor: str = Query(None, description="Opaque cursor from the X-Next-Cursor header; replaces offset"),
     current_user: User = Depends(get_current_active_user)
 ):
     """
     Get all disputes from database for the current user.
     """
-    from app.services.ebay_database import ebay_db
+    from app.models_sqlalchemy import AsyncSessionLocal
+    from app.utils.pagination import decode_cursor, keyset_sql, next_cursor
     from sqlalchemy import text
     
-    session = ebay_db._get_session()
+    params = {'user_id': current_user.id, 'limit': limit, 'offset': offset}
+    keyset_clause = ""
+    if cursor:
+        keyset_clause, keyset_params = keyset_sql(
+            'open_date', 'dispute_id', 'desc', *decode_cursor(cursor, "open_date", "desc")
+        )
+        keyset_clause = f"AND {keyset_clause}"
+        params.update(keyset_params)
+        params['offset'] = 0
     
-    try:
-        query = text("""
+    async with AsyncSessionLocal() as session:
+        query = text(f"""
             SELECT 
                 id,
                 dispute_id,
@@ -674,48 +724,48 @@ async def get_disputes(
                 dispute_status as status,
                 open_date,
                 respond_by_date,
-                dispute_data,
+                buyer_username,
+                amount_value as amount,
+                amount_currency as currency,
                 created_at,
                 updated_at
             FROM ebay_disputes
-            WHERE user_id = :user_id
-            ORDER BY open_date DESC
+            WHERE user_id = :user_id {keyset_clause}
+            ORDER BY open_date DESC, dispute_id DESC
             LIMIT :limit OFFSET :offset
         """)
         
-        result = session.execute(query, {
-            'user_id': current_user.id,
-            'limit': limit,
-            'offset': offset
-        })
+        result = await session.execute(query, params)
         
         disputes = []
+        last_key = None
         for row in result:
-            import json
-            dispute_data = json.loads(row.dispute_data) if row.dispute_data else {}
-            
+            last_key = (row.open_date, row.dispute_id)
             disputes.append({
                 'id': row.id,
                 'dispute_id': row.dispute_id,
                 'order_id': row.order_id,
-                'buyer_username': dispute_data.get('buyerUsername'),
+                'buyer_username': row.buyer_username,
                 'open_date': row.open_date.isoformat() if row.open_date else None,
                 'status': row.status,
-                'amount': dispute_data.get('monetaryTransactions', [{}])[0].get('totalPrice', {}).get('value') if dispute_data.get('monetaryTransactions') else None,
-                'currency': dispute_data.get('monetaryTransactions', [{}])[0].get('totalPrice', {}).get('currency') if dispute_data.get('monetaryTransactions') else None,
+                'amount': str(row.amount) if row.amount is not None else None,
+                'currency': row.currency,
                 'reason': row.reason,
                 'respond_by_date': row.respond_by_date.isoformat() if row.respond_by_date else None,
             })
         
+        # The body is a bare list, so the cursor for the next page travels in a header
+        cursor_token = next_cursor(disputes, limit, "open_date", "desc", lambda _: last_key)
+        if cursor_token:
+            response.headers["X-Next-Cursor"] = cursor_token
         return disputes
-    finally:
-        session.close()
 
 
 @router.post("/sync/offers", status_code=status.HTTP_202_ACCEPTED)
 async def sync_all_offers(
     background_tasks: BackgroundTasks,
     environment: str = Query(None, description="eBay environment: sandbox or production (default: user's current environment)"),
+    profile: bool = Query(False, description="Capture a sampling profile of the run, downloadable from /sync/logs/{run_id}/profile"),
     current_user: User = Depends(get_current_active_user)
 ):
     from app.services.sync_event_logger import SyncEventLogger
@@ -736,6 +786,8 @@ async def sync_all_offers(
             detail=f"eBay access token not found for {env} environment"
         )
     
+    budget = await _plan_or_defer(current_user.id, 'offers')
+    
     event_logger = SyncEventLogger(current_user.id, 'offers')
     run_id = event_logger.run_id
     
@@ -746,25 +798,30 @@ async def sync_all_offers(
         current_user.id,
         access_token,
         env,
-        run_id
+        run_id,
+        profile
     )
     
     return {
         "run_id": run_id,
         "status": "started",
-        "message": f"Offers sync started in background ({env})"
+        "message": f"Offers sync started in background ({env})",
+        "budget": budget.to_dict()
     }
 
 
-async def _run_offers_sync(user_id: str, access_token: str, ebay_environment: str, run_id: str):
+async def _run_offers_sync(user_id: str, access_token: str, ebay_environment: str, run_id: str,
+                           profile: bool = False):
     from app.config import settings
+    from app.services.sync_event_logger import profiled_run
     
     original_env = settings.EBAY_ENVIRONMENT
     settings.EBAY_ENVIRONMENT = ebay_environment
     
     try:
         # Pass run_id to sync_all_offers so it uses the same run_id for events
-        await ebay_service.sync_all_offers(user_id, access_token, run_id=run_id)
+        async with profiled_run(run_id, user_id, 'offers', profile):
+            await ebay_service.sync_all_offers(user_id, access_token, run_id=run_id)
     except Exception as e:
         logger.error(f"Background offers sync failed for run_id {run_id}: {str(e)}")
     finally:
@@ -775,6 +832,7 @@ async def _run_offers_sync(user_id: str, access_token: str, ebay_environment: st
 async def sync_all_inventory(
     background_tasks: BackgroundTasks,
     environment: str = Query(None, description="eBay environment: sandbox or production (default: user's current environment)"),
+    profile: bool = Query(False, description="Capture a sampling profile of the run, downloadable from /sync/logs/{run_id}/profile"),
     current_user: User = Depends(get_current_active_user)
 ):
     """
@@ -806,6 +864,8 @@ async def sync_all_inventory(
             detail=f"eBay access token not found for {env} environment"
         )
     
+    budget = await _plan_or_defer(current_user.id, 'inventory')
+    
     event_logger = SyncEventLogger(current_user.id, 'inventory')
     run_id = event_logger.run_id
     
@@ -816,25 +876,30 @@ async def sync_all_inventory(
         current_user.id,
         access_token,
         env,
-        run_id
+        run_id,
+        profile
     )
     
     return {
         "run_id": run_id,
         "status": "started",
-        "message": f"Inventory sync started in background ({env})"
+        "message": f"Inventory sync started in background ({env})",
+        "budget": budget.to_dict()
     }
 
 
-async def _run_inventory_sync(user_id: str, access_token: str, ebay_environment: str, run_id: str):
+async def _run_inventory_sync(user_id: str, access_token: str, ebay_environment: str, run_id: str,
+                              profile: bool = False):
     from app.config import settings
+    from app.services.sync_event_logger import profiled_run
     
     original_env = settings.EBAY_ENVIRONMENT
     settings.EBAY_ENVIRONMENT = ebay_environment
     
     try:
         # Pass run_id to sync_all_inventory so it uses the same run_id for events
-        await ebay_service.sync_all_inventory(user_id, access_token, run_id=run_id)
+        async with profiled_run(run_id, user_id, 'inventory', profile):
+            await ebay_service.sync_all_inventory(user_id, access_token, run_id=run_id)
     except Exception as e:
         logger.error(f"Background inventory sync failed for run_id {run_id}: {str(e)}")
     finally:
@@ -842,20 +907,35 @@ async def _run_inventory_sync(user_id: str, access_token: str, ebay_environment:
 
 
 @router.get("/export/all")
-async def export_all_data(current_user: User = Depends(get_current_active_user)):
+async def export_all_data(
+    format: str = Query("json", regex="^(json|ndjson)$"),
+    gzip: bool = Query(False, description="Compress the export with gzip"),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Export every order with its full eBay payload.
+    json keeps the single-document shape; both formats are streamed with no row cap.
+    """
     from app.services.ebay_database import ebay_db
+    from app.utils.exports import export_response, json_document_chunks, ndjson_chunks
     from datetime import datetime
     
-    orders = ebay_db.get_orders(current_user.id, limit=10000)
+    orders = ebay_db.iter_orders(current_user.id, include_payload=True)
     
-    export_data = {
-        "export_date": datetime.utcnow().isoformat(),
-        "user_email": current_user.email,
-        "orders": orders,
-        "total_orders": len(orders)
-    }
+    if format == "ndjson":
+        chunks = ndjson_chunks(orders)
+    else:
+        chunks = json_document_chunks(
+            {"export_date": datetime.utcnow().isoformat(), "user_email": current_user.email},
+            "orders", orders, "total_orders"
+        )
     
-    return export_data
+    return export_response(
+        chunks,
+        f"ebay_orders_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.{format}",
+        format,
+        gzip
+    )
 
 
 @router.get("/orders/filter")
@@ -866,27 +946,32 @@ async def filter_orders(
     end_date: str = Query(None, description="Filter by creation date (end)"),
     limit: int = Query(100, description="Number of orders to return"),
     offset: int = Query(0, description="Offset for pagination"),
+    cursor: str = Query(None, description="Opaque cursor from next_cursor; replaces offset"),
     current_user: User = Depends(get_current_active_user)
 ):
     from app.services.ebay_database import ebay_db
+    from app.utils.pagination import decode_cursor, next_cursor
     
-    orders = ebay_db.get_filtered_orders(
+    orders = await ebay_db.get_filtered_orders_async(
         current_user.id, 
         buyer_username=buyer_username,
         order_status=order_status,
         start_date=start_date,
         end_date=end_date,
         limit=limit,
-        offset=offset
+        offset=offset,
+        after=decode_cursor(cursor, "creation_date", "desc") if cursor else None
     )
-    total = ebay_db.get_order_count(current_user.id)
+    total = await ebay_db.get_order_count_async(current_user.id)
     
     return {
         "orders": orders,
         "total": total,
         "filtered_count": len(orders),
         "limit": limit,
-        "offset": offset
+        "offset": offset,
+        "next_cursor": next_cursor(orders, limit, "creation_date", "desc",
+                                   lambda o: (o['creation_date'], o['order_id']))
     }
 
 
@@ -911,26 +996,26 @@ async def stream_sync_events(
     NOTE: This endpoint supports token query parameter for EventSource compatibility.
     EventSource API cannot send custom headers, so we accept ?token=<jwt> as fallback.
     """
-    from app.services.sync_event_logger import get_sync_events_from_db
+    from app.services.sync_event_logger import get_sync_events_from_db_async
     import json
     import asyncio
     
     async def event_generator():
-        last_event_count = 0
+        last_event_id = 0
         is_complete = False
         
         while not is_complete:
-            events = get_sync_events_from_db(run_id, current_user.id)
+            # Only fetch events newer than the last one streamed
+            events = await get_sync_events_from_db_async(run_id, current_user.id, after_id=last_event_id)
             
-            if len(events) > last_event_count:
-                for event in events[last_event_count:]:
-                    yield f"event: {event['event_type']}\n"
-                    yield f"data: {json.dumps(event)}\n\n"
-                    
-                    if event['event_type'] in ['done', 'error', 'cancelled']:
-                        is_complete = True
+            for event in events:
+                yield f"event: {event['event_type']}\n"
+                yield f"data: {json.dumps(event)}\n\n"
+                
+                if event['event_type'] in ['done', 'error', 'cancelled']:
+                    is_complete = True
                 
-                last_event_count = len(events)
+                last_event_id = event['id']
             
             if not is_complete:
                 await asyncio.sleep(0.5)
@@ -958,9 +1043,9 @@ async def get_sync_logs(
     Get all sync logs for a specific run_id.
     Used for viewing historical logs or downloading complete log files.
     """
-    from app.services.sync_event_logger import get_sync_events_from_db
+    from app.services.sync_event_logger import get_sync_events_from_db_async
     
-    events = get_sync_events_from_db(run_id, current_user.id)
+    events = await get_sync_events_from_db_async(run_id, current_user.id)
     
     return {
         "run_id": run_id,
@@ -1025,10 +1110,10 @@ async def export_sync_logs(
     """
     Export sync logs as downloadable NDJSON file.
     """
-    from app.services.sync_event_logger import get_sync_events_from_db
+    from app.services.sync_event_logger import get_sync_events_from_db_async
     import json
     
-    events = get_sync_events_from_db(run_id, current_user.id)
+    events = await get_sync_events_from_db_async(run_id, current_user.id)
     
     def generate_ndjson():
         for event in events:
@@ -1043,6 +1128,33 @@ async def export_sync_logs(
     )
 
 
+@router.get("/sync/logs/{run_id}/profile")
+async def export_sync_profile(
+    run_id: str,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Download the sampling profile of a sync run started with profile=true,
+    as collapsed stacks (flamegraph.pl, speedscope).
+    """
+    from app.services.sync_event_logger import get_run_profile_async
+    
+    run_profile = await get_run_profile_async(run_id, current_user.id)
+    if not run_profile:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No profile captured for sync run {run_id}"
+        )
+    
+    return Response(
+        content=run_profile.folded_stacks,
+        media_type="text/plain",
+        headers={
+            "Content-Disposition": f"attachment; filename=sync_profile_{run_id}.folded"
+        }
+    )
+
+
 @router.post("/debug")
 async def debug_ebay_api(
     method: str = Query("GET", description="HTTP method"),
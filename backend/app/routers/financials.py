@@ -1,33 +1,27 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, asc, func
+from sqlalchemy import func
 from typing import Optional
 from datetime import datetime
 import uuid
 import time
 
 from ..models_sqlalchemy import get_db
-from ..models_sqlalchemy.models import Fee, Payout, PayoutItem, SyncLog
+from ..models_sqlalchemy.models import Fee, Payout, PayoutItem, SyncLog, DailyFinancialRollup
 from ..services.auth import get_current_user, admin_required
 from ..models.user import User
 from ..utils.logger import logger
+from ..services.grid_counts import COUNT_STRATEGY_PATTERN, count_rows
+from ..services.rollups import rebuild_financial_rollups, rollup_day
+from ..utils.pagination import decode_cursor, keyset_filter, keyset_order_by, next_cursor
 
 router = APIRouter(prefix="/api/financials", tags=["financials"])
 
 
-@router.get("/fees")
-async def get_fees(
-    from_date: Optional[str] = Query(None, alias="from"),
-    to_date: Optional[str] = Query(None, alias="to"),
-    type: Optional[str] = Query(None),
-    order_id: Optional[str] = Query(None),
-    limit: int = Query(50, ge=1, le=500),
-    offset: int = Query(0, ge=0),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """Get fees with filtering"""
-    query = db.query(Fee).filter(Fee.user_id == current_user.id)
+def _fees_query(db: Session, user_id: str, from_date: Optional[str], to_date: Optional[str],
+                type: Optional[str], order_id: Optional[str]):
+    """Build the filtered fees query"""
+    query = db.query(Fee).filter(Fee.user_id == user_id)
     
     if type:
         query = query.filter(Fee.fee_type.ilike(f"%{type}%"))
@@ -46,8 +40,36 @@ async def get_fees(
         except:
             pass
     
-    total_count = query.count()
-    fees = query.order_by(desc(Fee.assessed_at)).offset(offset).limit(limit).all()
+    return query
+
+
+@router.get("/fees")
+async def get_fees(
+    from_date: Optional[str] = Query(None, alias="from"),
+    to_date: Optional[str] = Query(None, alias="to"),
+    type: Optional[str] = Query(None),
+    order_id: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from next_cursor; replaces offset"),
+    count: str = Query("exact", regex=COUNT_STRATEGY_PATTERN, description="Total count strategy: exact, estimated, cached or none"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get fees with filtering"""
+    query = _fees_query(db, current_user.id, from_date, to_date, type, order_id)
+    filters = {"user_id": current_user.id, "from": from_date, "to": to_date, "type": type, "order_id": order_id}
+    
+    total_count = count_rows(db, query, count, "fees", filters)
+    query = query.order_by(*keyset_order_by(Fee.assessed_at, Fee.id, "desc"))
+    if cursor:
+        after_value, after_id = decode_cursor(cursor, "assessed_at", "desc")
+        query = query.filter(keyset_filter(Fee.assessed_at, Fee.id, "desc", after_value, after_id))
+    else:
+        query = query.offset(offset)
+    fees = query.limit(limit + 1).all()
+    has_more = len(fees) > limit
+    fees = fees[:limit]
     
     return {
         "fees": [
@@ -63,23 +85,37 @@ async def get_fees(
             for f in fees
         ],
         "total": total_count,
+        "count_strategy": count,
         "limit": limit,
-        "offset": offset
+        "offset": offset,
+        "has_more": has_more,
+        "next_cursor": next_cursor(fees, limit, "assessed_at", "desc", lambda f: (f.assessed_at, f.id), has_more)
     }
 
 
-@router.get("/payouts")
-async def get_payouts(
+@router.get("/fees/count")
+async def count_fees(
     from_date: Optional[str] = Query(None, alias="from"),
     to_date: Optional[str] = Query(None, alias="to"),
-    status: Optional[str] = Query(None),
-    limit: int = Query(50, ge=1, le=500),
-    offset: int = Query(0, ge=0),
+    type: Optional[str] = Query(None),
+    order_id: Optional[str] = Query(None),
+    count: str = Query("exact", regex="^(exact|estimated|cached)$"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get payouts with filtering"""
-    query = db.query(Payout).filter(Payout.user_id == current_user.id)
+    """Total for a fees query, for the grid to fetch in parallel with the page"""
+    query = _fees_query(db, current_user.id, from_date, to_date, type, order_id)
+    filters = {"user_id": current_user.id, "from": from_date, "to": to_date, "type": type, "order_id": order_id}
+    return {
+        "total": count_rows(db, query, count, "fees", filters),
+        "count_strategy": count
+    }
+
+
+def _payouts_query(db: Session, user_id: str, from_date: Optional[str], to_date: Optional[str],
+                   status: Optional[str]):
+    """Build the filtered payouts query"""
+    query = db.query(Payout).filter(Payout.user_id == user_id)
     
     if status:
         query = query.filter(Payout.status.ilike(f"%{status}%"))
@@ -96,8 +132,35 @@ async def get_payouts(
         except:
             pass
     
-    total_count = query.count()
-    payouts = query.order_by(desc(Payout.payout_date)).offset(offset).limit(limit).all()
+    return query
+
+
+@router.get("/payouts")
+async def get_payouts(
+    from_date: Optional[str] = Query(None, alias="from"),
+    to_date: Optional[str] = Query(None, alias="to"),
+    status: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from next_cursor; replaces offset"),
+    count: str = Query("exact", regex=COUNT_STRATEGY_PATTERN, description="Total count strategy: exact, estimated, cached or none"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get payouts with filtering"""
+    query = _payouts_query(db, current_user.id, from_date, to_date, status)
+    filters = {"user_id": current_user.id, "from": from_date, "to": to_date, "status": status}
+    
+    total_count = count_rows(db, query, count, "payouts", filters)
+    query = query.order_by(*keyset_order_by(Payout.payout_date, Payout.payout_id, "desc"))
+    if cursor:
+        after_value, after_id = decode_cursor(cursor, "payout_date", "desc")
+        query = query.filter(keyset_filter(Payout.payout_date, Payout.payout_id, "desc", after_value, after_id))
+    else:
+        query = query.offset(offset)
+    payouts = query.limit(limit + 1).all()
+    has_more = len(payouts) > limit
+    payouts = payouts[:limit]
     
     return {
         "payouts": [
@@ -111,8 +174,29 @@ async def get_payouts(
             for p in payouts
         ],
         "total": total_count,
+        "count_strategy": count,
         "limit": limit,
-        "offset": offset
+        "offset": offset,
+        "has_more": has_more,
+        "next_cursor": next_cursor(payouts, limit, "payout_date", "desc", lambda p: (p.payout_date, p.payout_id), has_more)
+    }
+
+
+@router.get("/payouts/count")
+async def count_payouts(
+    from_date: Optional[str] = Query(None, alias="from"),
+    to_date: Optional[str] = Query(None, alias="to"),
+    status: Optional[str] = Query(None),
+    count: str = Query("exact", regex="^(exact|estimated|cached)$"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Total for a payouts query, for the grid to fetch in parallel with the page"""
+    query = _payouts_query(db, current_user.id, from_date, to_date, status)
+    filters = {"user_id": current_user.id, "from": from_date, "to": to_date, "status": status}
+    return {
+        "total": count_rows(db, query, count, "payouts", filters),
+        "count_strategy": count
     }
 
 
@@ -123,41 +207,31 @@ async def get_financials_summary(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get financial summary (KPIs)"""
-    from ..models_sqlalchemy.models import Transaction
+    """
+    Get financial summary (KPIs) from daily_financial_rollups.
+    The range is applied at day resolution (UTC), both ends inclusive.
+    """
+    query = db.query(
+        DailyFinancialRollup.kind, func.sum(DailyFinancialRollup.amount)
+    ).filter(DailyFinancialRollup.user_id == current_user.id)
     
-    txn_query = db.query(Transaction).filter(Transaction.user_id == current_user.id)
-    fee_query = db.query(Fee).filter(Fee.user_id == current_user.id)
-    payout_query = db.query(Payout).filter(Payout.user_id == current_user.id)
+    from_day = rollup_day(from_date)
+    if from_day:
+        query = query.filter(DailyFinancialRollup.day >= from_day)
+    to_day = rollup_day(to_date)
+    if to_day:
+        query = query.filter(DailyFinancialRollup.day <= to_day)
     
-    if from_date:
-        try:
-            from_dt = datetime.fromisoformat(from_date.replace('Z', '+00:00'))
-            txn_query = txn_query.filter(Transaction.sale_date >= from_dt)
-            fee_query = fee_query.filter(Fee.assessed_at >= from_dt)
-            payout_query = payout_query.filter(Payout.payout_date >= from_dt)
-        except:
-            pass
-    
-    if to_date:
-        try:
-            to_dt = datetime.fromisoformat(to_date.replace('Z', '+00:00'))
-            txn_query = txn_query.filter(Transaction.sale_date <= to_dt)
-            fee_query = fee_query.filter(Fee.assessed_at <= to_dt)
-            payout_query = payout_query.filter(Payout.payout_date <= to_dt)
-        except:
-            pass
-    
-    gross_sales = txn_query.with_entities(func.sum(Transaction.sale_value)).scalar() or 0
-    total_fees = fee_query.with_entities(func.sum(Fee.amount)).scalar() or 0
-    payouts_total = payout_query.with_entities(func.sum(Payout.total_amount)).scalar() or 0
+    totals = {kind: amount or 0 for kind, amount in query.group_by(DailyFinancialRollup.kind).all()}
+    gross_sales = totals.get("sales", 0)
+    total_fees = totals.get("fees", 0)
     
     return {
         "gross_sales": float(gross_sales),
         "total_fees": float(total_fees),
         "net": float(gross_sales - total_fees),
-        "payouts_total": float(payouts_total),
-        "refunds": 0,
+        "payouts_total": float(totals.get("payouts", 0)),
+        "refunds": float(totals.get("refunds", 0)),
     }
 
 
@@ -186,6 +260,8 @@ def sync_financials_job(job_id: str, user_id: str, db: Session):
         pages_fetched = 1
         records_stored = 0
         
+        rebuild_financial_rollups(db, user_id)
+        
         duration_ms = int((time.time() - start_time) * 1000)
         sync_log.status = "success"
         sync_log.pages_fetched = pages_fetched
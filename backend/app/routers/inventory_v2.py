@@ -1,23 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
-from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
-from sqlalchemy import desc, asc, or_, and_, func
-from typing import Optional, List
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File, BackgroundTasks
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import desc, and_, func, select, update, any_, bindparam, Integer
+from sqlalchemy.dialects.postgresql import ARRAY
+from typing import Any, Optional, List, Dict
 from datetime import datetime
-import csv
-import io
+import time
+import uuid
 
-from ..models_sqlalchemy import get_db
-from ..models_sqlalchemy.models import Inventory, InventoryStatus, EbayStatus, ConditionType, Warehouse
+from ..models_sqlalchemy import get_db, get_async_db, SessionLocal
+from ..models_sqlalchemy.models import Inventory, InventoryStatus, EbayStatus, ConditionType, Warehouse, SyncLog
 from ..services.auth import get_current_user, admin_required
 from ..models.user import User
 from ..utils.logger import logger
+from ..services.grid_counts import COUNT_STRATEGY_PATTERN, count_rows_async
+from ..services.facets import inventory_facets
+from ..services.search import similarity_rank, substring_match
+from ..utils.pagination import decode_cursor, keyset_filter, keyset_order_by, next_cursor
+from ..utils.exports import EXPORT_BATCH_SIZE, EXPORT_FORMAT_PATTERN, csv_chunks, export_response, ndjson_chunks
 
 router = APIRouter(prefix="/api/inventory", tags=["inventory"])
 
 
-@router.get("/search")
-async def search_inventory(
+def inventory_search_filters(
     q: Optional[str] = Query(None),
     status: Optional[str] = Query(None),
     ebay_status: Optional[str] = Query(None),
@@ -33,29 +38,21 @@ async def search_inventory(
     tracking_number: Optional[str] = Query(None),
     date_from: Optional[str] = Query(None),
     date_to: Optional[str] = Query(None),
-    sort: str = Query("rec_created", regex="^(rec_created|price_value|sku_code|title|status|ebay_status)$"),
-    dir: str = Query("desc", regex="^(asc|desc)$"),
-    limit: int = Query(100, ge=1, le=1000),
-    offset: int = Query(0, ge=0),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+) -> Dict[str, Optional[str]]:
+    """Inventory grid filters, shared by /search, /search/count, /filters and /export"""
+    return dict(locals())
+
+
+def _inventory_search_query(
+    q=None, status=None, ebay_status=None, condition=None, category=None, storage=None,
+    warehouse_id=None, sku_code=None, item_id=None, ebay_listing_id=None, part_number=None,
+    author=None, tracking_number=None, date_from=None, date_to=None
 ):
-    """
-    Comprehensive inventory search with multi-filter support.
-    Optimized for production use with indexed queries.
-    """
-    query = db.query(Inventory)
+    """Build the filtered inventory select() for the search filters"""
+    query = select(Inventory)
     
     if q:
-        search_term = f"%{q}%"
-        query = query.filter(
-            or_(
-                Inventory.sku_code.ilike(search_term),
-                Inventory.title.ilike(search_term),
-                Inventory.part_number.ilike(search_term),
-                Inventory.model.ilike(search_term)
-            )
-        )
+        query = query.where(substring_match(Inventory.search_text, q))
     
     if status:
         statuses = [s.strip().upper() for s in status.split(',')]
@@ -66,7 +63,7 @@ async def search_inventory(
             except KeyError:
                 pass
         if valid_statuses:
-            query = query.filter(Inventory.status.in_(valid_statuses))
+            query = query.where(Inventory.status.in_(valid_statuses))
     
     if ebay_status:
         ebay_statuses = [s.strip().upper() for s in ebay_status.split(',')]
@@ -77,7 +74,7 @@ async def search_inventory(
             except KeyError:
                 pass
         if valid_ebay_statuses:
-            query = query.filter(Inventory.ebay_status.in_(valid_ebay_statuses))
+            query = query.where(Inventory.ebay_status.in_(valid_ebay_statuses))
     
     if condition:
         conditions = [c.strip().upper() for c in condition.split(',')]
@@ -88,61 +85,57 @@ async def search_inventory(
             except KeyError:
                 pass
         if valid_conditions:
-            query = query.filter(Inventory.condition.in_(valid_conditions))
+            query = query.where(Inventory.condition.in_(valid_conditions))
     
     if category:
         categories = [c.strip() for c in category.split(',')]
-        query = query.filter(Inventory.category.in_(categories))
+        query = query.where(Inventory.category.in_(categories))
     
     if storage:
-        query = query.filter(Inventory.storage_id.ilike(f"{storage}%"))
+        query = query.where(Inventory.storage_id.ilike(f"{storage}%"))
     
     if warehouse_id:
         try:
-            query = query.filter(Inventory.warehouse_id == int(warehouse_id))
+            query = query.where(Inventory.warehouse_id == int(warehouse_id))
         except:
             pass
     
     if sku_code:
-        query = query.filter(Inventory.sku_code.ilike(f"%{sku_code}%"))
+        query = query.where(substring_match(Inventory.sku_code, sku_code))
     
     if item_id or ebay_listing_id:
         search_id = item_id or ebay_listing_id
-        query = query.filter(Inventory.ebay_listing_id.ilike(f"%{search_id}%"))
+        query = query.where(substring_match(Inventory.ebay_listing_id, search_id))
     
     if part_number:
-        query = query.filter(Inventory.part_number.ilike(f"%{part_number}%"))
+        query = query.where(substring_match(Inventory.part_number, part_number))
     
     if author:
-        query = query.filter(Inventory.author.ilike(f"%{author}%"))
+        query = query.where(substring_match(Inventory.author, author))
     
     if tracking_number:
-        query = query.filter(Inventory.tracking_number.ilike(f"%{tracking_number}%"))
+        query = query.where(substring_match(Inventory.tracking_number, tracking_number))
     
     if date_from:
         try:
             from_dt = datetime.fromisoformat(date_from.replace('Z', '+00:00'))
-            query = query.filter(Inventory.rec_created >= from_dt)
+            query = query.where(Inventory.rec_created >= from_dt)
         except:
             pass
     
     if date_to:
         try:
             to_dt = datetime.fromisoformat(date_to.replace('Z', '+00:00'))
-            query = query.filter(Inventory.rec_created <= to_dt)
+            query = query.where(Inventory.rec_created <= to_dt)
         except:
             pass
     
-    total = query.count()
-    
-    order_col = getattr(Inventory, sort)
-    if dir == "desc":
-        query = query.order_by(desc(order_col))
-    else:
-        query = query.order_by(asc(order_col))
-    
-    rows = query.offset(offset).limit(limit).all()
-    
+    return query
+
+
+def _inventory_page(rows, total, count: str, limit: int, offset: int, has_more: bool,
+                    cursor_token: Optional[str]) -> dict:
+    """Serialize a page of inventory rows for the grid"""
     return {
         "rows": [
             {
@@ -173,33 +166,169 @@ async def search_inventory(
             for r in rows
         ],
         "total": total,
+        "count_strategy": count,
         "limit": limit,
-        "offset": offset
+        "offset": offset,
+        "has_more": has_more,
+        "next_cursor": cursor_token
+    }
+
+
+@router.get("/search")
+async def search_inventory(
+    filters: Dict[str, Optional[str]] = Depends(inventory_search_filters),
+    sort: str = Query("rec_created", regex="^(rec_created|price_value|sku_code|title|status|ebay_status|relevance)$"),
+    dir: str = Query("desc", regex="^(asc|desc)$"),
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from next_cursor; replaces offset"),
+    count: str = Query("exact", regex=COUNT_STRATEGY_PATTERN, description="Total count strategy: exact, estimated, cached or none"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Comprehensive inventory search with multi-filter support.
+    Optimized for production use with indexed queries.
+    Pass next_cursor back as `cursor` for constant-cost deep pages; offset still works.
+    sort=relevance ranks `q` matches by trigram similarity (offset paging only).
+    """
+    query = _inventory_search_query(**filters)
+    
+    total = await count_rows_async(db, query, count, "inventory", filters)
+    
+    if sort == "relevance":
+        if cursor:
+            raise HTTPException(status_code=400, detail="Cursor pagination is not available for relevance sort")
+        if filters["q"]:
+            query = query.order_by(desc(similarity_rank(Inventory.search_text, filters["q"])), desc(Inventory.id))
+        else:
+            query = query.order_by(*keyset_order_by(Inventory.rec_created, Inventory.id, "desc"))
+        rows = (await db.execute(query.offset(offset).limit(limit + 1))).scalars().all()
+        has_more = len(rows) > limit
+        return _inventory_page(rows[:limit], total, count, limit, offset, has_more, None)
+    
+    order_col = getattr(Inventory, sort)
+    query = query.order_by(*keyset_order_by(order_col, Inventory.id, dir))
+    
+    if cursor:
+        after_value, after_id = decode_cursor(cursor, sort, dir)
+        query = query.where(keyset_filter(order_col, Inventory.id, dir, after_value, after_id))
+    else:
+        query = query.offset(offset)
+    
+    rows = (await db.execute(query.limit(limit + 1))).scalars().all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
+    return _inventory_page(
+        rows, total, count, limit, offset, has_more,
+        next_cursor(rows, limit, sort, dir, lambda r: (getattr(r, sort), r.id), has_more)
+    )
+
+
+@router.get("/search/count")
+async def count_inventory(
+    filters: Dict[str, Optional[str]] = Depends(inventory_search_filters),
+    count: str = Query("exact", regex="^(exact|estimated|cached)$"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Total for an inventory search, for the grid to fetch in parallel with the page"""
+    query = _inventory_search_query(**filters)
+    return {
+        "total": await count_rows_async(db, query, count, "inventory", filters),
+        "count_strategy": count
     }
 
 
 @router.get("/filters")
 async def get_filter_options(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    filters: Dict[str, Optional[str]] = Depends(inventory_search_filters),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get distinct filter values for UI dropdowns"""
-    categories = db.query(Inventory.category).distinct().filter(Inventory.category.isnot(None)).all()
-    warehouses = db.query(Warehouse.id, Warehouse.code, Warehouse.name).all()
-    storage_prefixes = db.query(
-        func.substring(Inventory.storage_id, 1, 3).label('prefix')
-    ).distinct().filter(Inventory.storage_id.isnot(None)).limit(50).all()
-    
+    """
+    Filter values for the UI dropdowns. `facets` carries each value's item count
+    under the current search filters; the lists keep their old shape.
+    """
+    facets = await inventory_facets(db, _inventory_search_query(**filters), filters)
+
     return {
         "statuses": [s.value for s in InventoryStatus],
         "ebay_statuses": [s.value for s in EbayStatus],
         "conditions": [c.value for c in ConditionType],
-        "categories": [c[0] for c in categories if c[0]],
-        "warehouses": [{"id": w.id, "code": w.code, "name": w.name} for w in warehouses],
-        "storage_prefixes": [p[0] for p in storage_prefixes if p[0]]
+        "categories": [f["value"] for f in facets["category"]],
+        "warehouses": [{"id": f["value"], "name": f["name"]} for f in facets["warehouse"]],
+        "storage_prefixes": [f["value"] for f in facets["storage_prefix"]][:50],
+        "facets": facets
     }
 
 
+INVENTORY_EXPORT_COLUMNS = [
+    'id', 'sku_code', 'model', 'category', 'condition', 'part_number', 'title',
+    'price_value', 'price_currency', 'ebay_listing_id', 'ebay_status', 'status',
+    'photo_count', 'storage_id', 'warehouse_id', 'quantity', 'rec_created', 'author'
+]
+
+
+def _inventory_export_rows(filters: Dict[str, Optional[str]]):
+    """
+    Export rows for the search filters, newest first, read through a server-side cursor.
+    Owns its session so the stream outlives the request handler.
+    """
+    query = _inventory_search_query(**filters).with_only_columns(
+        *(getattr(Inventory, c) for c in INVENTORY_EXPORT_COLUMNS)
+    ).order_by(desc(Inventory.rec_created), desc(Inventory.id))
+    
+    db = SessionLocal()
+    try:
+        for r in db.execute(query, execution_options={"yield_per": EXPORT_BATCH_SIZE}):
+            yield {
+                'id': r.id,
+                'sku_code': r.sku_code or '',
+                'model': r.model or '',
+                'category': r.category or '',
+                'condition': r.condition.value if r.condition else '',
+                'part_number': r.part_number or '',
+                'title': r.title or '',
+                'price_value': float(r.price_value) if r.price_value else '',
+                'price_currency': r.price_currency or '',
+                'ebay_listing_id': r.ebay_listing_id or '',
+                'ebay_status': r.ebay_status.value if r.ebay_status else '',
+                'status': r.status.value if r.status else '',
+                'photo_count': r.photo_count or 0,
+                'storage_id': r.storage_id or '',
+                'warehouse_id': r.warehouse_id or '',
+                'quantity': r.quantity or 1,
+                'rec_created': r.rec_created.isoformat() if r.rec_created else '',
+                'author': r.author or ''
+            }
+    finally:
+        db.close()
+
+
+@router.get("/export")
+@router.get("/export.csv")
+async def export_inventory_csv(
+    filters: Dict[str, Optional[str]] = Depends(inventory_search_filters),
+    format: str = Query("csv", regex=EXPORT_FORMAT_PATTERN),
+    gzip: bool = Query(False, description="Compress the export with gzip"),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Export all inventory matching the search filters as CSV or NDJSON.
+    Streamed from a server-side cursor with no row cap.
+    """
+    rows = _inventory_export_rows(filters)
+    chunks = csv_chunks(rows, INVENTORY_EXPORT_COLUMNS) if format == "csv" else ndjson_chunks(rows)
+    return export_response(
+        chunks,
+        f"inventory_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.{format}",
+        format,
+        gzip
+    )
+
+
 @router.get("/{id}")
 async def get_inventory_item(
     id: int,
@@ -207,11 +336,11 @@ async def get_inventory_item(
     current_user: User = Depends(get_current_user)
 ):
     """Get single inventory item with full details"""
-    item = db.query(Inventory).filter(Inventory.id == id).first()
+    item = db.query(Inventory).options(joinedload(Inventory.warehouse)).filter(Inventory.id == id).first()
     if not item:
         raise HTTPException(status_code=404, detail="Inventory item not found")
     
-    warehouse = db.query(Warehouse).filter(Warehouse.id == item.warehouse_id).first() if item.warehouse_id else None
+    warehouse = item.warehouse
     
     return {
         "id": item.id,
@@ -231,7 +360,7 @@ async def get_inventory_item(
         "storage_id": item.storage_id,
         "storage": item.storage,
         "warehouse_id": item.warehouse_id,
-        "warehouse": {"id": warehouse.id, "code": warehouse.code, "name": warehouse.name} if warehouse else None,
+        "warehouse": {"id": warehouse.id, "name": warehouse.name, "location": warehouse.location} if warehouse else None,
         "quantity": item.quantity,
         "rec_created": item.rec_created.isoformat() if item.rec_created else None,
         "rec_updated": item.rec_updated.isoformat() if item.rec_updated else None,
@@ -288,129 +417,179 @@ async def update_inventory_item(
     return {"success": True, "id": item.id}
 
 
+# Ids per bulk UPDATE; they travel as a single array parameter, so this only bounds statement time
+BULK_CHUNK_SIZE = 5000
+
+
+def _bulk_values(action: str, payload: Optional[dict]) -> Dict[str, Any]:
+    """Column values written by a bulk action"""
+    payload = payload or {}
+    
+    if action == "freeze":
+        values = {"status": InventoryStatus.FROZEN}
+    elif action == "relist":
+        values = {"status": InventoryStatus.PENDING_LISTING}
+    elif action == "mark_listed":
+        values = {"status": InventoryStatus.LISTED, "ebay_status": EbayStatus.ACTIVE}
+        if "ebay_listing_id" in payload:
+            values["ebay_listing_id"] = payload["ebay_listing_id"]
+    elif action == "mark_group_listed":
+        values = {"status": InventoryStatus.LISTED, "ebay_status": EbayStatus.ACTIVE}
+    elif action == "cancel_listings":
+        values = {"status": InventoryStatus.AVAILABLE, "ebay_status": EbayStatus.ENDED}
+    elif action == "change_listings":
+        values = {}
+        if "price_value" in payload:
+            values["price_value"] = payload["price_value"]
+    else:
+        raise HTTPException(status_code=400, detail=f"Unknown action: {action}")
+    
+    values["rec_updated"] = datetime.utcnow()
+    return values
+
+
+def _bulk_update_chunk(db: Session, ids: List[int], values: Dict[str, Any]) -> List[int]:
+    """
+    Apply `values` to a chunk of distinct ids in one statement and return the ids that do not exist.
+    The UPDATE ... WHERE id = ANY(:ids) RETURNING id runs as a data-modifying CTE, and the
+    missing ids come from an anti-join of the requested ids against what it returned.
+    """
+    id_array = bindparam("ids", ids, type_=ARRAY(Integer))
+    updated = (
+        update(Inventory)
+        .where(Inventory.id == any_(id_array))
+        .values(**values)
+        .returning(Inventory.id)
+        .cte("updated")
+    )
+    requested = func.unnest(id_array).table_valued("id").render_derived(name="requested")
+    missing = db.execute(
+        select(requested.c.id)
+        .select_from(requested.outerjoin(updated, updated.c.id == requested.c.id))
+        .where(updated.c.id.is_(None))
+    )
+    return [row.id for row in missing]
+
+
+def _bulk_chunks(ids: List[int]) -> List[List[int]]:
+    ids = list(dict.fromkeys(ids))
+    return [ids[i:i + BULK_CHUNK_SIZE] for i in range(0, len(ids), BULK_CHUNK_SIZE)]
+
+
+def run_bulk_job(job_id: str, ids: List[int], values: Dict[str, Any]):
+    """
+    Background bulk action. Commits after every chunk and records progress on the job's
+    SyncLog: records_fetched = ids requested, record_count = ids processed,
+    records_stored = rows updated, pages_fetched = chunks done.
+    """
+    db = SessionLocal()
+    start_time = time.time()
+    sync_log = db.query(SyncLog).filter(SyncLog.job_id == job_id).first()
+    missing_ids = []
+    
+    try:
+        sync_log.status = "running"
+        db.commit()
+        
+        for chunk in _bulk_chunks(ids):
+            missing = _bulk_update_chunk(db, chunk, values)
+            missing_ids.extend(missing)
+            sync_log.pages_fetched = (sync_log.pages_fetched or 0) + 1
+            sync_log.record_count = (sync_log.record_count or 0) + len(chunk)
+            sync_log.records_stored = (sync_log.records_stored or 0) + len(chunk) - len(missing)
+            db.commit()
+        
+        sync_log.status = "success"
+        if missing_ids:
+            sync_log.error_text = f"{len(missing_ids)} items not found: " + ", ".join(map(str, missing_ids[:100]))
+    except Exception as e:
+        logger.error(f"[Job {job_id}] Inventory bulk action failed: {e}")
+        db.rollback()
+        sync_log.status = "error"
+        sync_log.error_text = str(e)
+    finally:
+        sync_log.duration_ms = int((time.time() - start_time) * 1000)
+        sync_log.sync_completed_at = datetime.utcnow()
+        db.commit()
+        db.close()
+
+
 @router.post("/admin/bulk")
 async def bulk_action(
+    background_tasks: BackgroundTasks,
     ids: List[int],
     action: str,
     payload: Optional[dict] = None,
+    background: bool = Query(False, description="Run as a background job and return its job_id"),
     db: Session = Depends(get_db),
     current_user: User = Depends(admin_required)
 ):
     """
-    Bulk actions on inventory items.
+    Bulk actions on inventory items, applied with set-based UPDATEs in chunks of BULK_CHUNK_SIZE.
     Actions: freeze, relist, mark_listed, mark_group_listed, cancel_listings, change_listings
+    With background=true the action runs as a job; poll /admin/bulk/jobs/{job_id} for progress.
     """
-    updated = []
+    values = _bulk_values(action, payload)
+    
+    if background:
+        job_id = str(uuid.uuid4())
+        db.add(SyncLog(
+            job_id=job_id,
+            user_id=current_user.id,
+            endpoint=f"inventory_bulk_{action}",
+            status="queued",
+            records_fetched=len(set(ids)),
+            sync_started_at=datetime.utcnow()
+        ))
+        db.commit()
+        background_tasks.add_task(run_bulk_job, job_id, ids, values)
+        return {"job_id": job_id, "status": "queued", "total": len(set(ids))}
+    
+    updated = 0
     failed = []
-    
-    for item_id in ids:
-        try:
-            item = db.query(Inventory).filter(Inventory.id == item_id).first()
-            if not item:
-                failed.append({"id": item_id, "reason": "Item not found"})
-                continue
-            
-            if action == "freeze":
-                item.status = InventoryStatus.FROZEN
-            elif action == "relist":
-                item.status = InventoryStatus.PENDING_LISTING
-            elif action == "mark_listed":
-                item.status = InventoryStatus.LISTED
-                if payload and "ebay_listing_id" in payload:
-                    item.ebay_listing_id = payload["ebay_listing_id"]
-                item.ebay_status = EbayStatus.ACTIVE
-            elif action == "mark_group_listed":
-                item.status = InventoryStatus.LISTED
-                item.ebay_status = EbayStatus.ACTIVE
-            elif action == "cancel_listings":
-                item.ebay_status = EbayStatus.ENDED
-                item.status = InventoryStatus.AVAILABLE
-            elif action == "change_listings":
-                if payload and "price_value" in payload:
-                    item.price_value = payload["price_value"]
-            else:
-                failed.append({"id": item_id, "reason": f"Unknown action: {action}"})
-                continue
-            
-            item.rec_updated = datetime.utcnow()
-            updated.append(item_id)
-            
-        except Exception as e:
-            failed.append({"id": item_id, "reason": str(e)})
+    for chunk in _bulk_chunks(ids):
+        missing = _bulk_update_chunk(db, chunk, values)
+        updated += len(chunk) - len(missing)
+        failed.extend({"id": item_id, "reason": "Item not found"} for item_id in missing)
     
     db.commit()
     
     return {
-        "updated": len(updated),
+        "updated": updated,
         "failed": failed
     }
 
 
-@router.get("/export.csv")
-async def export_inventory_csv(
-    q: Optional[str] = Query(None),
-    status: Optional[str] = Query(None),
-    ebay_status: Optional[str] = Query(None),
-    condition: Optional[str] = Query(None),
-    category: Optional[str] = Query(None),
-    storage: Optional[str] = Query(None),
-    warehouse_id: Optional[str] = Query(None),
+@router.get("/admin/bulk/jobs/{job_id}")
+async def get_bulk_job_status(
+    job_id: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(admin_required)
 ):
-    """Export inventory with filters to CSV"""
-    query = db.query(Inventory)
+    """Progress of a background bulk action"""
+    sync_log = db.query(SyncLog).filter(
+        SyncLog.job_id == job_id,
+        SyncLog.endpoint.like("inventory_bulk_%")
+    ).first()
     
-    if q:
-        search_term = f"%{q}%"
-        query = query.filter(
-            or_(
-                Inventory.sku_code.ilike(search_term),
-                Inventory.title.ilike(search_term),
-                Inventory.part_number.ilike(search_term)
-            )
-        )
+    if not sync_log:
+        raise HTTPException(status_code=404, detail="Job not found")
     
-    if status:
-        statuses = [InventoryStatus[s.strip().upper()] for s in status.split(',') if s.strip().upper() in InventoryStatus.__members__]
-        if statuses:
-            query = query.filter(Inventory.status.in_(statuses))
-    
-    rows = query.order_by(desc(Inventory.rec_created)).limit(10000).all()
-    
-    output = io.StringIO()
-    writer = csv.DictWriter(output, fieldnames=[
-        'id', 'sku_code', 'model', 'category', 'condition', 'part_number', 'title',
-        'price_value', 'price_currency', 'ebay_listing_id', 'ebay_status', 'status',
-        'photo_count', 'storage_id', 'warehouse_id', 'quantity', 'rec_created', 'author'
-    ])
-    writer.writeheader()
-    
-    for r in rows:
-        writer.writerow({
-            'id': r.id,
-            'sku_code': r.sku_code or '',
-            'model': r.model or '',
-            'category': r.category or '',
-            'condition': r.condition.value if r.condition else '',
-            'part_number': r.part_number or '',
-            'title': r.title or '',
-            'price_value': float(r.price_value) if r.price_value else '',
-            'price_currency': r.price_currency or '',
-            'ebay_listing_id': r.ebay_listing_id or '',
-            'ebay_status': r.ebay_status.value if r.ebay_status else '',
-            'status': r.status.value if r.status else '',
-            'photo_count': r.photo_count or 0,
-            'storage_id': r.storage_id or '',
-            'warehouse_id': r.warehouse_id or '',
-            'quantity': r.quantity or 1,
-            'rec_created': r.rec_created.isoformat() if r.rec_created else '',
-            'author': r.author or ''
-        })
-    
-    output.seek(0)
-    return StreamingResponse(
-        iter([output.getvalue()]),
-        media_type="text/csv",
-        headers={"Content-Disposition": f"attachment; filename=inventory_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.csv"}
-    )
+    total = sync_log.records_fetched or 0
+    processed = sync_log.record_count or 0
+    updated = sync_log.records_stored or 0
+    
+    return {
+        "job_id": sync_log.job_id,
+        "status": sync_log.status,
+        "action": sync_log.endpoint[len("inventory_bulk_"):],
+        "total": total,
+        "processed": processed,
+        "updated": updated,
+        "not_found": processed - updated,
+        "progress": processed / total if total else 1.0,
+        "error_text": sync_log.error_text,
+        "duration_ms": sync_log.duration_ms or 0,
+        "started_at": sync_log.sync_started_at.isoformat() if sync_log.sync_started_at else None,
+        "completed_at": sync_log.sync_completed_at.isoformat() if sync_log.sync_completed_at else None
+    }
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
@@ -7,6 +7,8 @@ from app.db_models import Message
 from app.services.auth import get_current_user
 from app.models.user import User as UserModel
 from app.services.ebay import ebay_service
+from app.services.search import fulltext_match, fulltext_rank, message_snippets
+from app.utils.pagination import decode_cursor, keyset_filter, keyset_order_by, next_cursor
 from pydantic import BaseModel
 import logging
 
@@ -30,6 +32,7 @@ class MessageResponse(BaseModel):
     message_date: datetime
     order_id: Optional[str]
     listing_id: Optional[str]
+    snippet: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -41,14 +44,20 @@ class MessageUpdate(BaseModel):
 
 @router.get("/", response_model=List[MessageResponse])
 async def get_messages(
+    response: Response,
     folder: str = Query("inbox", regex="^(inbox|sent|flagged|archived)$"),
     unread_only: bool = False,
     search: Optional[str] = None,
+    sort: Optional[str] = Query(None, regex="^(date|relevance)$", description="Defaults to relevance when searching"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header; replaces skip"),
     current_user: UserModel = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
+    search = (search or "").strip()
+    sort = "date" if not search else (sort or "relevance")
+    
     query = db.query(Message).filter(Message.user_id == current_user.id)
     
     if folder == "inbox":
@@ -64,14 +73,39 @@ async def get_messages(
         query = query.filter(Message.is_read == False)
     
     if search:
-        query = query.filter(
-            (Message.subject.contains(search)) |
-            (Message.body.contains(search)) |
-            (Message.sender_username.contains(search))
-        )
+        query = query.filter(fulltext_match(Message.search_vector, search))
+    
+    if sort == "relevance":
+        if cursor:
+            raise HTTPException(status_code=400, detail="Cursor pagination is not available for relevance sort")
+        messages = query.order_by(
+            fulltext_rank(Message.search_vector, search).desc(), Message.message_date.desc(), Message.id.desc()
+        ).offset(skip).limit(limit).all()
+        return _with_snippets(db, messages, search)
+    
+    query = query.order_by(*keyset_order_by(Message.message_date, Message.id, "desc"))
+    if cursor:
+        after_value, after_id = decode_cursor(cursor, "message_date", "desc")
+        query = query.filter(keyset_filter(Message.message_date, Message.id, "desc", after_value, after_id))
+    else:
+        query = query.offset(skip)
     
-    messages = query.order_by(Message.message_date.desc()).offset(skip).limit(limit).all()
-    return messages
+    messages = query.limit(limit).all()
+    
+    # The body is a bare list, so the cursor for the next page travels in a header
+    cursor_token = next_cursor(messages, limit, "message_date", "desc", lambda m: (m.message_date, m.id))
+    if cursor_token:
+        response.headers["X-Next-Cursor"] = cursor_token
+    return _with_snippets(db, messages, search) if search else messages
+
+
+def _with_snippets(db: Session, messages: List[Message], search: str) -> List[MessageResponse]:
+    """Attach highlighted body fragments to a page of search results"""
+    snippets = message_snippets(db, [m.id for m in messages], search)
+    return [
+        MessageResponse.model_validate(m).model_copy(update={"snippet": snippets.get(m.id)})
+        for m in messages
+    ]
 
 @router.get("/{message_id}", response_model=MessageResponse)
 async def get_message(
@@ -181,15 +215,13 @@ async def sync_messages(
 async def _run_messages_sync(user_id: str, access_token: str, dry_run: bool, run_id: str):
     """Background task to run messages sync with error handling"""
     from app.services.sync_event_logger import SyncEventLogger
-    from app.database import get_db
+    from app.services.ebay import MESSAGES_WRITE_BATCH
     import time
     
     event_logger = SyncEventLogger(user_id, 'messages')
     event_logger.run_id = run_id
     start_time = time.time()
     
-    db = next(get_db())
-    
     try:
         from app.config import settings
         import asyncio
@@ -245,12 +277,12 @@ async def _run_messages_sync(user_id: str, access_token: str, dry_run: bool, run
         
         for folder in folders:
             # Check for cancellation
-            from app.services.sync_event_logger import is_cancelled
-            if is_cancelled(run_id):
+            from app.services.sync_event_logger import is_cancelled_async
+            if await is_cancelled_async(run_id):
                 logger.info(f"Messages sync cancelled for run_id {run_id}")
                 event_logger.log_warning("Sync operation cancelled by user")
                 duration_ms = int((time.time() - start_time) * 1000)
-                event_logger.log_done(
+                event_logger.log_cancelled(
                     f"Messages sync cancelled: {total_fetched} fetched, {total_stored} stored",
                     total_fetched,
                     total_stored,
@@ -285,12 +317,12 @@ async def _run_messages_sync(user_id: str, access_token: str, dry_run: bool, run
             
             while page_number <= max_pages:
                 # Check for cancellation BEFORE each request
-                from app.services.sync_event_logger import is_cancelled
-                if is_cancelled(run_id):
+                from app.services.sync_event_logger import is_cancelled_async
+                if await is_cancelled_async(run_id):
                     logger.info(f"Messages sync cancelled for run_id {run_id}")
                     event_logger.log_warning("Sync operation cancelled by user")
                     duration_ms = int((time.time() - start_time) * 1000)
-                    event_logger.log_done(
+                    event_logger.log_cancelled(
                         f"Messages sync cancelled: {total_fetched} fetched, {total_stored} stored",
                         total_fetched,
                         total_stored,
@@ -370,16 +402,19 @@ async def _run_messages_sync(user_id: str, access_token: str, dry_run: bool, run
             
             folder_fetched = 0
             folder_stored = 0
+            pending_messages = []
             total_batches = (len(all_message_ids) + 9) // 10
             
             for i in range(0, len(all_message_ids), 10):
                 # Check for cancellation
-                from app.services.sync_event_logger import is_cancelled
-                if is_cancelled(run_id):
+                from app.services.sync_event_logger import is_cancelled_async
+                if await is_cancelled_async(run_id):
+                    if pending_messages:
+                        total_stored += await _flush_messages(user_id, pending_messages, event_logger)
                     logger.info(f"Messages sync cancelled for run_id {run_id}")
                     event_logger.log_warning("Sync operation cancelled by user")
                     duration_ms = int((time.time() - start_time) * 1000)
-                    event_logger.log_done(
+                    event_logger.log_cancelled(
                         f"Messages sync cancelled: {total_fetched} fetched, {total_stored} stored",
                         total_fetched,
                         total_stored,
@@ -412,67 +447,24 @@ async def _run_messages_sync(user_id: str, access_token: str, dry_run: bool, run
                     event_logger.log_info(f"← Response: 200 OK ({request_duration}ms) - Received {len(messages)} message bodies")
                     
                     folder_fetched += len(messages)
+                    pending_messages.extend(messages)
                     
-                    for msg in messages:
-                        message_id = msg.get("messageid") or msg.get("externalmessageid")
-                        
-                        if not message_id:
-                            logger.warning(f"Message missing ID, skipping: {msg}")
-                            continue
-                        
-                        existing = db.query(Message).filter(
-                            Message.message_id == message_id,
-                            Message.user_id == user_id
-                        ).first()
-                        
-                        if existing:
-                            logger.debug(f"Message {message_id} already exists, skipping")
-                            continue
-                        
-                        sender = msg.get("sender", "")
-                        recipient = msg.get("recipientuserid", "")
-                        direction = "INCOMING"
-                        
-                        receive_date_str = msg.get("receivedate", "")
-                        message_date = datetime.utcnow()
-                        if receive_date_str:
-                            try:
-                                message_date = datetime.fromisoformat(receive_date_str.replace("Z", "+00:00"))
-                            except Exception as e:
-                                logger.warning(f"Failed to parse date {receive_date_str}: {e}")
-                        
-                        message = Message(
-                            user_id=user_id,
-                            message_id=message_id,
-                            thread_id=msg.get("externalmessageid") or message_id,
-                            sender_username=sender,
-                            recipient_username=recipient,
-                            subject=msg.get("subject", ""),
-                            body=msg.get("text", ""),
-                            message_type="MEMBER_MESSAGE",
-                            is_read=msg.get("read", False),
-                            is_flagged=msg.get("flagged", False),
-                            is_archived=msg.get("folderid") == "2",
-                            direction=direction,
-                            message_date=message_date,
-                            order_id=None,
-                            listing_id=msg.get("itemid"),
-                            raw_data=str(msg)
-                        )
-                        db.add(message)
-                        folder_stored += 1
-                    
-                    db.commit()
-                    event_logger.log_info(f"← Database: Stored {len(messages)} messages from batch {batch_num}")
+                    # Writes are batched independently of the 10-ID body requests
+                    if len(pending_messages) >= MESSAGES_WRITE_BATCH:
+                        folder_stored += await _flush_messages(user_id, pending_messages, event_logger)
+                        pending_messages = []
                     
                     await asyncio.sleep(0.4)
                     
                 except Exception as e:
                     logger.error(f"Failed to fetch/store batch {i//10 + 1}: {str(e)}")
                     event_logger.log_error(f"Batch {batch_num} failed: {str(e)}", e)
-                    db.rollback()
                     continue
             
+            if pending_messages:
+                folder_stored += await _flush_messages(user_id, pending_messages, event_logger)
+                pending_messages = []
+            
             folder_stats[folder_name] = {
                 "fetched": folder_fetched,
                 "stored": folder_stored
@@ -495,7 +487,20 @@ async def _run_messages_sync(user_id: str, access_token: str, dry_run: bool, run
         error_msg = str(e)
         event_logger.log_error(f"Messages sync failed: {error_msg}", e)
         logger.error(f"Background messages sync failed for run_id {run_id}: {error_msg}")
-        db.rollback()
     finally:
         event_logger.close()
-        db.close()
+
+
+async def _flush_messages(user_id: str, messages: list, event_logger) -> int:
+    """Write buffered message bodies in one bulk upsert and return the stored count"""
+    from app.services.ebay_database import ebay_db
+    import time
+    
+    store_start = time.time()
+    stored, rejects = await ebay_db.batch_upsert_messages_async(user_id, messages)
+    store_duration = int((time.time() - store_start) * 1000)
+    
+    event_logger.log_info(f"← Database: Stored {stored} messages ({store_duration}ms)")
+    if rejects:
+        event_logger.log_warning(f"{len(rejects)} messages rejected: {rejects[:5]}")
+    return stored
@@ -40,7 +40,10 @@ async def get_offers(
     current_user: UserModel = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    query = db.query(Offer).filter(Offer.user_id == current_user.id)
+    # Listing title/price come from the same query instead of a lookup per offer
+    query = db.query(Offer, Listing.title, Listing.price).outerjoin(
+        Listing, Listing.id == Offer.listing_id
+    ).filter(Offer.user_id == current_user.id)
     
     if status:
         query = query.filter(Offer.offer_status == status)
@@ -50,7 +53,7 @@ async def get_offers(
     offers = query.order_by(Offer.offer_date.desc()).offset(skip).limit(limit).all()
     
     result = []
-    for offer in offers:
+    for offer, listing_title, listing_price in offers:
         offer_dict = {
             "id": offer.id,
             "offer_id": offer.offer_id,
@@ -63,16 +66,10 @@ async def get_offers(
             "counter_offer_amount": float(offer.counter_offer_amount) if offer.counter_offer_amount else None,
             "offer_date": offer.offer_date,
             "expiration_date": offer.expiration_date,
-            "listing_title": None,
-            "listing_price": None
+            "listing_title": listing_title,
+            "listing_price": float(listing_price) if listing_price is not None else None
         }
         
-        if offer.listing_id:
-            listing = db.query(Listing).filter(Listing.id == offer.listing_id).first()
-            if listing:
-                offer_dict["listing_title"] = listing.title
-                offer_dict["listing_price"] = float(listing.price)
-        
         result.append(offer_dict)
     
     return result
@@ -1,19 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks
-from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, asc
+from sqlalchemy import desc, asc, select
 from typing import Optional
 from datetime import datetime
 import uuid
 import time
-import csv
-import io
 
-from ..models_sqlalchemy import get_db
+from ..models_sqlalchemy import get_db, SessionLocal
 from ..models_sqlalchemy.models import Offer, OfferActionLog, SyncLog, OfferState, OfferDirection
 from ..services.auth import get_current_user, admin_required
 from ..models.user import User
 from ..utils.logger import logger
+from ..utils.exports import EXPORT_BATCH_SIZE, EXPORT_FORMAT_PATTERN, csv_chunks, export_response, ndjson_chunks
 
 router = APIRouter(prefix="/api/offers", tags=["offers"])
 
@@ -215,6 +213,87 @@ async def get_offers(
     }
 
 
+OFFER_EXPORT_COLUMNS = [
+    'offer_id', 'direction', 'state', 'item_id', 'sku', 'buyer_username',
+    'quantity', 'price_value', 'price_currency', 'created_at', 'expires_at'
+]
+
+
+def _offer_export_rows(query):
+    """Export rows for an offers select(), read through a server-side cursor on a session of its own"""
+    db = SessionLocal()
+    try:
+        for o in db.execute(query, execution_options={"yield_per": EXPORT_BATCH_SIZE}):
+            yield {
+                'offer_id': o.offer_id,
+                'direction': o.direction.value if o.direction else '',
+                'state': o.state.value if o.state else '',
+                'item_id': o.item_id or '',
+                'sku': o.sku or '',
+                'buyer_username': o.buyer_username or '',
+                'quantity': o.quantity,
+                'price_value': float(o.price_value) if o.price_value else 0,
+                'price_currency': o.price_currency or '',
+                'created_at': o.created_at.isoformat() if o.created_at else '',
+                'expires_at': o.expires_at.isoformat() if o.expires_at else ''
+            }
+    finally:
+        db.close()
+
+
+@router.get("/export.csv")
+async def export_offers_csv(
+    state: Optional[str] = Query(None),
+    direction: Optional[str] = Query(None),
+    buyer: Optional[str] = Query(None),
+    item_id: Optional[str] = Query(None),
+    sku: Optional[str] = Query(None),
+    from_date: Optional[str] = Query(None, alias="from"),
+    to_date: Optional[str] = Query(None, alias="to"),
+    format: str = Query("csv", regex=EXPORT_FORMAT_PATTERN),
+    gzip: bool = Query(False, description="Compress the export with gzip"),
+    current_user: User = Depends(get_current_user)
+):
+    """Export offers with current filters, streamed with no row cap"""
+    query = select(*(getattr(Offer, c) for c in OFFER_EXPORT_COLUMNS)).where(Offer.user_id == current_user.id)
+    
+    if state:
+        try:
+            query = query.where(Offer.state == OfferState[state.upper()])
+        except KeyError:
+            pass
+    if direction:
+        try:
+            query = query.where(Offer.direction == OfferDirection[direction.upper()])
+        except KeyError:
+            pass
+    if buyer:
+        query = query.where(Offer.buyer_username.ilike(f"%{buyer}%"))
+    if item_id:
+        query = query.where(Offer.item_id == item_id)
+    if sku:
+        query = query.where(Offer.sku.ilike(f"%{sku}%"))
+    if from_date:
+        try:
+            query = query.where(Offer.created_at >= datetime.fromisoformat(from_date.replace('Z', '+00:00')))
+        except:
+            pass
+    if to_date:
+        try:
+            query = query.where(Offer.created_at <= datetime.fromisoformat(to_date.replace('Z', '+00:00')))
+        except:
+            pass
+    
+    rows = _offer_export_rows(query.order_by(desc(Offer.created_at), desc(Offer.offer_id)))
+    chunks = csv_chunks(rows, OFFER_EXPORT_COLUMNS) if format == "csv" else ndjson_chunks(rows)
+    return export_response(
+        chunks,
+        f"offers_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.{format}",
+        format,
+        gzip
+    )
+
+
 @router.get("/{offer_id}")
 async def get_offer_detail(
     offer_id: str,
@@ -262,77 +341,3 @@ async def get_offer_detail(
             for a in actions
         ]
     }
-
-
-@router.get("/export.csv")
-async def export_offers_csv(
-    state: Optional[str] = Query(None),
-    direction: Optional[str] = Query(None),
-    buyer: Optional[str] = Query(None),
-    item_id: Optional[str] = Query(None),
-    sku: Optional[str] = Query(None),
-    from_date: Optional[str] = Query(None, alias="from"),
-    to_date: Optional[str] = Query(None, alias="to"),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """Export offers to CSV with current filters"""
-    query = db.query(Offer).filter(Offer.user_id == current_user.id)
-    
-    if state:
-        try:
-            query = query.filter(Offer.state == OfferState[state.upper()])
-        except KeyError:
-            pass
-    if direction:
-        try:
-            query = query.filter(Offer.direction == OfferDirection[direction.upper()])
-        except KeyError:
-            pass
-    if buyer:
-        query = query.filter(Offer.buyer_username.ilike(f"%{buyer}%"))
-    if item_id:
-        query = query.filter(Offer.item_id == item_id)
-    if sku:
-        query = query.filter(Offer.sku.ilike(f"%{sku}%"))
-    if from_date:
-        try:
-            query = query.filter(Offer.created_at >= datetime.fromisoformat(from_date.replace('Z', '+00:00')))
-        except:
-            pass
-    if to_date:
-        try:
-            query = query.filter(Offer.created_at <= datetime.fromisoformat(to_date.replace('Z', '+00:00')))
-        except:
-            pass
-    
-    offers = query.order_by(desc(Offer.created_at)).limit(10000).all()
-    
-    output = io.StringIO()
-    writer = csv.DictWriter(output, fieldnames=[
-        'offer_id', 'direction', 'state', 'item_id', 'sku', 'buyer_username',
-        'quantity', 'price_value', 'price_currency', 'created_at', 'expires_at'
-    ])
-    writer.writeheader()
-    
-    for o in offers:
-        writer.writerow({
-            'offer_id': o.offer_id,
-            'direction': o.direction.value if o.direction else '',
-            'state': o.state.value if o.state else '',
-            'item_id': o.item_id or '',
-            'sku': o.sku or '',
-            'buyer_username': o.buyer_username or '',
-            'quantity': o.quantity,
-            'price_value': float(o.price_value) if o.price_value else 0,
-            'price_currency': o.price_currency or '',
-            'created_at': o.created_at.isoformat() if o.created_at else '',
-            'expires_at': o.expires_at.isoformat() if o.expires_at else ''
-        })
-    
-    output.seek(0)
-    return StreamingResponse(
-        iter([output.getvalue()]),
-        media_type="text/csv",
-        headers={"Content-Disposition": f"attachment; filename=offers_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.csv"}
-    )
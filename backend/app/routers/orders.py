@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from typing import List, Optional
 from datetime import datetime
 from app.database import get_db
 from app.db_models import Order, OrderLineItem
+from app.models_sqlalchemy.models import DailyOrderRollup
 from app.services.auth import get_current_user
 from app.models.user import User as UserModel
 from pydantic import BaseModel
@@ -63,7 +64,8 @@ async def get_orders(
             (Order.buyer_email.contains(search))
         )
     
-    orders = query.order_by(Order.order_date.desc()).offset(skip).limit(limit).all()
+    # Load line items for the whole page at once rather than lazily per order during serialization
+    orders = query.options(selectinload(Order.line_items)).order_by(Order.order_date.desc()).offset(skip).limit(limit).all()
     return orders
 
 @router.get("/{order_id}", response_model=OrderResponse)
@@ -87,22 +89,21 @@ async def get_order_stats(
     current_user: UserModel = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
+    """Order KPIs from daily_order_rollups; statuses are eBay payment statuses"""
     from sqlalchemy import func
     
-    total_orders = db.query(func.count(Order.id)).filter(Order.user_id == current_user.id).scalar()
+    rows = db.query(
+        DailyOrderRollup.payment_status,
+        func.sum(DailyOrderRollup.order_count),
+        func.sum(DailyOrderRollup.gross_sales)
+    ).filter(DailyOrderRollup.user_id == current_user.id).group_by(DailyOrderRollup.payment_status).all()
+    status_counts = [(status or None, int(count), sales or 0) for status, count, sales in rows if count]
     
-    total_revenue = db.query(func.sum(Order.total_amount)).filter(
-        Order.user_id == current_user.id,
-        Order.order_status.in_(['PAID', 'SHIPPED', 'COMPLETED'])
-    ).scalar() or 0
-    
-    status_counts = db.query(
-        Order.order_status,
-        func.count(Order.id)
-    ).filter(Order.user_id == current_user.id).group_by(Order.order_status).all()
+    total_orders = sum(count for _, count, _ in status_counts)
+    total_revenue = sum(sales for status, _, sales in status_counts if status == 'PAID')
     
     return {
         "total_orders": total_orders,
         "total_revenue": float(total_revenue),
-        "status_breakdown": {status: count for status, count in status_counts}
+        "status_breakdown": {status: count for status, count, _ in status_counts}
     }
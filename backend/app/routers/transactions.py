@@ -1,63 +1,84 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, asc
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from typing import Optional
 from datetime import datetime
 from decimal import Decimal
 import uuid
 import time
 
-from ..models_sqlalchemy import get_db
+from ..models_sqlalchemy import get_db, get_async_db
 from ..models_sqlalchemy.models import Transaction, SyncLog, PaymentStatus, FulfillmentStatus
 from ..services.auth import get_current_user, admin_required
 from ..models.user import User
 from ..utils.logger import logger
+from ..services.grid_counts import COUNT_STRATEGY_PATTERN, count_rows_async
+from ..services.search import substring_match
+from ..services.rollups import rebuild_financial_rollups
+from ..utils.pagination import decode_cursor, keyset_filter, keyset_order_by, next_cursor
 
 router = APIRouter(prefix="/api/transactions", tags=["transactions"])
 
 
-@router.get("")
-async def get_transactions(
-    buyer: Optional[str] = Query(None),
-    sku: Optional[str] = Query(None),
-    from_date: Optional[str] = Query(None, alias="from"),
-    to_date: Optional[str] = Query(None, alias="to"),
-    limit: int = Query(50, ge=1, le=500),
-    offset: int = Query(0, ge=0),
-    sort: str = Query("sale_date", regex="^(sale_date|sale_value|buyer_username)$"),
-    dir: str = Query("desc", regex="^(asc|desc)$"),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """Get transactions with filtering and pagination"""
-    query = db.query(Transaction).filter(Transaction.user_id == current_user.id)
+def _transactions_query(user_id: str, buyer: Optional[str], sku: Optional[str],
+                        from_date: Optional[str], to_date: Optional[str]):
+    """Build the filtered transactions select()"""
+    query = select(Transaction).where(Transaction.user_id == user_id)
     
     if buyer:
-        query = query.filter(Transaction.buyer_username.ilike(f"%{buyer}%"))
+        query = query.where(substring_match(Transaction.buyer_username, buyer))
     if sku:
-        query = query.filter(Transaction.sku.ilike(f"%{sku}%"))
+        query = query.where(substring_match(Transaction.sku, sku))
     if from_date:
         try:
             from_dt = datetime.fromisoformat(from_date.replace('Z', '+00:00'))
-            query = query.filter(Transaction.sale_date >= from_dt)
+            query = query.where(Transaction.sale_date >= from_dt)
         except:
             pass
     if to_date:
         try:
             to_dt = datetime.fromisoformat(to_date.replace('Z', '+00:00'))
-            query = query.filter(Transaction.sale_date <= to_dt)
+            query = query.where(Transaction.sale_date <= to_dt)
         except:
             pass
     
-    total_count = query.count()
+    return query
+
+
+@router.get("")
+async def get_transactions(
+    buyer: Optional[str] = Query(None),
+    sku: Optional[str] = Query(None),
+    from_date: Optional[str] = Query(None, alias="from"),
+    to_date: Optional[str] = Query(None, alias="to"),
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    sort: str = Query("sale_date", regex="^(sale_date|sale_value|buyer_username)$"),
+    dir: str = Query("desc", regex="^(asc|desc)$"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from next_cursor; replaces offset"),
+    count: str = Query("exact", regex=COUNT_STRATEGY_PATTERN, description="Total count strategy: exact, estimated, cached or none"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get transactions with filtering and pagination (offset or cursor)"""
+    query = _transactions_query(current_user.id, buyer, sku, from_date, to_date)
+    filters = {"user_id": current_user.id, "buyer": buyer, "sku": sku, "from": from_date, "to": to_date}
+    
+    total_count = await count_rows_async(db, query, count, "transactions", filters)
     
     order_col = getattr(Transaction, sort)
-    if dir == "desc":
-        query = query.order_by(desc(order_col))
+    query = query.order_by(*keyset_order_by(order_col, Transaction.transaction_id, dir))
+    
+    if cursor:
+        after_value, after_id = decode_cursor(cursor, sort, dir)
+        query = query.where(keyset_filter(order_col, Transaction.transaction_id, dir, after_value, after_id))
     else:
-        query = query.order_by(asc(order_col))
+        query = query.offset(offset)
     
-    txns = query.offset(offset).limit(limit).all()
+    txns = (await db.execute(query.limit(limit + 1))).scalars().all()
+    has_more = len(txns) > limit
+    txns = txns[:limit]
     
     return {
         "transactions": [
@@ -78,9 +99,30 @@ async def get_transactions(
             for t in txns
         ],
         "total": total_count,
+        "count_strategy": count,
         "limit": limit,
         "offset": offset,
-        "has_more": (offset + limit) < total_count
+        "has_more": has_more,
+        "next_cursor": next_cursor(txns, limit, sort, dir, lambda t: (getattr(t, sort), t.transaction_id), has_more)
+    }
+
+
+@router.get("/count")
+async def count_transactions(
+    buyer: Optional[str] = Query(None),
+    sku: Optional[str] = Query(None),
+    from_date: Optional[str] = Query(None, alias="from"),
+    to_date: Optional[str] = Query(None, alias="to"),
+    count: str = Query("exact", regex="^(exact|estimated|cached)$"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Total for a transactions query, for the grid to fetch in parallel with the page"""
+    query = _transactions_query(current_user.id, buyer, sku, from_date, to_date)
+    filters = {"user_id": current_user.id, "buyer": buyer, "sku": sku, "from": from_date, "to": to_date}
+    return {
+        "total": await count_rows_async(db, query, count, "transactions", filters),
+        "count_strategy": count
     }
 
 
@@ -117,6 +159,8 @@ def sync_transactions_job(job_id: str, user_id: str, db: Session):
         records_fetched = 0
         records_stored = 0
         
+        rebuild_financial_rollups(db, user_id)
+        
         duration_ms = int((time.time() - start_time) * 1000)
         sync_log.status = "success"
         sync_log.pages_fetched = pages_fetched
@@ -2,11 +2,13 @@ from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 import hashlib
+import hmac
 from fastapi import Depends, HTTPException, status, Query, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from app.config import settings
 from app.models.user import User as UserModel, UserCreate
 from app.services.database import db
+from app.services.principal_cache import principal_cache
 from app.utils.logger import logger
 
 security = HTTPBearer()
@@ -61,7 +63,7 @@ async def get_current_user(
         logger.error(f"JWT validation error: {str(e)}")
         raise credentials_exception
     
-    user = db.get_user_by_id(user_id)
+    user = principal_cache.get_or_load(user_id, db.get_user_by_id)
     if user is None:
         logger.error(f"User not found for token: {user_id}")
         raise credentials_exception
@@ -90,6 +92,16 @@ async def admin_required(current_user: UserModel = Depends(get_current_user)) ->
     return current_user
 
 
+async def metrics_reader(credentials: HTTPAuthorizationCredentials = Depends(security)) -> None:
+    """
+    Access to /metrics: the METRICS_TOKEN bearer token (for the Prometheus scraper)
+    or an admin's JWT.
+    """
+    if settings.METRICS_TOKEN and hmac.compare_digest(credentials.credentials, settings.METRICS_TOKEN):
+        return
+    await admin_required(await get_current_user(credentials))
+
+
 async def get_user_from_header_or_query(
     request: Request,
     token: Optional[str] = Query(None, description="JWT token for SSE authentication")
@@ -129,7 +141,7 @@ async def get_user_from_header_or_query(
         logger.error(f"SSE JWT validation error: {str(e)}")
         raise credentials_exception
     
-    user = db.get_user_by_id(user_id)
+    user = principal_cache.get_or_load(user_id, db.get_user_by_id)
     if user is None:
         logger.error(f"SSE: User not found for token: {user_id}")
         raise credentials_exception
@@ -0,0 +1,247 @@
+"""
+eBay API call budget: a ledger of calls per API, user and UTC day, and a
+planner that checks a sync's expected cost against what is left of the day.
+
+All users share one application key, so eBay's daily limits apply to the sum
+over users. InstrumentedTransport records every call in the ledger, which
+accumulates in memory and is flushed to ebay_api_call_budget every
+FLUSH_INTERVAL_SECONDS by run_call_budget_flush_loop (and on shutdown). Today's
+usage is the flushed total of all processes, re-read at most every
+USAGE_CACHE_SECONDS (and after every flush of this process), plus this
+process's unflushed calls.
+
+Before a sync starts, plan_sync estimates its calls from the records the last
+completed run of the same type fetched. A run stopped at a budget page cap
+records budget_cap_note as its error_message and is left out of the estimate,
+since it fetched less than a full run would. If the estimate does not fit in the
+remaining budget (minus EBAY_CALL_BUDGET_RESERVE_PCT kept for interactive use),
+paginated syncs are degraded to the pages that fit and the others are deferred
+to the next UTC day.
+"""
+import asyncio
+import math
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import text
+
+from app.config import settings
+from app.utils.logger import logger
+
+FLUSH_INTERVAL_SECONDS = 60
+USAGE_CACHE_SECONDS = 60
+
+# Daily call limits of a default application key, by API family (see
+# app.utils.metrics.ebay_api_family); EBAY_API_DAILY_LIMITS overrides them
+DEFAULT_DAILY_CALL_LIMITS = {
+    "sell.fulfillment": 100_000,
+    "sell.finances": 15_000,
+    "sell.inventory": 2_000_000,
+    "commerce.identity": 100_000,
+    "trading": 5_000,
+}
+
+# API family each sync type spends its calls on, and its page size
+SYNC_CALL_PROFILES = {
+    "orders": ("sell.fulfillment", 200),
+    "transactions": ("sell.finances", 200),
+    "disputes": ("sell.fulfillment", 100),
+    "inventory": ("sell.inventory", 200),
+    "offers": ("sell.inventory", 200),
+}
+
+# Syncs that can run on a page cap instead of being deferred
+DEGRADABLE_SYNC_TYPES = ("orders", "transactions")
+
+# Estimate for a sync type that never completed for the user
+DEFAULT_ESTIMATED_CALLS = 20
+
+BUDGET_CAP_NOTE = "Stopped at the call budget page cap"
+
+
+def daily_call_limits() -> Dict[str, int]:
+    """DEFAULT_DAILY_CALL_LIMITS with the "api=limit,api=limit" overrides applied"""
+    limits = dict(DEFAULT_DAILY_CALL_LIMITS)
+    for item in settings.EBAY_API_DAILY_LIMITS.split(","):
+        if "=" in item:
+            api, limit = item.split("=", 1)
+            limits[api.strip().lower()] = int(limit)
+    return limits
+
+
+def budget_cap_note(max_pages: int) -> str:
+    """error_message of a completed run that the planner's page cap cut short"""
+    return f"{BUDGET_CAP_NOTE} of {max_pages} pages"
+
+
+def _today() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+class CallLedger:
+    """In-memory call counts, flushed in batches"""
+
+    def __init__(self):
+        self._pending: Dict[Tuple[date, str, str], int] = {}
+        self._lock = threading.Lock()
+        self._usage: Dict[str, int] = {}
+        self._usage_day: Optional[date] = None
+        self._usage_read_at = 0.0
+
+    def record(self, api: str, user_id: str):
+        key = (_today(), api, user_id)
+        with self._lock:
+            self._pending[key] = self._pending.get(key, 0) + 1
+
+    def _unflushed(self, day: date) -> Dict[str, int]:
+        usage: Dict[str, int] = {}
+        with self._lock:
+            for (pending_day, api, _), calls in self._pending.items():
+                if pending_day == day:
+                    usage[api] = usage.get(api, 0) + calls
+        return usage
+
+    async def flush(self):
+        """Add the pending counts to ebay_api_call_budget"""
+        from app.models_sqlalchemy import AsyncSessionLocal
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+
+        rows = [{"day": day, "api": api, "user_id": user_id, "calls": calls}
+                for (day, api, user_id), calls in pending.items()]
+        try:
+            async with AsyncSessionLocal() as session:
+                await session.execute(text("""
+                    INSERT INTO ebay_api_call_budget (day, api, user_id, calls, updated_at)
+                    VALUES (:day, :api, :user_id, :calls, now())
+                    ON CONFLICT (day, api, user_id)
+                    DO UPDATE SET calls = ebay_api_call_budget.calls + EXCLUDED.calls, updated_at = now()
+                """), rows)
+                await session.commit()
+            # The flushed calls left _pending; re-read usage so they are not missing from it
+            self._usage_read_at = 0.0
+        except Exception as e:
+            logger.warning(f"Failed to flush eBay call budget ledger, keeping counts: {e}")
+            with self._lock:
+                for key, calls in pending.items():
+                    self._pending[key] = self._pending.get(key, 0) + calls
+
+    async def usage_today(self) -> Dict[str, int]:
+        """Calls made today by API family, over all users and processes"""
+        from app.models_sqlalchemy import AsyncSessionLocal
+
+        day = _today()
+        if self._usage_day != day or time.monotonic() - self._usage_read_at > USAGE_CACHE_SECONDS:
+            async with AsyncSessionLocal() as session:
+                result = await session.execute(text("""
+                    SELECT api, SUM(calls) FROM ebay_api_call_budget WHERE day = :day GROUP BY api
+                """), {"day": day})
+                self._usage = {api: int(calls) for api, calls in result}
+            self._usage_day = day
+            self._usage_read_at = time.monotonic()
+
+        usage = dict(self._usage)
+        for api, calls in self._unflushed(day).items():
+            usage[api] = usage.get(api, 0) + calls
+        return usage
+
+    def cached_remaining(self) -> Dict[str, int]:
+        """Remaining calls per limited API from the last usage read, without I/O"""
+        usage = dict(self._usage) if self._usage_day == _today() else {}
+        for api, calls in self._unflushed(_today()).items():
+            usage[api] = usage.get(api, 0) + calls
+        return {api: limit - usage.get(api, 0) for api, limit in daily_call_limits().items()}
+
+
+call_ledger = CallLedger()
+
+
+@dataclass
+class SyncPlan:
+    decision: str  # run | degrade | defer
+    api: str
+    estimated_calls: int
+    remaining_calls: Optional[int]
+    max_pages: Optional[int] = None
+    retry_after_seconds: Optional[int] = None
+    reason: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+async def _last_fetched(user_id: str, sync_type: str) -> Optional[int]:
+    """Records fetched by the user's last completed sync of this type that was not page-capped"""
+    from app.models_sqlalchemy import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(text("""
+            SELECT records_fetched FROM ebay_sync_jobs
+            WHERE user_id = :user_id AND sync_type = :sync_type AND status = 'completed'
+              AND (error_message IS NULL OR error_message NOT LIKE :cap_note)
+            ORDER BY started_at DESC
+            LIMIT 1
+        """), {"user_id": user_id, "sync_type": sync_type, "cap_note": BUDGET_CAP_NOTE + "%"})
+        return result.scalar()
+
+
+def estimate_calls(sync_type: str, last_fetched: Optional[int]) -> int:
+    """Expected eBay calls of a sync, given the records its last run fetched"""
+    if last_fetched is None:
+        return DEFAULT_ESTIMATED_CALLS
+    _, page_size = SYNC_CALL_PROFILES[sync_type]
+    pages = max(math.ceil(last_fetched / page_size), 1)
+    if sync_type == "offers":
+        # One inventory page per 200 SKUs, then one getOffers call per SKU
+        return pages + last_fetched
+    return pages
+
+
+def _seconds_until_tomorrow() -> int:
+    now = datetime.now(timezone.utc)
+    tomorrow = datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), timezone.utc)
+    return int((tomorrow - now).total_seconds()) + 1
+
+
+async def plan_sync(user_id: str, sync_type: str) -> SyncPlan:
+    """Decide whether a sync runs in full, on a page cap, or waits for tomorrow's budget"""
+    api, _ = SYNC_CALL_PROFILES[sync_type]
+    limit = daily_call_limits().get(api)
+    try:
+        estimated = estimate_calls(sync_type, await _last_fetched(user_id, sync_type))
+        if not settings.EBAY_CALL_BUDGET_ENABLED or limit is None:
+            return SyncPlan("run", api, estimated, None)
+        used = (await call_ledger.usage_today()).get(api, 0)
+    except Exception as e:
+        # The budget must never block a sync because its own bookkeeping failed
+        logger.warning(f"Call budget check failed for {sync_type} sync of {user_id}, running anyway: {e}")
+        return SyncPlan("run", api, DEFAULT_ESTIMATED_CALLS, None, reason="budget check failed")
+
+    available = limit - used - limit * settings.EBAY_CALL_BUDGET_RESERVE_PCT // 100
+    if estimated <= available:
+        return SyncPlan("run", api, estimated, limit - used)
+
+    if sync_type in DEGRADABLE_SYNC_TYPES and available >= 1:
+        return SyncPlan(
+            "degrade", api, estimated, limit - used, max_pages=int(available),
+            reason=f"{api} budget allows {int(available)} of ~{estimated} calls today; syncing the first pages only",
+        )
+
+    return SyncPlan(
+        "defer", api, estimated, limit - used, retry_after_seconds=_seconds_until_tomorrow(),
+        reason=f"{api} budget has {max(int(available), 0)} calls left today, sync needs ~{estimated}",
+    )
+
+
+async def run_call_budget_flush_loop():
+    """Flush the ledger every FLUSH_INTERVAL_SECONDS"""
+    logger.info("Call budget flush loop started")
+    while True:
+        await asyncio.sleep(FLUSH_INTERVAL_SECONDS)
+        await call_ledger.flush()
@@ -1,15 +1,17 @@
 import base64
 import httpx
-import asyncio
 from typing import Optional, Dict, Any, List
 from datetime import datetime, timedelta
 from urllib.parse import urlencode
 from fastapi import HTTPException, status
 from app.config import settings
 from app.models.ebay import EbayTokenResponse
+from app.services.call_budget import budget_cap_note
 from app.services.database import db
 from app.services.ebay_connect_logger import ebay_connect_logger
 from app.utils.logger import logger, ebay_logger
+from app.utils.metrics import bind_ebay_user, ebay_http_client
+from app.utils.profiling import decode_json, sync_sleep
 
 ORDERS_PAGE_LIMIT = 200          # Fulfillment API max
 TRANSACTIONS_PAGE_LIMIT = 200    # Finances API max
@@ -17,6 +19,7 @@ DISPUTES_PAGE_LIMIT = 100        # Fulfillment API max
 OFFERS_PAGE_LIMIT = 100          # Inventory API max
 MESSAGES_HEADERS_LIMIT = 200     # Trading API max for headers
 MESSAGES_BODIES_BATCH = 10       # Trading API hard limit for bodies
+MESSAGES_WRITE_BATCH = 500       # Rows per bulk insert into ebay_messages
 
 ORDERS_CONCURRENCY = 6
 TRANSACTIONS_CONCURRENCY = 5
@@ -25,6 +28,81 @@ OFFERS_CONCURRENCY = 6
 MESSAGES_CONCURRENCY = 5
 
 
+TRADING_NS = {"ebay": "urn:ebay:apis:eBLBaseComponents"}
+
+MESSAGE_BODY_FIELDS = ["MessageID", "ExternalMessageID", "Subject", "Text", "Sender", "RecipientUserID", "ReceiveDate", "ExpirationDate", "ItemID", "FolderID"]
+
+
+def parse_message_headers(xml_text: str) -> Dict[str, Any]:
+    """Message and alert IDs plus pagination from a GetMyMessages ReturnHeaders response"""
+    import xml.etree.ElementTree as ET
+    
+    root = ET.fromstring(xml_text)
+    ns = TRADING_NS
+    
+    message_ids = []
+    alert_ids = []
+    
+    messages_elem = root.find(".//ebay:Messages", ns)
+    if messages_elem is not None:
+        for msg_elem in messages_elem.findall("ebay:Message", ns):
+            msg_id_elem = msg_elem.find("ebay:MessageID", ns)
+            if msg_id_elem is not None and msg_id_elem.text:
+                message_ids.append(msg_id_elem.text)
+        
+        for alert_elem in messages_elem.findall("ebay:Alert", ns):
+            alert_id_elem = alert_elem.find("ebay:AlertID", ns)
+            if alert_id_elem is not None and alert_id_elem.text:
+                alert_ids.append(alert_id_elem.text)
+    
+    pagination_elem = root.find(".//ebay:PaginationResult", ns)
+    total_pages = 1
+    total_entries = 0
+    if pagination_elem is not None:
+        total_pages_elem = pagination_elem.find("ebay:TotalNumberOfPages", ns)
+        total_entries_elem = pagination_elem.find("ebay:TotalNumberOfEntries", ns)
+        if total_pages_elem is not None:
+            total_pages = int(total_pages_elem.text)
+        if total_entries_elem is not None:
+            total_entries = int(total_entries_elem.text)
+    
+    return {
+        "message_ids": message_ids,
+        "alert_ids": alert_ids,
+        "total_pages": total_pages,
+        "total_entries": total_entries
+    }
+
+
+def parse_message_bodies(xml_text: str) -> List[Dict[str, Any]]:
+    """Messages from a GetMyMessages ReturnMessages response"""
+    import xml.etree.ElementTree as ET
+    
+    root = ET.fromstring(xml_text)
+    ns = TRADING_NS
+    
+    messages = []
+    messages_elem = root.find(".//ebay:Messages", ns)
+    if messages_elem is not None:
+        for msg_elem in messages_elem.findall("ebay:Message", ns):
+            message = {}
+            
+            for field in MESSAGE_BODY_FIELDS:
+                elem = msg_elem.find(f"ebay:{field}", ns)
+                if elem is not None:
+                    message[field.lower()] = elem.text
+            
+            read_elem = msg_elem.find("ebay:Read", ns)
+            flagged_elem = msg_elem.find("ebay:Flagged", ns)
+            
+            message["read"] = read_elem.text.lower() == "true" if read_elem is not None else False
+            message["flagged"] = flagged_elem.text.lower() == "true" if flagged_elem is not None else False
+            
+            messages.append(message)
+    
+    return messages
+
+
 class EbayService:
     
     def __init__(self):
@@ -203,7 +281,7 @@ class EbayService:
             )
 
             try:
-                async with httpx.AsyncClient() as client:
+                async with ebay_http_client() as client:
                     response = await client.post(
                         self.token_url,
                         headers=headers,
@@ -335,7 +413,7 @@ class EbayService:
         )
         
         try:
-            async with httpx.AsyncClient() as client:
+            async with ebay_http_client() as client:
                 response = await client.post(
                     self.token_url,
                     headers=headers,
@@ -462,7 +540,7 @@ class EbayService:
         )
         
         try:
-            async with httpx.AsyncClient() as client:
+            async with ebay_http_client() as client:
                 response = await client.get(
                     api_url,
                     headers=headers,
@@ -490,7 +568,7 @@ class EbayService:
                         detail=f"Failed to fetch orders: {error_detail}"
                     )
                 
-                orders_data = response.json()
+                orders_data = decode_json(response)
                 
                 ebay_logger.log_ebay_event(
                     "fetch_orders_success",
@@ -553,11 +631,11 @@ class EbayService:
         )
         
         try:
-            async with httpx.AsyncClient(timeout=httpx.Timeout(20.0, connect=5.0)) as client:
+            async with ebay_http_client(timeout=httpx.Timeout(20.0, connect=5.0)) as client:
                 response = await client.get(api_url, headers=headers)
                 
                 logger.info(f"Identity API response status: {response.status_code}")
-                logger.info(f"Identity API response headers: {dict(response.headers)}")
+                logger.debug("Identity API response headers: %s", response.headers)
                 
                 if response.status_code != 200:
                     error_detail = response.text
@@ -572,11 +650,11 @@ class EbayService:
                 
                 # Log raw response for debugging
                 response_text = response.text
-                logger.info(f"Identity API raw response: {response_text[:500]}")  # First 500 chars
+                logger.debug("Identity API raw response: %s", response_text[:500])  # First 500 chars
                 
                 try:
                     identity_data = response.json()
-                    logger.info(f"Identity API parsed JSON: {identity_data}")
+                    logger.debug("Identity API parsed JSON: %s", identity_data)
                 except Exception as json_error:
                     logger.error(f"Failed to parse Identity API response as JSON: {json_error}, raw: {response_text[:200]}")
                     return {"username": None, "userId": None, "error": f"Invalid JSON response: {str(json_error)}"}
@@ -645,7 +723,7 @@ class EbayService:
         )
         
         try:
-            async with httpx.AsyncClient(timeout=httpx.Timeout(20.0, connect=5.0)) as client:
+            async with ebay_http_client(timeout=httpx.Timeout(20.0, connect=5.0)) as client:
                 response = await client.get(
                     api_url,
                     headers=headers,
@@ -685,7 +763,7 @@ class EbayService:
                         detail=f"Failed to fetch transactions (HTTP {response.status_code}): {error_detail}"
                     )
                 
-                transactions_data = response.json()
+                transactions_data = decode_json(response)
                 
                 ebay_logger.log_ebay_event(
                     "fetch_transactions_success",
@@ -715,7 +793,8 @@ class EbayService:
             )
 
 
-    async def sync_all_orders(self, user_id: str, access_token: str, run_id: Optional[str] = None) -> Dict[str, Any]:
+    async def sync_all_orders(self, user_id: str, access_token: str, run_id: Optional[str] = None,
+                              max_pages: Optional[int] = None) -> Dict[str, Any]:
         """
         Synchronize all orders from eBay to database with pagination (limit=200)
         
@@ -723,6 +802,7 @@ class EbayService:
             user_id: User ID
             access_token: eBay OAuth access token
             run_id: Optional run_id for sync event logging
+            max_pages: Optional page cap below the safety limit (set by the call budget planner)
         """
         from app.services.ebay_database import ebay_db
         from app.services.sync_event_logger import SyncEventLogger
@@ -730,7 +810,10 @@ class EbayService:
         
         # Use provided run_id if available, otherwise create new one
         event_logger = SyncEventLogger(user_id, 'orders', run_id=run_id)
-        job_id = ebay_db.create_sync_job(user_id, 'orders')
+        bind_ebay_user(user_id)
+        event_logger.track_phases()
+        event_logger.start_trace()
+        job_id = await ebay_db.create_sync_job_async(user_id, 'orders')
         start_time = time.time()
         
         try:
@@ -740,7 +823,9 @@ class EbayService:
             offset = 0
             has_more = True
             current_page = 0
-            max_pages = 200  # Safety limit to prevent infinite loops
+            budget_capped = max_pages is not None and max_pages < 200
+            max_pages = min(max_pages or 200, 200)  # Safety limit to prevent infinite loops; lower when the call budget is short
+            cap_note = None
             
             # Get user scopes from user object if available
             from app.services.database import db
@@ -801,21 +886,23 @@ class EbayService:
             event_logger.log_info(f"Safety limit: max {max_pages} pages")
             logger.info(f"Starting full order sync for user {user_id} ({username}) with limit={limit}")
             
-            await asyncio.sleep(0.5)
+            await sync_sleep(0.5)
             
             while has_more:
                 # Safety check: max pages limit
                 if current_page >= max_pages:
                     event_logger.log_warning(f"Reached safety limit of {max_pages} pages. Stopping to prevent infinite loop.")
                     logger.warning(f"Order sync reached max_pages limit ({max_pages}) for run_id {event_logger.run_id}")
+                    if budget_capped:
+                        cap_note = budget_cap_note(max_pages)
                     break
                 
                 # Check for cancellation
-                from app.services.sync_event_logger import is_cancelled
-                if is_cancelled(event_logger.run_id):
+                from app.services.sync_event_logger import is_cancelled_async
+                if await is_cancelled_async(event_logger.run_id):
                     logger.info(f"Order sync cancelled for run_id {event_logger.run_id}")
                     event_logger.log_warning("Sync operation cancelled by user")
-                    event_logger.log_done(
+                    event_logger.log_cancelled(
                         f"Orders sync cancelled: {total_fetched} fetched, {total_stored} stored",
                         total_fetched,
                         total_stored,
@@ -841,11 +928,11 @@ class EbayService:
                 }
                 
                 # Check for cancellation BEFORE making the API request
-                from app.services.sync_event_logger import is_cancelled
-                if is_cancelled(event_logger.run_id):
+                from app.services.sync_event_logger import is_cancelled_async
+                if await is_cancelled_async(event_logger.run_id):
                     logger.info(f"Order sync cancelled for run_id {event_logger.run_id} (before API request)")
                     event_logger.log_warning("Sync operation cancelled by user")
-                    event_logger.log_done(
+                    event_logger.log_cancelled(
                         f"Orders sync cancelled: {total_fetched} fetched, {total_stored} stored",
                         total_fetched,
                         total_stored,
@@ -882,10 +969,10 @@ class EbayService:
                     orders_response = await self.fetch_orders(access_token, filter_params)
                 except Exception as e:
                     # Check for cancellation after error (in case error took a long time)
-                    if is_cancelled(event_logger.run_id):
+                    if await is_cancelled_async(event_logger.run_id):
                         logger.info(f"Order sync cancelled for run_id {event_logger.run_id} (after API error)")
                         event_logger.log_warning("Sync operation cancelled by user")
-                        event_logger.log_done(
+                        event_logger.log_cancelled(
                             f"Orders sync cancelled: {total_fetched} fetched, {total_stored} stored",
                             total_fetched,
                             total_stored,
@@ -903,10 +990,10 @@ class EbayService:
                 request_duration = int((time.time() - request_start) * 1000)
                 
                 # Check for cancellation AFTER the API request (in case request took a long time)
-                if is_cancelled(event_logger.run_id):
+                if await is_cancelled_async(event_logger.run_id):
                     logger.info(f"Order sync cancelled for run_id {event_logger.run_id} (after API request)")
                     event_logger.log_warning("Sync operation cancelled by user")
-                    event_logger.log_done(
+                    event_logger.log_cancelled(
                         f"Orders sync cancelled: {total_fetched} fetched, {total_stored} stored",
                         total_fetched,
                         total_stored,
@@ -943,13 +1030,13 @@ class EbayService:
                 
                 total_fetched += len(orders)
                 
-                await asyncio.sleep(0.3)
+                await sync_sleep(0.3)
                 
                 # Check for cancellation before storing
-                if is_cancelled(event_logger.run_id):
+                if await is_cancelled_async(event_logger.run_id):
                     logger.info(f"Order sync cancelled for run_id {event_logger.run_id} (before storing)")
                     event_logger.log_warning("Sync operation cancelled by user")
-                    event_logger.log_done(
+                    event_logger.log_cancelled(
                         f"Orders sync cancelled: {total_fetched} fetched, {total_stored} stored",
                         total_fetched,
                         total_stored,
@@ -966,7 +1053,7 @@ class EbayService:
                 
                 event_logger.log_info(f"→ Storing {len(orders)} orders in database...")
                 store_start = time.time()
-                batch_stored = ebay_db.batch_upsert_orders(user_id, orders)
+                batch_stored = await ebay_db.batch_upsert_orders_async(user_id, orders)
                 store_duration = int((time.time() - store_start) * 1000)
                 total_stored += batch_stored
                 
@@ -983,10 +1070,10 @@ class EbayService:
                 logger.info(f"Synced batch: {len(orders)} orders (total: {total_fetched}/{total}, stored: {total_stored})")
                 
                 # Check for cancellation before continuing to next page
-                if is_cancelled(event_logger.run_id):
+                if await is_cancelled_async(event_logger.run_id):
                     logger.info(f"Order sync cancelled for run_id {event_logger.run_id} (before next page)")
                     event_logger.log_warning("Sync operation cancelled by user")
-                    event_logger.log_done(
+                    event_logger.log_cancelled(
                         f"Orders sync cancelled: {total_fetched} fetched, {total_stored} stored",
                         total_fetched,
                         total_stored,
@@ -1008,10 +1095,11 @@ class EbayService:
                 offset += limit
                 
                 if has_more:
-                    await asyncio.sleep(0.8)
+                    await sync_sleep(0.8)
             
             duration_ms = int((time.time() - start_time) * 1000)
-            ebay_db.update_sync_job(job_id, 'completed', total_fetched, total_stored)
+            await ebay_db.update_sync_job_async(job_id, 'completed', total_fetched, total_stored,
+                                              error_message=cap_note, phase_timings=event_logger.phase_summary())
             
             event_logger.log_done(
                 f"Orders sync completed: {total_fetched} fetched, {total_stored} stored in {duration_ms}ms",
@@ -1034,7 +1122,7 @@ class EbayService:
             error_msg = str(e)
             event_logger.log_error(f"Orders sync failed: {error_msg}", e)
             logger.error(f"Order sync failed: {error_msg}")
-            ebay_db.update_sync_job(job_id, 'failed', error_message=error_msg)
+            await ebay_db.update_sync_job_async(job_id, 'failed', error_message=error_msg, phase_timings=event_logger.phase_summary())
             raise
         finally:
             event_logger.close()
@@ -1080,7 +1168,7 @@ class EbayService:
         )
         
         try:
-            async with httpx.AsyncClient() as client:
+            async with ebay_http_client() as client:
                 # Payment dispute search requires POST with body, not GET
                 search_body = {}
                 if filter_params:
@@ -1113,7 +1201,7 @@ class EbayService:
                         detail=f"Failed to fetch disputes: {error_detail}"
                     )
                 
-                disputes_data = response.json()
+                disputes_data = decode_json(response)
                 
                 ebay_logger.log_ebay_event(
                     "fetch_disputes_success",
@@ -1180,7 +1268,7 @@ class EbayService:
         )
         
         try:
-            async with httpx.AsyncClient() as client:
+            async with ebay_http_client() as client:
                 response = await client.get(
                     api_url,
                     headers=headers,
@@ -1208,7 +1296,7 @@ class EbayService:
                         detail=f"Failed to fetch inventory items: {error_detail}"
                     )
                 
-                inventory_data = response.json()
+                inventory_data = decode_json(response)
                 
                 ebay_logger.log_ebay_event(
                     "fetch_inventory_items_success",
@@ -1290,7 +1378,7 @@ class EbayService:
         )
         
         try:
-            async with httpx.AsyncClient() as client:
+            async with ebay_http_client() as client:
                 response = await client.get(
                     api_url,
                     headers=headers,
@@ -1318,7 +1406,7 @@ class EbayService:
                         detail=f"Failed to fetch offers: {error_detail}"
                     )
                 
-                offers_data = response.json()
+                offers_data = decode_json(response)
                 
                 ebay_logger.log_ebay_event(
                     "fetch_offers_success",
@@ -1348,7 +1436,8 @@ class EbayService:
             )
 
 
-    async def sync_all_transactions(self, user_id: str, access_token: str, run_id: Optional[str] = None) -> Dict[str, Any]:
+    async def sync_all_transactions(self, user_id: str, access_token: str, run_id: Optional[str] = None,
+                                    max_pages: Optional[int] = None) -> Dict[str, Any]:
         """
         Synchronize all transactions from eBay to database with pagination (limit=200)
         
@@ -1356,6 +1445,7 @@ class EbayService:
             user_id: User ID
             access_token: eBay OAuth access token
             run_id: Optional run_id for sync event logging
+            max_pages: Optional page cap below the safety limit (set by the call budget planner)
         """
         from app.services.ebay_database import ebay_db
         from app.services.sync_event_logger import SyncEventLogger
@@ -1363,7 +1453,10 @@ class EbayService:
         
         # Use provided run_id if available, otherwise create new one
         event_logger = SyncEventLogger(user_id, 'transactions', run_id=run_id)
-        job_id = ebay_db.create_sync_job(user_id, 'transactions')
+        bind_ebay_user(user_id)
+        event_logger.track_phases()
+        event_logger.start_trace()
+        job_id = await ebay_db.create_sync_job_async(user_id, 'transactions')
         start_time = time.time()
         
         try:
@@ -1378,7 +1471,9 @@ class EbayService:
             offset = 0
             has_more = True
             current_page = 0
-            max_pages = 200  # Safety limit to prevent infinite loops
+            budget_capped = max_pages is not None and max_pages < 200
+            max_pages = min(max_pages or 200, 200)  # Safety limit to prevent infinite loops; lower when the call budget is short
+            cap_note = None
             
             # Get user identity for logging "who we are"
             identity = await self.get_user_identity(access_token)
@@ -1400,20 +1495,22 @@ class EbayService:
             event_logger.log_info(f"Safety limit: max {max_pages} pages")
             logger.info(f"Starting transaction sync for user {user_id} ({username}) with limit={limit}")
             
-            await asyncio.sleep(0.5)
+            await sync_sleep(0.5)
             
             while has_more:
                 # Safety check: max pages limit
                 if current_page >= max_pages:
                     event_logger.log_warning(f"Reached safety limit of {max_pages} pages. Stopping to prevent infinite loop.")
                     logger.warning(f"Transactions sync reached max_pages limit ({max_pages}) for run_id {event_logger.run_id}")
+                    if budget_capped:
+                        cap_note = budget_cap_note(max_pages)
                     break
                 # Check for cancellation
-                from app.services.sync_event_logger import is_cancelled
-                if is_cancelled(event_logger.run_id):
+                from app.services.sync_event_logger import is_cancelled_async
+                if await is_cancelled_async(event_logger.run_id):
                     logger.info(f"Transaction sync cancelled for run_id {event_logger.run_id}")
                     event_logger.log_warning("Sync operation cancelled by user")
-                    event_logger.log_done(
+                    event_logger.log_cancelled(
                         f"Transactions sync cancelled: {total_fetched} fetched, {total_stored} stored",
                         total_fetched,
                         total_stored,
@@ -1437,11 +1534,11 @@ class EbayService:
                 }
                 
                 # Check for cancellation BEFORE making the API request
-                from app.services.sync_event_logger import is_cancelled
-                if is_cancelled(event_logger.run_id):
+                from app.services.sync_event_logger import is_cancelled_async
+                if await is_cancelled_async(event_logger.run_id):
                     logger.info(f"Transactions sync cancelled for run_id {event_logger.run_id} (before API request)")
                     event_logger.log_warning("Sync operation cancelled by user")
-                    event_logger.log_done(
+                    event_logger.log_cancelled(
                         f"Transactions sync cancelled: {total_fetched} fetched, {total_stored} stored",
                         total_fetched,
                         total_stored,
@@ -1463,10 +1560,10 @@ class EbayService:
                     transactions_response = await self.fetch_transactions(access_token, filter_params)
                 except Exception as e:
                     # Check for cancellation after error
-                    if is_cancelled(event_logger.run_id):
+                    if await is_cancelled_async(event_logger.run_id):
                         logger.info(f"Transactions sync cancelled for run_id {event_logger.run_id} (after API error)")
                         event_logger.log_warning("Sync operation cancelled by user")
-                        event_logger.log_done(
+                        event_logger.log_cancelled(
                             f"Transactions sync cancelled: {total_fetched} fetched, {total_stored} stored",
                             total_fetched,
                             total_stored,
@@ -1484,10 +1581,10 @@ class EbayService:
                 request_duration = int((time.time() - request_start) * 1000)
                 
                 # Check for cancellation AFTER the API request
-                if is_cancelled(event_logger.run_id):
+                if await is_cancelled_async(event_logger.run_id):
                     logger.info(f"Transactions sync cancelled for run_id {event_logger.run_id} (after API request)")
                     event_logger.log_warning("Sync operation cancelled by user")
-                    event_logger.log_done(
+                    event_logger.log_cancelled(
                         f"Transactions sync cancelled: {total_fetched} fetched, {total_stored} stored",
                         total_fetched,
                         total_stored,
@@ -1524,13 +1621,13 @@ class EbayService:
                 
                 total_fetched += len(transactions)
                 
-                await asyncio.sleep(0.3)
+                await sync_sleep(0.3)
                 
                 # Check for cancellation before storing
-                if is_cancelled(event_logger.run_id):
+                if await is_cancelled_async(event_logger.run_id):
                     logger.info(f"Transactions sync cancelled for run_id {event_logger.run_id} (before storing)")
                     event_logger.log_warning("Sync operation cancelled by user")
-                    event_logger.log_done(
+                    event_logger.log_cancelled(
                         f"Transactions sync cancelled: {total_fetched} fetched, {total_stored} stored",
                         total_fetched,
                         total_stored,
@@ -1547,14 +1644,13 @@ class EbayService:
                 
                 event_logger.log_info(f"→ Storing {len(transactions)} transactions in database...")
                 store_start = time.time()
-                batch_stored = 0
-                for transaction in transactions:
-                    if ebay_db.upsert_transaction(user_id, transaction):
-                        batch_stored += 1
+                batch_stored, rejects = await ebay_db.batch_upsert_transactions_async(user_id, transactions)
                 total_stored += batch_stored
                 store_duration = int((time.time() - store_start) * 1000)
                 
                 event_logger.log_info(f"← Database: Stored {batch_stored} transactions ({store_duration}ms)")
+                if rejects:
+                    event_logger.log_warning(f"{len(rejects)} transactions rejected on page {current_page}: {rejects[:5]}")
                 
                 event_logger.log_progress(
                     f"Page {current_page}/{total_pages} complete: {len(transactions)} fetched, {batch_stored} stored | Running total: {total_fetched}/{total} fetched, {total_stored} stored",
@@ -1567,10 +1663,10 @@ class EbayService:
                 logger.info(f"Synced batch: {len(transactions)} transactions (total: {total_fetched}/{total}, stored: {total_stored})")
                 
                 # Check for cancellation before continuing to next page
-                if is_cancelled(event_logger.run_id):
+                if await is_cancelled_async(event_logger.run_id):
                     logger.info(f"Transactions sync cancelled for run_id {event_logger.run_id} (before next page)")
                     event_logger.log_warning("Sync operation cancelled by user")
-                    event_logger.log_done(
+                    event_logger.log_cancelled(
                         f"Transactions sync cancelled: {total_fetched} fetched, {total_stored} stored",
                         total_fetched,
                         total_stored,
@@ -1592,10 +1688,11 @@ class EbayService:
                 offset += limit
                 
                 if has_more:
-                    await asyncio.sleep(0.8)
+                    await sync_sleep(0.8)
             
             duration_ms = int((time.time() - start_time) * 1000)
-            ebay_db.update_sync_job(job_id, 'completed', total_fetched, total_stored)
+            await ebay_db.update_sync_job_async(job_id, 'completed', total_fetched, total_stored,
+                                              error_message=cap_note, phase_timings=event_logger.phase_summary())
             
             event_logger.log_done(
                 f"Transactions sync completed: {total_fetched} fetched, {total_stored} stored in {duration_ms}ms",
@@ -1618,7 +1715,7 @@ class EbayService:
             error_msg = str(e)
             event_logger.log_error(f"Transactions sync failed: {error_msg}", e)
             logger.error(f"Transaction sync failed: {error_msg}")
-            ebay_db.update_sync_job(job_id, 'failed', error_message=error_msg)
+            await ebay_db.update_sync_job_async(job_id, 'failed', error_message=error_msg, phase_timings=event_logger.phase_summary())
             raise
         finally:
             event_logger.close()
@@ -1638,7 +1735,10 @@ class EbayService:
         
         # Use provided run_id if available, otherwise create new one
         event_logger = SyncEventLogger(user_id, 'disputes', run_id=run_id)
-        job_id = ebay_db.create_sync_job(user_id, 'disputes')
+        bind_ebay_user(user_id)
+        event_logger.track_phases()
+        event_logger.start_trace()
+        job_id = await ebay_db.create_sync_job_async(user_id, 'disputes')
         start_time = time.time()
         
         try:
@@ -1649,14 +1749,14 @@ class EbayService:
             event_logger.log_info(f"API Configuration: Fulfillment API v1 payment_dispute")
             logger.info(f"Starting disputes sync for user {user_id}")
             
-            await asyncio.sleep(0.5)
+            await sync_sleep(0.5)
             
             # Check for cancellation before starting
-            from app.services.sync_event_logger import is_cancelled
-            if is_cancelled(event_logger.run_id):
+            from app.services.sync_event_logger import is_cancelled_async
+            if await is_cancelled_async(event_logger.run_id):
                 logger.info(f"Disputes sync cancelled for run_id {event_logger.run_id}")
                 event_logger.log_warning("Sync operation cancelled by user")
-                event_logger.log_done(
+                event_logger.log_cancelled(
                     f"Disputes sync cancelled: 0 fetched, 0 stored",
                     0,
                     0,
@@ -1672,10 +1772,10 @@ class EbayService:
                 }
             
             # Check for cancellation BEFORE making the API request
-            if is_cancelled(event_logger.run_id):
+            if await is_cancelled_async(event_logger.run_id):
                 logger.info(f"Disputes sync cancelled for run_id {event_logger.run_id} (before API request)")
                 event_logger.log_warning("Sync operation cancelled by user")
-                event_logger.log_done(
+                event_logger.log_cancelled(
                     f"Disputes sync cancelled: 0 fetched, 0 stored",
                     0,
                     0,
@@ -1697,10 +1797,10 @@ class EbayService:
                 disputes_response = await self.fetch_payment_disputes(access_token)
             except Exception as e:
                 # Check for cancellation after error
-                if is_cancelled(event_logger.run_id):
+                if await is_cancelled_async(event_logger.run_id):
                     logger.info(f"Disputes sync cancelled for run_id {event_logger.run_id} (after API error)")
                     event_logger.log_warning("Sync operation cancelled by user")
-                    event_logger.log_done(
+                    event_logger.log_cancelled(
                         f"Disputes sync cancelled: 0 fetched, 0 stored",
                         0,
                         0,
@@ -1718,10 +1818,10 @@ class EbayService:
             request_duration = int((time.time() - request_start) * 1000)
             
             # Check for cancellation after API call
-            if is_cancelled(event_logger.run_id):
+            if await is_cancelled_async(event_logger.run_id):
                 logger.info(f"Disputes sync cancelled for run_id {event_logger.run_id}")
                 event_logger.log_warning("Sync operation cancelled by user")
-                event_logger.log_done(
+                event_logger.log_cancelled(
                     f"Disputes sync cancelled: 0 fetched, 0 stored",
                     0,
                     0,
@@ -1749,32 +1849,33 @@ class EbayService:
             
             event_logger.log_info(f"← Response: 200 OK ({request_duration}ms) - Received {total_fetched} disputes")
             
-            await asyncio.sleep(0.3)
+            await sync_sleep(0.3)
             
             event_logger.log_info(f"→ Storing {total_fetched} disputes in database...")
             store_start = time.time()
-            for dispute in disputes:
-                # Check for cancellation during storage
-                if is_cancelled(event_logger.run_id):
-                    logger.info(f"Disputes sync cancelled for run_id {event_logger.run_id}")
-                    event_logger.log_warning("Sync operation cancelled by user")
-                    event_logger.log_done(
-                        f"Disputes sync cancelled: {total_fetched} fetched, {total_stored} stored",
-                        total_fetched,
-                        total_stored,
-                        int((time.time() - start_time) * 1000)
-                    )
-                    event_logger.close()
-                    return {
-                        "status": "cancelled",
-                        "total_fetched": total_fetched,
-                        "total_stored": total_stored,
-                        "job_id": job_id,
-                        "run_id": event_logger.run_id
-                    }
-                
-                if ebay_db.upsert_dispute(user_id, dispute):
-                    total_stored += 1
+            # Check for cancellation before storing
+            if await is_cancelled_async(event_logger.run_id):
+                logger.info(f"Disputes sync cancelled for run_id {event_logger.run_id}")
+                event_logger.log_warning("Sync operation cancelled by user")
+                event_logger.log_cancelled(
+                    f"Disputes sync cancelled: {total_fetched} fetched, {total_stored} stored",
+                    total_fetched,
+                    total_stored,
+                    int((time.time() - start_time) * 1000)
+                )
+                event_logger.close()
+                return {
+                    "status": "cancelled",
+                    "total_fetched": total_fetched,
+                    "total_stored": total_stored,
+                    "job_id": job_id,
+                    "run_id": event_logger.run_id
+                }
+            
+            batch_stored, rejects = await ebay_db.batch_upsert_disputes_async(user_id, disputes)
+            total_stored += batch_stored
+            if rejects:
+                event_logger.log_warning(f"{len(rejects)} disputes rejected: {rejects[:5]}")
             store_duration = int((time.time() - store_start) * 1000)
             
             event_logger.log_info(f"← Database: Stored {total_stored} disputes ({store_duration}ms)")
@@ -1788,7 +1889,7 @@ class EbayService:
             )
             
             duration_ms = int((time.time() - start_time) * 1000)
-            ebay_db.update_sync_job(job_id, 'completed', total_fetched, total_stored)
+            await ebay_db.update_sync_job_async(job_id, 'completed', total_fetched, total_stored, phase_timings=event_logger.phase_summary())
             
             event_logger.log_done(
                 f"Disputes sync completed: {total_fetched} fetched, {total_stored} stored in {duration_ms}ms",
@@ -1811,7 +1912,7 @@ class EbayService:
             error_msg = str(e)
             event_logger.log_error(f"Disputes sync failed: {error_msg}", e)
             logger.error(f"Disputes sync failed: {error_msg}")
-            ebay_db.update_sync_job(job_id, 'failed', error_message=error_msg)
+            await ebay_db.update_sync_job_async(job_id, 'failed', error_message=error_msg, phase_timings=event_logger.phase_summary())
             raise
         finally:
             event_logger.close()
@@ -1845,7 +1946,10 @@ class EbayService:
         
         # Use provided run_id if available, otherwise create new one
         event_logger = SyncEventLogger(user_id, 'offers', run_id=run_id)
-        job_id = ebay_db.create_sync_job(user_id, 'offers')
+        bind_ebay_user(user_id)
+        event_logger.track_phases()
+        event_logger.start_trace()
+        job_id = await ebay_db.create_sync_job_async(user_id, 'offers')
         start_time = time.time()
         
         try:
@@ -1858,14 +1962,14 @@ class EbayService:
             event_logger.log_info(f"Step 1: Fetching all inventory items to get SKU list...")
             logger.info(f"Starting offers sync for user {user_id}")
             
-            await asyncio.sleep(0.5)
+            await sync_sleep(0.5)
             
             # Check for cancellation before starting
-            from app.services.sync_event_logger import is_cancelled
-            if is_cancelled(event_logger.run_id):
+            from app.services.sync_event_logger import is_cancelled_async
+            if await is_cancelled_async(event_logger.run_id):
                 logger.info(f"Offers sync cancelled for run_id {event_logger.run_id}")
                 event_logger.log_warning("Sync operation cancelled by user")
-                event_logger.log_done(
+                event_logger.log_cancelled(
                     f"Offers sync cancelled: 0 fetched, 0 stored",
                     0,
                     0,
@@ -1890,10 +1994,10 @@ class EbayService:
                 inventory_page += 1
                 
                 # Check for cancellation
-                if is_cancelled(event_logger.run_id):
+                if await is_cancelled_async(event_logger.run_id):
                     logger.info(f"Offers sync cancelled for run_id {event_logger.run_id}")
                     event_logger.log_warning("Sync operation cancelled by user")
-                    event_logger.log_done(
+                    event_logger.log_cancelled(
                         f"Offers sync cancelled: {total_fetched} fetched, {total_stored} stored",
                         total_fetched,
                         total_stored,
@@ -1909,10 +2013,10 @@ class EbayService:
                     }
                 
                 # Check for cancellation BEFORE making the API request
-                if is_cancelled(event_logger.run_id):
+                if await is_cancelled_async(event_logger.run_id):
                     logger.info(f"Offers sync cancelled for run_id {event_logger.run_id} (before inventory API request)")
                     event_logger.log_warning("Sync operation cancelled by user")
-                    event_logger.log_done(
+                    event_logger.log_cancelled(
                         f"Offers sync cancelled: {total_fetched} fetched, {total_stored} stored",
                         total_fetched,
                         total_stored,
@@ -1934,10 +2038,10 @@ class EbayService:
                     inventory_response = await self.fetch_inventory_items(access_token, limit=limit, offset=offset)
                 except Exception as e:
                     # Check for cancellation after error
-                    if is_cancelled(event_logger.run_id):
+                    if await is_cancelled_async(event_logger.run_id):
                         logger.info(f"Offers sync cancelled for run_id {event_logger.run_id} (after inventory API error)")
                         event_logger.log_warning("Sync operation cancelled by user")
-                        event_logger.log_done(
+                        event_logger.log_cancelled(
                             f"Offers sync cancelled: {total_fetched} fetched, {total_stored} stored",
                             total_fetched,
                             total_stored,
@@ -1955,10 +2059,10 @@ class EbayService:
                 request_duration = int((time.time() - request_start) * 1000)
                 
                 # Check for cancellation AFTER the API request
-                if is_cancelled(event_logger.run_id):
+                if await is_cancelled_async(event_logger.run_id):
                     logger.info(f"Offers sync cancelled for run_id {event_logger.run_id} (after inventory API request)")
                     event_logger.log_warning("Sync operation cancelled by user")
-                    event_logger.log_done(
+                    event_logger.log_cancelled(
                         f"Offers sync cancelled: {total_fetched} fetched, {total_stored} stored",
                         total_fetched,
                         total_stored,
@@ -1987,7 +2091,7 @@ class EbayService:
                 has_more_items = len(inventory_items) == limit and offset < total_items
                 
                 if has_more_items:
-                    await asyncio.sleep(0.3)
+                    await sync_sleep(0.3)
             
             event_logger.log_info(f"✓ Step 1 complete: Found {len(all_skus)} unique SKUs")
             
@@ -1999,7 +2103,7 @@ class EbayService:
                     0,
                     int((time.time() - start_time) * 1000)
                 )
-                ebay_db.update_sync_job(job_id, 'completed', 0, 0)
+                await ebay_db.update_sync_job_async(job_id, 'completed', 0, 0, phase_timings=event_logger.phase_summary())
                 return {
                     "status": "completed",
                     "total_fetched": 0,
@@ -2016,10 +2120,10 @@ class EbayService:
                 sku_count += 1
                 
                 # Check for cancellation
-                if is_cancelled(event_logger.run_id):
+                if await is_cancelled_async(event_logger.run_id):
                     logger.info(f"Offers sync cancelled for run_id {event_logger.run_id}")
                     event_logger.log_warning("Sync operation cancelled by user")
-                    event_logger.log_done(
+                    event_logger.log_cancelled(
                         f"Offers sync cancelled: {total_fetched} fetched, {total_stored} stored",
                         total_fetched,
                         total_stored,
@@ -2035,10 +2139,10 @@ class EbayService:
                     }
                 
                 # Check for cancellation BEFORE making the API request
-                if is_cancelled(event_logger.run_id):
+                if await is_cancelled_async(event_logger.run_id):
                     logger.info(f"Offers sync cancelled for run_id {event_logger.run_id} (before offers API request)")
                     event_logger.log_warning("Sync operation cancelled by user")
-                    event_logger.log_done(
+                    event_logger.log_cancelled(
                         f"Offers sync cancelled: {total_fetched} fetched, {total_stored} stored",
                         total_fetched,
                         total_stored,
@@ -2061,10 +2165,10 @@ class EbayService:
                     request_duration = int((time.time() - request_start) * 1000)
                     
                     # Check for cancellation AFTER the API request
-                    if is_cancelled(event_logger.run_id):
+                    if await is_cancelled_async(event_logger.run_id):
                         logger.info(f"Offers sync cancelled for run_id {event_logger.run_id} (after offers API request)")
                         event_logger.log_warning("Sync operation cancelled by user")
-                        event_logger.log_done(
+                        event_logger.log_cancelled(
                             f"Offers sync cancelled: {total_fetched} fetched, {total_stored} stored",
                             total_fetched,
                             total_stored,
@@ -2085,19 +2189,20 @@ class EbayService:
                     event_logger.log_info(f"← [{sku_count}/{len(all_skus)}] SKU {sku}: {len(offers)} offers ({request_duration}ms)")
                     
                     # Store offers
-                    for offer in offers:
-                        if ebay_db.upsert_offer(user_id, offer):
-                            total_stored += 1
+                    batch_stored, rejects = await ebay_db.batch_upsert_offers_async(user_id, offers)
+                    total_stored += batch_stored
+                    if rejects:
+                        event_logger.log_warning(f"{len(rejects)} offers rejected for SKU {sku}: {rejects[:5]}")
                     
                     # Rate limiting - small delay between SKU requests
-                    await asyncio.sleep(0.2)
+                    await sync_sleep(0.2)
                     
                 except Exception as e:
                     # Check for cancellation after error
-                    if is_cancelled(event_logger.run_id):
+                    if await is_cancelled_async(event_logger.run_id):
                         logger.info(f"Offers sync cancelled for run_id {event_logger.run_id} (after offers API error)")
                         event_logger.log_warning("Sync operation cancelled by user")
-                        event_logger.log_done(
+                        event_logger.log_cancelled(
                             f"Offers sync cancelled: {total_fetched} fetched, {total_stored} stored",
                             total_fetched,
                             total_stored,
@@ -2120,7 +2225,7 @@ class EbayService:
             event_logger.log_info(f"✓ Step 2 complete: Processed {sku_count} SKUs")
             
             duration_ms = int((time.time() - start_time) * 1000)
-            ebay_db.update_sync_job(job_id, 'completed', total_fetched, total_stored)
+            await ebay_db.update_sync_job_async(job_id, 'completed', total_fetched, total_stored, phase_timings=event_logger.phase_summary())
             
             event_logger.log_done(
                 f"Offers sync completed: {total_fetched} offers fetched, {total_stored} stored from {sku_count} SKUs in {duration_ms}ms",
@@ -2143,7 +2248,7 @@ class EbayService:
             error_msg = str(e)
             event_logger.log_error(f"Offers sync failed: {error_msg}", e)
             logger.error(f"Offers sync failed: {error_msg}")
-            ebay_db.update_sync_job(job_id, 'failed', error_message=error_msg)
+            await ebay_db.update_sync_job_async(job_id, 'failed', error_message=error_msg, phase_timings=event_logger.phase_summary())
             raise
         finally:
             event_logger.close()
@@ -2178,7 +2283,10 @@ class EbayService:
         
         # Use provided run_id if available, otherwise create new one
         event_logger = SyncEventLogger(user_id, 'inventory', run_id=run_id)
-        job_id = ebay_db.create_sync_job(user_id, 'inventory')
+        bind_ebay_user(user_id)
+        event_logger.track_phases()
+        event_logger.start_trace()
+        job_id = await ebay_db.create_sync_job_async(user_id, 'inventory')
         start_time = time.time()
         
         try:
@@ -2189,14 +2297,14 @@ class EbayService:
             event_logger.log_info(f"API Configuration: Inventory API v1 - getInventoryItems with pagination")
             logger.info(f"Starting inventory sync for user {user_id}")
             
-            await asyncio.sleep(0.5)
+            await sync_sleep(0.5)
             
             # Check for cancellation before starting
-            from app.services.sync_event_logger import is_cancelled
-            if is_cancelled(event_logger.run_id):
+            from app.services.sync_event_logger import is_cancelled_async
+            if await is_cancelled_async(event_logger.run_id):
                 logger.info(f"Inventory sync cancelled for run_id {event_logger.run_id}")
                 event_logger.log_warning("Sync operation cancelled by user")
-                event_logger.log_done(
+                event_logger.log_cancelled(
                     f"Inventory sync cancelled: 0 fetched, 0 stored",
                     0,
                     0,
@@ -2221,10 +2329,10 @@ class EbayService:
                 current_page += 1
                 
                 # Check for cancellation
-                if is_cancelled(event_logger.run_id):
+                if await is_cancelled_async(event_logger.run_id):
                     logger.info(f"Inventory sync cancelled for run_id {event_logger.run_id}")
                     event_logger.log_warning("Sync operation cancelled by user")
-                    event_logger.log_done(
+                    event_logger.log_cancelled(
                         f"Inventory sync cancelled: {total_fetched} fetched, {total_stored} stored",
                         total_fetched,
                         total_stored,
@@ -2240,10 +2348,10 @@ class EbayService:
                     }
                 
                 # Check for cancellation BEFORE making the API request
-                if is_cancelled(event_logger.run_id):
+                if await is_cancelled_async(event_logger.run_id):
                     logger.info(f"Inventory sync cancelled for run_id {event_logger.run_id} (before API request)")
                     event_logger.log_warning("Sync operation cancelled by user")
-                    event_logger.log_done(
+                    event_logger.log_cancelled(
                         f"Inventory sync cancelled: {total_fetched} fetched, {total_stored} stored",
                         total_fetched,
                         total_stored,
@@ -2265,10 +2373,10 @@ class EbayService:
                     inventory_response = await self.fetch_inventory_items(access_token, limit=limit, offset=offset)
                 except Exception as e:
                     # Check for cancellation after error
-                    if is_cancelled(event_logger.run_id):
+                    if await is_cancelled_async(event_logger.run_id):
                         logger.info(f"Inventory sync cancelled for run_id {event_logger.run_id} (after API error)")
                         event_logger.log_warning("Sync operation cancelled by user")
-                        event_logger.log_done(
+                        event_logger.log_cancelled(
                             f"Inventory sync cancelled: {total_fetched} fetched, {total_stored} stored",
                             total_fetched,
                             total_stored,
@@ -2286,10 +2394,10 @@ class EbayService:
                 request_duration = int((time.time() - request_start) * 1000)
                 
                 # Check for cancellation AFTER the API request
-                if is_cancelled(event_logger.run_id):
+                if await is_cancelled_async(event_logger.run_id):
                     logger.info(f"Inventory sync cancelled for run_id {event_logger.run_id} (after API request)")
                     event_logger.log_warning("Sync operation cancelled by user")
-                    event_logger.log_done(
+                    event_logger.log_cancelled(
                         f"Inventory sync cancelled: {total_fetched} fetched, {total_stored} stored",
                         total_fetched,
                         total_stored,
@@ -2320,40 +2428,39 @@ class EbayService:
                 
                 total_fetched += len(inventory_items)
                 
-                await asyncio.sleep(0.3)
+                await sync_sleep(0.3)
+                
+                # Check for cancellation once per page before storing
+                if await is_cancelled_async(event_logger.run_id):
+                    logger.info(f"Inventory sync cancelled for run_id {event_logger.run_id}")
+                    event_logger.log_warning("Sync operation cancelled by user")
+                    event_logger.log_cancelled(
+                        f"Inventory sync cancelled: {total_fetched} fetched, {total_stored} stored",
+                        total_fetched,
+                        total_stored,
+                        int((time.time() - start_time) * 1000)
+                    )
+                    event_logger.close()
+                    return {
+                        "status": "cancelled",
+                        "total_fetched": total_fetched,
+                        "total_stored": total_stored,
+                        "job_id": job_id,
+                        "run_id": event_logger.run_id
+                    }
                 
                 event_logger.log_info(f"→ Storing {len(inventory_items)} inventory items in database...")
                 store_start = time.time()
-                
-                for item in inventory_items:
-                    # Check for cancellation during storage
-                    if is_cancelled(event_logger.run_id):
-                        logger.info(f"Inventory sync cancelled for run_id {event_logger.run_id}")
-                        event_logger.log_warning("Sync operation cancelled by user")
-                        event_logger.log_done(
-                            f"Inventory sync cancelled: {total_fetched} fetched, {total_stored} stored",
-                            total_fetched,
-                            total_stored,
-                            int((time.time() - start_time) * 1000)
-                        )
-                        event_logger.close()
-                        return {
-                            "status": "cancelled",
-                            "total_fetched": total_fetched,
-                            "total_stored": total_stored,
-                            "job_id": job_id,
-                            "run_id": event_logger.run_id
-                        }
-                    
-                    if ebay_db.upsert_inventory_item(user_id, item):
-                        total_stored += 1
-                
+                batch_stored, rejects = await ebay_db.batch_upsert_inventory_items_async(user_id, inventory_items)
+                total_stored += batch_stored
                 store_duration = int((time.time() - store_start) * 1000)
                 
-                event_logger.log_info(f"← Database: Stored {total_stored - (total_fetched - len(inventory_items))} items ({store_duration}ms)")
+                event_logger.log_info(f"← Database: Stored {batch_stored} items ({store_duration}ms)")
+                if rejects:
+                    event_logger.log_warning(f"{len(rejects)} inventory items rejected on page {current_page}: {rejects[:5]}")
                 
                 event_logger.log_progress(
-                    f"Page {current_page}/{total_pages} complete: {len(inventory_items)} fetched, {total_stored - (total_fetched - len(inventory_items))} stored | Running total: {total_fetched}/{total_items} fetched, {total_stored} stored",
+                    f"Page {current_page}/{total_pages} complete: {len(inventory_items)} fetched, {batch_stored} stored | Running total: {total_fetched}/{total_items} fetched, {total_stored} stored",
                     current_page,
                     total_pages,
                     total_fetched,
@@ -2367,10 +2474,10 @@ class EbayService:
                 has_more = len(inventory_items) == limit and offset < total_items
                 
                 if has_more:
-                    await asyncio.sleep(0.8)
+                    await sync_sleep(0.8)
             
             duration_ms = int((time.time() - start_time) * 1000)
-            ebay_db.update_sync_job(job_id, 'completed', total_fetched, total_stored)
+            await ebay_db.update_sync_job_async(job_id, 'completed', total_fetched, total_stored, phase_timings=event_logger.phase_summary())
             
             event_logger.log_done(
                 f"Inventory sync completed: {total_fetched} fetched, {total_stored} stored in {duration_ms}ms",
@@ -2393,7 +2500,7 @@ class EbayService:
             error_msg = str(e)
             event_logger.log_error(f"Inventory sync failed: {error_msg}", e)
             logger.error(f"Inventory sync failed: {error_msg}")
-            ebay_db.update_sync_job(job_id, 'failed', error_message=error_msg)
+            await ebay_db.update_sync_job_async(job_id, 'failed', error_message=error_msg, phase_timings=event_logger.phase_summary())
             raise
         finally:
             event_logger.close()
@@ -2437,7 +2544,7 @@ class EbayService:
         request_payload["body"] = xml_request.replace(access_token, "<hidden-token>")
         
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
+            async with ebay_http_client(timeout=10.0) as client:
                 response = await client.post(api_url, content=xml_request, headers=headers)
             
             root = ET.fromstring(response.text)
@@ -2516,7 +2623,7 @@ class EbayService:
         }
         
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
+            async with ebay_http_client(timeout=10.0) as client:
                 response = await client.post(api_url, content=xml_request, headers=headers)
             
             root = ET.fromstring(response.text)
@@ -2583,7 +2690,7 @@ class EbayService:
         }
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
+            async with ebay_http_client(timeout=30.0) as client:
                 response = await client.post(api_url, content=xml_request, headers=headers)
             
             root = ET.fromstring(response.text)
@@ -2611,8 +2718,6 @@ class EbayService:
     
     async def get_message_headers(self, access_token: str, folder_id: str, page_number: int = 1, entries_per_page: int = 200) -> Dict[str, Any]:
         """Get message headers (IDs only) using GetMyMessages with ReturnHeaders"""
-        import xml.etree.ElementTree as ET
-        
         api_url = "https://api.ebay.com/ws/api.dll"
         
         now_iso = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.000Z")
@@ -2641,52 +2746,16 @@ class EbayService:
         }
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
+            async with ebay_http_client(timeout=30.0) as client:
                 response = await client.post(api_url, content=xml_request, headers=headers)
             
-            root = ET.fromstring(response.text)
-            ns = {"ebay": "urn:ebay:apis:eBLBaseComponents"}
-            
-            message_ids = []
-            alert_ids = []
-            
-            messages_elem = root.find(".//ebay:Messages", ns)
-            if messages_elem is not None:
-                for msg_elem in messages_elem.findall("ebay:Message", ns):
-                    msg_id_elem = msg_elem.find("ebay:MessageID", ns)
-                    if msg_id_elem is not None and msg_id_elem.text:
-                        message_ids.append(msg_id_elem.text)
-                
-                for alert_elem in messages_elem.findall("ebay:Alert", ns):
-                    alert_id_elem = alert_elem.find("ebay:AlertID", ns)
-                    if alert_id_elem is not None and alert_id_elem.text:
-                        alert_ids.append(alert_id_elem.text)
-            
-            pagination_elem = root.find(".//ebay:PaginationResult", ns)
-            total_pages = 1
-            total_entries = 0
-            if pagination_elem is not None:
-                total_pages_elem = pagination_elem.find("ebay:TotalNumberOfPages", ns)
-                total_entries_elem = pagination_elem.find("ebay:TotalNumberOfEntries", ns)
-                if total_pages_elem is not None:
-                    total_pages = int(total_pages_elem.text)
-                if total_entries_elem is not None:
-                    total_entries = int(total_entries_elem.text)
-            
-            return {
-                "message_ids": message_ids,
-                "alert_ids": alert_ids,
-                "total_pages": total_pages,
-                "total_entries": total_entries
-            }
+            return parse_message_headers(response.text)
         except Exception as e:
             logger.error(f"Failed to get message headers: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Failed to get message headers: {str(e)}")
     
     async def get_message_bodies(self, access_token: str, message_ids: List[str]) -> List[Dict[str, Any]]:
         """Get message bodies using GetMyMessages with ReturnMessages (batch of up to 10 IDs)"""
-        import xml.etree.ElementTree as ET
-        
         if not message_ids:
             return []
         
@@ -2715,32 +2784,10 @@ class EbayService:
         }
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
+            async with ebay_http_client(timeout=30.0) as client:
                 response = await client.post(api_url, content=xml_request, headers=headers)
             
-            root = ET.fromstring(response.text)
-            ns = {"ebay": "urn:ebay:apis:eBLBaseComponents"}
-            
-            messages = []
-            messages_elem = root.find(".//ebay:Messages", ns)
-            if messages_elem is not None:
-                for msg_elem in messages_elem.findall("ebay:Message", ns):
-                    message = {}
-                    
-                    for field in ["MessageID", "ExternalMessageID", "Subject", "Text", "Sender", "RecipientUserID", "ReceiveDate", "ExpirationDate", "ItemID", "FolderID"]:
-                        elem = msg_elem.find(f"ebay:{field}", ns)
-                        if elem is not None:
-                            message[field.lower()] = elem.text
-                    
-                    read_elem = msg_elem.find("ebay:Read", ns)
-                    flagged_elem = msg_elem.find("ebay:Flagged", ns)
-                    
-                    message["read"] = read_elem.text.lower() == "true" if read_elem is not None else False
-                    message["flagged"] = flagged_elem.text.lower() == "true" if flagged_elem is not None else False
-                    
-                    messages.append(message)
-            
-            return messages
+            return parse_message_bodies(response.text)
         except Exception as e:
             logger.error(f"Failed to get message bodies: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Failed to get message bodies: {str(e)}")
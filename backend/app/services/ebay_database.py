@@ -1,5 +1,5 @@
 import sqlite3
-from typing import Dict, Optional, List, Any
+from typing import Dict, Optional, List, Any, Iterator
 from datetime import datetime
 import json
 from pathlib import Path
@@ -223,8 +223,9 @@ class EbayDatabase:
             conn.close()
             return False
     
-    def get_orders(self, user_id: str, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
-        """Get orders for a user"""
+    def get_orders(self, user_id: str, limit: int = 100, offset: int = 0,
+                   include_payload: bool = True) -> List[Dict[str, Any]]:
+        """Get orders for a user (SQLite always returns the full order_data)"""
         conn = self._get_connection()
         cursor = conn.cursor()
         
@@ -246,6 +247,25 @@ class EbayDatabase:
         
         return orders
     
+    def iter_orders(self, user_id: str, include_payload: bool = True,
+                    batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """All orders of a user, newest first, fetched batch_size rows at a time"""
+        conn = self._get_connection()
+        
+        try:
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM orders WHERE user_id = ? ORDER BY creation_date DESC', (user_id,))
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    order = dict(row)
+                    order['order_data'] = json.loads(order['order_data'])
+                    yield order
+        finally:
+            conn.close()
+    
     def get_order_count(self, user_id: str) -> int:
         """Get total order count for a user"""
         conn = self._get_connection()
@@ -0,0 +1,83 @@
+"""
+Filter facets with counts for the inventory grid.
+
+All facets are computed by one GROUP BY GROUPING SETS query over the inventory
+rows matching the grid's current filters, so each facet value comes back with
+the number of items behind it. Results are cached in the grid count cache under
+the inventory table: any INSERT/UPDATE/DELETE on inventory drops them, and the
+cache TTL bounds staleness from other worker processes.
+"""
+import enum
+from typing import Any, Dict, List
+
+from sqlalchemy import func, literal_column, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models_sqlalchemy.models import Inventory, Warehouse
+from app.services.grid_counts import count_cache, normalize_filters
+
+INVENTORY_FACETS = ("category", "status", "ebay_status", "condition", "warehouse", "storage_prefix")
+
+# Constant arguments are inlined so the expression in GROUP BY, GROUPING() and the
+# select list is textually identical, as Postgres requires
+STORAGE_PREFIX = func.substring(Inventory.storage_id, literal_column("1"), literal_column("3"))
+
+
+def _facet_value(value: Any) -> Any:
+    return value.value if isinstance(value, enum.Enum) else value
+
+
+async def inventory_facets(db: AsyncSession, query, filters: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Facet values and counts for a filtered inventory select(), highest count first.
+    Returns {facet: [{"value": ..., "count": n}, ...]}; warehouse entries also carry the name.
+    """
+    key = ("facets",) + normalize_filters(filters)
+    cached = count_cache.get("inventory", key)
+    if cached is not None:
+        return cached
+
+    grouped = {
+        "category": Inventory.category,
+        "status": Inventory.status,
+        "ebay_status": Inventory.ebay_status,
+        "condition": Inventory.condition,
+        "warehouse": Inventory.warehouse_id,
+        "storage_prefix": STORAGE_PREFIX,
+    }
+    statement = (
+        query.order_by(None)
+        .with_only_columns(
+            *(expr.label(name) for name, expr in grouped.items()),
+            Warehouse.name.label("warehouse_name"),
+            *(func.grouping(expr).label(f"g_{name}") for name, expr in grouped.items()),
+            func.count().label("count"),
+        )
+        .outerjoin(Warehouse, Warehouse.id == Inventory.warehouse_id)
+        .group_by(func.grouping_sets(
+            Inventory.category,
+            Inventory.status,
+            Inventory.ebay_status,
+            Inventory.condition,
+            tuple_(Inventory.warehouse_id, Warehouse.name),
+            STORAGE_PREFIX,
+        ))
+    )
+
+    facets: Dict[str, List[Dict[str, Any]]] = {name: [] for name in INVENTORY_FACETS}
+    for row in (await db.execute(statement)).mappings():
+        # Each row belongs to exactly one grouping set: the facet whose GROUPING() is 0
+        name = next(n for n in grouped if row[f"g_{n}"] == 0)
+        value = _facet_value(row[name])
+        if value is None:
+            continue
+        entry = {"value": value, "count": row["count"]}
+        if name == "warehouse":
+            entry["name"] = row["warehouse_name"]
+        facets[name].append(entry)
+
+    for entries in facets.values():
+        entries.sort(key=lambda e: (-e["count"], str(e["value"])))
+
+    count_cache.set("inventory", key, facets)
+    return facets
@@ -0,0 +1,191 @@
+"""
+Total-count strategies for the grid endpoints.
+
+A grid request picks how its `total` is computed:
+    exact      COUNT(*) over the filtered set (the old behaviour)
+    estimated  planner row estimate from EXPLAIN; for an unfiltered table, pg_class.reltuples
+               scaled to the table's current size (as the planner does), without planning
+               the query
+    cached     exact count cached per normalized filter set, dropped on writes to the table
+    none       no count at all; the grid relies on has_more (limit + 1 fetch)
+"""
+import json
+import re
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import event, func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from app.models_sqlalchemy import engine, async_engine
+from app.utils.logger import logger
+
+COUNT_STRATEGIES = ("exact", "estimated", "cached", "none")
+COUNT_STRATEGY_PATTERN = "^(exact|estimated|cached|none)$"
+
+# Bounds staleness from writes made by other worker processes
+COUNT_CACHE_TTL_SECONDS = 300
+
+# Filters whose value is a comma-separated set, so "a,b" and "b, a" select the same rows
+LIST_FILTERS = frozenset({"status", "ebay_status", "condition", "category"})
+
+# Also matches writes inside a leading CTE (WITH updated AS (UPDATE inventory ...)
+_WRITE_TABLE_RE = re.compile(
+    r'^\s*(?:WITH\s.*?\(\s*)?(?:INSERT\s+INTO|UPDATE|DELETE\s+FROM)\s+"?(\w+)',
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+# NULL for a table that was never vacuumed or analyzed (reltuples -1, or 0 pages)
+_TABLE_ESTIMATE_SQL = text("""
+    SELECT CASE WHEN c.reltuples < 0 OR c.relpages = 0 THEN NULL
+                ELSE (c.reltuples / c.relpages
+                      * (pg_relation_size(c.oid) / current_setting('block_size')::int))::bigint
+           END
+    FROM pg_class c
+    WHERE c.oid = to_regclass(:table)
+""")
+
+
+class Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) <statement>, keeping the statement's bound parameters"""
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+class CountCache:
+    """
+    In-process cache of exact counts (and other per-filter aggregates, such as the
+    inventory facets) keyed by (table, normalized filters).
+    Every INSERT/UPDATE/DELETE on a table bumps that table's generation, which
+    invalidates all of its cached counts at once.
+    """
+
+    def __init__(self, ttl_seconds: int = COUNT_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._generations: Dict[str, int] = {}
+        self._entries: Dict[Tuple, Tuple[Any, int, float]] = {}
+
+    def get(self, table: str, key: Tuple) -> Optional[Any]:
+        entry = self._entries.get((table, key))
+        if entry is None:
+            return None
+        count, generation, stored_at = entry
+        if generation != self._generations.get(table, 0) or time.monotonic() - stored_at > self.ttl_seconds:
+            self._entries.pop((table, key), None)
+            return None
+        return count
+
+    def set(self, table: str, key: Tuple, count: Any):
+        self._entries[(table, key)] = (count, self._generations.get(table, 0), time.monotonic())
+
+    def invalidate(self, table: str):
+        self._generations[table] = self._generations.get(table, 0) + 1
+
+
+count_cache = CountCache()
+
+
+def _invalidate_on_write(conn, cursor, statement, parameters, context, executemany):
+    match = _WRITE_TABLE_RE.match(statement)
+    if match:
+        count_cache.invalidate(match.group(1).lower())
+
+
+event.listen(engine, "after_cursor_execute", _invalidate_on_write)
+event.listen(async_engine.sync_engine, "after_cursor_execute", _invalidate_on_write)
+
+
+def normalize_filters(filters: Dict[str, Any]) -> Tuple:
+    """
+    Cache key for a filter set: empty filters dropped, order-independent. Only the
+    comma-list filters in LIST_FILTERS are sorted; any other value (a substring
+    search, a date) is kept as given, stripped.
+    """
+    normalized = []
+    for name, value in filters.items():
+        if value is None or value == "":
+            continue
+        if isinstance(value, str):
+            if name in LIST_FILTERS:
+                value = ",".join(sorted(v.strip() for v in value.split(",")))
+            else:
+                value = value.strip()
+        normalized.append((name, str(value)))
+    return tuple(sorted(normalized))
+
+
+def _plan_rows(plan: Any) -> int:
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def _count_statement(query):
+    return select(func.count()).select_from(query.order_by(None).subquery())
+
+
+async def count_rows_async(db: AsyncSession, query, strategy: str, table: str,
+                           filters: Dict[str, Any]) -> Optional[int]:
+    """Total for a select() under the given strategy; None for the 'none' strategy"""
+    if strategy == "none":
+        return None
+
+    if strategy == "estimated":
+        try:
+            async with db.begin_nested():
+                if not normalize_filters(filters):
+                    estimate = (await db.execute(_TABLE_ESTIMATE_SQL, {"table": table})).scalar()
+                    if estimate is not None:
+                        return estimate
+                return _plan_rows((await db.execute(Explain(query.order_by(None)))).scalar())
+        except Exception as e:
+            logger.warning(f"Estimated count for {table} failed, falling back to exact: {e}")
+
+    key = normalize_filters(filters)
+    if strategy == "cached":
+        cached = count_cache.get(table, key)
+        if cached is not None:
+            return cached
+
+    total = (await db.execute(_count_statement(query))).scalar() or 0
+    count_cache.set(table, key, total)
+    return total
+
+
+def count_rows(db: Session, query, strategy: str, table: str, filters: Dict[str, Any]) -> Optional[int]:
+    """Sync counterpart of count_rows_async for ORM Query objects"""
+    if strategy == "none":
+        return None
+
+    statement = query.statement
+    if strategy == "estimated":
+        try:
+            with db.begin_nested():
+                if not normalize_filters(filters):
+                    estimate = db.execute(_TABLE_ESTIMATE_SQL, {"table": table}).scalar()
+                    if estimate is not None:
+                        return estimate
+                return _plan_rows(db.execute(Explain(statement.order_by(None))).scalar())
+        except Exception as e:
+            logger.warning(f"Estimated count for {table} failed, falling back to exact: {e}")
+
+    key = normalize_filters(filters)
+    if strategy == "cached":
+        cached = count_cache.get(table, key)
+        if cached is not None:
+            return cached
+
+    total = db.execute(_count_statement(statement)).scalar() or 0
+    count_cache.set(table, key, total)
+    return total
@@ -6,6 +6,7 @@ from sqlalchemy.orm import Session
 from app.services.ebay_account_service import ebay_account_service
 from app.services.ebay import ebay_service
 from app.utils.logger import logger
+from app.utils.metrics import bind_ebay_user, ebay_http_client
 
 
 async def run_account_health_check(db: Session, account_id: str) -> Dict[str, Any]:
@@ -34,8 +35,6 @@ async def run_account_health_check(db: Session, account_id: str) -> Dict[str, An
                 "message": "No access token available"
             }
         
-        import httpx
-        
         xml_request = f"""<?xml version="1.0" encoding="utf-8"?>
 <GetUserRequest xmlns="urn:ebay:apis:eBLBaseComponents">
     <RequesterCredentials>
@@ -51,7 +50,8 @@ async def run_account_health_check(db: Session, account_id: str) -> Dict[str, An
             "Content-Type": "text/xml"
         }
         
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        bind_ebay_user(account.org_id)
+        async with ebay_http_client(timeout=10.0) as client:
             response = await client.post(
                 "https://api.ebay.com/ws/api.dll",
                 content=xml_request,
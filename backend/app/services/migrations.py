@@ -0,0 +1,143 @@
+"""
+Alembic migrations outside the request path.
+
+Migrations run as a one-shot command before the app starts (entrypoint.sh), or
+from the app's startup in `upgrade` mode. Either way they hold a Postgres advisory
+lock, so concurrent replicas never run them twice: the command waits for the lock,
+while startup skips the upgrade if another process already holds it. When the
+database is already at head, startup costs one query against alembic_version.
+
+STARTUP_MIGRATIONS selects what the app does at startup:
+    upgrade  upgrade if behind head (skipped while another process migrates)
+    check    only log a warning if behind head
+    off      nothing
+
+Usage (from backend/):
+    python -m app.services.migrations            # upgrade to head
+    python -m app.services.migrations --check    # exit 1 if behind head
+"""
+import argparse
+import sys
+from pathlib import Path
+from typing import Optional, Set
+
+from alembic import command
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, pool, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import ProgrammingError
+
+from app.utils.logger import logger
+
+ALEMBIC_INI = Path(__file__).resolve().parents[2] / "alembic.ini"
+
+# pg_advisory_lock key shared by every process that runs migrations
+MIGRATION_LOCK_KEY = 7_214_009_311
+
+# DDL from startup gives up instead of queueing behind long-running locks
+STARTUP_LOCK_TIMEOUT = "10s"
+
+
+def alembic_config() -> Config:
+    return Config(str(ALEMBIC_INI))
+
+
+def head_revisions() -> Set[str]:
+    """Head revisions of the migration scripts on disk"""
+    return set(ScriptDirectory.from_config(alembic_config()).get_heads())
+
+
+def current_revisions(conn: Connection) -> Set[str]:
+    """Revisions recorded in the database; empty if Alembic never ran"""
+    try:
+        with conn.begin_nested():
+            return {row[0] for row in conn.execute(text("SELECT version_num FROM alembic_version"))}
+    except ProgrammingError:
+        return set()
+
+
+def _engine(database_url: str):
+    return create_engine(database_url, poolclass=pool.NullPool, connect_args={"connect_timeout": 10})
+
+
+def check(database_url: str) -> bool:
+    """True if the database is at head"""
+    engine = _engine(database_url)
+    try:
+        with engine.connect() as conn:
+            current = current_revisions(conn)
+    finally:
+        engine.dispose()
+    heads = head_revisions()
+    if current != heads:
+        logger.warning(f"Database at {sorted(current) or 'no revision'}, migrations head is {sorted(heads)}")
+        return False
+    return True
+
+
+def upgrade(database_url: str, wait: bool = True, lock_timeout: Optional[str] = None) -> bool:
+    """
+    Upgrade to head under the migration lock. With wait=False, returns False
+    without migrating if another process holds the lock.
+    """
+    heads = head_revisions()
+    engine = _engine(database_url)
+    try:
+        with engine.connect() as conn:
+            if wait:
+                conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+            elif not conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY}).scalar():
+                conn.commit()
+                logger.info("Another process is running migrations, skipping")
+                return False
+            if lock_timeout:
+                conn.execute(text(f"SET lock_timeout = '{lock_timeout}'"))
+            conn.commit()
+
+            try:
+                # Re-read under the lock: the previous holder may have just migrated
+                current = current_revisions(conn)
+                conn.commit()
+                if current == heads:
+                    logger.info(f"Database already at head {sorted(heads)}")
+                    return True
+
+                logger.info(f"Migrating database from {sorted(current) or 'no revision'} to {sorted(heads)}")
+                cfg = alembic_config()
+                cfg.attributes["connection"] = conn
+                command.upgrade(cfg, "heads")
+                conn.commit()
+                logger.info("Database migrations completed")
+                return True
+            finally:
+                conn.rollback()
+                conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+                conn.commit()
+    finally:
+        engine.dispose()
+
+
+def run_startup_migrations(database_url: str, mode: str):
+    """STARTUP_MIGRATIONS handling for the app's startup event"""
+    if mode == "off":
+        return
+    if check(database_url) or mode != "upgrade":
+        return
+    upgrade(database_url, wait=False, lock_timeout=STARTUP_LOCK_TIMEOUT)
+
+
+def main():
+    from app.models_sqlalchemy import DATABASE_URL
+
+    parser = argparse.ArgumentParser(description="Run Alembic migrations under the migration lock")
+    parser.add_argument("--check", action="store_true", help="only check whether the database is at head")
+    args = parser.parse_args()
+
+    if args.check:
+        sys.exit(0 if check(DATABASE_URL) else 1)
+    upgrade(DATABASE_URL)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+"""
+Columnar export of orders, line items, transactions, fees and payouts to Parquet.
+
+Each dataset is written as one Parquet file per calendar month (UTC) of its
+business date, in a hive-style layout that pandas, polars, DuckDB and Spark read
+directly:
+
+    <out>/<dataset>/month=YYYY-MM/data.parquet
+
+Rows are read through server-side cursors and written as Arrow record batches,
+so memory use is bounded by EXPORT_BATCH_SIZE whatever the table size. All
+datasets are read from one REPEATABLE READ snapshot.
+
+Runs are incremental: <out>/_state.json keeps the highest updated_at exported
+per dataset, and the next run rewrites only the months that contain rows
+changed since then. Deleted rows are not tracked, and neither is a row moving
+to another month (an order whose creation_date is filled in or corrected): its
+old partition keeps the stale copy. Use --full to rewrite everything. The
+export runs with the session time zone pinned to UTC, so naive timestamp
+columns, the watermark and the month boundaries all compare in UTC. A month is
+written to a temporary file and swapped in, so readers never see a partial
+partition.
+
+pyarrow is only needed for this job and is not a dependency of the API:
+    pip install pyarrow
+    python -m app.services.parquet_export --out /data/exports [--user-id ID] [--full]
+"""
+import argparse
+import json
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from app.services.rollups import varchar_timestamp
+from app.utils.logger import logger
+
+EXPORT_BATCH_SIZE = 50000
+
+STATE_FILE = "_state.json"
+
+# Month of rows whose date is missing or, for the varchar order dates, not a date
+UNKNOWN_MONTH = "unknown"
+
+
+# (name, SQL expression, arrow type); expressions cast to stable types since older
+# environments still have varchar dates and float amounts on the ebay_* tables
+DATASETS: Dict[str, Dict[str, Any]] = {
+    "ebay_orders": {
+        "from": "ebay_orders",
+        "date": varchar_timestamp("ebay_orders.creation_date"),
+        "updated": "ebay_orders.updated_at",
+        "user": "ebay_orders.user_id",
+        "columns": [
+            ("order_id", "order_id::text", "string"),
+            ("user_id", "user_id::text", "string"),
+            ("creation_date", varchar_timestamp("creation_date"), "timestamp"),
+            ("last_modified_date", varchar_timestamp("last_modified_date"), "timestamp"),
+            ("order_payment_status", "order_payment_status::text", "string"),
+            ("order_fulfillment_status", "order_fulfillment_status::text", "string"),
+            ("buyer_username", "buyer_username::text", "string"),
+            ("total_amount", "total_amount::numeric(14,2)", "money"),
+            ("total_currency", "total_currency::text", "string"),
+            ("line_items_count", "line_items_count::bigint", "int"),
+            ("tracking_number", "tracking_number::text", "string"),
+            ("ship_to_city", "ship_to_city::text", "string"),
+            ("ship_to_state", "ship_to_state::text", "string"),
+            ("ship_to_postal_code", "ship_to_postal_code::text", "string"),
+            ("ship_to_country_code", "ship_to_country_code::text", "string"),
+            ("raw_payload", "raw_payload::text", "string"),
+            ("created_at", "created_at::timestamptz", "timestamp"),
+            ("updated_at", "updated_at::timestamptz", "timestamp"),
+        ],
+    },
+    # Line items have no dates of their own; they follow their order's month and
+    # are rewritten whenever the order is, since both are upserted together.
+    # order_line_items has no user_id (it is unique on order_id, line_item_id), so
+    # an order stored for several accounts shares one set of line items, exported
+    # under each of those accounts
+    "order_line_items": {
+        "from": "order_line_items li JOIN ebay_orders o ON o.order_id = li.order_id",
+        "date": varchar_timestamp("o.creation_date"),
+        "updated": "o.updated_at",
+        "user": "o.user_id",
+        "columns": [
+            ("order_id", "li.order_id::text", "string"),
+            ("line_item_id", "li.line_item_id::text", "string"),
+            ("user_id", "o.user_id::text", "string"),
+            ("order_creation_date", varchar_timestamp("o.creation_date"), "timestamp"),
+            ("sku", "li.sku::text", "string"),
+            ("title", "li.title::text", "string"),
+            ("quantity", "li.quantity::bigint", "int"),
+            ("total_value", "li.total_value::numeric(14,2)", "money"),
+            ("currency", "li.currency::text", "string"),
+            ("raw_payload", "li.raw_payload::text", "string"),
+        ],
+    },
+    "transactions": {
+        "from": "transactions",
+        "date": "transactions.sale_date",
+        "updated": "transactions.updated_at",
+        "user": "transactions.user_id",
+        "columns": [
+            ("transaction_id", "transaction_id", "string"),
+            ("user_id", "user_id", "string"),
+            ("order_id", "order_id", "string"),
+            ("line_item_id", "line_item_id", "string"),
+            ("sku", "sku", "string"),
+            ("buyer_username", "buyer_username", "string"),
+            ("sale_value", "sale_value", "money"),
+            ("currency", "currency::text", "string"),
+            ("sale_date", "sale_date", "timestamp"),
+            ("quantity", "quantity::bigint", "int"),
+            ("shipping_charged", "shipping_charged", "money"),
+            ("tax_collected", "tax_collected", "money"),
+            ("fulfillment_status", "fulfillment_status::text", "string"),
+            ("payment_status", "payment_status::text", "string"),
+            ("profit", "profit", "money"),
+            ("profit_status", "profit_status::text", "string"),
+            ("created_at", "created_at", "timestamp"),
+            ("updated_at", "updated_at", "timestamp"),
+        ],
+    },
+    "fees": {
+        "from": "fees",
+        "date": "fees.assessed_at",
+        "updated": "fees.updated_at",
+        "user": "fees.user_id",
+        "columns": [
+            ("id", "id::bigint", "int"),
+            ("user_id", "user_id", "string"),
+            ("source_type", "source_type", "string"),
+            ("source_id", "source_id", "string"),
+            ("fee_type", "fee_type", "string"),
+            ("amount", "amount", "money"),
+            ("currency", "currency::text", "string"),
+            ("assessed_at", "assessed_at", "timestamp"),
+            ("created_at", "created_at", "timestamp"),
+            ("updated_at", "updated_at", "timestamp"),
+        ],
+    },
+    "payouts": {
+        "from": "payouts",
+        "date": "payouts.payout_date",
+        "updated": "payouts.updated_at",
+        "user": "payouts.user_id",
+        "columns": [
+            ("payout_id", "payout_id", "string"),
+            ("user_id", "user_id", "string"),
+            ("total_amount", "total_amount", "money"),
+            ("currency", "currency::text", "string"),
+            ("status", "status::text", "string"),
+            ("payout_date", "payout_date", "timestamp"),
+            ("created_at", "created_at", "timestamp"),
+            ("updated_at", "updated_at", "timestamp"),
+        ],
+    },
+}
+
+
+def _arrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow")
+    return pyarrow, pyarrow.parquet
+
+
+def _schema(pa, dataset: Dict[str, Any]):
+    types = {
+        "string": pa.string(),
+        "int": pa.int64(),
+        "money": pa.decimal128(14, 2),
+        "timestamp": pa.timestamp("us", tz="UTC"),
+    }
+    return pa.schema([(name, types[kind]) for name, _, kind in dataset["columns"]])
+
+
+def _month_expr(dataset: Dict[str, Any]) -> str:
+    return f"COALESCE(to_char({dataset['date']} AT TIME ZONE 'UTC', 'YYYY-MM'), '{UNKNOWN_MONTH}')"
+
+
+def _user_filter(dataset: Dict[str, Any], user_id: Optional[str]) -> str:
+    return f" AND {dataset['user']} = :user_id" if user_id else ""
+
+
+def changed_months(conn: Connection, dataset: Dict[str, Any], user_id: Optional[str],
+                   since: Optional[datetime]) -> List[str]:
+    """Months holding rows updated after `since` (every month when since is None)"""
+    where = "TRUE" + _user_filter(dataset, user_id)
+    params: Dict[str, Any] = {"user_id": user_id}
+    if since is not None:
+        where += f" AND {dataset['updated']} > :since"
+        params["since"] = since
+    rows = conn.execute(text(f"""
+        SELECT DISTINCT {_month_expr(dataset)} AS month FROM {dataset['from']} WHERE {where}
+    """), params)
+    return sorted(row.month for row in rows)
+
+
+def _month_bounds(month: str) -> Tuple[datetime, datetime]:
+    start = datetime.strptime(month, "%Y-%m").replace(tzinfo=timezone.utc)
+    end = start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+    return start, end
+
+
+def _month_batches(conn: Connection, dataset: Dict[str, Any], month: str,
+                   user_id: Optional[str]) -> Iterator[List[Tuple]]:
+    """One month of a dataset in batches of EXPORT_BATCH_SIZE rows, from a server-side cursor"""
+    params: Dict[str, Any] = {"user_id": user_id}
+    if month == UNKNOWN_MONTH:
+        where = f"{dataset['date']} IS NULL"
+    else:
+        where = f"{dataset['date']} >= :start AND {dataset['date']} < :end"
+        params["start"], params["end"] = _month_bounds(month)
+
+    columns = ", ".join(f"{expr} AS {name}" for name, expr, _ in dataset["columns"])
+    result = conn.execute(text(f"""
+        SELECT {columns} FROM {dataset['from']}
+        WHERE {where}{_user_filter(dataset, user_id)}
+    """), params, execution_options={"yield_per": EXPORT_BATCH_SIZE})
+    for rows in result.partitions():
+        yield rows
+
+
+def write_month(conn: Connection, out_dir: str, name: str, month: str, user_id: Optional[str]) -> int:
+    """Rewrite one month partition of a dataset; returns the rows written"""
+    pa, pq = _arrow()
+    dataset = DATASETS[name]
+    schema = _schema(pa, dataset)
+
+    partition_dir = os.path.join(out_dir, name, f"month={month}")
+    os.makedirs(partition_dir, exist_ok=True)
+    path = os.path.join(partition_dir, "data.parquet")
+    tmp_path = path + ".tmp"
+
+    written = 0
+    with pq.ParquetWriter(tmp_path, schema, compression="zstd") as writer:
+        for rows in _month_batches(conn, dataset, month, user_id):
+            columns = list(zip(*rows))
+            writer.write_batch(pa.RecordBatch.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                schema=schema
+            ))
+            written += len(rows)
+
+    if written:
+        os.replace(tmp_path, path)
+    else:
+        # Every row of the month is gone or moved to another month
+        os.remove(tmp_path)
+        if os.path.exists(path):
+            os.remove(path)
+    return written
+
+
+def _load_state(out_dir: str) -> Dict[str, Any]:
+    path = os.path.join(out_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_state(out_dir: str, state: Dict[str, Any]):
+    path = os.path.join(out_dir, STATE_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def export_datasets(conn: Connection, out_dir: str, names: List[str], user_id: Optional[str] = None,
+                    full: bool = False) -> Dict[str, Dict[str, int]]:
+    """
+    Export the named datasets under out_dir. Incremental unless `full`, or unless the
+    previous run of the directory was for another user scope.
+    Returns {dataset: {month: rows written}}.
+    """
+    # ebay_orders.updated_at is a naive timestamp; pin the session to UTC so comparing
+    # it with the tz-aware watermark, and varchar dates without an offset, mean UTC
+    conn.execute(text("SET LOCAL TIME ZONE 'UTC'"))
+
+    state = _load_state(out_dir)
+    if state.get("user_id") != user_id:
+        state = {}
+    state["user_id"] = user_id
+    datasets_state = state.setdefault("datasets", {})
+
+    summary = {}
+    for name in names:
+        dataset = DATASETS[name]
+        previous = datasets_state.get(name, {}).get("watermark")
+        since = None if full or previous is None else datetime.fromisoformat(previous)
+
+        # Taken before reading so rows changed during the run are picked up next time
+        watermark = conn.execute(
+            text(f"SELECT max({dataset['updated']}) FROM {dataset['from']} WHERE TRUE{_user_filter(dataset, user_id)}"),
+            {"user_id": user_id}
+        ).scalar()
+
+        summary[name] = {}
+        for month in changed_months(conn, dataset, user_id, since):
+            summary[name][month] = write_month(conn, out_dir, name, month, user_id)
+
+        if watermark is not None:
+            if isinstance(watermark, datetime) and watermark.tzinfo is None:
+                watermark = watermark.replace(tzinfo=timezone.utc)
+            datasets_state[name] = {"watermark": watermark.isoformat(), "exported_at": datetime.utcnow().isoformat()}
+        _save_state(out_dir, state)
+
+        rows = sum(summary[name].values())
+        logger.info(f"Parquet export {name}: {len(summary[name])} months rewritten, {rows} rows")
+
+    return summary
+
+
+def main():
+    from app.models_sqlalchemy import engine
+
+    parser = argparse.ArgumentParser(description="Export orders and financials to month-partitioned Parquet")
+    parser.add_argument("--out", required=True, help="output directory")
+    parser.add_argument("--user-id", help="only export this user's rows")
+    parser.add_argument("--datasets", nargs="+", choices=list(DATASETS), default=list(DATASETS))
+    parser.add_argument("--full", action="store_true", help="rewrite every month instead of the changed ones "
+                             "(also drops rows left behind in a month they moved out of)")
+    args = parser.parse_args()
+
+    _arrow()
+    os.makedirs(args.out, exist_ok=True)
+    with engine.connect().execution_options(isolation_level="REPEATABLE READ") as conn:
+        with conn.begin():
+            summary = export_datasets(conn, args.out, args.datasets, args.user_id, args.full)
+
+    for name, months in summary.items():
+        print(f"{name:<18} {len(months):>4} months {sum(months.values()):>10,} rows")
+
+
+if __name__ == "__main__":
+    main()
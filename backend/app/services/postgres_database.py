@@ -1,10 +1,13 @@
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 import uuid
+from sqlalchemy import text
 from sqlalchemy.orm import Session
+from app.config import settings
 from app.models.user import User as UserModel, UserCreate, UserRole
 from app.models_sqlalchemy.models import User as UserDB, EbayConnectLog
 from app.models_sqlalchemy import get_db
+from app.services.principal_cache import PRINCIPAL_INVALIDATE_CHANNEL, principal_cache
 from app.utils.logger import logger
 
 
@@ -91,7 +94,12 @@ class PostgresDatabase:
                     setattr(db_user, key, value)
             
             db_user.updated_at = datetime.utcnow()
+            if settings.PRINCIPAL_CACHE_NOTIFY:
+                # Delivered to the other replicas' listeners on commit
+                db.execute(text("SELECT pg_notify(:channel, :user_id)"),
+                           {"channel": PRINCIPAL_INVALIDATE_CHANNEL, "user_id": user_id})
             db.commit()
+            principal_cache.invalidate(user_id)
             db.refresh(db_user)
             
             user = self._db_to_model(db_user)
@@ -1,23 +1,155 @@
-from typing import Dict, Optional, List, Any, Tuple
+from typing import Dict, Optional, List, Any, Tuple, Iterator
 from datetime import datetime
 from decimal import Decimal
 import json
 from functools import reduce
+import uuid
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
-from app.models_sqlalchemy import get_db
+from app.models_sqlalchemy import get_db, AsyncSessionLocal
 from app.utils.logger import logger
+from app.utils.pagination import keyset_sql
+from app.utils.profiling import sync_phase
+from app.utils.tracing import span
+from app.services.rollups import ORDER_ROLLUP_SNAPSHOT_SQL, order_rollup_deltas
 
 
 class PostgresEbayDatabase:
     """
-    Postgres-based database for storing eBay data using raw SQL for flexibility
+    Postgres-based database for storing eBay data using raw SQL for flexibility.
+
+    Batch writers come in two flavours sharing the same SQL: the plain methods use
+    the sync engine, the ``*_async`` methods use the async engine and are what the
+    sync loops running on the event loop should call.
     """
-    
+
+    # Keep each statement well under the 65535 bind parameter limit of the protocol
+    MAX_BIND_PARAMS = 30000
+
+    # Order columns the API returns; the payload is projected separately by _order_select_list
+    ORDER_READ_COLUMNS = """order_id, user_id, creation_date, last_modified_date,
+                    order_payment_status, order_fulfillment_status,
+                    buyer_username, buyer_email, total_amount, total_currency,
+                    order_total_value, order_total_currency, line_items_count, tracking_number,
+                    ship_to_name, ship_to_city, ship_to_state, ship_to_postal_code, ship_to_country_code,
+                    created_at, updated_at"""
+
+    # Only flip between AVAILABLE/LISTED on sync; SOLD, FROZEN, REPAIR etc. are set by hand
+    INVENTORY_STATUS_UPDATE = """CASE
+                        WHEN inventory.status IS NULL OR inventory.status IN ('AVAILABLE', 'LISTED')
+                        THEN EXCLUDED.status
+                        ELSE inventory.status
+                    END"""
+
+    UPSERT_SPECS = {
+        'orders': {
+            'table': 'ebay_orders',
+            'columns': ['order_id', 'user_id', 'creation_date', 'last_modified_date',
+                        'order_payment_status', 'order_fulfillment_status',
+                        'buyer_username', 'buyer_email', 'buyer_registered',
+                        'total_amount', 'total_currency',
+                        'order_total_value', 'order_total_currency', 'line_items_count',
+                        'tracking_number', 'ship_to_name', 'ship_to_city', 'ship_to_state',
+                        'ship_to_postal_code', 'ship_to_country_code',
+                        'raw_payload', 'created_at', 'updated_at'],
+            'conflict_columns': ['order_id', 'user_id'],
+            'update_columns': ['last_modified_date', 'order_payment_status', 'order_fulfillment_status',
+                               'buyer_username', 'buyer_email', 'buyer_registered',
+                               'total_amount', 'total_currency',
+                               'order_total_value', 'order_total_currency', 'line_items_count',
+                               'tracking_number', 'ship_to_name', 'ship_to_city', 'ship_to_state',
+                               'ship_to_postal_code', 'ship_to_country_code',
+                               'raw_payload', 'updated_at'],
+            'key_column': 'order_id',
+        },
+        'line_items': {
+            'table': 'order_line_items',
+            'columns': ['order_id', 'line_item_id', 'sku', 'title', 'quantity',
+                        'total_value', 'currency', 'raw_payload'],
+            'conflict_columns': ['order_id', 'line_item_id'],
+            'update_columns': ['sku', 'title', 'quantity', 'total_value', 'currency', 'raw_payload'],
+            'key_column': 'line_item_id',
+        },
+        'transactions': {
+            'table': 'ebay_transactions',
+            'columns': ['transaction_id', 'user_id', 'order_id', 'transaction_date',
+                        'transaction_type', 'transaction_status', 'amount', 'currency',
+                        'transaction_data', 'created_at', 'updated_at'],
+            'conflict_columns': ['transaction_id', 'user_id'],
+            'update_columns': ['order_id', 'transaction_date', 'transaction_type', 'transaction_status',
+                               'amount', 'currency', 'transaction_data', 'updated_at'],
+            'key_column': 'transaction_id',
+        },
+        'disputes': {
+            'table': 'ebay_disputes',
+            'columns': ['dispute_id', 'user_id', 'order_id', 'dispute_reason',
+                        'dispute_status', 'open_date', 'respond_by_date', 'buyer_username',
+                        'amount_value', 'amount_currency', 'raw_payload',
+                        'created_at', 'updated_at'],
+            'conflict_columns': ['dispute_id', 'user_id'],
+            'update_columns': ['order_id', 'dispute_reason', 'dispute_status', 'open_date',
+                               'respond_by_date', 'buyer_username', 'amount_value',
+                               'amount_currency', 'raw_payload', 'updated_at'],
+            'key_column': 'dispute_id',
+        },
+        'offers': {
+            'table': 'ebay_offers',
+            'columns': ['offer_id', 'user_id', 'listing_id', 'buyer_username',
+                        'offer_amount', 'offer_currency', 'offer_status',
+                        'offer_date', 'expiration_date', 'offer_data',
+                        'created_at', 'updated_at'],
+            'conflict_columns': ['offer_id', 'user_id'],
+            'update_columns': ['listing_id', 'buyer_username', 'offer_amount', 'offer_currency',
+                               'offer_status', 'offer_date', 'expiration_date', 'offer_data', 'updated_at'],
+            'key_column': 'offer_id',
+        },
+        'messages': {
+            'table': 'ebay_messages',
+            'columns': ['id', 'user_id', 'message_id', 'thread_id', 'sender_username',
+                        'recipient_username', 'subject', 'body', 'message_type',
+                        'is_read', 'is_flagged', 'is_archived', 'direction',
+                        'message_date', 'listing_id', 'raw_data', 'created_at', 'updated_at'],
+            'conflict_columns': ['user_id', 'message_id'],
+            # Existing messages only get their read/flag/archive state refreshed
+            'update_columns': ['is_read', 'is_flagged', 'is_archived', 'updated_at'],
+            'key_column': 'message_id',
+        },
+        'inventory': {
+            'table': 'inventory',
+            'columns': ['sku_code', 'title', 'condition', 'part_number', 'model', 'category',
+                        'price_value', 'price_currency', 'quantity', 'ebay_listing_id', 'ebay_status',
+                        'status', 'photo_count', 'raw_payload', 'rec_created', 'rec_updated'],
+            'conflict_columns': ['sku_code'],
+            'update_columns': ['title', 'condition', 'part_number', 'model', 'category',
+                               'price_value', 'price_currency', 'quantity', 'ebay_listing_id', 'ebay_status',
+                               'status', 'photo_count', 'raw_payload', 'rec_updated'],
+            'update_overrides': {'status': INVENTORY_STATUS_UPDATE},
+            'key_column': 'sku_code',
+        },
+        # Deltas from order writes; see app.services.rollups
+        'order_rollups': {
+            'table': 'daily_order_rollups',
+            'columns': ['user_id', 'day', 'currency', 'payment_status', 'fulfillment_status',
+                        'order_count', 'gross_sales', 'updated_at'],
+            'conflict_columns': ['user_id', 'day', 'currency', 'payment_status', 'fulfillment_status'],
+            'update_columns': ['order_count', 'gross_sales', 'updated_at'],
+            'update_overrides': {
+                'order_count': 'daily_order_rollups.order_count + EXCLUDED.order_count',
+                'gross_sales': 'daily_order_rollups.gross_sales + EXCLUDED.gross_sales',
+            },
+            'key_column': 'day',
+        },
+    }
+
     def _get_session(self) -> Session:
         """Get a database session"""
         return next(get_db())
-    
+
+    def _get_async_session(self) -> AsyncSession:
+        """Get an async database session (use with `async with`)"""
+        return AsyncSessionLocal()
+
     def _safe_get(self, data: Dict, *keys):
         """Safely get nested dict/list values"""
         def accessor(obj, key):
@@ -103,7 +235,6 @@ class PostgresEbayDatabase:
             'ship_to_state': contact_addr.get('stateOrProvince'),
             'ship_to_postal_code': contact_addr.get('postalCode'),
             'ship_to_country_code': contact_addr.get('countryCode'),
-            'order_data': json.dumps(order_data),
             'raw_payload': json.dumps(order_data)
         }
         
@@ -156,11 +287,11 @@ class PostgresEbayDatabase:
                 (order_id, user_id, creation_date, last_modified_date, 
                  order_payment_status, order_fulfillment_status, 
                  buyer_username, buyer_email, total_amount, total_currency,
-                 order_data, created_at, updated_at)
+                 raw_payload, created_at, updated_at)
                 VALUES (:order_id, :user_id, :creation_date, :last_modified,
                         :payment_status, :fulfillment_status,
                         :buyer_username, :buyer_email, :total_amount, :total_currency,
-                        :order_data, :created_at, :updated_at)
+                        :raw_payload, :created_at, :updated_at)
                 ON CONFLICT (order_id, user_id) 
                 DO UPDATE SET
                     last_modified_date = EXCLUDED.last_modified_date,
@@ -170,10 +301,19 @@ class PostgresEbayDatabase:
                     buyer_email = EXCLUDED.buyer_email,
                     total_amount = EXCLUDED.total_amount,
                     total_currency = EXCLUDED.total_currency,
-                    order_data = EXCLUDED.order_data,
+                    raw_payload = EXCLUDED.raw_payload,
                     updated_at = EXCLUDED.updated_at
             """)
             
+            row = {
+                'order_id': order_id,
+                'creation_date': creation_date,
+                'total_amount': total_amount,
+                'total_currency': total_currency,
+                'order_payment_status': payment_status,
+                'order_fulfillment_status': fulfillment_status,
+            }
+            before = self._order_snapshot(session, user_id, [row])
             session.execute(query, {
                 'order_id': order_id,
                 'user_id': user_id,
@@ -185,10 +325,11 @@ class PostgresEbayDatabase:
                 'buyer_email': buyer_email,
                 'total_amount': total_amount,
                 'total_currency': total_currency,
-                'order_data': json.dumps(order_data),
+                'raw_payload': json.dumps(order_data),
                 'created_at': now,
                 'updated_at': now
             })
+            self._apply_order_rollups(session, user_id, before, [row], [])
             
             session.commit()
             return True
@@ -200,13 +341,17 @@ class PostgresEbayDatabase:
         finally:
             session.close()
     
-    def get_orders(self, user_id: str, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
-        """Get orders for a user"""
+    def get_orders(self, user_id: str, limit: int = 100, offset: int = 0,
+                   include_payload: bool = False) -> List[Dict[str, Any]]:
+        """
+        Get orders for a user.
+        order_data only carries lineItems unless include_payload asks for the full eBay payload.
+        """
         session = self._get_session()
         
         try:
-            query = text("""
-                SELECT * FROM ebay_orders 
+            query = text(f"""
+                SELECT {self._order_select_list(include_payload)} FROM ebay_orders
                 WHERE user_id = :user_id 
                 ORDER BY creation_date DESC 
                 LIMIT :limit OFFSET :offset
@@ -218,18 +363,31 @@ class PostgresEbayDatabase:
                 'offset': offset
             })
             
-            orders = []
-            for row in result:
-                order = dict(row._mapping)
-                if order.get('order_data'):
-                    order['order_data'] = json.loads(order['order_data'])
-                orders.append(order)
-            
-            return orders
+            return [self._order_row_to_dict(row) for row in result]
             
         finally:
             session.close()
     
+    def iter_orders(self, user_id: str, include_payload: bool = False,
+                    batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """
+        All orders of a user, newest first, read through a server-side cursor.
+        Only one batch of rows is held in memory, however many orders there are.
+        """
+        session = self._get_session()
+        
+        try:
+            query = text(f"""
+                SELECT {self._order_select_list(include_payload)} FROM ebay_orders
+                WHERE user_id = :user_id
+                ORDER BY creation_date DESC, order_id DESC
+            """)
+            result = session.execute(query, {'user_id': user_id}, execution_options={'yield_per': batch_size})
+            for row in result:
+                yield self._order_row_to_dict(row)
+        finally:
+            session.close()
+    
     def get_order_count(self, user_id: str) -> int:
         """Get total order count for a user"""
         session = self._get_session()
@@ -243,166 +401,327 @@ class PostgresEbayDatabase:
         finally:
             session.close()
     
-    def batch_upsert_orders(self, user_id: str, orders: List[Dict[str, Any]]) -> int:
-        """Batch insert or update multiple orders with normalization"""
-        if not orders:
-            return 0
-        
+    async def get_orders_async(self, user_id: str, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
+        """Get orders for a user (async engine)"""
+        async with self._get_async_session() as session:
+            result = await session.execute(text(f"""
+                SELECT {self._order_select_list()} FROM ebay_orders
+                WHERE user_id = :user_id
+                ORDER BY creation_date DESC
+                LIMIT :limit OFFSET :offset
+            """), {
+                'user_id': user_id,
+                'limit': limit,
+                'offset': offset
+            })
+            return [self._order_row_to_dict(row) for row in result]
+
+    async def get_order_count_async(self, user_id: str) -> int:
+        """Get total order count for a user (async engine)"""
+        async with self._get_async_session() as session:
+            result = await session.execute(
+                text("SELECT COUNT(*) as count FROM ebay_orders WHERE user_id = :user_id"),
+                {'user_id': user_id}
+            )
+            return result.scalar() or 0
+
+    def _order_select_list(self, include_payload: bool = False) -> str:
+        """Columns returned by the order read endpoints; order_data comes back as JSONB, already decoded"""
+        payload = "COALESCE(raw_payload, order_data::jsonb)"
+        if include_payload:
+            order_data = f"{payload} AS order_data"
+        else:
+            order_data = f"jsonb_build_object('lineItems', {payload}->'lineItems') AS order_data"
+        return f"{self.ORDER_READ_COLUMNS}, {order_data}"
+
+    def _order_row_to_dict(self, row) -> Dict[str, Any]:
+        """Convert an ebay_orders row to a dict"""
+        return dict(row._mapping)
+
+    def _build_batch_upsert(self, spec: Dict[str, Any], batch: List[Dict[str, Any]]):
+        """Build a multi-row INSERT ... ON CONFLICT DO UPDATE statement for a spec"""
+        columns = spec['columns']
+        update_overrides = spec.get('update_overrides') or {}
+
+        params = {}
+        value_placeholders = []
+        for idx, values in enumerate(batch):
+            placeholders = []
+            for key in columns:
+                param_name = f"{key}_{idx}"
+                params[param_name] = values.get(key)
+                placeholders.append(f":{param_name}")
+            value_placeholders.append(f"({','.join(placeholders)})")
+
+        update_clause = ",\n                    ".join(
+            f"{c} = {update_overrides.get(c, f'EXCLUDED.{c}')}" for c in spec['update_columns']
+        )
+        query = text(f"""
+            INSERT INTO {spec['table']}
+            ({', '.join(columns)})
+            VALUES {','.join(value_placeholders)}
+            ON CONFLICT ({', '.join(spec['conflict_columns'])})
+            DO UPDATE SET
+                {update_clause}
+        """)
+        return query, params
+
+    def _chunk_rows(self, spec: Dict[str, Any], rows: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """Dedupe rows on the conflict key and split them into statement-sized chunks"""
+        # ON CONFLICT DO UPDATE cannot touch the same row twice in one statement
+        deduped: Dict[Tuple, Dict[str, Any]] = {}
+        for row in rows:
+            deduped[tuple(row.get(c) for c in spec['conflict_columns'])] = row
+        rows = list(deduped.values())
+
+        chunk_size = max(1, self.MAX_BIND_PARAMS // len(spec['columns']))
+        return [rows[i:i + chunk_size] for i in range(0, len(rows), chunk_size)]
+
+    def _execute_batch_upsert(self, session: Session, spec: Dict[str, Any],
+                              rows: List[Dict[str, Any]]) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Write rows with multi-row INSERT ... ON CONFLICT DO UPDATE statements.
+
+        Each statement runs inside a SAVEPOINT. If Postgres rejects it as a whole,
+        its rows are retried in their own SAVEPOINTs so that only the bad rows are
+        reported and the rest of the page is still stored.
+        Returns: (stored_count, rejects)
+        """
+        stored_count = 0
+        rejects = []
+
+        for chunk in self._chunk_rows(spec, rows):
+            try:
+                with session.begin_nested():
+                    query, params = self._build_batch_upsert(spec, chunk)
+                    session.execute(query, params)
+                stored_count += len(chunk)
+                continue
+            except Exception as e:
+                logger.warning(f"Batch upsert into {spec['table']} failed ({str(e)}), retrying {len(chunk)} rows individually")
+
+            for row in chunk:
+                try:
+                    with session.begin_nested():
+                        query, params = self._build_batch_upsert(spec, [row])
+                        session.execute(query, params)
+                    stored_count += 1
+                except Exception as e:
+                    rejects.append({'id': row.get(spec['key_column']), 'reason': str(e)})
+
+        return stored_count, rejects
+
+    async def _execute_batch_upsert_async(self, session: AsyncSession, spec: Dict[str, Any],
+                                          rows: List[Dict[str, Any]]) -> Tuple[int, List[Dict[str, Any]]]:
+        """Async counterpart of _execute_batch_upsert"""
+        stored_count = 0
+        rejects = []
+
+        for chunk in self._chunk_rows(spec, rows):
+            try:
+                async with session.begin_nested():
+                    query, params = self._build_batch_upsert(spec, chunk)
+                    await session.execute(query, params)
+                stored_count += len(chunk)
+                continue
+            except Exception as e:
+                logger.warning(f"Batch upsert into {spec['table']} failed ({str(e)}), retrying {len(chunk)} rows individually")
+
+            for row in chunk:
+                try:
+                    async with session.begin_nested():
+                        query, params = self._build_batch_upsert(spec, [row])
+                        await session.execute(query, params)
+                    stored_count += 1
+                except Exception as e:
+                    rejects.append({'id': row.get(spec['key_column']), 'reason': str(e)})
+
+        return stored_count, rejects
+
+    def _store_rows(self, user_id: str, writes: List[Tuple[str, List[Dict[str, Any]]]],
+                    rejects: List[Dict[str, Any]]) -> Tuple[Dict[str, int], List[Dict[str, Any]]]:
+        """
+        Run the batch upserts for (spec_name, rows) pairs in one transaction.
+        Returns: ({spec_name: stored_count}, rejects)
+        """
+        stored = {name: 0 for name, _ in writes}
+        if not any(rows for _, rows in writes):
+            return stored, rejects
+
         session = self._get_session()
-        
+
         try:
-            now = datetime.utcnow()
-            stored_count = 0
-            all_line_items = []
-            
-            batch_size = 100
-            for i in range(0, len(orders), batch_size):
-                batch = orders[i:i + batch_size]
-                
-                values_list = []
-                for order_data in batch:
-                    if not order_data.get('orderId'):
-                        logger.warning("Skipping order without orderId")
-                        continue
-                    
-                    try:
-                        normalized_order, line_items = self.normalize_order(order_data)
-                        all_line_items.extend(line_items)
-                        
-                        normalized_order['user_id'] = user_id
-                        normalized_order['created_at'] = now
-                        normalized_order['updated_at'] = now
-                        
-                        values_list.append(normalized_order)
-                    except Exception as e:
-                        logger.error(f"Error normalizing order {order_data.get('orderId')}: {str(e)}")
-                        continue
-                
-                if not values_list:
-                    continue
-                
-                params = {}
-                value_placeholders = []
-                
-                for idx, values in enumerate(values_list):
-                    placeholders = []
-                    for key in ['order_id', 'user_id', 'creation_date', 'last_modified',
-                               'payment_status', 'fulfillment_status', 'buyer_username', 'buyer_email',
-                               'buyer_registered', 'total_amount', 'total_currency',
-                               'order_total_value', 'order_total_currency', 'line_items_count',
-                               'tracking_number', 'ship_to_name', 'ship_to_city', 'ship_to_state',
-                               'ship_to_postal_code', 'ship_to_country_code',
-                               'order_data', 'raw_payload', 'created_at', 'updated_at']:
-                        param_name = f"{key}_{idx}"
-                        params[param_name] = values.get(key)
-                        placeholders.append(f":{param_name}")
-                    value_placeholders.append(f"({','.join(placeholders)})")
-                
-                query = text(f"""
-                    INSERT INTO ebay_orders 
-                    (order_id, user_id, creation_date, last_modified_date, 
-                     order_payment_status, order_fulfillment_status, 
-                     buyer_username, buyer_email, buyer_registered,
-                     total_amount, total_currency,
-                     order_total_value, order_total_currency, line_items_count,
-                     tracking_number, ship_to_name, ship_to_city, ship_to_state,
-                     ship_to_postal_code, ship_to_country_code,
-                     order_data, raw_payload, created_at, updated_at)
-                    VALUES {','.join(value_placeholders)}
-                    ON CONFLICT (order_id, user_id) 
-                    DO UPDATE SET
-                        last_modified_date = EXCLUDED.last_modified_date,
-                        order_payment_status = EXCLUDED.order_payment_status,
-                        order_fulfillment_status = EXCLUDED.order_fulfillment_status,
-                        buyer_username = EXCLUDED.buyer_username,
-                        buyer_email = EXCLUDED.buyer_email,
-                        buyer_registered = EXCLUDED.buyer_registered,
-                        total_amount = EXCLUDED.total_amount,
-                        total_currency = EXCLUDED.total_currency,
-                        order_total_value = EXCLUDED.order_total_value,
-                        order_total_currency = EXCLUDED.order_total_currency,
-                        line_items_count = EXCLUDED.line_items_count,
-                        tracking_number = EXCLUDED.tracking_number,
-                        ship_to_name = EXCLUDED.ship_to_name,
-                        ship_to_city = EXCLUDED.ship_to_city,
-                        ship_to_state = EXCLUDED.ship_to_state,
-                        ship_to_postal_code = EXCLUDED.ship_to_postal_code,
-                        ship_to_country_code = EXCLUDED.ship_to_country_code,
-                        order_data = EXCLUDED.order_data,
-                        raw_payload = EXCLUDED.raw_payload,
-                        updated_at = EXCLUDED.updated_at
-                """)
-                
-                session.execute(query, params)
-                stored_count += len(values_list)
-            
-            if all_line_items:
-                self.batch_upsert_line_items(session, all_line_items)
-            
+            for name, rows in writes:
+                if rows:
+                    before = self._order_snapshot(session, user_id, rows) if name == 'orders' else None
+                    stored[name], db_rejects = self._execute_batch_upsert(session, self.UPSERT_SPECS[name], rows)
+                    rejects.extend(db_rejects)
+                    if name == 'orders':
+                        self._apply_order_rollups(session, user_id, before, rows, db_rejects)
             session.commit()
-            logger.info(f"Batch upserted {stored_count} orders and {len(all_line_items)} line items for user {user_id}")
-            return stored_count
-            
+            self._log_stored(user_id, stored, rejects)
+            return stored, rejects
+
         except Exception as e:
-            logger.error(f"Error in batch upsert orders: {str(e)}")
+            logger.error(f"Error in batch upsert {', '.join(stored)}: {str(e)}")
             session.rollback()
-            return 0
+            return self._failed_writes(writes, rejects, e)
         finally:
             session.close()
-    
+
+    async def _store_rows_async(self, user_id: str, writes: List[Tuple[str, List[Dict[str, Any]]]],
+                                rejects: List[Dict[str, Any]]) -> Tuple[Dict[str, int], List[Dict[str, Any]]]:
+        """Async counterpart of _store_rows"""
+        stored = {name: 0 for name, _ in writes}
+        if not any(rows for _, rows in writes):
+            return stored, rejects
+
+        with sync_phase("db"), span("sync.store", tables=",".join(name for name, rows in writes if rows),
+                                    records=sum(len(rows) for _, rows in writes)):
+            return await self._write_rows_async(user_id, writes, rejects, stored)
+
+    async def _write_rows_async(self, user_id: str, writes: List[Tuple[str, List[Dict[str, Any]]]],
+                                rejects: List[Dict[str, Any]],
+                                stored: Dict[str, int]) -> Tuple[Dict[str, int], List[Dict[str, Any]]]:
+        async with self._get_async_session() as session:
+            try:
+                for name, rows in writes:
+                    if rows:
+                        before = await self._order_snapshot_async(session, user_id, rows) if name == 'orders' else None
+                        stored[name], db_rejects = await self._execute_batch_upsert_async(
+                            session, self.UPSERT_SPECS[name], rows
+                        )
+                        rejects.extend(db_rejects)
+                        if name == 'orders':
+                            await self._apply_order_rollups_async(session, user_id, before, rows, db_rejects)
+                await session.commit()
+                self._log_stored(user_id, stored, rejects)
+                return stored, rejects
+
+            except Exception as e:
+                logger.error(f"Error in batch upsert {', '.join(stored)}: {str(e)}")
+                await session.rollback()
+                return self._failed_writes(writes, rejects, e)
+
+    def _order_snapshot(self, session: Session, user_id: str,
+                        rows: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Stored versions of the orders about to be upserted, keyed by order_id"""
+        result = session.execute(text(ORDER_ROLLUP_SNAPSHOT_SQL), {
+            'user_id': user_id, 'order_ids': [r['order_id'] for r in rows]
+        })
+        return {row.order_id: dict(row._mapping) for row in result}
+
+    async def _order_snapshot_async(self, session: AsyncSession, user_id: str,
+                                    rows: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Async counterpart of _order_snapshot"""
+        result = await session.execute(text(ORDER_ROLLUP_SNAPSHOT_SQL), {
+            'user_id': user_id, 'order_ids': [r['order_id'] for r in rows]
+        })
+        return {row.order_id: dict(row._mapping) for row in result}
+
+    def _order_rollup_rows(self, user_id: str, before: Dict[str, Dict[str, Any]], rows: List[Dict[str, Any]],
+                           db_rejects: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """daily_order_rollups deltas for the order rows that were actually written"""
+        rejected = {r['id'] for r in db_rejects}
+        return order_rollup_deltas(user_id, before, [r for r in rows if r['order_id'] not in rejected])
+
+    def _apply_order_rollups(self, session: Session, user_id: str, before: Dict[str, Dict[str, Any]],
+                             rows: List[Dict[str, Any]], db_rejects: List[Dict[str, Any]]):
+        """
+        Add the deltas of an order write to daily_order_rollups.
+        No per-row fallback here: a failed delta must roll back the whole write.
+        """
+        spec = self.UPSERT_SPECS['order_rollups']
+        for chunk in self._chunk_rows(spec, self._order_rollup_rows(user_id, before, rows, db_rejects)):
+            query, params = self._build_batch_upsert(spec, chunk)
+            session.execute(query, params)
+
+    async def _apply_order_rollups_async(self, session: AsyncSession, user_id: str,
+                                         before: Dict[str, Dict[str, Any]], rows: List[Dict[str, Any]],
+                                         db_rejects: List[Dict[str, Any]]):
+        """Async counterpart of _apply_order_rollups"""
+        spec = self.UPSERT_SPECS['order_rollups']
+        for chunk in self._chunk_rows(spec, self._order_rollup_rows(user_id, before, rows, db_rejects)):
+            query, params = self._build_batch_upsert(spec, chunk)
+            await session.execute(query, params)
+
+    def _log_stored(self, user_id: str, stored: Dict[str, int], rejects: List[Dict[str, Any]]):
+        """Log the outcome of a batch write"""
+        summary = ", ".join(f"{count} {name}" for name, count in stored.items())
+        if rejects:
+            logger.warning(f"Batch upsert: {len(rejects)} rejected for user {user_id}")
+        logger.info(f"Batch upserted {summary} for user {user_id}")
+
+    def _failed_writes(self, writes: List[Tuple[str, List[Dict[str, Any]]]], rejects: List[Dict[str, Any]],
+                       error: Exception) -> Tuple[Dict[str, int], List[Dict[str, Any]]]:
+        """Report every row of a rolled back batch write as rejected"""
+        for name, rows in writes:
+            key_column = self.UPSERT_SPECS[name]['key_column']
+            rejects.extend({'id': r.get(key_column), 'reason': str(error)} for r in rows)
+        return {name: 0 for name, _ in writes}, rejects
+
+    def _order_rows(self, user_id: str, orders: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Normalize a page of orders into (order_rows, line_item_rows, rejects)"""
+        now = datetime.utcnow()
+        order_rows = []
+        line_item_rows = []
+        rejects = []
+
+        for order_data in orders:
+            if not order_data.get('orderId'):
+                logger.warning("Skipping order without orderId")
+                rejects.append({'id': None, 'reason': 'missing orderId'})
+                continue
+
+            try:
+                normalized_order, line_items = self.normalize_order(order_data)
+            except Exception as e:
+                logger.error(f"Error normalizing order {order_data.get('orderId')}: {str(e)}")
+                rejects.append({'id': order_data.get('orderId'), 'reason': str(e)})
+                continue
+
+            normalized_order['last_modified_date'] = normalized_order.pop('last_modified')
+            normalized_order['order_payment_status'] = normalized_order.pop('payment_status')
+            normalized_order['order_fulfillment_status'] = normalized_order.pop('fulfillment_status')
+            normalized_order['user_id'] = user_id
+            normalized_order['created_at'] = now
+            normalized_order['updated_at'] = now
+
+            order_rows.append(normalized_order)
+            line_item_rows.extend(li for li in line_items if li.get('order_id') and li.get('line_item_id'))
+
+        return order_rows, line_item_rows, rejects
+
+    def batch_upsert_orders(self, user_id: str, orders: List[Dict[str, Any]]) -> int:
+        """Batch insert or update multiple orders with normalization"""
+        if not orders:
+            return 0
+
+        order_rows, line_item_rows, rejects = self._order_rows(user_id, orders)
+        stored, _ = self._store_rows(user_id, [('orders', order_rows), ('line_items', line_item_rows)], rejects)
+        return stored['orders']
+
+    async def batch_upsert_orders_async(self, user_id: str, orders: List[Dict[str, Any]]) -> int:
+        """Batch insert or update multiple orders with normalization (async engine)"""
+        if not orders:
+            return 0
+
+        with sync_phase("normalize"), span("sync.normalize", resource='orders', records=len(orders)):
+            order_rows, line_item_rows, rejects = self._order_rows(user_id, orders)
+        stored, _ = await self._store_rows_async(user_id, [('orders', order_rows), ('line_items', line_item_rows)], rejects)
+        return stored['orders']
+
     def batch_upsert_line_items(self, session: Session, line_items: List[Dict[str, Any]]) -> int:
         """Batch upsert line items"""
-        if not line_items:
+        rows = [li for li in line_items if li.get('order_id') and li.get('line_item_id')]
+        if not rows:
             return 0
-        
-        try:
-            batch_size = 100
-            stored_count = 0
-            
-            for i in range(0, len(line_items), batch_size):
-                batch = line_items[i:i + batch_size]
-                
-                params = {}
-                value_placeholders = []
-                
-                for idx, item in enumerate(batch):
-                    if not item.get('order_id') or not item.get('line_item_id'):
-                        continue
-                    
-                    placeholders = []
-                    for key in ['order_id', 'line_item_id', 'sku', 'title', 'quantity', 
-                               'total_value', 'currency', 'raw_payload']:
-                        param_name = f"{key}_{idx}"
-                        params[param_name] = item.get(key)
-                        placeholders.append(f":{param_name}")
-                    value_placeholders.append(f"({','.join(placeholders)})")
-                
-                if not value_placeholders:
-                    continue
-                
-                query = text(f"""
-                    INSERT INTO order_line_items 
-                    (order_id, line_item_id, sku, title, quantity, total_value, currency, raw_payload)
-                    VALUES {','.join(value_placeholders)}
-                    ON CONFLICT (order_id, line_item_id) 
-                    DO UPDATE SET
-                        sku = EXCLUDED.sku,
-                        title = EXCLUDED.title,
-                        quantity = EXCLUDED.quantity,
-                        total_value = EXCLUDED.total_value,
-                        currency = EXCLUDED.currency,
-                        raw_payload = EXCLUDED.raw_payload
-                """)
-                
-                session.execute(query, params)
-                stored_count += len(value_placeholders)
-            
-            return stored_count
-            
-        except Exception as e:
-            logger.error(f"Error in batch upsert line items: {str(e)}")
-            raise
-    
+
+        stored_count, rejects = self._execute_batch_upsert(session, self.UPSERT_SPECS['line_items'], rows)
+        if rejects:
+            logger.error(f"Error in batch upsert line items: {rejects[0]['reason']}")
+        return stored_count
+
     def create_sync_job(self, user_id: str, sync_type: str) -> int:
         """Create a new sync job"""
         session = self._get_session()
@@ -435,7 +754,8 @@ class PostgresEbayDatabase:
             session.close()
     
     def update_sync_job(self, job_id: int, status: str, records_fetched: int = 0, 
-                        records_stored: int = 0, error_message: str = None):
+                        records_stored: int = 0, error_message: str = None,
+                        phase_timings: Optional[Dict[str, int]] = None):
         """Update sync job status"""
         session = self._get_session()
         
@@ -448,7 +768,8 @@ class PostgresEbayDatabase:
                     records_fetched = :records_fetched, 
                     records_stored = :records_stored, 
                     completed_at = :completed_at, 
-                    error_message = :error_message
+                    error_message = :error_message,
+                    phase_timings = COALESCE(CAST(:phase_timings AS JSONB), phase_timings)
                 WHERE id = :job_id
             """)
             
@@ -458,6 +779,7 @@ class PostgresEbayDatabase:
                 'records_stored': records_stored,
                 'completed_at': now,
                 'error_message': error_message,
+                'phase_timings': json.dumps(phase_timings) if phase_timings else None,
                 'job_id': job_id
             })
             
@@ -469,6 +791,59 @@ class PostgresEbayDatabase:
         finally:
             session.close()
     
+    async def create_sync_job_async(self, user_id: str, sync_type: str) -> int:
+        """Create a new sync job (async engine)"""
+        async with self._get_async_session() as session:
+            try:
+                result = await session.execute(text("""
+                    INSERT INTO ebay_sync_jobs (user_id, sync_type, status, started_at)
+                    VALUES (:user_id, :sync_type, :status, :started_at)
+                    RETURNING id
+                """), {
+                    'user_id': user_id,
+                    'sync_type': sync_type,
+                    'status': 'running',
+                    'started_at': datetime.utcnow()
+                })
+                job_id = result.scalar()
+                await session.commit()
+                return job_id
+
+            except Exception as e:
+                logger.error(f"Error creating sync job: {str(e)}")
+                await session.rollback()
+                return 0
+
+    async def update_sync_job_async(self, job_id: int, status: str, records_fetched: int = 0,
+                                    records_stored: int = 0, error_message: str = None,
+                                    phase_timings: Optional[Dict[str, int]] = None):
+        """Update sync job status (async engine)"""
+        async with self._get_async_session() as session:
+            try:
+                await session.execute(text("""
+                    UPDATE ebay_sync_jobs
+                    SET status = :status,
+                        records_fetched = :records_fetched,
+                        records_stored = :records_stored,
+                        completed_at = :completed_at,
+                        error_message = :error_message,
+                        phase_timings = COALESCE(CAST(:phase_timings AS JSONB), phase_timings)
+                    WHERE id = :job_id
+                """), {
+                    'status': status,
+                    'records_fetched': records_fetched,
+                    'records_stored': records_stored,
+                    'completed_at': datetime.utcnow(),
+                    'error_message': error_message,
+                    'phase_timings': json.dumps(phase_timings) if phase_timings else None,
+                    'job_id': job_id
+                })
+                await session.commit()
+
+            except Exception as e:
+                logger.error(f"Error updating sync job: {str(e)}")
+                await session.rollback()
+
     def get_sync_jobs(self, user_id: str, limit: int = 10) -> List[Dict[str, Any]]:
         """Get recent sync jobs for a user"""
         session = self._get_session()
@@ -493,54 +868,16 @@ class PostgresEbayDatabase:
     
     def upsert_dispute(self, user_id: str, dispute_data: Dict[str, Any]) -> bool:
         """Insert or update a dispute"""
+        if not dispute_data.get('paymentDisputeId'):
+            logger.error("Dispute data missing paymentDisputeId")
+            return False
+        
         session = self._get_session()
         
         try:
-            dispute_id = dispute_data.get('paymentDisputeId')
-            if not dispute_id:
-                logger.error("Dispute data missing paymentDisputeId")
-                return False
-            
-            now = datetime.utcnow()
-            
-            order_id = dispute_data.get('orderId')
-            dispute_reason = dispute_data.get('reason')
-            dispute_status = dispute_data.get('status')
-            open_date = dispute_data.get('openDate')
-            respond_by_date = dispute_data.get('respondByDate')
-            
-            query = text("""
-                INSERT INTO ebay_disputes 
-                (dispute_id, user_id, order_id, dispute_reason, 
-                 dispute_status, open_date, respond_by_date, dispute_data, 
-                 created_at, updated_at)
-                VALUES (:dispute_id, :user_id, :order_id, :dispute_reason,
-                        :dispute_status, :open_date, :respond_by_date, :dispute_data,
-                        :created_at, :updated_at)
-                ON CONFLICT (dispute_id, user_id) 
-                DO UPDATE SET
-                    order_id = EXCLUDED.order_id,
-                    dispute_reason = EXCLUDED.dispute_reason,
-                    dispute_status = EXCLUDED.dispute_status,
-                    open_date = EXCLUDED.open_date,
-                    respond_by_date = EXCLUDED.respond_by_date,
-                    dispute_data = EXCLUDED.dispute_data,
-                    updated_at = EXCLUDED.updated_at
-            """)
-            
-            session.execute(query, {
-                'dispute_id': dispute_id,
-                'user_id': user_id,
-                'order_id': order_id,
-                'dispute_reason': dispute_reason,
-                'dispute_status': dispute_status,
-                'open_date': open_date,
-                'respond_by_date': respond_by_date,
-                'dispute_data': json.dumps(dispute_data),
-                'created_at': now,
-                'updated_at': now
-            })
-            
+            row = self.normalize_dispute(user_id, dispute_data, datetime.utcnow())
+            query, params = self._build_batch_upsert(self.UPSERT_SPECS['disputes'], [row])
+            session.execute(query, params)
             session.commit()
             return True
             
@@ -679,100 +1016,355 @@ class PostgresEbayDatabase:
             
             session.commit()
             return True
-            
+
         except Exception as e:
             logger.error(f"Error upserting transaction: {str(e)}")
             session.rollback()
             return False
         finally:
             session.close()
+
+    def _transaction_rows(self, user_id: str, transactions: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Normalize a page of transactions into (rows, rejects)"""
+        now = datetime.utcnow()
+        rows = []
+        rejects = []
+
+        for transaction_data in transactions:
+            transaction_id = transaction_data.get('transactionId')
+            if not transaction_id:
+                rejects.append({'id': None, 'reason': 'missing transactionId'})
+                continue
+
+            amount_data = transaction_data.get('amount') or {}
+            rows.append({
+                'transaction_id': transaction_id,
+                'user_id': user_id,
+                'order_id': transaction_data.get('orderId'),
+                'transaction_date': transaction_data.get('transactionDate'),
+                'transaction_type': transaction_data.get('transactionType'),
+                'transaction_status': transaction_data.get('transactionStatus'),
+                'amount': amount_data.get('value'),
+                'currency': amount_data.get('currency'),
+                'transaction_data': json.dumps(transaction_data),
+                'created_at': now,
+                'updated_at': now
+            })
+
+        return rows, rejects
+
+    def batch_upsert_transactions(self, user_id: str, transactions: List[Dict[str, Any]]) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Batch insert or update transactions: one statement and one commit per page.
+        Returns: (stored_count, rejects) where rejects is a list of {'id', 'reason'}
+        """
+        if not transactions:
+            return 0, []
+
+        rows, rejects = self._transaction_rows(user_id, transactions)
+        stored, rejects = self._store_rows(user_id, [('transactions', rows)], rejects)
+        return stored['transactions'], rejects
+
+    async def batch_upsert_transactions_async(self, user_id: str, transactions: List[Dict[str, Any]]) -> Tuple[int, List[Dict[str, Any]]]:
+        """Batch insert or update transactions (async engine)"""
+        if not transactions:
+            return 0, []
+
+        with sync_phase("normalize"), span("sync.normalize", resource='transactions', records=len(transactions)):
+            rows, rejects = self._transaction_rows(user_id, transactions)
+        stored, rejects = await self._store_rows_async(user_id, [('transactions', rows)], rejects)
+        return stored['transactions'], rejects
+
+    def normalize_dispute(self, user_id: str, dispute_data: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+        """Normalize a payment dispute into an ebay_disputes row"""
+        amount_value, amount_currency = self._parse_money(
+            self._safe_get(dispute_data, 'monetaryTransactions', 0, 'totalPrice')
+        )
+        return {
+            'dispute_id': dispute_data.get('paymentDisputeId'),
+            'user_id': user_id,
+            'order_id': dispute_data.get('orderId'),
+            'dispute_reason': dispute_data.get('reason'),
+            'dispute_status': dispute_data.get('status'),
+            'open_date': dispute_data.get('openDate'),
+            'respond_by_date': dispute_data.get('respondByDate'),
+            'buyer_username': dispute_data.get('buyerUsername'),
+            'amount_value': amount_value,
+            'amount_currency': amount_currency,
+            'raw_payload': json.dumps(dispute_data),
+            'created_at': now,
+            'updated_at': now
+        }
+
+    def _dispute_rows(self, user_id: str, disputes: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Normalize a page of payment disputes into (rows, rejects)"""
+        now = datetime.utcnow()
+        rows = []
+        rejects = []
+
+        for dispute_data in disputes:
+            dispute_id = dispute_data.get('paymentDisputeId')
+            if not dispute_id:
+                rejects.append({'id': None, 'reason': 'missing paymentDisputeId'})
+                continue
+
+            rows.append(self.normalize_dispute(user_id, dispute_data, now))
+
+        return rows, rejects
+
+    def batch_upsert_disputes(self, user_id: str, disputes: List[Dict[str, Any]]) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Batch insert or update payment disputes: one statement and one commit per page.
+        Returns: (stored_count, rejects) where rejects is a list of {'id', 'reason'}
+        """
+        if not disputes:
+            return 0, []
+
+        rows, rejects = self._dispute_rows(user_id, disputes)
+        stored, rejects = self._store_rows(user_id, [('disputes', rows)], rejects)
+        return stored['disputes'], rejects
+
+    async def batch_upsert_disputes_async(self, user_id: str, disputes: List[Dict[str, Any]]) -> Tuple[int, List[Dict[str, Any]]]:
+        """Batch insert or update payment disputes (async engine)"""
+        if not disputes:
+            return 0, []
+
+        with sync_phase("normalize"), span("sync.normalize", resource='disputes', records=len(disputes)):
+            rows, rejects = self._dispute_rows(user_id, disputes)
+        stored, rejects = await self._store_rows_async(user_id, [('disputes', rows)], rejects)
+        return stored['disputes'], rejects
+
+    def _offer_rows(self, user_id: str, offers: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Normalize a page of offers into (rows, rejects)"""
+        now = datetime.utcnow()
+        rows = []
+        rejects = []
+
+        for offer_data in offers:
+            offer_id = offer_data.get('offerId')
+            if not offer_id:
+                rejects.append({'id': None, 'reason': 'missing offerId'})
+                continue
+
+            price = offer_data.get('price') or {}
+            rows.append({
+                'offer_id': offer_id,
+                'user_id': user_id,
+                'listing_id': offer_data.get('listingId'),
+                'buyer_username': (offer_data.get('buyer') or {}).get('username'),
+                'offer_amount': price.get('value'),
+                'offer_currency': price.get('currency'),
+                'offer_status': offer_data.get('status'),
+                'offer_date': offer_data.get('creationDate'),
+                'expiration_date': offer_data.get('expirationDate'),
+                'offer_data': json.dumps(offer_data),
+                'created_at': now,
+                'updated_at': now
+            })
+
+        return rows, rejects
+
+    def batch_upsert_offers(self, user_id: str, offers: List[Dict[str, Any]]) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Batch insert or update offers: one statement and one commit per page.
+        Returns: (stored_count, rejects) where rejects is a list of {'id', 'reason'}
+        """
+        if not offers:
+            return 0, []
+
+        rows, rejects = self._offer_rows(user_id, offers)
+        stored, rejects = self._store_rows(user_id, [('offers', rows)], rejects)
+        return stored['offers'], rejects
+
+    async def batch_upsert_offers_async(self, user_id: str, offers: List[Dict[str, Any]]) -> Tuple[int, List[Dict[str, Any]]]:
+        """Batch insert or update offers (async engine)"""
+        if not offers:
+            return 0, []
+
+        with sync_phase("normalize"), span("sync.normalize", resource='offers', records=len(offers)):
+            rows, rejects = self._offer_rows(user_id, offers)
+        stored, rejects = await self._store_rows_async(user_id, [('offers', rows)], rejects)
+        return stored['offers'], rejects
+
+    def normalize_message(self, user_id: str, msg: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Normalize a parsed Trading API message into an ebay_messages row.
+        Returns None when the message has no id.
+        """
+        message_id = msg.get("messageid") or msg.get("externalmessageid")
+        if not message_id:
+            return None
+
+        now = datetime.utcnow()
+        message_date = self._parse_datetime(msg.get("receivedate")) or now
+
+        return {
+            'id': str(uuid.uuid4()),
+            'user_id': user_id,
+            'message_id': message_id,
+            'thread_id': msg.get("externalmessageid") or message_id,
+            'sender_username': msg.get("sender", ""),
+            'recipient_username': msg.get("recipientuserid", ""),
+            'subject': msg.get("subject", ""),
+            'body': msg.get("text", ""),
+            'message_type': "MEMBER_MESSAGE",
+            'is_read': bool(msg.get("read", False)),
+            'is_flagged': bool(msg.get("flagged", False)),
+            'is_archived': msg.get("folderid") == "2",
+            'direction': "INCOMING",
+            'message_date': message_date,
+            'listing_id': msg.get("itemid"),
+            'raw_data': json.dumps(msg, default=str),
+            'created_at': now,
+            'updated_at': now
+        }
+
+    def _message_rows(self, user_id: str, messages: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Normalize a batch of messages into (rows, rejects)"""
+        rows = []
+        rejects = []
+        for msg in messages:
+            row = self.normalize_message(user_id, msg)
+            if row is None:
+                rejects.append({'id': None, 'reason': 'missing messageid'})
+                continue
+            rows.append(row)
+        return rows, rejects
+
+    def batch_upsert_messages(self, user_id: str, messages: List[Dict[str, Any]]) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Batch insert messages keyed on (user_id, message_id).
+        Returns: (stored_count, rejects) where rejects is a list of {'id', 'reason'}
+        """
+        if not messages:
+            return 0, []
+
+        rows, rejects = self._message_rows(user_id, messages)
+        stored, rejects = self._store_rows(user_id, [('messages', rows)], rejects)
+        return stored['messages'], rejects
+
+    async def batch_upsert_messages_async(self, user_id: str, messages: List[Dict[str, Any]]) -> Tuple[int, List[Dict[str, Any]]]:
+        """Batch insert messages keyed on (user_id, message_id) (async engine)"""
+        if not messages:
+            return 0, []
+
+        with sync_phase("normalize"), span("sync.normalize", resource='messages', records=len(messages)):
+            rows, rejects = self._message_rows(user_id, messages)
+        stored, rejects = await self._store_rows_async(user_id, [('messages', rows)], rejects)
+        return stored['messages'], rejects
+
+    def _filtered_orders_query(self, user_id: str, buyer_username: str = None,
+                               order_status: str = None, start_date: str = None,
+                               end_date: str = None, limit: int = 100, offset: int = 0,
+                               after: Optional[Tuple[Any, Any]] = None):
+        """
+        Build the filtered orders query and params.
+        `after` is a decoded (creation_date, order_id) cursor and replaces the offset.
+        """
+        query_str = f"SELECT {self._order_select_list()} FROM ebay_orders WHERE user_id = :user_id"
+        params = {'user_id': user_id}
+        
+        if buyer_username:
+            query_str += " AND buyer_username LIKE :buyer_username"
+            params['buyer_username'] = f"%{buyer_username}%"
+        
+        if order_status:
+            query_str += " AND order_payment_status = :order_status"
+            params['order_status'] = order_status
+        
+        if start_date:
+            query_str += " AND creation_date >= :start_date"
+            params['start_date'] = start_date
+        
+        if end_date:
+            query_str += " AND creation_date <= :end_date"
+            params['end_date'] = end_date
+        
+        if after:
+            keyset_clause, keyset_params = keyset_sql('creation_date', 'order_id', 'desc', *after)
+            query_str += f" AND {keyset_clause}"
+            params.update(keyset_params)
+            offset = 0
+        
+        query_str += " ORDER BY creation_date DESC, order_id DESC LIMIT :limit OFFSET :offset"
+        params['limit'] = limit
+        params['offset'] = offset
+        
+        return text(query_str), params
     
     def get_filtered_orders(self, user_id: str, buyer_username: str = None, 
                            order_status: str = None, start_date: str = None, 
-                           end_date: str = None, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
+                           end_date: str = None, limit: int = 100, offset: int = 0,
+                           after: Optional[Tuple[Any, Any]] = None) -> List[Dict[str, Any]]:
         """Get filtered orders for a user"""
         session = self._get_session()
         
         try:
-            query_str = "SELECT * FROM ebay_orders WHERE user_id = :user_id"
-            params = {'user_id': user_id}
-            
-            if buyer_username:
-                query_str += " AND buyer_username LIKE :buyer_username"
-                params['buyer_username'] = f"%{buyer_username}%"
-            
-            if order_status:
-                query_str += " AND order_payment_status = :order_status"
-                params['order_status'] = order_status
-            
-            if start_date:
-                query_str += " AND creation_date >= :start_date"
-                params['start_date'] = start_date
-            
-            if end_date:
-                query_str += " AND creation_date <= :end_date"
-                params['end_date'] = end_date
-            
-            query_str += " ORDER BY creation_date DESC LIMIT :limit OFFSET :offset"
-            params['limit'] = limit
-            params['offset'] = offset
-            
-            query = text(query_str)
+            query, params = self._filtered_orders_query(
+                user_id, buyer_username, order_status, start_date, end_date, limit, offset, after
+            )
             result = session.execute(query, params)
-            
-            orders = []
-            for row in result:
-                order = dict(row._mapping)
-                if order.get('order_data'):
-                    order['order_data'] = json.loads(order['order_data'])
-                orders.append(order)
-            
-            return orders
+            return [self._order_row_to_dict(row) for row in result]
             
         finally:
             session.close()
     
+    async def get_filtered_orders_async(self, user_id: str, buyer_username: str = None,
+                                        order_status: str = None, start_date: str = None,
+                                        end_date: str = None, limit: int = 100, offset: int = 0,
+                                        after: Optional[Tuple[Any, Any]] = None) -> List[Dict[str, Any]]:
+        """Get filtered orders for a user (async engine)"""
+        async with self._get_async_session() as session:
+            query, params = self._filtered_orders_query(
+                user_id, buyer_username, order_status, start_date, end_date, limit, offset, after
+            )
+            result = await session.execute(query, params)
+            return [self._order_row_to_dict(row) for row in result]
+    
     def get_analytics_summary(self, user_id: str) -> Dict[str, Any]:
-        """Get analytics summary for a user"""
+        """Get analytics summary for a user, read from daily_order_rollups"""
         session = self._get_session()
         
         try:
-            total_query = text("SELECT COUNT(*) as total FROM ebay_orders WHERE user_id = :user_id")
-            total_orders = session.execute(total_query, {'user_id': user_id}).scalar() or 0
+            params = {'user_id': user_id}
+            total_orders = session.execute(text(
+                "SELECT COALESCE(SUM(order_count), 0) FROM daily_order_rollups WHERE user_id = :user_id"
+            ), params).scalar() or 0
             
             sales_query = text("""
-                SELECT SUM(total_amount) as total_sales, total_currency 
-                FROM ebay_orders 
-                WHERE user_id = :user_id AND total_amount IS NOT NULL
-                GROUP BY total_currency
-            """)
-            sales_data = [dict(row._mapping) for row in session.execute(sales_query, {'user_id': user_id})]
-            
-            payment_query = text("""
-                SELECT order_payment_status, COUNT(*) as count 
-                FROM ebay_orders 
+                SELECT SUM(gross_sales) as total_sales, NULLIF(currency, '') as total_currency
+                FROM daily_order_rollups
                 WHERE user_id = :user_id
-                GROUP BY order_payment_status
+                GROUP BY currency
+                HAVING SUM(order_count) > 0
             """)
-            payment_status_counts = {row.order_payment_status: row.count for row in session.execute(payment_query, {'user_id': user_id})}
+            sales_data = [dict(row._mapping) for row in session.execute(sales_query, params)]
             
-            fulfillment_query = text("""
-                SELECT order_fulfillment_status, COUNT(*) as count 
-                FROM ebay_orders 
+            status_query = text("""
+                SELECT payment_status, fulfillment_status, SUM(order_count) as count
+                FROM daily_order_rollups
                 WHERE user_id = :user_id
-                GROUP BY order_fulfillment_status
+                GROUP BY payment_status, fulfillment_status
+                HAVING SUM(order_count) > 0
             """)
-            fulfillment_status_counts = {row.order_fulfillment_status: row.count for row in session.execute(fulfillment_query, {'user_id': user_id})}
+            payment_status_counts: Dict[Optional[str], int] = {}
+            fulfillment_status_counts: Dict[Optional[str], int] = {}
+            for row in session.execute(status_query, params):
+                payment = row.payment_status or None
+                fulfillment = row.fulfillment_status or None
+                payment_status_counts[payment] = payment_status_counts.get(payment, 0) + row.count
+                fulfillment_status_counts[fulfillment] = fulfillment_status_counts.get(fulfillment, 0) + row.count
             
             daily_query = text("""
-                SELECT DATE(creation_date) as date, COUNT(*) as count 
-                FROM ebay_orders 
-                WHERE user_id = :user_id AND creation_date IS NOT NULL
-                GROUP BY DATE(creation_date)
+                SELECT day as date, SUM(order_count) as count
+                FROM daily_order_rollups
+                WHERE user_id = :user_id
+                GROUP BY day
+                HAVING SUM(order_count) > 0
                 ORDER BY date DESC
                 LIMIT 30
             """)
-            daily_orders = [dict(row._mapping) for row in session.execute(daily_query, {'user_id': user_id})]
+            daily_orders = [dict(row._mapping) for row in session.execute(daily_query, params)]
             
             return {
                 "total_orders": total_orders,
@@ -785,6 +1377,129 @@ class PostgresEbayDatabase:
         finally:
             session.close()
     
+    def normalize_inventory_item(self, inventory_item_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Normalize an eBay inventory item into an inventory table row.
+        Returns None when the item has no sku.
+        """
+        sku = inventory_item_data.get('sku')
+        if not sku:
+            return None
+
+        now = datetime.utcnow()
+
+        # Extract data from eBay inventory item structure
+        product = inventory_item_data.get('product') or {}
+        title = product.get('title')
+
+        # Get condition - map eBay condition to our ConditionType enum
+        condition_str = inventory_item_data.get('condition', '')
+        condition = None
+        if condition_str:
+            condition_map = {
+                'NEW': 'NEW',
+                'NEW_OTHER': 'NEW_OTHER',
+                'NEW_WITH_DEFECTS': 'NEW_WITH_DEFECTS',
+                'MANUFACTURER_REFURBISHED': 'MANUFACTURER_REFURBISHED',
+                'SELLER_REFURBISHED': 'SELLER_REFURBISHED',
+                'USED_EXCELLENT': 'USED_EXCELLENT',
+                'USED_VERY_GOOD': 'USED_VERY_GOOD',
+                'USED_GOOD': 'USED_GOOD',
+                'USED_ACCEPTABLE': 'USED_ACCEPTABLE',
+                'FOR_PARTS_OR_NOT_WORKING': 'FOR_PARTS_OR_NOT_WORKING'
+            }
+            condition = condition_map.get(condition_str.upper())
+
+        # Get availability/quantity
+        availability = inventory_item_data.get('availability') or {}
+        quantity = (availability.get('shipToLocationAvailability') or {}).get('quantity', 0)
+
+        # Get pricing if available
+        pricing_summary = inventory_item_data.get('pricingSummary') or {}
+        price_obj = pricing_summary.get('price') or {}
+        price_value, price_currency = self._parse_money(price_obj)
+
+        # Get category
+        category_id = product.get('categoryId')
+        category = str(category_id) if category_id else None
+
+        # Get listing IDs (offers)
+        offers = inventory_item_data.get('offers') or []
+        listing_ids = [offer.get('offerId') for offer in offers if offer.get('offerId')]
+        ebay_listing_id = listing_ids[0] if listing_ids else None
+
+        # Get image URLs count
+        image_urls = product.get('imageUrls') or []
+        photo_count = len(image_urls)
+
+        # Get aspects for part_number, model, etc.
+        aspects = product.get('aspects') or {}
+        part_number = aspects.get('Part Number') or aspects.get('MPN') or aspects.get('Brand Part Number')
+        model = aspects.get('Model') or aspects.get('Model Number')
+
+        # Determine eBay status based on offers
+        ebay_status = 'UNKNOWN'
+        if offers:
+            active_offers = [o for o in offers if o.get('status') in ['PUBLISHED', 'PUBLISHED_IN_PROGRESS']]
+            if active_offers:
+                ebay_status = 'ACTIVE'
+            else:
+                ebay_status = 'ENDED'
+
+        return {
+            'sku_code': sku,
+            'title': title,
+            'condition': condition,
+            'part_number': part_number,
+            'model': model,
+            'category': category,
+            'price_value': price_value,
+            'price_currency': price_currency,
+            'quantity': quantity,
+            'ebay_listing_id': ebay_listing_id,
+            'ebay_status': ebay_status,
+            'status': 'LISTED' if ebay_status == 'ACTIVE' else 'AVAILABLE',
+            'photo_count': photo_count,
+            'raw_payload': json.dumps(inventory_item_data),
+            'rec_created': now,
+            'rec_updated': now
+        }
+
+    def _inventory_rows(self, inventory_items: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Normalize a page of inventory items into (rows, rejects)"""
+        rows = []
+        rejects = []
+        for inventory_item_data in inventory_items:
+            row = self.normalize_inventory_item(inventory_item_data)
+            if row is None:
+                rejects.append({'id': None, 'reason': 'missing sku'})
+                continue
+            rows.append(row)
+        return rows, rejects
+
+    def batch_upsert_inventory_items(self, user_id: str, inventory_items: List[Dict[str, Any]]) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Batch insert or update inventory items keyed on sku_code: one statement and one commit per page.
+        Keeps the denormalized search columns (status, ebay_status, price, quantity) current.
+        Returns: (stored_count, rejects) where rejects is a list of {'id', 'reason'}
+        """
+        if not inventory_items:
+            return 0, []
+
+        rows, rejects = self._inventory_rows(inventory_items)
+        stored, rejects = self._store_rows(user_id, [('inventory', rows)], rejects)
+        return stored['inventory'], rejects
+
+    async def batch_upsert_inventory_items_async(self, user_id: str, inventory_items: List[Dict[str, Any]]) -> Tuple[int, List[Dict[str, Any]]]:
+        """Batch insert or update inventory items keyed on sku_code (async engine)"""
+        if not inventory_items:
+            return 0, []
+
+        with sync_phase("normalize"), span("sync.normalize", resource='inventory', records=len(inventory_items)):
+            rows, rejects = self._inventory_rows(inventory_items)
+        stored, rejects = await self._store_rows_async(user_id, [('inventory', rows)], rejects)
+        return stored['inventory'], rejects
+
     def upsert_inventory_item(self, user_id: str, inventory_item_data: Dict[str, Any]) -> bool:
         """
         Insert or update an inventory item from eBay API into the inventory table.
@@ -844,119 +1559,20 @@ class PostgresEbayDatabase:
         Returns:
             bool: True if successful, False otherwise
         """
+        row = self.normalize_inventory_item(inventory_item_data)
+        if row is None:
+            logger.error("Inventory item data missing sku")
+            return False
+
         session = self._get_session()
-        
+
         try:
-            sku = inventory_item_data.get('sku')
-            if not sku:
-                logger.error("Inventory item data missing sku")
-                return False
-            
-            now = datetime.utcnow()
-            
-            # Extract data from eBay inventory item structure
-            product = inventory_item_data.get('product', {})
-            title = product.get('title')
-            
-            # Get condition - map eBay condition to our ConditionType enum
-            condition_str = inventory_item_data.get('condition', '')
-            condition = None
-            if condition_str:
-                condition_map = {
-                    'NEW': 'NEW',
-                    'NEW_OTHER': 'NEW_OTHER',
-                    'NEW_WITH_DEFECTS': 'NEW_WITH_DEFECTS',
-                    'MANUFACTURER_REFURBISHED': 'MANUFACTURER_REFURBISHED',
-                    'SELLER_REFURBISHED': 'SELLER_REFURBISHED',
-                    'USED_EXCELLENT': 'USED_EXCELLENT',
-                    'USED_VERY_GOOD': 'USED_VERY_GOOD',
-                    'USED_GOOD': 'USED_GOOD',
-                    'USED_ACCEPTABLE': 'USED_ACCEPTABLE',
-                    'FOR_PARTS_OR_NOT_WORKING': 'FOR_PARTS_OR_NOT_WORKING'
-                }
-                condition = condition_map.get(condition_str.upper())
-            
-            # Get availability/quantity
-            availability = inventory_item_data.get('availability', {})
-            quantity = availability.get('shipToLocationAvailability', {}).get('quantity', 0)
-            
-            # Get pricing if available
-            pricing_summary = inventory_item_data.get('pricingSummary', {})
-            price_obj = pricing_summary.get('price') or {}
-            price_value, price_currency = self._parse_money(price_obj)
-            
-            # Get category
-            category_id = product.get('categoryId')
-            category = str(category_id) if category_id else None
-            
-            # Get listing IDs (offers)
-            offers = inventory_item_data.get('offers', [])
-            listing_ids = [offer.get('offerId') for offer in offers if offer.get('offerId')]
-            ebay_listing_id = listing_ids[0] if listing_ids else None
-            
-            # Get image URLs count
-            image_urls = product.get('imageUrls', [])
-            photo_count = len(image_urls) if image_urls else 0
-            
-            # Get aspects for part_number, model, etc.
-            aspects = product.get('aspects', {})
-            part_number = aspects.get('Part Number') or aspects.get('MPN') or aspects.get('Brand Part Number')
-            model = aspects.get('Model') or aspects.get('Model Number')
-            
-            # Determine eBay status based on offers
-            ebay_status = 'UNKNOWN'
-            if offers:
-                active_offers = [o for o in offers if o.get('status') in ['PUBLISHED', 'PUBLISHED_IN_PROGRESS']]
-                if active_offers:
-                    ebay_status = 'ACTIVE'
-                else:
-                    ebay_status = 'ENDED'
-            
             # Upsert using sku_code as unique key
             # Note: Currently inventory table doesn't have user_id - may need schema update for multi-user
-            query = text("""
-                INSERT INTO inventory 
-                (sku_code, title, condition, part_number, model, category,
-                 price_value, price_currency, quantity, ebay_listing_id, ebay_status,
-                 photo_count, raw_payload, rec_created, rec_updated)
-                VALUES (:sku_code, :title, :condition, :part_number, :model, :category,
-                        :price_value, :price_currency, :quantity, :ebay_listing_id, :ebay_status,
-                        :photo_count, :raw_payload, :rec_created, :rec_updated)
-                ON CONFLICT (sku_code) 
-                DO UPDATE SET
-                    title = EXCLUDED.title,
-                    condition = EXCLUDED.condition,
-                    part_number = EXCLUDED.part_number,
-                    model = EXCLUDED.model,
-                    category = EXCLUDED.category,
-                    price_value = EXCLUDED.price_value,
-                    price_currency = EXCLUDED.price_currency,
-                    quantity = EXCLUDED.quantity,
-                    ebay_listing_id = EXCLUDED.ebay_listing_id,
-                    ebay_status = EXCLUDED.ebay_status,
-                    photo_count = EXCLUDED.photo_count,
-                    raw_payload = EXCLUDED.raw_payload,
-                    rec_updated = EXCLUDED.rec_updated
-            """)
-            
-            session.execute(query, {
-                'sku_code': sku,
-                'title': title,
-                'condition': condition,
-                'part_number': part_number,
-                'model': model,
-                'category': category,
-                'price_value': price_value,
-                'price_currency': price_currency,
-                'quantity': quantity,
-                'ebay_listing_id': ebay_listing_id,
-                'ebay_status': ebay_status,
-                'photo_count': photo_count,
-                'raw_payload': json.dumps(inventory_item_data),
-                'rec_created': now,
-                'rec_updated': now
-            })
-            
+            _, rejects = self._execute_batch_upsert(session, self.UPSERT_SPECS['inventory'], [row])
+            if rejects:
+                raise Exception(rejects[0]['reason'])
+
             session.commit()
             return True
             
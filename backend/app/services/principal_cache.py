@@ -0,0 +1,104 @@
+"""
+Authenticated-user cache for the auth dependencies.
+
+get_current_user and the SSE auth resolve the JWT subject through this cache, so
+a request costs no database round trip while the user is cached. Entries live for
+PRINCIPAL_CACHE_TTL_SECONDS and the least recently used are evicted beyond
+PRINCIPAL_CACHE_MAX_SIZE.
+
+Every write to a user row goes through update_user (profile changes, eBay token
+saves, disconnects), which drops the user's entry. With PRINCIPAL_CACHE_NOTIFY
+enabled, update_user also sends a Postgres NOTIFY on commit and each process runs
+a listener that drops the entry, so other replicas do not wait out the TTL.
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from sqlalchemy.engine import make_url
+
+from app.config import settings
+from app.models.user import User as UserModel
+from app.utils.logger import logger
+
+PRINCIPAL_INVALIDATE_CHANNEL = "principal_invalidate"
+
+# Wait before reconnecting a dropped listener connection
+LISTENER_RETRY_SECONDS = 5
+
+
+class PrincipalCache:
+    """
+    Thread-safe TTL/LRU cache of users keyed by user id.
+    A load that races an invalidation is not stored, so a stale row read before
+    an update can never outlive it.
+    """
+
+    def __init__(self, ttl_seconds: int, max_size: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def get_or_load(self, user_id: str, loader: Callable[[str], Optional[UserModel]]) -> Optional[UserModel]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                user, stored_at = entry
+                if time.monotonic() - stored_at <= self.ttl_seconds:
+                    self._entries.move_to_end(user_id)
+                    return user
+                del self._entries[user_id]
+            version = self._version
+
+        user = loader(user_id)
+        if user is None:
+            return None
+
+        with self._lock:
+            if version == self._version:
+                self._entries[user_id] = (user, time.monotonic())
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return user
+
+    def invalidate(self, user_id: str):
+        with self._lock:
+            self._version += 1
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+
+
+principal_cache = PrincipalCache(settings.PRINCIPAL_CACHE_TTL_SECONDS, settings.PRINCIPAL_CACHE_MAX_SIZE)
+
+
+async def run_principal_invalidation_listener(database_url: str):
+    """
+    LISTEN for user invalidations sent by other processes. The whole cache is
+    cleared on every (re)connect, since notifications sent while disconnected are lost.
+    """
+    import psycopg
+
+    conninfo = make_url(database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+
+    while True:
+        try:
+            async with await psycopg.AsyncConnection.connect(conninfo, autocommit=True) as conn:
+                await conn.execute(f"LISTEN {PRINCIPAL_INVALIDATE_CHANNEL}")
+                principal_cache.clear()
+                logger.info("Principal cache invalidation listener connected")
+                async for notify in conn.notifies():
+                    principal_cache.invalidate(notify.payload)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Principal cache invalidation listener failed, retrying: {e}")
+        await asyncio.sleep(LISTENER_RETRY_SECONDS)
@@ -0,0 +1,205 @@
+"""
+Daily sales rollups behind the summary endpoints.
+
+daily_order_rollups holds order counts and gross sales per (user, UTC day of
+creation, currency, payment status, fulfillment status). The ebay_orders batch
+writers keep it current: they read the stored version of the orders in a page
+before upserting it and apply the difference as additive deltas in the same
+transaction, so a re-synced order that changed status moves between buckets
+instead of being counted twice.
+
+daily_financial_rollups holds sales, fees, payouts and refunds per (user, day,
+currency, kind). Those tables have no incremental writers, so the rollup is
+recomputed for the user at the end of the transactions and financials syncs.
+
+Backfill or repair (from backend/):
+    python -m app.services.rollups [--user-id ID]
+"""
+import argparse
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.utils.logger import logger
+
+FINANCIAL_KINDS = ("sales", "fees", "payouts", "refunds")
+
+ORDER_ROLLUP_COLUMNS = ("day", "currency", "payment_status", "fulfillment_status")
+
+# Stored state of the orders in a page, locked so concurrent writers apply their deltas in turn
+ORDER_ROLLUP_SNAPSHOT_SQL = """
+    SELECT order_id, creation_date, total_amount, total_currency,
+           order_payment_status, order_fulfillment_status
+    FROM ebay_orders
+    WHERE user_id = :user_id AND order_id = ANY(:order_ids)
+    ORDER BY order_id
+    FOR UPDATE
+"""
+
+
+def varchar_timestamp(column: str) -> str:
+    """
+    SQL cast of a varchar date column (ebay_orders.creation_date and friends) that is
+    NULL, instead of an error, for empty or malformed values
+    """
+    return rf"CASE WHEN {column} ~ '^\d{{4}}-\d{{2}}-\d{{2}}' THEN {column}::timestamptz END"
+
+
+# Orders whose creation_date is not a date are left out, as rollup_day does for the deltas
+ORDER_ROLLUP_REBUILD_SQL = """
+    INSERT INTO daily_order_rollups
+        (user_id, day, currency, payment_status, fulfillment_status, order_count, gross_sales, updated_at)
+    SELECT user_id,
+           (created AT TIME ZONE 'UTC')::date,
+           COALESCE(total_currency, ''),
+           COALESCE(order_payment_status, ''),
+           COALESCE(order_fulfillment_status, ''),
+           COUNT(*),
+           COALESCE(SUM(total_amount), 0),
+           now()
+    FROM (
+        SELECT *, {created} AS created FROM ebay_orders
+    ) orders
+    WHERE created IS NOT NULL {user_filter}
+    GROUP BY 1, 2, 3, 4, 5
+"""
+
+FINANCIAL_ROLLUP_REBUILD_SQL = """
+    INSERT INTO daily_financial_rollups (user_id, day, currency, kind, entry_count, amount, updated_at)
+    SELECT user_id, day, currency, kind, COUNT(*), COALESCE(SUM(amount), 0), now()
+    FROM (
+        SELECT user_id, (sale_date AT TIME ZONE 'UTC')::date AS day, COALESCE(currency, '') AS currency,
+               'sales' AS kind, sale_value AS amount
+        FROM transactions WHERE sale_date IS NOT NULL
+        UNION ALL
+        SELECT user_id, (assessed_at AT TIME ZONE 'UTC')::date, COALESCE(currency, ''), 'fees', amount
+        FROM fees WHERE assessed_at IS NOT NULL
+        UNION ALL
+        SELECT user_id, (payout_date AT TIME ZONE 'UTC')::date, COALESCE(currency, ''), 'payouts', total_amount
+        FROM payouts WHERE payout_date IS NOT NULL
+        UNION ALL
+        SELECT p.user_id, (p.payout_date AT TIME ZONE 'UTC')::date, COALESCE(pi.currency, p.currency, ''),
+               'refunds', ABS(pi.amount)
+        FROM payout_items pi JOIN payouts p ON p.payout_id = pi.payout_id
+        WHERE pi.type = 'REFUND' AND p.payout_date IS NOT NULL
+    ) entries
+    WHERE TRUE {user_filter}
+    GROUP BY user_id, day, currency, kind
+"""
+
+
+def rollup_day(value: Any) -> Optional[date]:
+    """UTC calendar day of an order creation date (datetime or the stored varchar)"""
+    if not value:
+        return None
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.date()
+
+
+def _amount(value: Any) -> Decimal:
+    if value is None or value == '':
+        return Decimal(0)
+    return Decimal(str(value))
+
+
+def _order_bucket(row: Dict[str, Any], creation_date: Any) -> Optional[Tuple]:
+    day = rollup_day(creation_date)
+    if day is None:
+        return None
+    return (
+        day,
+        row.get('total_currency') or '',
+        row.get('order_payment_status') or '',
+        row.get('order_fulfillment_status') or '',
+    )
+
+
+def order_rollup_deltas(user_id: str, stored: Dict[str, Dict[str, Any]],
+                        rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Rollup deltas for upserting `rows` over the `stored` versions (keyed by order_id).
+    The upsert never rewrites creation_date, so an existing order stays on its stored day.
+    """
+    incoming = {row['order_id']: row for row in rows}
+    deltas: Dict[Tuple, List] = {}
+
+    def add(bucket: Optional[Tuple], count: int, amount: Decimal):
+        if bucket is None:
+            return
+        delta = deltas.setdefault(bucket, [0, Decimal(0)])
+        delta[0] += count
+        delta[1] += amount
+
+    for order_id, row in incoming.items():
+        old = stored.get(order_id)
+        if old:
+            add(_order_bucket(old, old.get('creation_date')), -1, -_amount(old.get('total_amount')))
+            add(_order_bucket(row, old.get('creation_date')), 1, _amount(row.get('total_amount')))
+        else:
+            add(_order_bucket(row, row.get('creation_date')), 1, _amount(row.get('total_amount')))
+
+    now = datetime.utcnow()
+    return [
+        {'user_id': user_id, **dict(zip(ORDER_ROLLUP_COLUMNS, bucket)),
+         'order_count': count, 'gross_sales': amount, 'updated_at': now}
+        for bucket, (count, amount) in sorted(deltas.items())
+        if count or amount
+    ]
+
+
+def _user_filter(user_id: Optional[str]) -> Tuple[str, Dict[str, Any]]:
+    if user_id is None:
+        return "", {}
+    return "AND user_id = :user_id", {'user_id': user_id}
+
+
+def rebuild_order_rollups(db: Session, user_id: Optional[str] = None) -> None:
+    """
+    Recompute daily_order_rollups from ebay_orders, for one user or everyone.
+    Blocks order writers until the caller commits so no delta lands in between.
+    """
+    user_filter, params = _user_filter(user_id)
+    db.execute(text("LOCK TABLE ebay_orders IN SHARE MODE"))
+    db.execute(text(f"DELETE FROM daily_order_rollups WHERE TRUE {user_filter}"), params)
+    db.execute(text(ORDER_ROLLUP_REBUILD_SQL.format(created=varchar_timestamp("creation_date"),
+                                                    user_filter=user_filter)), params)
+
+
+def rebuild_financial_rollups(db: Session, user_id: Optional[str] = None) -> None:
+    """Recompute daily_financial_rollups from transactions, fees and payouts"""
+    user_filter, params = _user_filter(user_id)
+    db.execute(text(f"DELETE FROM daily_financial_rollups WHERE TRUE {user_filter}"), params)
+    db.execute(text(FINANCIAL_ROLLUP_REBUILD_SQL.format(user_filter=user_filter)), params)
+
+
+def main():
+    from app.models_sqlalchemy import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Rebuild the daily sales rollups")
+    parser.add_argument("--user-id", help="only rebuild this user's rollups")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        rebuild_order_rollups(db, args.user_id)
+        rebuild_financial_rollups(db, args.user_id)
+        db.commit()
+        logger.info(f"Rebuilt daily rollups for {args.user_id or 'all users'}")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
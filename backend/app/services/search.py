@@ -0,0 +1,76 @@
+"""
+Substring search over the grid tables, backed by pg_trgm GIN indexes.
+
+ILIKE '%term%' cannot use a btree index, but it can use a gin_trgm_ops index on
+the same column, so the filters here stay plain ILIKE and the trigram indexes
+added in the search_trgm migration do the work. The multi-field `q` box of the
+inventory grid searches the generated `inventory.search_text` column and can be
+ranked with word_similarity(). Mailbox search uses Postgres full-text search
+instead, over the generated `ebay_messages.search_vector` column.
+"""
+from typing import Dict, List
+
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+
+from app.models_sqlalchemy.models import MESSAGE_BODY_TEXT_SQL
+
+LIKE_ESCAPE = "\\"
+
+
+def like_pattern(term: str) -> str:
+    """%term% with LIKE wildcards in user input escaped"""
+    escaped = (
+        term.replace(LIKE_ESCAPE, LIKE_ESCAPE * 2)
+        .replace("%", LIKE_ESCAPE + "%")
+        .replace("_", LIKE_ESCAPE + "_")
+    )
+    return f"%{escaped}%"
+
+
+def substring_match(column, term: str):
+    """Case-insensitive substring filter that a gin_trgm_ops index on `column` can serve"""
+    return column.ilike(like_pattern(term.strip()), escape=LIKE_ESCAPE)
+
+
+def similarity_rank(column, term: str):
+    """Relevance of `column` for `term`, 0..1, highest first when ordered desc"""
+    return func.word_similarity(term.strip().lower(), column)
+
+
+# Full-text search over ebay_messages.search_vector (generated column, GIN indexed)
+TS_CONFIG = "english"
+SNIPPET_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=25, MinWords=8, FragmentDelimiter= … "
+
+
+def text_query(term: str):
+    """tsquery for a mailbox search box; accepts quoted phrases, OR and -exclusions"""
+    return func.websearch_to_tsquery(TS_CONFIG, term)
+
+
+def fulltext_match(vector_column, term: str):
+    return vector_column.op("@@")(text_query(term))
+
+
+def fulltext_rank(vector_column, term: str):
+    """Cover-density rank, normalized by document length"""
+    return func.ts_rank_cd(vector_column, text_query(term), 32)
+
+
+def message_snippets(db: Session, message_ids: List[str], term: str) -> Dict[str, str]:
+    """
+    Highlighted body fragments for a page of search results.
+    Run separately on the page's ids so ts_headline never touches rows outside the page.
+    """
+    if not message_ids:
+        return {}
+    rows = db.execute(
+        text(f"""
+            SELECT id, ts_headline('{TS_CONFIG}', {MESSAGE_BODY_TEXT_SQL},
+                                   websearch_to_tsquery('{TS_CONFIG}', :term), :options) AS snippet
+            FROM ebay_messages
+            WHERE id = ANY(:ids)
+        """),
+        {"term": term, "options": SNIPPET_OPTIONS, "ids": list(message_ids)}
+    )
+    return {row.id: row.snippet for row in rows}
@@ -5,6 +5,7 @@ import uuid
 import json
 from pathlib import Path
 from app.models.user import User, UserCreate, UserRole
+from app.services.principal_cache import principal_cache
 from app.utils.logger import logger
 
 
@@ -158,6 +159,7 @@ class SQLiteDatabase:
         cursor.execute(query, values)
         conn.commit()
         conn.close()
+        principal_cache.invalidate(user_id)
         
         user = self.get_user_by_id(user_id)
         if user:
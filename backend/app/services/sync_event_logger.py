@@ -4,17 +4,50 @@ Sync Event Logger Service for real-time streaming of sync operation logs
 import uuid
 import time
 from datetime import datetime
-from typing import Dict, Any, Optional, AsyncGenerator
+from typing import Dict, Any, Optional, AsyncGenerator, List
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from app.models_sqlalchemy.models import SyncEventLog
-from app.models_sqlalchemy import SessionLocal
-from app.utils.logger import logger
+from app.models_sqlalchemy.models import SyncEventLog, SyncRunProfile
+from app.models_sqlalchemy import SessionLocal, AsyncSessionLocal
+from app.utils.logger import logger, request_id_var
+from app.utils.metrics import collector, sync_records_fetched, sync_records_stored, sync_runs
+from app.utils.profiling import PhaseTimer, SamplingProfiler, bind_phase_timer, sync_phase
+from app.utils.tracing import Span, start_span
+from contextlib import asynccontextmanager
 import asyncio
 import json
 
 # In-memory cancellation flags (fast lookup)
 _cancelled_run_ids: set = set()
 
+# Strong references to event writer tasks so they are not garbage collected mid-flush
+_writer_tasks: set = set()
+
+# Runs between log_start and close, by run_id, for the active-run and queue metrics
+_active_loggers: Dict[str, "SyncEventLogger"] = {}
+
+
+@collector("sync_active_runs", "Sync runs in progress by resource")
+def _active_runs_metric():
+    counts: Dict[str, int] = {}
+    for event_logger in list(_active_loggers.values()):
+        counts[event_logger.sync_type] = counts.get(event_logger.sync_type, 0) + 1
+    for resource, count in counts.items():
+        yield {"resource": resource}, count
+
+
+@collector("sync_event_queue_depth", "Sync events waiting for the async writer")
+def _event_queue_depth_metric():
+    yield {}, sum(lg._queue.qsize() for lg in list(_active_loggers.values()) if lg._queue is not None)
+
+
+def _event_time(event: Dict[str, Any]) -> datetime:
+    """When the event was emitted, not when the writer got to it; naive UTC like the column"""
+    try:
+        return datetime.fromisoformat(event['timestamp'])
+    except (KeyError, TypeError, ValueError):
+        return datetime.utcnow()
+
 
 class SyncEventLogger:
     """
@@ -28,53 +61,145 @@ class SyncEventLogger:
         self.run_id = run_id or f"{sync_type}_{int(time.time())}_{uuid.uuid4().hex[:8]}"
         self.db: Optional[Session] = None
         self.events = []
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+        self._counted_fetched = 0
+        self._counted_stored = 0
+        self.phases: Optional[PhaseTimer] = None
+        self._run_span: Optional[Span] = None
+        self._page_span: Optional[Span] = None
+        self._trace_error: Optional[Exception] = None
         
+    def track_phases(self):
+        """Time the sync phases of the current task from here on, see app.utils.profiling"""
+        self.phases = PhaseTimer()
+        bind_phase_timer(self.phases)
+    
+    def phase_summary(self) -> Optional[Dict[str, int]]:
+        """Milliseconds per phase over the run so far, if phases are tracked"""
+        return self.phases.summary() if self.phases else None
+    
+    def start_trace(self):
+        """
+        Trace the run from here on: a root span for the run, linked to the request
+        that started it, and one child span per page, rotated by log_progress
+        """
+        self._run_span = start_span(
+            "sync.run", root=True, run_id=self.run_id, sync_type=self.sync_type,
+            user_id=self.user_id, request_id=request_id_var.get(),
+        )
+        if self._run_span is not None and self._run_span.sampled:
+            self._page_span = start_span("sync.page", run_id=self.run_id)
+    
+    def _end_trace(self):
+        if self._page_span is not None:
+            self._page_span.end()
+            self._page_span = None
+        if self._run_span is not None:
+            self._run_span.end(self._trace_error)
+            self._run_span = None
+    
     def _get_db(self) -> Session:
         """Get or create database session"""
         if self.db is None:
             self.db = SessionLocal()
         return self.db
     
+    def _to_model(self, event: Dict[str, Any]) -> SyncEventLog:
+        """Build the SyncEventLog row for an event"""
+        return SyncEventLog(
+            run_id=self.run_id,
+            user_id=self.user_id,
+            sync_type=self.sync_type,
+            event_type=event.get('event_type', 'log'),
+            level=event.get('level', 'info'),
+            message=event.get('message', ''),
+            http_method=event.get('http_method'),
+            http_url=event.get('http_url'),
+            http_status=event.get('http_status'),
+            http_duration_ms=event.get('http_duration_ms'),
+            current_page=event.get('current_page'),
+            total_pages=event.get('total_pages'),
+            items_fetched=event.get('items_fetched'),
+            items_stored=event.get('items_stored'),
+            progress_pct=event.get('progress_pct'),
+            extra_data=event.get('extra_data'),
+            timestamp=_event_time(event)
+        )
+    
     def _persist_event(self, event: Dict[str, Any]):
         """Persist event to database"""
         try:
             db = self._get_db()
-            event_log = SyncEventLog(
-                run_id=self.run_id,
-                user_id=self.user_id,
-                sync_type=self.sync_type,
-                event_type=event.get('event_type', 'log'),
-                level=event.get('level', 'info'),
-                message=event.get('message', ''),
-                http_method=event.get('http_method'),
-                http_url=event.get('http_url'),
-                http_status=event.get('http_status'),
-                http_duration_ms=event.get('http_duration_ms'),
-                current_page=event.get('current_page'),
-                total_pages=event.get('total_pages'),
-                items_fetched=event.get('items_fetched'),
-                items_stored=event.get('items_stored'),
-                progress_pct=event.get('progress_pct'),
-                extra_data=event.get('extra_data'),
-                timestamp=datetime.utcnow()
-            )
-            db.add(event_log)
+            db.add(self._to_model(event))
             db.commit()
         except Exception as e:
             logger.error(f"Failed to persist sync event: {str(e)}")
             if self.db:
                 self.db.rollback()
     
+    def _enqueue_event(self, event: Dict[str, Any]) -> bool:
+        """
+        Hand the event to the async writer when running on the event loop.
+        Returns False when there is no running loop and the caller must persist synchronously.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+        
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._writer = loop.create_task(self._drain_events())
+            _writer_tasks.add(self._writer)
+            self._writer.add_done_callback(_writer_tasks.discard)
+        
+        self._queue.put_nowait(event)
+        return True
+    
+    async def _drain_events(self):
+        """Write queued events through the async engine, batching whatever has piled up"""
+        done = False
+        while not done:
+            batch = [await self._queue.get()]
+            while not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            
+            if None in batch:
+                done = True
+                batch = [e for e in batch if e is not None]
+            if not batch:
+                continue
+            
+            try:
+                async with AsyncSessionLocal() as db:
+                    db.add_all([self._to_model(e) for e in batch])
+                    await db.commit()
+            except Exception as e:
+                logger.error(f"Failed to persist {len(batch)} sync events: {str(e)}")
+    
     def emit_event(self, event: Dict[str, Any]):
         """Emit a log event (stores in memory and persists to DB)"""
-        event['run_id'] = self.run_id
-        event['timestamp'] = datetime.utcnow().isoformat()
-        self.events.append(event)
-        self._persist_event(event)
-        logger.info(f"[{self.run_id}] {event.get('message', '')}")
+        with sync_phase("event_log"):
+            event['run_id'] = self.run_id
+            event['timestamp'] = datetime.utcnow().isoformat()
+            self.events.append(event)
+            if not self._enqueue_event(event):
+                self._persist_event(event)
+            logger.info(f"[{self.run_id}] {event.get('message', '')}")
+    
+    def _count_records(self, items_fetched: Optional[int], items_stored: Optional[int]):
+        """Add the growth of the run's cumulative totals to the throughput counters"""
+        if items_fetched is not None and items_fetched > self._counted_fetched:
+            sync_records_fetched.inc(items_fetched - self._counted_fetched, resource=self.sync_type)
+            self._counted_fetched = items_fetched
+        if items_stored is not None and items_stored > self._counted_stored:
+            sync_records_stored.inc(items_stored - self._counted_stored, resource=self.sync_type)
+            self._counted_stored = items_stored
     
     def log_start(self, message: str):
         """Log sync start event"""
+        _active_loggers[self.run_id] = self
         self.emit_event({
             'event_type': 'start',
             'level': 'info',
@@ -88,6 +213,7 @@ class SyncEventLogger:
         if total_pages and total_pages > 0:
             progress_pct = (current_page / total_pages) * 100
         
+        self._count_records(items_fetched, items_stored)
         self.emit_event({
             'event_type': 'progress',
             'level': 'info',
@@ -96,8 +222,14 @@ class SyncEventLogger:
             'total_pages': total_pages,
             'items_fetched': items_fetched,
             'items_stored': items_stored,
-            'progress_pct': progress_pct
+            'progress_pct': progress_pct,
+            'extra_data': {'phases_ms': self.phases.page_breakdown()} if self.phases else None
         })
+        if self._page_span is not None:
+            self._page_span.set_attribute("page", current_page)
+            self._page_span.set_attribute("items_fetched", items_fetched)
+            self._page_span.end()
+            self._page_span = start_span("sync.page", run_id=self.run_id)
     
     def log_http_request(self, method: str, url: str, status: int, duration_ms: int, 
                         items_count: Optional[int] = None):
@@ -173,7 +305,11 @@ class SyncEventLogger:
     
     def log_error(self, message: str, error: Optional[Exception] = None, 
                  extra_data: Optional[Dict[str, Any]] = None):
-        """Log error message"""
+        """Log error message; with an exception it ends the run"""
+        if error is not None and _active_loggers.pop(self.run_id, None) is not None:
+            sync_runs.inc(resource=self.sync_type, outcome="error")
+        if error is not None:
+            self._trace_error = error
         error_data = extra_data or {}
         if error:
             error_data['error_type'] = type(error).__name__
@@ -186,23 +322,46 @@ class SyncEventLogger:
             'extra_data': error_data
         })
     
-    def log_done(self, message: str, total_fetched: int, total_stored: int, duration_ms: int):
+    def log_done(self, message: str, total_fetched: int, total_stored: int, duration_ms: int,
+                 outcome: str = "done"):
         """Log completion event"""
+        self._count_records(total_fetched, total_stored)
+        if _active_loggers.pop(self.run_id, None) is not None:
+            sync_runs.inc(resource=self.sync_type, outcome=outcome)
         self.emit_event({
             'event_type': 'done',
             'level': 'info',
             'message': message,
             'items_fetched': total_fetched,
             'items_stored': total_stored,
-            'extra_data': {'duration_ms': duration_ms}
+            'extra_data': {'duration_ms': duration_ms, 'phases_ms': self.phase_summary()}
         })
     
+    def log_cancelled(self, message: str, total_fetched: int, total_stored: int, duration_ms: int):
+        """Log the completion event of a run stopped by the user"""
+        self.log_done(message, total_fetched, total_stored, duration_ms, outcome="cancelled")
+    
     def close(self):
-        """Close database session"""
+        """Close database session; queued events are still flushed by the async writer"""
+        if _active_loggers.pop(self.run_id, None) is not None:
+            sync_runs.inc(resource=self.sync_type, outcome="incomplete")
+        if self.phases is not None:
+            bind_phase_timer(None)
+        self._end_trace()
+        if self._queue is not None:
+            self._queue.put_nowait(None)
+            self._queue = None
         if self.db:
             self.db.close()
             self.db = None
     
+    async def aclose(self):
+        """Close and wait until every queued event has been written"""
+        writer = self._writer
+        self.close()
+        if writer is not None:
+            await writer
+    
     async def stream_events(self) -> AsyncGenerator[str, None]:
         """
         Stream events as Server-Sent Events (SSE) format.
@@ -242,6 +401,71 @@ def is_cancelled(run_id: str) -> bool:
         db.close()
 
 
+async def is_cancelled_async(run_id: str) -> bool:
+    """Check if a sync run has been cancelled (async engine)"""
+    if run_id in _cancelled_run_ids:
+        return True
+    with sync_phase("cancel_check"):
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(SyncEventLog.id).where(
+                    SyncEventLog.run_id == run_id,
+                    SyncEventLog.event_type == 'cancelled'
+                ).limit(1)
+            )
+            if result.first():
+                _cancelled_run_ids.add(run_id)
+                return True
+            return False
+
+
+@asynccontextmanager
+async def profiled_run(run_id: str, user_id: str, sync_type: str, enabled: bool):
+    """
+    Sample the current task's stacks for the duration of the block and store the
+    collapsed stacks as the run's profile. A no-op unless enabled.
+    """
+    if not enabled:
+        yield
+        return
+    
+    profiler = SamplingProfiler(asyncio.current_task())
+    started = time.time()
+    profiler.start()
+    try:
+        yield
+    finally:
+        folded = await asyncio.to_thread(profiler.stop)
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.merge(SyncRunProfile(
+                    run_id=run_id,
+                    user_id=user_id,
+                    sync_type=sync_type,
+                    sample_count=sum(profiler.samples.values()),
+                    interval_ms=profiler.interval * 1000,
+                    duration_ms=int((time.time() - started) * 1000),
+                    folded_stacks=folded,
+                    created_at=datetime.utcnow()
+                ))
+                await db.commit()
+            logger.info(f"Stored sampling profile for sync run {run_id}")
+        except Exception as e:
+            logger.error(f"Failed to store profile for sync run {run_id}: {str(e)}")
+
+
+async def get_run_profile_async(run_id: str, user_id: str) -> Optional[SyncRunProfile]:
+    """Stored sampling profile of a sync run"""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(SyncRunProfile).where(
+                SyncRunProfile.run_id == run_id,
+                SyncRunProfile.user_id == user_id
+            )
+        )
+        return result.scalar_one_or_none()
+
+
 def cancel_sync(run_id: str, user_id: str) -> bool:
     """Mark a sync run as cancelled"""
     _cancelled_run_ids.add(run_id)
@@ -270,7 +494,7 @@ def cancel_sync(run_id: str, user_id: str) -> bool:
             event_type='cancelled',
             level='warning',
             message='Sync operation cancelled by user',
-            timestamp=datetime.utcnow()
+            timestamp=_event_time(event)
         )
         db.add(cancel_event)
         db.commit()
@@ -293,22 +517,44 @@ def get_sync_events_from_db(run_id: str, user_id: str) -> list:
             SyncEventLog.user_id == user_id
         ).order_by(SyncEventLog.timestamp).all()
         
-        return [{
-            'run_id': e.run_id,
-            'event_type': e.event_type,
-            'level': e.level,
-            'message': e.message,
-            'http_method': e.http_method,
-            'http_url': e.http_url,
-            'http_status': e.http_status,
-            'http_duration_ms': e.http_duration_ms,
-            'current_page': e.current_page,
-            'total_pages': e.total_pages,
-            'items_fetched': e.items_fetched,
-            'items_stored': e.items_stored,
-            'progress_pct': e.progress_pct,
-            'extra_data': e.extra_data,
-            'timestamp': e.timestamp.isoformat()
-        } for e in events]
+        return [_event_to_dict(e) for e in events]
     finally:
         db.close()
+
+
+async def get_sync_events_from_db_async(run_id: str, user_id: str, after_id: int = 0) -> List[Dict[str, Any]]:
+    """
+    Retrieve sync events for a run_id from database (async engine).
+    Pass after_id (the last seen event id) to fetch only newer events.
+    """
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(SyncEventLog).where(
+                SyncEventLog.run_id == run_id,
+                SyncEventLog.user_id == user_id,
+                SyncEventLog.id > after_id
+            ).order_by(SyncEventLog.id)
+        )
+        return [_event_to_dict(e) for e in result.scalars().all()]
+
+
+def _event_to_dict(e: SyncEventLog) -> Dict[str, Any]:
+    """Serialize a SyncEventLog row"""
+    return {
+        'id': e.id,
+        'run_id': e.run_id,
+        'event_type': e.event_type,
+        'level': e.level,
+        'message': e.message,
+        'http_method': e.http_method,
+        'http_url': e.http_url,
+        'http_status': e.http_status,
+        'http_duration_ms': e.http_duration_ms,
+        'current_page': e.current_page,
+        'total_pages': e.total_pages,
+        'items_fetched': e.items_fetched,
+        'items_stored': e.items_stored,
+        'progress_pct': e.progress_pct,
+        'extra_data': e.extra_data,
+        'timestamp': e.timestamp.isoformat()
+    }
@@ -1,16 +1,165 @@
+"""
+Logging setup for the API process.
+
+Records from every logger go through a QueueHandler on the root logger; a
+QueueListener thread formats them and writes them to stdout, so log I/O never
+blocks the event loop. Output is one JSON object per line (LOG_FORMAT=text for
+the old layout) and carries the request id of the request that emitted it.
+
+Levels come from settings: LOG_LEVEL for the root logger and LOG_LEVELS for
+per-module overrides ("sqlalchemy.engine=INFO,app.services.ebay=DEBUG"). DEBUG
+records are sampled per call site, keeping 1 in LOG_DEBUG_SAMPLE_RATE after the
+first. SQL echo is the sqlalchemy.engine level and can be flipped at runtime
+with set_sql_echo.
+"""
+import atexit
+import contextvars
 import logging
+import logging.handlers
+import queue
 import sys
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Any, Dict, Optional
 import json
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+from app.config import settings
+
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+SQL_LOGGER = "sqlalchemy.engine"
+
+# LogRecord attributes that are not user-supplied `extra` fields
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "rid"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record; `extra` fields are included as keys"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "rid", None):
+            entry["rid"] = record.rid
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamps records with the current request id while still on the emitting task"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.rid = request_id_var.get()
+        return True
+
+
+class DebugSamplingFilter(logging.Filter):
+    """Keeps the first DEBUG record of each call site, then 1 in `rate`"""
+
+    def __init__(self, rate: int):
+        super().__init__()
+        self.rate = max(rate, 1)
+        self._seen: Dict[tuple, int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate == 1:
+            return True
+        site = (record.pathname, record.lineno)
+        count = self._seen.get(site, 0)
+        self._seen[site] = count + 1
+        return count % self.rate == 0
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve args now (they may be mutated later) but keep exc_info for the formatter
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue: Optional[queue.SimpleQueue] = None
+
+
+def parse_log_levels(spec: str) -> Dict[str, str]:
+    """"name=LEVEL,name=LEVEL" -> {name: LEVEL}"""
+    levels = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def set_log_levels(levels: Dict[str, str]):
+    for name, level in levels.items():
+        logging.getLogger(name).setLevel(level)
+
+
+def set_sql_echo(enabled: bool):
+    """Statement logging for all engines; takes effect on the next connection checkout"""
+    logging.getLogger(SQL_LOGGER).setLevel(logging.INFO if enabled else logging.WARNING)
+
+
+def sql_echo_enabled() -> bool:
+    return logging.getLogger(SQL_LOGGER).isEnabledFor(logging.INFO)
+
+
+def configure_logging():
+    """Install the queue pipeline on the root logger; safe to call more than once"""
+    global _listener, _queue
+    if _listener is not None:
+        return
+
+    stream = logging.StreamHandler(sys.stdout)
+    if settings.LOG_FORMAT == "text":
+        stream.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s rid=%(rid)s :: %(message)s"))
+    else:
+        stream.setFormatter(JsonFormatter())
+
+    _queue = queue.SimpleQueue()
+    handler = _QueueHandler(_queue)
+    handler.addFilter(RequestIdFilter())
+    handler.addFilter(DebugSamplingFilter(settings.LOG_DEBUG_SAMPLE_RATE))
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(settings.LOG_LEVEL.upper())
+
+    set_sql_echo(settings.SQL_ECHO)
+    set_log_levels(parse_log_levels(settings.LOG_LEVELS))
+
+    _listener = logging.handlers.QueueListener(handler.queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def log_queue_depth() -> int:
+    """Records waiting for the listener thread"""
+    return _queue.qsize() if _queue is not None else 0
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+configure_logging()
 
 logger = logging.getLogger("ebay_connector")
 
@@ -0,0 +1,337 @@
+"""
+In-process metrics in the Prometheus text format, served at /metrics.
+
+Recording is a dict update under a lock, so instrumentation stays on in
+production. Values that already live elsewhere (pool state, queue sizes,
+active sync runs) are not tracked continuously: collectors registered with
+`collector` read them when /metrics is scraped.
+
+eBay API calls are measured by InstrumentedTransport, which ebay_http_client
+installs on the httpx clients. Each call is labelled with its API family and
+the user bound to the current task with bind_ebay_user. Sync runs use the
+user's token and do not know which of the user's eBay accounts it belongs to,
+so calls are attributed to users, not to ebay_accounts rows.
+"""
+import asyncio
+import contextvars
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import httpx
+
+from app.services.call_budget import call_ledger
+from app.utils.profiling import sync_phase
+from app.utils.tracing import SPAN_KIND_CLIENT, span
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+EBAY_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0)
+
+# How often the event-loop lag probe wakes up
+LOOP_LAG_INTERVAL_SECONDS = 0.5
+
+ebay_user_var: contextvars.ContextVar[str] = contextvars.ContextVar("ebay_user", default="unknown")
+
+_metrics: List["_Metric"] = []
+_collectors: List[Tuple["_CollectedGauge", Callable[[], Iterable[Tuple[Dict[str, str], float]]]]] = []
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, object] = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _samples(self) -> Iterable[Tuple[str, Dict[str, str], float]]:
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield self.name, dict(zip(self.labelnames, key)), value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for name, labels, value in self._samples():
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def _samples(self):
+        with self._lock:
+            items = [(key, (list(s[0]), s[1], s[2])) for key, s in self._values.items()]
+        for key, (counts, total, count) in items:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket", {**labels, "le": repr(bound)}, cumulative
+            yield f"{self.name}_bucket", {**labels, "le": "+Inf"}, count
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, count
+
+
+class _CollectedGauge:
+    """Gauge family whose samples come from a collector at scrape time"""
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+
+
+def collector(name: str, documentation: str):
+    """Register a function yielding (labels, value) pairs for gauge `name`, read on every scrape"""
+    def register(fn: Callable[[], Iterable[Tuple[Dict[str, str], float]]]):
+        _collectors.append((_CollectedGauge(name, documentation), fn))
+        return fn
+    return register
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    for family, fn in _collectors:
+        lines.append(f"# HELP {family.name} {family.documentation}")
+        lines.append(f"# TYPE {family.name} gauge")
+        try:
+            for labels, value in fn():
+                lines.append(f"{family.name}{_format_labels(labels)} {value}")
+        except Exception:
+            # A failing collector must not take down the scrape
+            continue
+    return "\n".join(lines) + "\n"
+
+
+# --- eBay API calls ---
+
+ebay_request_duration = Histogram(
+    "ebay_api_request_duration_seconds", "eBay API call latency until response headers",
+    ("api", "user"), EBAY_LATENCY_BUCKETS,
+)
+ebay_requests = Counter(
+    "ebay_api_requests_total", "eBay API calls by response status class",
+    ("api", "user", "status"),
+)
+token_refreshes = Counter("ebay_token_refreshes_total", "eBay token refresh attempts by outcome", ("source", "outcome"))
+
+# --- Sync runs ---
+
+sync_records_fetched = Counter("sync_records_fetched_total", "Records fetched from eBay by sync resource", ("resource",))
+sync_records_stored = Counter("sync_records_stored_total", "Records stored by sync resource", ("resource",))
+sync_runs = Counter("sync_runs_total", "Finished sync runs by resource and outcome", ("resource", "outcome"))
+
+# --- Background workers ---
+
+worker_busy_seconds = Counter("worker_busy_seconds_total", "Time background workers spent running a cycle", ("worker",))
+worker_cycles = Counter("worker_cycles_total", "Background worker cycles by outcome", ("worker", "outcome"))
+worker_busy = Gauge("worker_busy", "1 while a background worker is running a cycle", ("worker",))
+
+# --- Event loop ---
+
+event_loop_lag = Histogram(
+    "event_loop_lag_seconds", "Delay of the event loop in waking up a timer",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+event_loop_lag_last = Gauge("event_loop_lag_last_seconds", "Most recent event loop lag sample")
+
+
+def ebay_api_family(url: httpx.URL) -> str:
+    """Coarse API name for an eBay URL: sell.fulfillment, commerce.identity, trading, oauth..."""
+    path = url.path
+    if "/oauth2/" in path:
+        return "oauth"
+    if path.startswith("/ws/api.dll"):
+        return "trading"
+    parts = [p for p in path.split("/") if p]
+    if not parts:
+        return "other"
+    if parts[0] in ("sell", "buy", "commerce", "developer") and len(parts) > 1:
+        return f"{parts[0]}.{parts[1]}"
+    return parts[0]
+
+
+class _PhasedStream(httpx.AsyncByteStream):
+    """Response body stream whose reads are charged to the sync run's http phase"""
+
+    def __init__(self, stream: httpx.AsyncByteStream):
+        self._stream = stream
+
+    async def __aiter__(self):
+        chunks = self._stream.__aiter__()
+        while True:
+            with sync_phase("http"):
+                try:
+                    chunk = await chunks.__anext__()
+                except StopAsyncIteration:
+                    return
+            yield chunk
+
+    async def aclose(self):
+        await self._stream.aclose()
+
+
+class InstrumentedTransport(httpx.AsyncBaseTransport):
+    """
+    Times each request until its response headers arrive and counts it by status
+    class. Inside a sync run, the request and the body reads count as its http phase.
+    Each call is also a tracing span.
+    """
+
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self._transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        api = ebay_api_family(request.url)
+        if api == "trading" and request.headers.get("X-EBAY-API-CALL-NAME"):
+            api = f"trading.{request.headers['X-EBAY-API-CALL-NAME']}"
+        user = ebay_user_var.get()
+        started = time.perf_counter()
+        try:
+            with sync_phase("http"), span("ebay.http", kind=SPAN_KIND_CLIENT, api=api, user=user,
+                                          http_method=request.method, http_path=request.url.path) as call:
+                response = await self._transport.handle_async_request(request)
+                if call is not None:
+                    call.set_attribute("http_status", response.status_code)
+        except Exception:
+            ebay_requests.inc(api=api, user=user, status="error")
+            raise
+        finally:
+            ebay_request_duration.observe(time.perf_counter() - started, api=api, user=user)
+        ebay_requests.inc(api=api, user=user, status=f"{response.status_code // 100}xx")
+        call_ledger.record(api.split(".")[0] if api.startswith("trading.") else api, user)
+        response.stream = _PhasedStream(response.stream)
+        return response
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+def ebay_http_client(**kwargs) -> httpx.AsyncClient:
+    """httpx.AsyncClient for eBay calls, with per-call metrics"""
+    return httpx.AsyncClient(transport=InstrumentedTransport(), **kwargs)
+
+
+def bind_ebay_user(user_id: Optional[str]):
+    """Label the current task's eBay calls with the user whose token they use"""
+    ebay_user_var.set(user_id or "unknown")
+
+
+@asynccontextmanager
+async def track_worker(worker: str):
+    """
+    Busy time, busy flag and outcome of one background worker cycle. The body may
+    set cycle["outcome"] for cycles that report failure without raising.
+    """
+    started = time.perf_counter()
+    worker_busy.set(1, worker=worker)
+    cycle = {"outcome": "ok"}
+    try:
+        yield cycle
+        worker_cycles.inc(worker=worker, outcome=cycle["outcome"])
+    except Exception:
+        worker_cycles.inc(worker=worker, outcome="error")
+        raise
+    finally:
+        worker_busy.set(0, worker=worker)
+        worker_busy_seconds.inc(time.perf_counter() - started, worker=worker)
+
+
+async def monitor_event_loop_lag(interval: float = LOOP_LAG_INTERVAL_SECONDS):
+    """Sleep `interval` in a loop and record how late each wake-up is"""
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lag = max(loop.time() - expected, 0.0)
+        event_loop_lag.observe(lag)
+        event_loop_lag_last.set(lag)
+
+
+@collector("db_pool_connections", "SQLAlchemy pool connections by engine and state")
+def _pool_connections():
+    from app.models_sqlalchemy import async_engine, engine
+
+    for name, pool in (("sync", engine.pool), ("async", async_engine.sync_engine.pool)):
+        if not hasattr(pool, "checkedout"):
+            continue
+        yield {"engine": name, "state": "checked_out"}, pool.checkedout()
+        yield {"engine": name, "state": "checked_in"}, pool.checkedin()
+        yield {"engine": name, "state": "overflow"}, max(pool.overflow(), 0)
+        yield {"engine": name, "state": "size"}, pool.size()
+
+
+@collector("ebay_api_budget_remaining", "eBay calls left today per API under the shared daily limit")
+def _ebay_budget_remaining():
+    for api, remaining in call_ledger.cached_remaining().items():
+        yield {"api": api}, remaining
+
+
+@collector("log_queue_depth", "Log records waiting for the logging listener thread")
+def _log_queue_depth():
+    from app.utils.logger import log_queue_depth
+
+    yield {}, log_queue_depth()
@@ -0,0 +1,116 @@
+"""
+Keyset (cursor) pagination helpers for the grid endpoints.
+
+A cursor is an opaque token holding the sort column, the direction and the
+(sort value, id) of the last row of the previous page. The next page is read
+with a row comparison on (sort column, id) instead of OFFSET, so it costs the
+same on page 400 as on page 1 as long as a matching (sort column, id) index exists.
+
+Ordering follows Postgres defaults (ASC NULLS LAST, DESC NULLS FIRST) so that a
+single ascending btree index serves both directions.
+"""
+import base64
+import binascii
+import enum
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import and_, asc, desc, literal, or_, tuple_
+
+
+def _encode_value(value: Any) -> List[Any]:
+    """Encode a sort value as [type, value] so it survives the JSON round trip"""
+    if value is None:
+        return [None, None]
+    if isinstance(value, enum.Enum):
+        return ["str", value.name]
+    if isinstance(value, datetime):
+        return ["dt", value.isoformat()]
+    if isinstance(value, Decimal):
+        return ["dec", str(value)]
+    return ["raw", value]
+
+
+def _decode_value(encoded: List[Any]) -> Any:
+    kind, value = encoded
+    if kind == "dt":
+        return datetime.fromisoformat(value)
+    if kind == "dec":
+        return Decimal(value)
+    return value
+
+
+def encode_cursor(sort: str, direction: str, value: Any, row_id: Any) -> str:
+    """Build the opaque cursor pointing after a row"""
+    payload = {"s": sort, "d": direction, "v": _encode_value(value), "id": _encode_value(row_id)}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, direction: str) -> Tuple[Any, Any]:
+    """
+    Decode a cursor into (sort value, id).
+    Raises 400 if the cursor is malformed or was issued for another sort/direction.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        value = _decode_value(payload["v"])
+        row_id = _decode_value(payload["id"])
+    except (ValueError, KeyError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if payload.get("s") != sort or payload.get("d") != direction:
+        raise HTTPException(status_code=400, detail="Cursor does not match the requested sort")
+
+    return value, row_id
+
+
+def keyset_order_by(sort_col, id_col, direction: str) -> list:
+    """ORDER BY clauses for a keyset-paginated query"""
+    order = desc if direction == "desc" else asc
+    return [order(sort_col), order(id_col)]
+
+
+def keyset_filter(sort_col, id_col, direction: str, value: Any, row_id: Any):
+    """WHERE clause selecting the rows after (value, row_id) in the keyset order"""
+    if direction == "desc":
+        if value is None:
+            return or_(sort_col.isnot(None), id_col < row_id)
+        return tuple_(sort_col, id_col) < tuple_(literal(value, sort_col.type), literal(row_id, id_col.type))
+
+    if value is None:
+        return and_(sort_col.is_(None), id_col > row_id)
+    return or_(
+        tuple_(sort_col, id_col) > tuple_(literal(value, sort_col.type), literal(row_id, id_col.type)),
+        sort_col.is_(None)
+    )
+
+
+def keyset_sql(sort_col: str, id_col: str, direction: str, value: Any, row_id: Any) -> Tuple[str, Dict[str, Any]]:
+    """Raw SQL counterpart of keyset_filter for the text() queries"""
+    params = {"cursor_value": value, "cursor_id": row_id}
+    if direction == "desc":
+        if value is None:
+            return f"({sort_col} IS NOT NULL OR {id_col} < :cursor_id)", params
+        return f"({sort_col}, {id_col}) < (:cursor_value, :cursor_id)", params
+
+    if value is None:
+        return f"({sort_col} IS NULL AND {id_col} > :cursor_id)", params
+    return f"(({sort_col}, {id_col}) > (:cursor_value, :cursor_id) OR {sort_col} IS NULL)", params
+
+
+def next_cursor(rows: list, limit: int, sort: str, direction: str, key,
+                has_more: Optional[bool] = None) -> Optional[str]:
+    """
+    Cursor for the page after `rows`, or None on the last page.
+    `key(row)` returns the row's (sort value, id). Pass has_more when the page was
+    fetched with limit + 1; otherwise a full page is assumed to have a successor.
+    """
+    if has_more is False or len(rows) < limit or not rows:
+        return None
+    value, row_id = key(rows[-1])
+    return encode_cursor(sort, direction, value, row_id)
@@ -0,0 +1,172 @@
+"""
+Phase timing and sampling profiles for sync runs.
+
+A sync run binds a PhaseTimer to its task. Code on the sync path wraps its work
+in `sync_phase(name)` (HTTP, JSON decoding, normalization, DB writes,
+cancellation checks, event logging, throttling sleeps); outside a bound run the
+context manager only costs a contextvar lookup. Phases nest and time is
+exclusive: a DB write that logs an event is charged to event_log for that part.
+Wall time not covered by any phase is reported as `other`.
+
+SamplingProfiler samples the event loop thread's stack while a given task is
+the one running and folds the samples into collapsed-stack text, the input
+format of flamegraph.pl and speedscope.
+"""
+import asyncio
+import contextvars
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+SYNC_PHASES = ("http", "json", "normalize", "db", "cancel_check", "event_log", "sleep")
+
+DEFAULT_SAMPLE_INTERVAL_SECONDS = 0.005
+
+# Stops a runaway profile from growing without bound
+MAX_PROFILE_SAMPLES = 200_000
+
+_phase_timer: contextvars.ContextVar[Optional["PhaseTimer"]] = contextvars.ContextVar("sync_phase_timer", default=None)
+
+
+class PhaseTimer:
+    """Exclusive wall time per phase, in total and since the last page"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.totals: Dict[str, float] = {}
+        self._page: Dict[str, float] = {}
+        self._page_started = self.started
+        self._stack: List[List] = []
+
+    def _charge(self, name: str, seconds: float):
+        self.totals[name] = self.totals.get(name, 0.0) + seconds
+        self._page[name] = self._page.get(name, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name: str):
+        now = time.perf_counter()
+        if self._stack:
+            parent = self._stack[-1]
+            self._charge(parent[0], now - parent[1])
+        entry = [name, now]
+        self._stack.append(entry)
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            self._charge(name, now - entry[1])
+            self._stack.pop()
+            if self._stack:
+                self._stack[-1][1] = now
+
+    @staticmethod
+    def _breakdown(phases: Dict[str, float], wall: float) -> Dict[str, int]:
+        result = {name: int(phases.get(name, 0.0) * 1000) for name in SYNC_PHASES}
+        result["other"] = max(int((wall - sum(phases.values())) * 1000), 0)
+        result["wall"] = int(wall * 1000)
+        return result
+
+    def page_breakdown(self) -> Dict[str, int]:
+        """Milliseconds per phase since the previous call, then start a new page"""
+        now = time.perf_counter()
+        breakdown = self._breakdown(self._page, now - self._page_started)
+        self._page = {}
+        self._page_started = now
+        return breakdown
+
+    def summary(self) -> Dict[str, int]:
+        """Milliseconds per phase since the run started"""
+        return self._breakdown(self.totals, time.perf_counter() - self.started)
+
+
+def bind_phase_timer(timer: Optional[PhaseTimer]):
+    """Make `timer` collect the sync phases of the current task"""
+    _phase_timer.set(timer)
+
+
+@contextmanager
+def sync_phase(name: str):
+    timer = _phase_timer.get()
+    if timer is None:
+        yield
+        return
+    with timer.phase(name):
+        yield
+
+
+async def sync_sleep(seconds: float):
+    """asyncio.sleep charged to the sleep phase"""
+    with sync_phase("sleep"):
+        await asyncio.sleep(seconds)
+
+
+def decode_json(response):
+    """response.json() charged to the json phase"""
+    with sync_phase("json"):
+        return response.json()
+
+
+def _frame_label(frame) -> str:
+    module = frame.f_globals.get("__name__", "?")
+    return f"{frame.f_code.co_name} ({module})"
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampler for one asyncio task. A background thread wakes every
+    `interval` seconds; if the task is the one running on its loop, the loop
+    thread's stack is recorded from the first app frame down, otherwise the
+    sample is counted as (waiting).
+    """
+
+    def __init__(self, task: asyncio.Task, interval: float = DEFAULT_SAMPLE_INTERVAL_SECONDS):
+        self.task = task
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._loop = task.get_loop()
+        self._thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sync-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> str:
+        """Stop sampling and return the collapsed stacks"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.folded()
+
+    def _run(self):
+        taken = 0
+        while not self._stop.wait(self.interval) and taken < MAX_PROFILE_SAMPLES:
+            if asyncio.current_task(self._loop) is not self.task:
+                self.samples["(waiting)"] += 1
+            else:
+                frame = sys._current_frames().get(self._thread_id)
+                if frame is None:
+                    continue
+                self.samples[self._stack(frame)] += 1
+            taken += 1
+
+    @staticmethod
+    def _stack(frame) -> str:
+        frames = []
+        while frame is not None:
+            frames.append(frame)
+            frame = frame.f_back
+        frames.reverse()
+        # Drop the event loop and server frames below the first app frame
+        for i, f in enumerate(frames):
+            if f.f_globals.get("__name__", "").startswith("app."):
+                frames = frames[i:]
+                break
+        return ";".join(_frame_label(f) for f in frames)
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
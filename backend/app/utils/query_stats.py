@@ -0,0 +1,236 @@
+"""
+Per-statement timing for every SQL statement, with sampled EXPLAIN plans.
+
+Engine events time each statement and fold it into stats keyed by its normalized
+text (literals and bind parameters replaced by ?, multi-row VALUES lists and IN
+lists collapsed), so the batch upserts and the filter builders each show up as
+one entry. At most SLOW_QUERY_MAX_STATEMENTS entries are kept; beyond that the
+ones with the least total time are dropped.
+
+Statements slower than SLOW_QUERY_THRESHOLD_MS are sent, with probability
+SLOW_QUERY_EXPLAIN_SAMPLE_RATE and at most once per EXPLAIN_INTERVAL_SECONDS per
+statement, to a background thread that runs EXPLAIN with the same parameters on
+its own connection. ANALYZE executes the statement again, so EXPLAIN (ANALYZE,
+BUFFERS) is reserved for plain reads: writes, row-locking reads (FOR UPDATE/SHARE)
+and calls to functions with side effects (pg_notify, nextval, advisory locks...)
+only get a plain EXPLAIN. The EXPLAIN runs in a READ ONLY transaction that is
+always rolled back.
+"""
+import json
+import queue
+import random
+import re
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event
+
+from app.config import settings
+from app.utils.logger import logger
+
+# Minimum time between two plans of the same statement
+EXPLAIN_INTERVAL_SECONDS = 600
+
+# EXPLAIN ANALYZE runs the query again; give up on anything slower than this
+EXPLAIN_STATEMENT_TIMEOUT = "30s"
+
+# Pending EXPLAIN requests; more are dropped
+MAX_PENDING_EXPLAINS = 16
+
+_PARAM_RE = re.compile(r"%\(\w+\)s|%s|\?")
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_WHITESPACE_RE = re.compile(r"\s+")
+_TUPLE_LIST_RE = re.compile(r"(\((?:\?, )*\?\))(?:, \1)+")
+_IN_LIST_RE = re.compile(r"\bIN \((?:\?, )+\?\)", re.IGNORECASE)
+_WRITE_RE = re.compile(r"\b(?:INSERT|UPDATE|DELETE|MERGE|TRUNCATE)\b", re.IGNORECASE)
+_LOCKING_RE = re.compile(r"\bFOR\s+(?:NO\s+KEY\s+UPDATE|UPDATE|KEY\s+SHARE|SHARE)\b", re.IGNORECASE)
+_SIDE_EFFECT_RE = re.compile(
+    r"\b(?:pg_notify|nextval|setval|pg_advisory\w*|pg_try_advisory\w*|set_config)\s*\(", re.IGNORECASE
+)
+
+
+@lru_cache(maxsize=2048)
+def normalize_statement(statement: str) -> str:
+    """Statement text with literals and parameters replaced by ? and value lists collapsed"""
+    text = _WHITESPACE_RE.sub(" ", statement).strip()
+    text = _STRING_RE.sub("?", text)
+    text = _PARAM_RE.sub("?", text)
+    text = _NUMBER_RE.sub("?", text)
+    text = _TUPLE_LIST_RE.sub(r"\1, ...", text)
+    return _IN_LIST_RE.sub("IN (...)", text)
+
+
+def _is_read_only(statement: str) -> bool:
+    """Whether running the statement again has no effect beyond reading (safe for ANALYZE)"""
+    return (
+        statement.lstrip()[:6].upper().startswith(("SELECT", "WITH"))
+        and not _WRITE_RE.search(statement)
+        and not _LOCKING_RE.search(statement)
+        and not _SIDE_EFFECT_RE.search(statement)
+    )
+
+
+class StatementStats:
+    __slots__ = ("statement", "calls", "total_ms", "max_ms", "rows", "slow_calls", "last_seen",
+                 "plan", "plan_ms", "plan_analyzed", "plan_captured_at", "_plan_requested_at")
+
+    def __init__(self, statement: str):
+        self.statement = statement
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.slow_calls = 0
+        self.last_seen = 0.0
+        self.plan: Optional[Any] = None
+        self.plan_ms: Optional[float] = None
+        self.plan_analyzed = False
+        self.plan_captured_at: Optional[float] = None
+        self._plan_requested_at = 0.0
+
+    def to_dict(self, include_plan: bool = True) -> Dict[str, Any]:
+        entry = {
+            "statement": self.statement,
+            "calls": self.calls,
+            "total_ms": round(self.total_ms, 1),
+            "mean_ms": round(self.total_ms / self.calls, 2) if self.calls else 0.0,
+            "max_ms": round(self.max_ms, 1),
+            "rows": self.rows,
+            "slow_calls": self.slow_calls,
+            "last_seen": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.last_seen)),
+            "has_plan": self.plan is not None,
+        }
+        if include_plan and self.plan is not None:
+            entry["plan"] = self.plan
+            entry["plan_duration_ms"] = self.plan_ms
+            entry["plan_analyzed"] = self.plan_analyzed
+            entry["plan_captured_at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.plan_captured_at))
+        return entry
+
+
+class QueryStats:
+    """Statement stats of this process, shared by every instrumented engine"""
+
+    def __init__(self, max_statements: int):
+        self.max_statements = max_statements
+        self._stats: Dict[str, StatementStats] = {}
+        self._lock = threading.Lock()
+        self._explains: "queue.Queue" = queue.Queue(MAX_PENDING_EXPLAINS)
+        self._explainer: Optional[threading.Thread] = None
+        self.started_at = time.time()
+
+    def record(self, statement: str, parameters: Any, duration_ms: float, rowcount: int,
+               executemany: bool, explainable: bool):
+        key = normalize_statement(statement)
+        now = time.time()
+        explain = False
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                if len(self._stats) >= self.max_statements:
+                    self._evict()
+                stats = self._stats[key] = StatementStats(key)
+            stats.calls += 1
+            stats.total_ms += duration_ms
+            stats.max_ms = max(stats.max_ms, duration_ms)
+            stats.rows += max(rowcount, 0)
+            stats.last_seen = now
+            if duration_ms >= settings.SLOW_QUERY_THRESHOLD_MS:
+                stats.slow_calls += 1
+                if (explainable and not executemany
+                        and now - stats._plan_requested_at >= EXPLAIN_INTERVAL_SECONDS
+                        and random.random() < settings.SLOW_QUERY_EXPLAIN_SAMPLE_RATE):
+                    stats._plan_requested_at = now
+                    explain = True
+        if explain:
+            self._request_explain(stats, statement, parameters)
+
+    def _evict(self):
+        """Drop the quarter of entries with the least total time (lock held)"""
+        keep = sorted(self._stats.values(), key=lambda s: s.total_ms, reverse=True)[: self.max_statements * 3 // 4]
+        self._stats = {s.statement: s for s in keep}
+
+    def _request_explain(self, stats: StatementStats, statement: str, parameters: Any):
+        if self._explainer is None:
+            with self._lock:
+                if self._explainer is None:
+                    self._explainer = threading.Thread(target=self._run_explains, name="query-explain", daemon=True)
+                    self._explainer.start()
+        try:
+            self._explains.put_nowait((stats, statement, parameters))
+        except queue.Full:
+            pass
+
+    def _run_explains(self):
+        while True:
+            stats, statement, parameters = self._explains.get()
+            try:
+                self._explain(stats, statement, parameters)
+            except Exception as e:
+                logger.warning(f"EXPLAIN of slow statement failed: {e}")
+
+    def _explain(self, stats: StatementStats, statement: str, parameters: Any):
+        from app.models_sqlalchemy import engine
+
+        analyze = _is_read_only(statement)
+        options = "ANALYZE, BUFFERS, FORMAT JSON" if analyze else "FORMAT JSON"
+        # Raw DBAPI connection: its statements bypass the engine events
+        conn = engine.raw_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SET TRANSACTION READ ONLY")
+            cursor.execute(f"SET LOCAL statement_timeout = '{EXPLAIN_STATEMENT_TIMEOUT}'")
+            started = time.perf_counter()
+            cursor.execute(f"EXPLAIN ({options}) {statement}", parameters or None)
+            plan = cursor.fetchone()[0]
+            elapsed = (time.perf_counter() - started) * 1000
+        finally:
+            try:
+                conn.rollback()
+            finally:
+                conn.close()
+
+        with self._lock:
+            stats.plan = json.loads(plan) if isinstance(plan, str) else plan
+            stats.plan_ms = round(elapsed, 1)
+            stats.plan_analyzed = analyze
+            stats.plan_captured_at = time.time()
+
+    def top(self, limit: int, order_by: str = "total_ms", include_plans: bool = True) -> List[Dict[str, Any]]:
+        with self._lock:
+            entries = [s.to_dict(include_plans) for s in self._stats.values()]
+        return sorted(entries, key=lambda e: e[order_by], reverse=True)[:limit]
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+            self.started_at = time.time()
+
+    def __len__(self) -> int:
+        return len(self._stats)
+
+
+query_stats = QueryStats(settings.SLOW_QUERY_MAX_STATEMENTS)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_query_started", None)
+    if started is None:
+        return
+    query_stats.record(
+        statement, parameters, (time.perf_counter() - started) * 1000, cursor.rowcount,
+        executemany, conn.dialect.name == "postgresql",
+    )
+
+
+def track_query_stats(engine):
+    """Time every statement executed through `engine` (a sync Engine) into query_stats"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
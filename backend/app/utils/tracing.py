@@ -0,0 +1,269 @@
+"""
+Lightweight tracing for requests and sync runs.
+
+A trace starts at a root span: one per HTTP request (request_logger middleware)
+and one per sync run (SyncEventLogger.start_trace), the latter linked to the
+request that started it. Below them, spans cover each sync page, eBay call,
+normalization batch, batch write and SQL statement. Every root carries the
+request id, sync roots also the run_id.
+
+Sampling is decided once per root with probability TRACE_SAMPLE_RATE and
+inherited by everything below it, so an unsampled trace costs a contextvar
+lookup per instrumented call. Finished spans go through a bounded queue to an
+exporter thread that writes them as OTLP/JSON, either appended to TRACE_FILE
+(one export request per line) or POSTed to TRACE_OTLP_ENDPOINT.
+"""
+import contextvars
+import json
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from sqlalchemy import event
+
+from app.config import settings
+from app.utils.logger import logger
+
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+STATUS_ERROR = 2
+
+# Finished spans waiting for export; spans beyond this are dropped
+MAX_QUEUED_SPANS = 10_000
+EXPORT_BATCH_SIZE = 512
+EXPORT_INTERVAL_SECONDS = 2.0
+
+# Statements are recorded up to this length
+MAX_STATEMENT_LENGTH = 500
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("trace_span", default=None)
+
+
+class Span:
+    """A timed operation; unsampled spans only keep the context in order"""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent", "sampled", "kind", "attributes",
+                 "links", "start_ns", "end_ns", "error")
+
+    def __init__(self, name: str, trace_id: str, parent: Optional["Span"], sampled: bool,
+                 kind: int = SPAN_KIND_INTERNAL, attributes: Optional[Dict[str, Any]] = None,
+                 links: Optional[List[Tuple[str, str]]] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent = parent
+        self.sampled = sampled
+        self.kind = kind
+        self.attributes = attributes or {}
+        self.links = links or []
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any):
+        if self.sampled:
+            self.attributes[key] = value
+
+    def end(self, error: Optional[BaseException] = None):
+        """Finish the span and make its parent current again"""
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        _current_span.set(self.parent)
+        if self.sampled:
+            if error is not None:
+                self.error = f"{type(error).__name__}: {error}"
+            _exporter.submit(self)
+
+
+def _new_trace_id() -> str:
+    return f"{random.getrandbits(128):032x}"
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def start_span(name: str, root: bool = False, kind: int = SPAN_KIND_INTERNAL, **attributes) -> Optional[Span]:
+    """
+    Start a span and make it current; call .end() on it when done. Returns None
+    inside an unsampled trace. root=True starts a new trace linked to the current
+    span, keeping its sampling decision.
+    """
+    parent = _current_span.get()
+    if parent is not None and not parent.sampled and not root:
+        return None
+
+    if root or parent is None:
+        if parent is not None:
+            sampled = parent.sampled
+        else:
+            sampled = settings.TRACE_SAMPLE_RATE > 0 and random.random() < settings.TRACE_SAMPLE_RATE
+        links = [(parent.trace_id, parent.span_id)] if parent is not None and sampled else None
+        new = Span(name, _new_trace_id(), parent, sampled, kind, attributes if sampled else None, links)
+    else:
+        new = Span(name, parent.trace_id, parent, True, kind, attributes)
+
+    _current_span.set(new)
+    return new
+
+
+@contextmanager
+def span(name: str, root: bool = False, kind: int = SPAN_KIND_INTERNAL, **attributes):
+    """Context manager around start_span; yields None inside an unsampled trace"""
+    current = start_span(name, root, kind, **attributes)
+    if current is None:
+        yield None
+        return
+    try:
+        yield current
+    except BaseException as e:
+        current.end(e)
+        raise
+    current.end()
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_span(span: Span) -> Dict[str, Any]:
+    entry = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": span.kind,
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.end_ns),
+        "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in span.attributes.items() if v is not None],
+    }
+    if span.parent is not None and span.parent.trace_id == span.trace_id:
+        entry["parentSpanId"] = span.parent.span_id
+    if span.links:
+        entry["links"] = [{"traceId": trace_id, "spanId": span_id} for trace_id, span_id in span.links]
+    if span.error:
+        entry["status"] = {"code": STATUS_ERROR, "message": span.error}
+    return entry
+
+
+def otlp_payload(spans: List[Span]) -> Dict[str, Any]:
+    """OTLP/JSON ExportTraceServiceRequest for `spans`"""
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": settings.TRACE_SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": "app.utils.tracing"}, "spans": [_otlp_span(s) for s in spans]}],
+        }]
+    }
+
+
+class _SpanExporter:
+    """Exporter thread, started with the first sampled span"""
+
+    def __init__(self):
+        self._queue: "queue.Queue[Optional[Span]]" = queue.Queue(MAX_QUEUED_SPANS)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def submit(self, span: Span):
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        client = httpx.Client(timeout=10) if settings.TRACE_EXPORTER == "otlp" else None
+        running = True
+        while running:
+            batch: List[Span] = []
+            deadline = time.monotonic() + EXPORT_INTERVAL_SECONDS
+            while len(batch) < EXPORT_BATCH_SIZE:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is None:
+                    running = False
+                    break
+                batch.append(item)
+            if batch:
+                try:
+                    self._export(batch, client)
+                except Exception as e:
+                    logger.warning(f"Failed to export {len(batch)} trace spans: {e}")
+        if client is not None:
+            client.close()
+
+    def _export(self, batch: List[Span], client: Optional[httpx.Client]):
+        payload = otlp_payload(batch)
+        if client is not None:
+            client.post(settings.TRACE_OTLP_ENDPOINT, json=payload).raise_for_status()
+        else:
+            with open(settings.TRACE_FILE, "a") as f:
+                f.write(json.dumps(payload) + "\n")
+
+    def shutdown(self):
+        """Export what is queued and stop the thread"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout=10)
+        self._thread = None
+
+
+_exporter = _SpanExporter()
+
+
+def shutdown_tracing():
+    _exporter.shutdown()
+
+
+def queued_spans() -> int:
+    return _exporter._queue.qsize()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._trace_span = start_span(
+        "db.statement", kind=SPAN_KIND_CLIENT,
+        db_statement=statement[:MAX_STATEMENT_LENGTH], db_executemany=executemany,
+    )
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    current = getattr(context, "_trace_span", None)
+    if current is not None:
+        current.set_attribute("db_rowcount", cursor.rowcount)
+        current.end()
+
+
+def _handle_error(exception_context):
+    current = getattr(exception_context.execution_context, "_trace_span", None)
+    if current is not None:
+        current.end(exception_context.original_exception)
+
+
+def instrument_engine(engine):
+    """Span per SQL statement executed through `engine` (a sync Engine)"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
@@ -10,6 +10,7 @@ from app.database import get_db
 from app.models_sqlalchemy.models import EbayAccount
 from app.services.health_check import run_account_health_check
 from app.utils.logger import logger
+from app.utils.metrics import track_worker
 
 
 async def run_all_health_checks():
@@ -98,7 +99,9 @@ async def run_health_check_worker_loop():
     
     while True:
         try:
-            result = await run_all_health_checks()
+            async with track_worker("health_check") as cycle:
+                result = await run_all_health_checks()
+                cycle["outcome"] = result.get("status", "ok")
             logger.info(f"Health check cycle completed: {result}")
         except Exception as e:
             logger.error(f"Health check worker loop error: {str(e)}")
@@ -10,6 +10,7 @@ from app.database import get_db
 from app.services.ebay_account_service import ebay_account_service
 from app.services.ebay import ebay_service
 from app.utils.logger import logger
+from app.utils.metrics import bind_ebay_user, token_refreshes, track_worker
 
 
 async def refresh_expiring_tokens():
@@ -43,6 +44,7 @@ async def refresh_expiring_tokens():
                 
                 if not token or not token.refresh_token:
                     logger.warning(f"Account {account.id} ({account.house_name}) has no refresh token")
+                    token_refreshes.inc(source="worker", outcome="no_refresh_token")
                     errors.append({
                         "account_id": account.id,
                         "house_name": account.house_name,
@@ -51,6 +53,7 @@ async def refresh_expiring_tokens():
                     continue
                 
                 logger.info(f"Refreshing token for account {account.id} ({account.house_name})")
+                bind_ebay_user(account.org_id)
                 
                 new_token_data = await ebay_service.refresh_access_token(token.refresh_token)
                 
@@ -70,11 +73,13 @@ async def refresh_expiring_tokens():
                 )
                 
                 refreshed_count += 1
+                token_refreshes.inc(source="worker", outcome="refreshed")
                 logger.info(f"Successfully refreshed token for account {account.id} ({account.house_name})")
                 
             except Exception as e:
                 error_msg = str(e)
                 logger.error(f"Failed to refresh token for account {account.id} ({account.house_name}): {error_msg}")
+                token_refreshes.inc(source="worker", outcome="failed")
                 
                 if token:
                     token.refresh_error = error_msg
@@ -116,7 +121,9 @@ async def run_token_refresh_worker_loop():
     
     while True:
         try:
-            result = await refresh_expiring_tokens()
+            async with track_worker("token_refresh") as cycle:
+                result = await refresh_expiring_tokens()
+                cycle["outcome"] = result.get("status", "ok")
             logger.info(f"Token refresh cycle completed: {result}")
         except Exception as e:
             logger.error(f"Token refresh worker loop error: {str(e)}")
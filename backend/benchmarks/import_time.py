@@ -0,0 +1,88 @@
+"""
+Report: import-time profile of the API process.
+
+Imports app.main in a fresh interpreter under `python -X importtime` and prints
+the slowest modules by cumulative and self time, grouped into app modules and
+third-party packages. Modules that must stay lazy (only imported inside the
+endpoints or CLIs that use them) are checked as well; the exit code is 1 if any
+of them was loaded at startup.
+
+Usage (from backend/):
+    DATABASE_URL=postgresql://... python -m benchmarks.import_time [--top 25]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+# Heavy or CLI-only modules that must not load with the app
+LAZY_MODULES = (
+    "app.utils.ebay_debugger",
+    "app.seed_data",
+    "app.services.parquet_export",
+    "app.services.migrations",
+    "pyarrow",
+    "alembic",
+)
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def profile(target: str) -> List[Tuple[str, int, int, int]]:
+    """(module, self us, cumulative us, depth) for every module imported by `import target`"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        capture_output=True, text=True, env=os.environ.copy(),
+    )
+    if result.returncode != 0:
+        sys.exit(f"import {target} failed:\n{result.stderr[-2000:]}")
+
+    modules = []
+    for line in result.stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return modules
+
+
+def _print_table(title: str, rows: List[Tuple[str, int, int, int]], top: int, key: int):
+    print(f"\n{title}")
+    print(f"{'module':<55} {'self ms':>9} {'cumul ms':>9}")
+    for name, self_us, cumulative_us, _ in sorted(rows, key=lambda r: r[key], reverse=True)[:top]:
+        print(f"{name:<55} {self_us / 1000:>9.1f} {cumulative_us / 1000:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", default="app.main")
+    parser.add_argument("--top", type=int, default=25)
+    args = parser.parse_args()
+
+    modules = profile(args.target)
+    total = next((m[2] for m in modules if m[0] == args.target), sum(m[1] for m in modules))
+    app_modules = [m for m in modules if m[0] == "app" or m[0].startswith("app.")]
+
+    packages: Dict[str, int] = {}
+    for name, self_us, _, _ in modules:
+        if not name.startswith("app"):
+            packages[name.split(".")[0]] = packages.get(name.split(".")[0], 0) + self_us
+
+    print(f"import {args.target}: {total / 1000:.1f} ms, {len(modules)} modules")
+    _print_table("App modules by cumulative time", app_modules, args.top, key=2)
+    _print_table("All modules by self time", modules, args.top, key=1)
+
+    print(f"\n{'package':<55} {'self ms':>9}")
+    for name, self_us in sorted(packages.items(), key=lambda p: p[1], reverse=True)[:args.top]:
+        print(f"{name:<55} {self_us / 1000:>9.1f}")
+
+    loaded = {m[0] for m in modules}
+    eager = [name for name in LAZY_MODULES if name in loaded]
+    print(f"\nLazy modules loaded at startup: {', '.join(eager) or 'none'}")
+    sys.exit(1 if eager else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Benchmark: inventory substring search at 1M rows, sequential scan vs pg_trgm GIN.
+
+Builds a scratch copy of the searched inventory columns in its own schema,
+fills it with synthetic rows, and times the grid's search predicates before
+and after the trigram indexes exist. The scratch schema is dropped at the end.
+
+Usage (from backend/):
+    DATABASE_URL=postgresql://... python -m benchmarks.inventory_search_trgm [--rows 1000000]
+"""
+import argparse
+import json
+import time
+
+from sqlalchemy import create_engine, text
+
+from app.models_sqlalchemy import DATABASE_URL
+from app.models_sqlalchemy.models import INVENTORY_SEARCH_TEXT_SQL
+
+SCHEMA = "bench_trgm"
+
+QUERIES = {
+    "q box (search_text)": "SELECT id FROM {schema}.inventory WHERE search_text ILIKE :pattern ORDER BY id DESC LIMIT 100",
+    "q box ranked": (
+        "SELECT id FROM {schema}.inventory WHERE search_text ILIKE :pattern "
+        "ORDER BY word_similarity(:term, search_text) DESC, id DESC LIMIT 100"
+    ),
+    "sku_code filter": "SELECT id FROM {schema}.inventory WHERE sku_code ILIKE :pattern LIMIT 100",
+    "tracking filter": "SELECT id FROM {schema}.inventory WHERE tracking_number ILIKE :pattern LIMIT 100",
+    "count(q box)": "SELECT count(*) FROM {schema}.inventory WHERE search_text ILIKE :pattern",
+}
+
+SEARCH_TERMS = ["thinkpad", "a1b2", "gpu-77", "zzzz-none"]
+
+
+def setup(conn, rows: int):
+    conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+    conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    conn.execute(text(f"""
+        CREATE TABLE {SCHEMA}.inventory (
+            id bigserial PRIMARY KEY,
+            sku_code varchar(100),
+            title text,
+            part_number varchar(100),
+            model text,
+            tracking_number varchar(100),
+            search_text text GENERATED ALWAYS AS ({INVENTORY_SEARCH_TEXT_SQL}) STORED
+        )
+    """))
+    started = time.perf_counter()
+    conn.execute(text(f"""
+        INSERT INTO {SCHEMA}.inventory (sku_code, title, part_number, model, tracking_number)
+        SELECT
+            'SKU-' || lpad(g::text, 8, '0'),
+            (ARRAY['ThinkPad', 'MacBook', 'Dell XPS', 'GPU', 'Lens', 'Camera'])[1 + g % 6]
+                || ' ' || substr(md5(g::text), 1, 12) || ' part lot',
+            upper(substr(md5((g * 7)::text), 1, 4)) || '-' || (g % 997),
+            'GPU-' || (g % 100),
+            '1Z' || substr(md5((g * 13)::text), 1, 16)
+        FROM generate_series(1, :rows) AS g
+    """), {"rows": rows})
+    conn.execute(text(f"ANALYZE {SCHEMA}.inventory"))
+    print(f"Seeded {rows:,} rows in {time.perf_counter() - started:.1f}s")
+
+
+def create_indexes(conn):
+    started = time.perf_counter()
+    for column in ("search_text", "sku_code", "tracking_number"):
+        conn.execute(text(
+            f"CREATE INDEX bench_{column}_trgm ON {SCHEMA}.inventory USING gin ({column} gin_trgm_ops)"
+        ))
+    conn.execute(text(f"ANALYZE {SCHEMA}.inventory"))
+    print(f"Built trigram indexes in {time.perf_counter() - started:.1f}s")
+
+
+def measure(conn, repeats: int):
+    """Median execution time (ms) per query and search term, plus the top plan node"""
+    results = {}
+    for name, sql in QUERIES.items():
+        for term in SEARCH_TERMS:
+            params = {"pattern": f"%{term}%", "term": term}
+            timings = []
+            node = None
+            for _ in range(repeats):
+                plan = conn.execute(
+                    text("EXPLAIN (ANALYZE, FORMAT JSON) " + sql.format(schema=SCHEMA)), params
+                ).scalar()
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                timings.append(plan[0]["Execution Time"])
+                node = _scan_node(plan[0]["Plan"])
+            timings.sort()
+            results[(name, term)] = (timings[len(timings) // 2], node)
+    return results
+
+
+def _scan_node(plan) -> str:
+    """Name of the deepest scan node of a plan"""
+    while plan.get("Plans"):
+        plan = plan["Plans"][0]
+    return plan["Node Type"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--keep", action="store_true", help="keep the scratch schema")
+    args = parser.parse_args()
+
+    engine = create_engine(DATABASE_URL, isolation_level="AUTOCOMMIT")
+    with engine.connect() as conn:
+        setup(conn, args.rows)
+        try:
+            before = measure(conn, args.repeats)
+            create_indexes(conn)
+            after = measure(conn, args.repeats)
+        finally:
+            if not args.keep:
+                conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+    print(f"\n{'query':<22} {'term':<10} {'seq ms':>10} {'trgm ms':>10} {'speedup':>8}  plan")
+    for key, (before_ms, _) in before.items():
+        after_ms, node = after[key]
+        speedup = before_ms / after_ms if after_ms else float("inf")
+        print(f"{key[0]:<22} {key[1]:<10} {before_ms:>10.2f} {after_ms:>10.2f} {speedup:>7.1f}x  {node}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Benchmark: latency of the hot read endpoints under concurrent load.
+
+Logs in as the users created by benchmarks.synthetic_data and replays the
+requests of a scenario file (default benchmarks/scenarios/read_apis.json)
+against a running API for --duration seconds, from --concurrency workers.
+Each scenario request has a weight and a list of query parameter variants; a
+worker picks a request by weight, a variant and a user at random, so the
+largest tenants are exercised along with the small ones. "{days_ago:N}" in a
+parameter becomes the ISO date N days back.
+
+Requests made during the first --warmup seconds are not counted. The report
+lists per request name the count, errors (non-2xx or transport failures),
+throughput and p50/p95/p99/max latency; --output also writes it as JSON.
+
+Usage (from backend/):
+    python -m benchmarks.load_test --base-url http://localhost:8000 [--duration 60] [--concurrency 20]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SCENARIO = os.path.join(HERE, "scenarios", "read_apis.json")
+
+EMAIL_DOMAIN = "synthetic.example.com"  # see benchmarks.synthetic_data
+
+_DAYS_AGO_RE = re.compile(r"\{days_ago:(\d+)\}")
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def expand_params(params: Dict[str, Any]) -> Dict[str, str]:
+    today = datetime.now(timezone.utc).date()
+    expanded = {}
+    for key, value in params.items():
+        if isinstance(value, bool):
+            value = "true" if value else "false"
+        value = _DAYS_AGO_RE.sub(lambda m: (today - timedelta(days=int(m.group(1)))).isoformat(), str(value))
+        expanded[key] = value
+    return expanded
+
+
+class Stats:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.statuses: Dict[str, Dict[str, int]] = {}
+
+    def record(self, name: str, seconds: float, status: str, ok: bool):
+        self.latencies.setdefault(name, []).append(seconds)
+        if not ok:
+            self.errors[name] = self.errors.get(name, 0) + 1
+        by_status = self.statuses.setdefault(name, {})
+        by_status[status] = by_status.get(status, 0) + 1
+
+    def report(self, elapsed: float) -> List[Dict[str, Any]]:
+        rows = []
+        names = sorted(self.latencies)
+        combined = sorted(v for name in names for v in self.latencies[name])
+        for name, values in [(n, sorted(self.latencies[n])) for n in names] + [("all", combined)]:
+            errors = sum(self.errors.values()) if name == "all" else self.errors.get(name, 0)
+            rows.append({
+                "name": name,
+                "requests": len(values),
+                "errors": errors,
+                "rps": round(len(values) / elapsed, 1) if elapsed else 0.0,
+                "p50_ms": round(percentile(values, 50) * 1000, 1),
+                "p95_ms": round(percentile(values, 95) * 1000, 1),
+                "p99_ms": round(percentile(values, 99) * 1000, 1),
+                "max_ms": round(values[-1] * 1000, 1) if values else 0.0,
+                "statuses": self.statuses.get(name, {}) if name != "all" else {},
+            })
+        return rows
+
+
+async def login(client: httpx.AsyncClient, users: int, password: str) -> List[str]:
+    """Bearer tokens of synthetic-000 .. synthetic-<users-1>; missing users are skipped"""
+    tokens = []
+    for i in range(users):
+        response = await client.post("/auth/login", json={"email": f"synthetic-{i:03d}@{EMAIL_DOMAIN}",
+                                                           "password": password})
+        if response.status_code != 200:
+            print(f"  login synthetic-{i:03d} failed: HTTP {response.status_code}")
+            continue
+        tokens.append(response.json()["access_token"])
+    return tokens
+
+
+async def worker(client: httpx.AsyncClient, scenario: List[Dict[str, Any]], weights: List[float],
+                 tokens: List[str], stats: Stats, rng: random.Random, measure_from: float, stop_at: float):
+    while time.monotonic() < stop_at:
+        request = rng.choices(scenario, weights=weights)[0]
+        params = expand_params(rng.choice(request.get("params") or [{}]))
+        headers = {"Authorization": f"Bearer {rng.choice(tokens)}"}
+        started = time.monotonic()
+        try:
+            response = await client.request(request.get("method", "GET"), request["path"],
+                                            params=params, headers=headers)
+            status, ok = str(response.status_code), response.is_success
+        except httpx.HTTPError as e:
+            status, ok = type(e).__name__, False
+        if started >= measure_from:
+            stats.record(request["name"], time.monotonic() - started, status, ok)
+
+
+async def run(args: argparse.Namespace) -> Optional[List[Dict[str, Any]]]:
+    with open(args.scenario) as f:
+        scenario = json.load(f)["requests"]
+    weights = [r.get("weight", 1) for r in scenario]
+    rng = random.Random(args.seed)
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        print(f"Logging in {args.users} synthetic users...")
+        tokens = await login(client, args.users, args.password)
+        if not tokens:
+            print("No user could log in; load data with benchmarks.synthetic_data first")
+            return None
+
+        stats = Stats()
+        started = time.monotonic()
+        measure_from = started + args.warmup
+        stop_at = measure_from + args.duration
+        print(f"Running {args.concurrency} workers for {args.warmup}s warmup + {args.duration}s...")
+        await asyncio.gather(*(
+            worker(client, scenario, weights, tokens, stats, random.Random(rng.random()), measure_from, stop_at)
+            for _ in range(args.concurrency)
+        ))
+        return stats.report(time.monotonic() - measure_from)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--scenario", default=DEFAULT_SCENARIO)
+    parser.add_argument("--duration", type=float, default=60, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="Seconds before measuring starts")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--users", type=int, default=10, help="Synthetic users to log in as")
+    parser.add_argument("--password", default="synthetic-load-test")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Also write the report as JSON to this file")
+    args = parser.parse_args()
+
+    rows = asyncio.run(run(args))
+    if rows is None:
+        raise SystemExit(1)
+
+    print(f"\n{'request':<22} {'count':>7} {'errors':>7} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for row in rows:
+        print(f"{row['name']:<22} {row['requests']:>7} {row['errors']:>7} {row['rps']:>7.1f} "
+              f"{row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['max_ms']:>8.1f}")
+        unexpected = {s: n for s, n in row["statuses"].items() if not s.startswith("2")}
+        if unexpected:
+            print(f"{'':<22} statuses: {unexpected}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"base_url": args.base_url, "scenario": os.path.basename(args.scenario),
+                       "concurrency": args.concurrency, "duration": args.duration, "results": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
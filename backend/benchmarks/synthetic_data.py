@@ -0,0 +1,575 @@
+"""
+Generator: bulk-load synthetic, production-sized data into a local Postgres for load tests.
+
+app/seed_data.py adds a handful of rows; this fills the tables behind the read
+APIs at the volumes where the inventory grid and the financial dashboards get
+slow: millions of inventory rows spread over warehouses and storage bins,
+hundreds of thousands of orders with line items, transactions, fees, payouts
+with their items, messages and sync event logs.
+
+Rows are streamed to the server with COPY in batches of --batch-rows. Per-user
+volumes follow a Zipf distribution over --users accounts (exponent --skew), so
+a few tenants own most of the data, as in production. All values are drawn
+from a seeded generator, so the same arguments produce the same data.
+
+Everything generated is recognizable and removed again before each load (or
+with --purge): users are synthetic-NNN@synthetic.example.com, order, payout,
+transaction and message ids start with SYN-, as do inventory SKUs and
+warehouse names. Every user's password is --password, for benchmarks.load_test.
+The daily rollups of the generated users are rebuilt and the tables analyzed
+at the end, as after a real sync. The tables keep their indexes during the
+load, so a full-size run takes several minutes.
+
+Usage (from backend/):
+    DATABASE_URL=postgresql://... python -m benchmarks.synthetic_data [--inventory 2000000] [--orders 300000] [--users 50]
+    DATABASE_URL=postgresql://... python -m benchmarks.synthetic_data --purge
+"""
+import argparse
+import csv
+import io
+import json
+import math
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple
+
+from app.models_sqlalchemy import SessionLocal, engine
+from app.models_sqlalchemy.models import (
+    ConditionType,
+    EbayStatus,
+    FeeType,
+    FulfillmentStatus,
+    InventoryStatus,
+    PaymentStatus,
+    PayoutItemType,
+    PayoutStatus,
+    ProfitStatus,
+    UserRole,
+)
+from app.services.auth import get_password_hash
+from app.services.rollups import rebuild_financial_rollups, rebuild_order_rollups
+
+EMAIL_DOMAIN = "synthetic.example.com"
+ID_PREFIX = "SYN-"
+SYNTHETIC_USERS_SQL = f"SELECT id FROM users WHERE email LIKE '%@{EMAIL_DOMAIN}'"
+
+# Children first, so no foreign key is left pointing at a deleted row
+PURGE_STATEMENTS = [
+    f"DELETE FROM payout_items WHERE payout_id LIKE '{ID_PREFIX}%'",
+    f"DELETE FROM payouts WHERE user_id IN ({SYNTHETIC_USERS_SQL})",
+    f"DELETE FROM fees WHERE user_id IN ({SYNTHETIC_USERS_SQL})",
+    f"DELETE FROM transactions WHERE user_id IN ({SYNTHETIC_USERS_SQL})",
+    f"DELETE FROM order_line_items WHERE order_id LIKE '{ID_PREFIX}%'",
+    f"DELETE FROM ebay_orders WHERE user_id IN ({SYNTHETIC_USERS_SQL})",
+    f"DELETE FROM daily_order_rollups WHERE user_id IN ({SYNTHETIC_USERS_SQL})",
+    f"DELETE FROM daily_financial_rollups WHERE user_id IN ({SYNTHETIC_USERS_SQL})",
+    f"DELETE FROM ebay_messages WHERE user_id IN ({SYNTHETIC_USERS_SQL})",
+    f"DELETE FROM sync_event_logs WHERE user_id IN ({SYNTHETIC_USERS_SQL})",
+    f"DELETE FROM ebay_accounts WHERE org_id IN ({SYNTHETIC_USERS_SQL})",
+    f"DELETE FROM users WHERE email LIKE '%@{EMAIL_DOMAIN}'",
+    f"DELETE FROM inventory WHERE sku_code LIKE '{ID_PREFIX}%'",
+    f"DELETE FROM warehouses WHERE name LIKE '{ID_PREFIX}%'",
+]
+
+ANALYZE_TABLES = ("users", "ebay_accounts", "warehouses", "inventory", "ebay_orders", "order_line_items",
+                  "transactions", "fees", "payouts", "payout_items", "ebay_messages", "sync_event_logs",
+                  "daily_order_rollups", "daily_financial_rollups")
+
+BRANDS = {
+    "Lenovo": ["ThinkPad T480", "ThinkPad X1 Carbon", "ThinkPad T14", "IdeaPad 5", "Legion 5"],
+    "Dell": ["Latitude 7490", "Latitude 5420", "XPS 13 9370", "Precision 5530", "Inspiron 15"],
+    "HP": ["EliteBook 840 G5", "ProBook 450 G7", "ZBook 15 G6", "Spectre x360", "Pavilion 15"],
+    "Apple": ["MacBook Pro A1989", "MacBook Air A2337", "MacBook Pro A2141", "iMac A2116"],
+    "Microsoft": ["Surface Pro 7", "Surface Laptop 3", "Surface Book 2"],
+    "ASUS": ["ZenBook UX425", "ROG Strix G15", "VivoBook 15"],
+}
+PARTS = ["Motherboard", "LCD Screen Assembly", "Keyboard", "Palmrest Touchpad", "Battery", "CPU Cooling Fan",
+         "Bottom Base Cover", "Hinge Set", "DC Power Jack", "Speaker Set", "Webcam Module", "SSD 512GB",
+         "RAM 16GB DDR4", "WiFi Card", "Charger 65W", "Display Cable", "LCD Back Cover", "Heatsink"]
+CATEGORY_BY_PART = {part: str(175600 + i) for i, part in enumerate(PARTS)}
+QUALIFIERS = ["Tested", "Genuine OEM", "Grade A", "Working", "Pulled", "New Open Box", "For Parts", "Refurbished"]
+
+# (weight, value) pairs; names of the enums the ORM maps these columns to
+INVENTORY_STATUSES = [(50, InventoryStatus.LISTED.name), (28, InventoryStatus.AVAILABLE.name),
+                      (15, InventoryStatus.SOLD.name), (3, InventoryStatus.FROZEN.name),
+                      (2, InventoryStatus.REPAIR.name), (2, InventoryStatus.PENDING_LISTING.name)]
+CONDITIONS = [(20, ConditionType.new.name), (10, ConditionType.refurbished.name),
+              (30, ConditionType.used_excellent.name), (25, ConditionType.used_good.name),
+              (5, ConditionType.used_acceptable.name), (10, ConditionType.for_parts.name)]
+ORDER_PAYMENT_STATUSES = [(90, "PAID"), (4, "PENDING"), (1, "FAILED"), (3, "FULLY_REFUNDED"), (2, "PARTIALLY_REFUNDED")]
+ORDER_FULFILLMENT_STATUSES = [(80, "FULFILLED"), (12, "IN_PROGRESS"), (8, "NOT_STARTED")]
+MESSAGE_TYPES = [(60, "MEMBER_MESSAGE"), (25, "ASK_SELLER_QUESTION"), (10, "EBAY_MESSAGE"), (5, "RESPONSE_TO_ASQ")]
+SYNC_TYPES = ["orders", "transactions", "disputes", "offers", "inventory"]
+MESSAGE_PHRASES = ["Does this come with the original screws?", "Is the BIOS password locked?",
+                   "Can you combine shipping with my other order?", "When will this ship?",
+                   "The item arrived damaged, please advise.", "Would you accept a lower offer?",
+                   "Is this compatible with the i7 version?", "Thanks, received in great condition!",
+                   "Tracking has not updated for four days.", "Do you have more of these in stock?"]
+US_PLACES = [("Columbus", "OH", "43215"), ("Austin", "TX", "78701"), ("Denver", "CO", "80202"),
+             ("Seattle", "WA", "98101"), ("Miami", "FL", "33131"), ("Chicago", "IL", "60601"),
+             ("Brooklyn", "NY", "11201"), ("Phoenix", "AZ", "85004"), ("Portland", "OR", "97205")]
+
+
+class Picker:
+    """Weighted choice over (weight, value) pairs, k at a time"""
+
+    def __init__(self, rng: random.Random, weighted: Sequence[Tuple[float, Any]]):
+        self.rng = rng
+        self.values = [value for _, value in weighted]
+        self.cum_weights = list(accumulate(weight for weight, _ in weighted))
+
+    def one(self) -> Any:
+        return self.rng.choices(self.values, cum_weights=self.cum_weights)[0]
+
+    def many(self, k: int) -> List[Any]:
+        return self.rng.choices(self.values, cum_weights=self.cum_weights, k=k)
+
+
+def zipf_weights(n: int, exponent: float) -> List[float]:
+    return [1 / (rank + 1) ** exponent for rank in range(n)]
+
+
+def split_by_weight(total: int, weights: Sequence[float]) -> List[int]:
+    """Distribute `total` over buckets proportionally to `weights`, at least one each"""
+    scale = sum(weights)
+    counts = [max(int(total * w / scale), 1) for w in weights]
+    counts[0] += total - sum(counts)
+    return counts
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return None
+    if value is True:
+        return "t"
+    if value is False:
+        return "f"
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, separators=(",", ":"))
+    return value
+
+
+def copy_rows(cursor, table: str, columns: Sequence[str], rows: Iterable[Sequence[Any]]) -> int:
+    """COPY `rows` into `table`; None becomes NULL"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    count = 0
+    for row in rows:
+        writer.writerow([_csv_value(v) for v in row])
+        count += 1
+    if count:
+        buffer.seek(0)
+        cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+    return count
+
+
+class Loader:
+    """Batched COPY into one raw psycopg2 connection, committed per batch"""
+
+    def __init__(self, conn, batch_rows: int):
+        self.conn = conn
+        self.batch_rows = batch_rows
+        self.loaded: Dict[str, int] = {}
+
+    def load(self, table: str, columns: Sequence[str], rows: Iterable[Sequence[Any]]):
+        batch: List[Sequence[Any]] = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_rows:
+                self._flush(table, columns, batch)
+                batch = []
+        self._flush(table, columns, batch)
+
+    def _flush(self, table: str, columns: Sequence[str], batch: List[Sequence[Any]]):
+        if not batch:
+            return
+        with self.conn.cursor() as cursor:
+            copy_rows(cursor, table, columns, batch)
+        self.conn.commit()
+        self.loaded[table] = self.loaded.get(table, 0) + len(batch)
+        print(f"  {table}: {self.loaded[table]:,} rows", end="\r", flush=True)
+
+
+class Generator:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.now = datetime.now(timezone.utc).replace(microsecond=0)
+        self.start = self.now - timedelta(days=args.days)
+        self.user_weights = zipf_weights(args.users, args.skew)
+        self.users: List[Dict[str, Any]] = []
+        self.buyers = [f"buyer_{self.rng.randrange(16 ** 6):06x}" for _ in range(max(args.orders // 4, 100))]
+        self.buyer_picker = Picker(self.rng, list(zip(zipf_weights(len(self.buyers), 0.6), self.buyers)))
+        self.catalog = [(brand, model) for brand, models in BRANDS.items() for model in models]
+
+    def _uuid(self) -> str:
+        return str(uuid.UUID(int=self.rng.getrandbits(128), version=4))
+
+    def _moment(self, fraction: float) -> datetime:
+        """Point in the date range; later fractions are denser, as a growing business"""
+        return self.start + timedelta(seconds=math.sqrt(fraction) * self.args.days * 86400)
+
+    def _title(self) -> Tuple[str, str, str, str]:
+        brand, model = self.rng.choice(self.catalog)
+        part = self.rng.choice(PARTS)
+        mpn = f"{self.rng.choice('0123456789ABCDEF')}{self.rng.randrange(10, 99)}{self.rng.choice('ABCDEFGHJKLMNPRSTUVWXYZ')}{self.rng.randrange(100, 999)}"
+        return f"{brand} {model} {part} {mpn} {self.rng.choice(QUALIFIERS)}", model, part, mpn
+
+    # --- users and accounts ---
+
+    def users_rows(self):
+        password = get_password_hash(self.args.password)
+        for i in range(self.args.users):
+            user = {"id": self._uuid(), "email": f"synthetic-{i:03d}@{EMAIL_DOMAIN}",
+                    "username": f"synthetic_{i:03d}", "account_id": self._uuid(),
+                    "house_name": f"Synthetic House {i:03d}"}
+            self.users.append(user)
+            yield (user["id"], user["email"], user["username"], password, UserRole.user.name,
+                   self.start, self.start, False, "production")
+
+    def account_rows(self):
+        for user in self.users:
+            yield (user["account_id"], user["id"], f"ebay_{user['username']}", f"ebay_{user['username']}",
+                   user["house_name"], "BOTH", "EBAY_US", 0, self.start, True, self.start, self.start)
+
+    # --- inventory ---
+
+    def warehouse_rows(self):
+        for i in range(self.args.warehouses):
+            city, state, _ = US_PLACES[i % len(US_PLACES)]
+            yield (f"{ID_PREFIX}WH-{i + 1:02d}", f"{city}, {state}", self.rng.randrange(50_000, 500_000),
+                   self.rng.choice(["main", "overflow", "returns"]), self.start, self.start)
+
+    def inventory_rows(self, warehouse_ids: List[int]):
+        rng = self.rng
+        status = Picker(rng, INVENTORY_STATUSES)
+        condition = Picker(rng, CONDITIONS)
+        # Big warehouses hold most stock. Bins are numbered by the synthetic warehouse
+        # (WH-01 is W1), not its serial id, so storage prefixes are the same on every load
+        warehouse = Picker(rng, list(zip(zipf_weights(len(warehouse_ids), 0.8), enumerate(warehouse_ids, 1))))
+        authors = [f"lister_{i:02d}" for i in range(25)]
+        total = self.args.inventory
+        for i in range(total):
+            title, model, part, mpn = self._title()
+            state = status.one()
+            ebay_status = {"LISTED": EbayStatus.ACTIVE.name, "SOLD": EbayStatus.ENDED.name}.get(state)
+            if ebay_status is None and rng.random() < 0.3:
+                ebay_status = EbayStatus.DRAFT.name
+            warehouse_number, warehouse_id = warehouse.one()
+            aisle, shelf, bin_ = rng.choice("ABCDEFGHJK"), rng.randrange(1, 40), rng.randrange(1, 12)
+            created = self._moment(i / total)
+            updated = min(created + timedelta(days=rng.expovariate(1 / 20)), self.now)
+            yield (
+                f"{ID_PREFIX}{i:08d}", title, condition.one(), mpn, model, CATEGORY_BY_PART[part],
+                round(rng.lognormvariate(3.6, 0.9), 2), "USD", rng.choice((1, 1, 1, 1, 2, 3, 5)),
+                str(180000000000 + i) if ebay_status else None, ebay_status, state,
+                rng.randrange(0, 13), f"W{warehouse_number}-{aisle}{shelf:02d}-{bin_:02d}",
+                f"{aisle}{shelf:02d}-{bin_:02d}", warehouse_id, rng.choice(authors),
+                f"94001118992{rng.randrange(10 ** 11):011d}" if state == "SOLD" else None,
+                created, updated,
+            )
+
+    # --- orders and money ---
+
+    def order_batches(self):
+        """Per batch of orders: (orders, line items, transactions, fees) rows"""
+        rng = self.rng
+        args = self.args
+        payment = Picker(rng, ORDER_PAYMENT_STATUSES)
+        fulfillment = Picker(rng, ORDER_FULFILLMENT_STATUSES)
+        user_picker = Picker(rng, list(zip(self.user_weights, self.users)))
+        total = args.orders
+        for first in range(0, total, args.batch_rows):
+            orders, lines, transactions, fees = [], [], [], []
+            for n in range(first, min(first + args.batch_rows, total)):
+                user = user_picker.one()
+                order_id = f"{ID_PREFIX}{n:09d}"
+                created = self._moment(n / total) + timedelta(seconds=rng.randrange(3600))
+                pay_status = payment.one()
+                ful_status = fulfillment.one() if pay_status == "PAID" else "NOT_STARTED"
+                buyer = self.buyer_picker.one()
+                city, state, postal = rng.choice(US_PLACES)
+                tracking = f"9400111899{rng.randrange(10 ** 12):012d}" if ful_status == "FULFILLED" else None
+                item_count = rng.choice((1, 1, 1, 1, 2, 2, 3))
+                order_total = 0.0
+                for j in range(item_count):
+                    title, _, _, _ = self._title()
+                    quantity = rng.choice((1, 1, 1, 2))
+                    value = round(rng.lognormvariate(3.8, 0.8) * quantity, 2)
+                    shipping = round(rng.choice((0, 0, 5.99, 9.45, 12.45)), 2)
+                    tax = round(value * 0.07, 2)
+                    order_total += value + shipping + tax
+                    line_id = f"{n:09d}{j}"
+                    sku = f"{ID_PREFIX}{rng.randrange(max(args.inventory, 1)):08d}"
+                    lines.append((order_id, line_id, sku, title, quantity, value, "USD"))
+                    if pay_status in ("PAID", "FULLY_REFUNDED", "PARTIALLY_REFUNDED"):
+                        fee = round(value * 0.1325 + 0.30, 2)
+                        profit = round(value - fee - value * rng.uniform(0.2, 0.7), 2)
+                        transactions.append((
+                            f"{ID_PREFIX}T{line_id}", user["id"], order_id, line_id, sku, buyer, value, "USD",
+                            created, quantity, shipping, tax,
+                            FulfillmentStatus.FULFILLED.name if ful_status == "FULFILLED" else FulfillmentStatus.NOT_STARTED.name,
+                            PaymentStatus.PAID.name, profit,
+                            ProfitStatus.OK.name if profit >= 0 else ProfitStatus.NEGATIVE.name,
+                            created, created,
+                        ))
+                        fees.append((user["id"], "ORDER", order_id, FeeType.FINAL_VALUE_FEE.name, fee, "USD", created, created, created))
+                        if rng.random() < 0.3:
+                            fees.append((user["id"], "ORDER", order_id, FeeType.AD_FEE.name,
+                                         round(value * rng.uniform(0.02, 0.08), 2), "USD", created, created, created))
+                        if tracking and j == 0 and rng.random() < 0.6:
+                            fees.append((user["id"], "ORDER", order_id, FeeType.SHIPPING_LABEL.name,
+                                         round(rng.uniform(4, 18), 2), "USD", created, created, created))
+                order_total = round(order_total, 2)
+                stamp = created.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+                payload = {"orderId": order_id, "creationDate": stamp, "orderPaymentStatus": pay_status,
+                           "orderFulfillmentStatus": ful_status, "buyer": {"username": buyer},
+                           "pricingSummary": {"total": {"value": f"{order_total:.2f}", "currency": "USD"}}}
+                orders.append((
+                    order_id, user["id"], stamp, stamp, pay_status, ful_status, buyer,
+                    f"{buyer}@members.ebay.com", True, order_total, "USD", order_total, "USD", item_count,
+                    tracking, buyer.replace("_", " ").title(), city, state, postal, "US", payload, created, created,
+                ))
+            yield orders, lines, transactions, fees
+
+    def payout_rows(self):
+        """(payouts, payout items): a payout every few days per user, more often for big sellers"""
+        rng = self.rng
+        item_type = Picker(rng, [(85, PayoutItemType.ORDER.name), (6, PayoutItemType.REFUND.name),
+                                 (4, PayoutItemType.ADJUSTMENT.name), (2, PayoutItemType.FEE_REVERSAL.name),
+                                 (3, PayoutItemType.OTHER.name)])
+        top = self.user_weights[0]
+        payouts, items = [], []
+        for rank, user in enumerate(self.users):
+            interval = max(1, round(7 * (1 - self.user_weights[rank] / top)))
+            day = self.start
+            number = 0
+            while day < self.now:
+                payout_id = f"{ID_PREFIX}P{rank:03d}{number:05d}"
+                amounts = []
+                for k in range(rng.randrange(1, 8)):
+                    kind = item_type.one()
+                    amount = round(rng.lognormvariate(4.2, 0.9), 2)
+                    if kind == PayoutItemType.REFUND.name:
+                        amount = -amount
+                    amounts.append(amount)
+                    items.append((payout_id, kind, f"{ID_PREFIX}R{rank:03d}{number:05d}{k}", amount, "USD", day, day))
+                status = PayoutStatus.PAID.name if day < self.now - timedelta(days=3) else PayoutStatus.IN_PROGRESS.name
+                payouts.append((payout_id, user["id"], round(max(sum(amounts), 0), 2), "USD", status, day, day, day))
+                number += 1
+                day += timedelta(days=interval, hours=rng.randrange(-6, 6))
+        return payouts, items
+
+    # --- messages and sync logs ---
+
+    def message_rows(self):
+        rng = self.rng
+        message_type = Picker(rng, MESSAGE_TYPES)
+        user_picker = Picker(rng, list(zip(self.user_weights, self.users)))
+        total = self.args.messages
+        for n in range(total):
+            user = user_picker.one()
+            incoming = rng.random() < 0.8
+            buyer = self.buyer_picker.one()
+            sent = self._moment(n / total)
+            body = " ".join(rng.choices(MESSAGE_PHRASES, k=rng.randrange(1, 6)))
+            archived = rng.random() < 0.15
+            yield (
+                self._uuid(), user["account_id"], user["house_name"], user["id"], f"{ID_PREFIX}M{n:09d}",
+                f"{ID_PREFIX}TH{n // rng.randrange(1, 4):09d}",
+                buyer if incoming else user["username"], user["username"] if incoming else buyer,
+                f"Question about item #{180000000000 + rng.randrange(max(self.args.inventory, 1))}",
+                f"<div>{body}</div>", message_type.one(), rng.random() < 0.7, rng.random() < 0.05, archived,
+                "INCOMING" if incoming else "OUTGOING", sent,
+                f"{ID_PREFIX}{rng.randrange(max(self.args.orders, 1)):09d}" if rng.random() < 0.4 else None,
+                str(180000000000 + rng.randrange(max(self.args.inventory, 1))), sent, sent,
+            )
+
+    def sync_event_rows(self):
+        """Runs of start, page progress and done events, with an occasional failed run"""
+        rng = self.rng
+        user_picker = Picker(rng, list(zip(self.user_weights, self.users)))
+        emitted = 0
+        run = 0
+        total = self.args.sync_events
+        while emitted < total:
+            user = user_picker.one()
+            sync_type = rng.choice(SYNC_TYPES)
+            run_id = f"{ID_PREFIX}RUN-{run:07d}"
+            at = self._moment(emitted / total)
+            pages = rng.randrange(1, 40)
+            failed = rng.random() < 0.03
+            yield (run_id, user["id"], sync_type, "start", "info", f"Starting {sync_type} sync",
+                   None, None, None, None, None, pages, 0, 0, 0.0, at)
+            fetched = 0
+            for page in range(1, pages + 1):
+                at += timedelta(milliseconds=rng.randrange(300, 4000))
+                fetched += rng.randrange(50, 200)
+                yield (run_id, user["id"], sync_type, "http", "debug", f"GET page {page}",
+                       "GET", f"https://api.ebay.com/sell/fulfillment/v1/order?offset={(page - 1) * 200}",
+                       200, rng.randrange(150, 3500), page, pages, fetched, None, None, at)
+                yield (run_id, user["id"], sync_type, "progress", "info", f"Page {page}/{pages}: {fetched} fetched",
+                       None, None, None, None, page, pages, fetched, fetched, round(page / pages * 100, 1), at)
+                emitted += 2
+                if failed and page == pages // 2 + 1:
+                    break
+            if failed:
+                yield (run_id, user["id"], sync_type, "error", "error", "eBay API returned 500 Internal Server Error",
+                       None, None, 500, None, None, pages, fetched, fetched, None, at)
+            else:
+                yield (run_id, user["id"], sync_type, "done", "info", f"Sync completed: {fetched} records",
+                       None, None, None, None, pages, pages, fetched, fetched, 100.0, at)
+            emitted += 2
+            run += 1
+
+
+USER_COLUMNS = ["id", "email", "username", "hashed_password", "role", "created_at", "updated_at",
+                "ebay_connected", "ebay_environment"]
+ACCOUNT_COLUMNS = ["id", "org_id", "ebay_user_id", "username", "house_name", "purpose", "marketplace_id",
+                   "site_id", "connected_at", "is_active", "created_at", "updated_at"]
+WAREHOUSE_COLUMNS = ["name", "location", "capacity", "warehouse_type", "rec_created", "rec_updated"]
+INVENTORY_COLUMNS = ["sku_code", "title", "condition", "part_number", "model", "category", "price_value",
+                     "price_currency", "quantity", "ebay_listing_id", "ebay_status", "status", "photo_count",
+                     "storage_id", "storage", "warehouse_id", "author", "tracking_number", "rec_created", "rec_updated"]
+ORDER_COLUMNS = ["order_id", "user_id", "creation_date", "last_modified_date", "order_payment_status",
+                 "order_fulfillment_status", "buyer_username", "buyer_email", "buyer_registered",
+                 "total_amount", "total_currency", "order_total_value", "order_total_currency",
+                 "line_items_count", "tracking_number", "ship_to_name", "ship_to_city", "ship_to_state",
+                 "ship_to_postal_code", "ship_to_country_code", "raw_payload", "created_at", "updated_at"]
+LINE_ITEM_COLUMNS = ["order_id", "line_item_id", "sku", "title", "quantity", "total_value", "currency"]
+TRANSACTION_COLUMNS = ["transaction_id", "user_id", "order_id", "line_item_id", "sku", "buyer_username",
+                       "sale_value", "currency", "sale_date", "quantity", "shipping_charged", "tax_collected",
+                       "fulfillment_status", "payment_status", "profit", "profit_status", "created_at", "updated_at"]
+FEE_COLUMNS = ["user_id", "source_type", "source_id", "fee_type", "amount", "currency", "assessed_at",
+               "created_at", "updated_at"]
+PAYOUT_COLUMNS = ["payout_id", "user_id", "total_amount", "currency", "status", "payout_date",
+                  "created_at", "updated_at"]
+PAYOUT_ITEM_COLUMNS = ["payout_id", "type", "reference_id", "amount", "currency", "created_at", "updated_at"]
+MESSAGE_COLUMNS = ["id", "ebay_account_id", "house_name", "user_id", "message_id", "thread_id",
+                   "sender_username", "recipient_username", "subject", "body", "message_type", "is_read",
+                   "is_flagged", "is_archived", "direction", "message_date", "order_id", "listing_id",
+                   "created_at", "updated_at"]
+SYNC_EVENT_COLUMNS = ["run_id", "user_id", "sync_type", "event_type", "level", "message", "http_method",
+                      "http_url", "http_status", "http_duration_ms", "current_page", "total_pages",
+                      "items_fetched", "items_stored", "progress_pct", "timestamp"]
+
+
+def purge(conn):
+    with conn.cursor() as cursor:
+        for statement in PURGE_STATEMENTS:
+            cursor.execute(statement)
+            if cursor.rowcount:
+                print(f"  {statement.split(' WHERE')[0][len('DELETE FROM '):]}: {cursor.rowcount:,} rows deleted")
+    conn.commit()
+
+
+def _step(label: str, fn: Callable[[], None]):
+    started = time.perf_counter()
+    print(f"{label}...")
+    fn()
+    print(f"\n  done in {time.perf_counter() - started:.1f}s")
+
+
+def generate(args: argparse.Namespace):
+    gen = Generator(args)
+    conn = engine.raw_connection()
+    try:
+        _step("Removing earlier synthetic data", lambda: purge(conn))
+        loader = Loader(conn, args.batch_rows)
+
+        def load_users():
+            loader.load("users", USER_COLUMNS, gen.users_rows())
+            loader.load("ebay_accounts", ACCOUNT_COLUMNS, gen.account_rows())
+
+        def load_inventory():
+            loader.load("warehouses", WAREHOUSE_COLUMNS, gen.warehouse_rows())
+            with conn.cursor() as cursor:
+                cursor.execute(f"SELECT id FROM warehouses WHERE name LIKE '{ID_PREFIX}%' ORDER BY name")
+                warehouse_ids = [row[0] for row in cursor.fetchall()]
+            loader.load("inventory", INVENTORY_COLUMNS, gen.inventory_rows(warehouse_ids))
+
+        def load_orders():
+            for orders, lines, transactions, fees in gen.order_batches():
+                loader.load("ebay_orders", ORDER_COLUMNS, orders)
+                loader.load("order_line_items", LINE_ITEM_COLUMNS, lines)
+                loader.load("transactions", TRANSACTION_COLUMNS, transactions)
+                loader.load("fees", FEE_COLUMNS, fees)
+
+        def load_payouts():
+            payouts, items = gen.payout_rows()
+            loader.load("payouts", PAYOUT_COLUMNS, payouts)
+            loader.load("payout_items", PAYOUT_ITEM_COLUMNS, items)
+
+        _step(f"Loading {args.users} users", load_users)
+        _step(f"Loading {args.warehouses} warehouses and {args.inventory:,} inventory rows", load_inventory)
+        _step(f"Loading {args.orders:,} orders with line items, transactions and fees", load_orders)
+        _step("Loading payouts", load_payouts)
+        _step(f"Loading {args.messages:,} messages", lambda: loader.load("ebay_messages", MESSAGE_COLUMNS, gen.message_rows()))
+        _step(f"Loading ~{args.sync_events:,} sync events",
+              lambda: loader.load("sync_event_logs", SYNC_EVENT_COLUMNS, gen.sync_event_rows()))
+    finally:
+        conn.close()
+
+    def rebuild_rollups():
+        db = SessionLocal()
+        try:
+            for user in gen.users:
+                rebuild_order_rollups(db, user["id"])
+                rebuild_financial_rollups(db, user["id"])
+                db.commit()
+        finally:
+            db.close()
+
+    def analyze():
+        conn = engine.raw_connection()
+        try:
+            with conn.cursor() as cursor:
+                for table in ANALYZE_TABLES:
+                    cursor.execute(f"ANALYZE {table}")
+            conn.commit()
+        finally:
+            conn.close()
+
+    _step("Rebuilding daily rollups", rebuild_rollups)
+    _step("Analyzing tables", analyze)
+
+    print("\nLoaded:")
+    for table, rows in loader.loaded.items():
+        print(f"  {table:<20} {rows:>12,}")
+    print(f"\nLog in as synthetic-000@{EMAIL_DOMAIN} (largest) .. synthetic-{args.users - 1:03d}@{EMAIL_DOMAIN} "
+          f"with password {args.password!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of per-user volumes")
+    parser.add_argument("--warehouses", type=int, default=12)
+    parser.add_argument("--inventory", type=int, default=2_000_000)
+    parser.add_argument("--orders", type=int, default=300_000)
+    parser.add_argument("--messages", type=int, default=200_000)
+    parser.add_argument("--sync-events", type=int, default=500_000)
+    parser.add_argument("--days", type=int, default=730, help="Length of the generated history")
+    parser.add_argument("--batch-rows", type=int, default=50_000, help="Rows per COPY")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--password", default="synthetic-load-test")
+    parser.add_argument("--purge", action="store_true", help="Only remove the synthetic data")
+    args = parser.parse_args()
+
+    if args.purge:
+        conn = engine.raw_connection()
+        try:
+            _step("Removing synthetic data", lambda: purge(conn))
+        finally:
+            conn.close()
+        return
+    generate(args)
+
+
+if __name__ == "__main__":
+    main()
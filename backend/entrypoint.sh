@@ -5,8 +5,11 @@ echo "🚀 Starting eBay Connector Backend..."
 
 if [ -n "$DATABASE_URL" ]; then
     echo "📊 Running Alembic migrations..."
-    cd /app && poetry run alembic upgrade head
+    # Waits on the migration advisory lock, so concurrent replicas migrate once
+    cd /app && poetry run python -m app.services.migrations
     echo "✅ Migrations completed!"
+    # Migrated above; the app only checks the revision at startup
+    export STARTUP_MIGRATIONS="${STARTUP_MIGRATIONS:-check}"
 else
     echo "⚠️  DATABASE_URL not set, skipping migrations"
 fi
@@ -20,7 +20,8 @@ if [[ "${RUN_MIGRATIONS:-1}" == "1" ]]; then
     while [ $attempt -le $max_attempts ]; do
       echo "[entry] Migration attempt $attempt/$max_attempts..."
       
-      if poetry run alembic upgrade heads; then
+      # Waits on the migration advisory lock, so concurrent replicas migrate once
+      if poetry run python -m app.services.migrations; then
         echo "[entry] ✅ Migrations completed successfully!"
         return 0
       else
@@ -39,15 +40,14 @@ if [[ "${RUN_MIGRATIONS:-1}" == "1" ]]; then
     return 1
   }
   
-  echo "[entry] alembic current before:"
-  poetry run alembic current || echo "[entry] No current revision found"
-  echo "[entry] alembic heads:"
-  poetry run alembic heads || echo "[entry] No heads found"
   echo "[entry] Running migrations with retry logic..."
   
   run_migrations_with_retry || {
     echo "[entry] WARNING: Migrations failed after retries, continuing anyway..."
   }
+  
+  # Migrated above; the app only checks the revision at startup
+  export STARTUP_MIGRATIONS="${STARTUP_MIGRATIONS:-check}"
 fi
 
 # 2) Запуск приложения (exec — чтобы процесс не завершился после скрипта)
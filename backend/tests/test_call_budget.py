@@ -0,0 +1,52 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.routers import ebay as ebay_router
+from app.services.call_budget import BUDGET_CAP_NOTE, SyncPlan, budget_cap_note, call_ledger, estimate_calls
+from app.utils.metrics import InstrumentedTransport, bind_ebay_user, ebay_requests
+
+
+def _plan(decision: str, **kwargs) -> SyncPlan:
+    async def plan_sync(user_id, sync_type):
+        return SyncPlan(decision, "sell.fulfillment", 30, 10, **kwargs)
+    return plan_sync
+
+
+def test_plan_or_defer_returns_runnable_plans(monkeypatch):
+    monkeypatch.setattr(ebay_router, "plan_sync", _plan("degrade", max_pages=3))
+    plan = asyncio.run(ebay_router._plan_or_defer("user", "orders"))
+    assert plan.max_pages == 3
+
+
+def test_plan_or_defer_raises_429_with_retry_after(monkeypatch):
+    monkeypatch.setattr(ebay_router, "plan_sync", _plan("defer", retry_after_seconds=120, reason="no budget"))
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(ebay_router._plan_or_defer("user", "disputes"))
+    assert exc.value.status_code == 429
+    assert exc.value.headers == {"Retry-After": "120"}
+    assert exc.value.detail == "no budget"
+
+
+def test_budget_cap_note_is_recognised_by_the_estimate_filter():
+    assert budget_cap_note(7).startswith(BUDGET_CAP_NOTE)
+
+
+def test_estimate_calls():
+    assert estimate_calls("orders", None) == 20
+    assert estimate_calls("orders", 401) == 3
+    assert estimate_calls("offers", 10) == 11
+
+
+def test_ebay_calls_are_labelled_and_recorded_by_bound_user():
+    async def call():
+        bind_ebay_user("user-1")
+        transport = InstrumentedTransport(httpx.MockTransport(lambda request: httpx.Response(200)))
+        async with httpx.AsyncClient(transport=transport) as client:
+            await client.get("https://api.ebay.com/sell/fulfillment/v1/order")
+
+    asyncio.run(call())
+    assert any(labels["user"] == "user-1" for _, labels, _ in ebay_requests._samples())
+    assert any(user_id == "user-1" for _, _, user_id in call_ledger._pending)
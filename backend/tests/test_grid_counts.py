@@ -0,0 +1,15 @@
+from app.services.grid_counts import normalize_filters
+
+
+def test_list_filters_are_order_independent():
+    assert normalize_filters({"status": "SOLD, AVAILABLE"}) == normalize_filters({"status": "AVAILABLE,SOLD"})
+    assert normalize_filters({"category": "b,a", "condition": None}) == (("category", "a,b"),)
+
+
+def test_free_text_filters_keep_their_value():
+    assert normalize_filters({"q": "fan, t480"}) != normalize_filters({"q": "t480,fan"})
+    assert normalize_filters({"buyer": " smith,j "}) == (("buyer", "smith,j"),)
+
+
+def test_empty_filters_are_dropped():
+    assert normalize_filters({"q": "", "sku_code": None}) == ()
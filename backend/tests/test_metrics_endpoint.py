@@ -0,0 +1,36 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.main import app
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def metrics_token(monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "scrape-secret")
+    return "scrape-secret"
+
+
+def test_metrics_rejects_unauthenticated_requests(metrics_token):
+    response = client.get("/metrics")
+    assert response.status_code in (401, 403)
+    assert "ebay_api_requests_total" not in response.text
+
+
+def test_metrics_rejects_wrong_token(metrics_token):
+    response = client.get("/metrics", headers={"Authorization": "Bearer not-the-token"})
+    assert response.status_code == 401
+
+
+def test_metrics_rejects_any_token_when_none_is_configured(monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "")
+    response = client.get("/metrics", headers={"Authorization": "Bearer "})
+    assert response.status_code in (401, 403)
+
+
+def test_metrics_accepts_the_scrape_token(metrics_token):
+    response = client.get("/metrics", headers={"Authorization": f"Bearer {metrics_token}"})
+    assert response.status_code == 200
+    assert "# TYPE ebay_api_requests_total counter" in response.text
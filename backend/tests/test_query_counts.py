@@ -0,0 +1,179 @@
+"""
+Guard against per-row queries on the list endpoints: loading a page must issue the
+same number of statements whatever its size. Needs a Postgres database in
+TEST_DATABASE_URL; the tables are created in scratch schemas and dropped afterwards.
+"""
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import MetaData, create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+
+from app import database as legacy_db
+from app import models_sqlalchemy as core_db
+from app.db_models import Listing, Offer, Order, OrderLineItem
+from app.db_models.user import User as LegacyUser
+from app.models.user import User
+from app.models_sqlalchemy.models import (
+    Inventory, PaymentStatus, Purchase, PurchaseLineItem, User as CoreUser, UserRole, Warehouse,
+)
+from app.routers import buying, inventory_v2, offers, orders
+from app.services.auth import get_current_user
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+
+ROWS = 30
+
+USER = User(id=str(uuid.uuid4()), email="query-counts@example.com", username="query-counts",
+            hashed_password="x", created_at=datetime.now(timezone.utc))
+
+
+class StatementCounter:
+    def __init__(self, *engines):
+        self.count = 0
+        for engine in engines:
+            event.listen(engine, "after_cursor_execute", self._count)
+
+    def _count(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+def _schema_engine(schema: str):
+    engine = create_engine(TEST_DATABASE_URL, connect_args={"options": f"-c search_path={schema},public"})
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {schema}"))
+    return engine
+
+
+def _create_tables(engine, metadata: MetaData, names):
+    """Create the named tables without their GIN indexes, which need pg_trgm and do not change query counts"""
+    copy = MetaData()
+    for name in names:
+        table = metadata.tables[name].to_metadata(copy)
+        table.indexes = {index for index in table.indexes if index.dialect_options["postgresql"]["using"] != "gin"}
+    copy.create_all(engine)
+
+
+def _seed_core(session):
+    session.add(CoreUser(id=USER.id, email=USER.email, username=USER.username,
+                         hashed_password="x", role=UserRole.user))
+    session.flush()
+    warehouse = Warehouse(name="Main")
+    session.add(warehouse)
+    now = datetime.now(timezone.utc)
+    for i in range(ROWS):
+        purchase_id = f"P{i:03d}"
+        session.add(Purchase(purchase_id=purchase_id, user_id=USER.id, creation_date=now - timedelta(hours=i),
+                             buyer_username="buyer", seller_username="seller", total_value=Decimal("10.00"),
+                             payment_status=PaymentStatus.PAID))
+        session.flush()
+        session.add_all([PurchaseLineItem(purchase_id=purchase_id, line_item_id=str(n)) for n in range(2)])
+    session.flush()
+    item = Inventory(sku_code="SKU-1", title="Item", warehouse=warehouse)
+    session.add(item)
+    session.commit()
+    return item.id
+
+
+def _seed_legacy(session):
+    session.add(LegacyUser(id=USER.id, email=USER.email, username=USER.username,
+                           hashed_password="x", role="user"))
+    session.flush()
+    now = datetime.now(timezone.utc)
+    for i in range(ROWS):
+        listing = Listing(user_id=USER.id, listing_id=f"L{i:03d}", title=f"Listing {i}",
+                          listing_status="ACTIVE", price=Decimal("20.00"))
+        session.add(listing)
+        session.flush()
+        session.add(Offer(user_id=USER.id, listing_id=listing.id, offer_id=f"O{i:03d}",
+                          offer_amount=Decimal("15.00"), offer_status="PENDING", offer_date=now - timedelta(hours=i)))
+        order = Order(user_id=USER.id, order_id=f"E{i:03d}", order_status="PAID",
+                      order_date=now - timedelta(hours=i), total_amount=Decimal("20.00"))
+        order.line_items = [
+            OrderLineItem(line_item_id=f"E{i:03d}-{n}", title="Line", unit_price=Decimal("10.00"),
+                          total_price=Decimal("10.00"))
+            for n in range(2)
+        ]
+        session.add(order)
+    session.commit()
+
+
+@pytest.fixture(scope="module")
+def api():
+    core_engine = _schema_engine("test_query_counts_core")
+    legacy_engine = _schema_engine("test_query_counts_legacy")
+    _create_tables(core_engine, core_db.Base.metadata,
+                   ("users", "warehouses", "sku", "inventory", "purchases", "purchase_line_items"))
+    _create_tables(legacy_engine, legacy_db.Base.metadata,
+                   ("users", "ebay_listings", "ebay_offers", "ebay_orders", "order_line_items"))
+
+    CoreSession = sessionmaker(bind=core_engine)
+    LegacySession = sessionmaker(bind=legacy_engine)
+    with CoreSession() as session:
+        inventory_id = _seed_core(session)
+    with LegacySession() as session:
+        _seed_legacy(session)
+
+    def core_session():
+        with CoreSession() as session:
+            yield session
+
+    def legacy_session():
+        with LegacySession() as session:
+            yield session
+
+    app = FastAPI()
+    for module in (buying, offers, orders, inventory_v2):
+        app.include_router(module.router)
+    app.dependency_overrides[core_db.get_db] = core_session
+    app.dependency_overrides[legacy_db.get_db] = legacy_session
+    app.dependency_overrides[get_current_user] = lambda: USER
+
+    counter = StatementCounter(core_engine, legacy_engine)
+    yield TestClient(app), counter, inventory_id
+
+    for engine, schema in ((core_engine, "test_query_counts_core"), (legacy_engine, "test_query_counts_legacy")):
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+        engine.dispose()
+
+
+def _statements(api, path: str, **params) -> int:
+    client, counter, _ = api
+    counter.count = 0
+    response = client.get(path, params=params)
+    assert response.status_code == 200, response.text
+    return counter.count
+
+
+@pytest.mark.parametrize("path, page_param", [
+    ("/api/buying", "limit"),
+    ("/offers/", "limit"),
+    ("/orders/", "limit"),
+])
+def test_list_statements_do_not_grow_with_page_size(api, path, page_param):
+    small = _statements(api, path, **{page_param: 5})
+    large = _statements(api, path, **{page_param: 25})
+    assert small == large
+
+
+def test_list_pages_return_their_rows(api):
+    client, _, _ = api
+    assert len(client.get("/api/buying", params={"limit": 25}).json()["purchases"]) == 25
+    assert all(p["line_items_count"] == 2 for p in client.get("/api/buying").json()["purchases"])
+    assert all(o["listing_title"] for o in client.get("/offers/", params={"limit": 25}).json())
+    assert all(len(o["line_items"]) == 2 for o in client.get("/orders/", params={"limit": 25}).json())
+
+
+def test_inventory_item_loads_its_warehouse_in_one_statement(api):
+    _, _, inventory_id = api
+    assert _statements(api, f"/api/inventory/{inventory_id}") == 1
+    assert api[0].get(f"/api/inventory/{inventory_id}").json()["warehouse"]["name"] == "Main"
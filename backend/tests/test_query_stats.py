@@ -0,0 +1,37 @@
+import pytest
+
+from app.services.rollups import ORDER_ROLLUP_SNAPSHOT_SQL
+from app.utils.query_stats import _is_read_only, normalize_statement
+
+
+@pytest.mark.parametrize("statement", [
+    "SELECT id, title FROM inventory WHERE search_text ILIKE %(pattern)s ORDER BY id DESC LIMIT 100",
+    "WITH page AS (SELECT id FROM inventory LIMIT 10) SELECT * FROM page",
+    "select count(*) from ebay_orders where user_id = %(user_id)s",
+])
+def test_plain_reads_are_analyzed(statement):
+    assert _is_read_only(statement)
+
+
+@pytest.mark.parametrize("statement", [
+    ORDER_ROLLUP_SNAPSHOT_SQL,
+    "SELECT * FROM ebay_sync_jobs WHERE id = %(id)s FOR NO KEY UPDATE",
+    "SELECT * FROM payouts FOR SHARE SKIP LOCKED",
+    "SELECT * FROM payouts FOR KEY SHARE",
+    "SELECT pg_notify(%(channel)s, %(user_id)s)",
+    "SELECT nextval('inventory_id_seq')",
+    "SELECT setval('inventory_id_seq', 10)",
+    "SELECT pg_advisory_lock(%(key)s)",
+    "SELECT pg_try_advisory_xact_lock(1)",
+    "SELECT set_config('app.user', %(user)s, true)",
+    "WITH moved AS (DELETE FROM fees RETURNING *) SELECT count(*) FROM moved",
+    "INSERT INTO fees (amount) VALUES (%(amount)s)",
+])
+def test_statements_with_side_effects_are_not_analyzed(statement):
+    assert not _is_read_only(statement)
+
+
+def test_normalize_statement_collapses_literals_and_value_lists():
+    assert normalize_statement(
+        "SELECT * FROM t WHERE a = 'x' AND b IN (1, 2, 3) AND c = %(c)s"
+    ) == "SELECT * FROM t WHERE a = ? AND b IN (...) AND c = ?"
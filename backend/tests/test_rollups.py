@@ -0,0 +1,16 @@
+from datetime import date
+
+from app.services.rollups import ORDER_ROLLUP_REBUILD_SQL, rollup_day, varchar_timestamp
+
+
+def test_rebuild_sql_guards_the_varchar_creation_date():
+    sql = ORDER_ROLLUP_REBUILD_SQL.format(created=varchar_timestamp("creation_date"), user_filter="")
+    assert r"creation_date ~ '^\d{4}-\d{2}-\d{2}' THEN creation_date::timestamptz" in sql
+    assert "WHERE created IS NOT NULL" in sql
+
+
+def test_rollup_day_skips_values_that_are_not_dates():
+    assert rollup_day("2026-03-31T23:30:00.000Z") == date(2026, 3, 31)
+    assert rollup_day("2026-03-31T23:30:00-05:00") == date(2026, 4, 1)
+    assert rollup_day("") is None
+    assert rollup_day("not a date") is None
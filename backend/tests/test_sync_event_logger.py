@@ -0,0 +1,31 @@
+from app.services.sync_event_logger import SyncEventLogger
+from app.utils.metrics import sync_runs
+
+
+def _logger(monkeypatch, sync_type: str) -> SyncEventLogger:
+    monkeypatch.setattr(SyncEventLogger, "_persist_event", lambda self, event: None)
+    return SyncEventLogger("user", sync_type)
+
+
+def _runs(sync_type: str, outcome: str) -> float:
+    return sync_runs._values.get((sync_type, outcome), 0)
+
+
+def test_cancelled_runs_are_not_counted_as_done(monkeypatch):
+    event_logger = _logger(monkeypatch, "test_cancelled")
+    event_logger.log_start("start")
+    event_logger.log_cancelled("cancelled", 3, 2, 10)
+    event_logger.close()
+
+    assert _runs("test_cancelled", "cancelled") == 1
+    assert _runs("test_cancelled", "done") == 0
+    assert _runs("test_cancelled", "incomplete") == 0
+    assert event_logger.events[-1]["event_type"] == "done"
+
+
+def test_stored_event_time_is_the_emit_time(monkeypatch):
+    event_logger = _logger(monkeypatch, "test_timestamp")
+    event_logger.emit_event({"message": "page"})
+    event = event_logger.events[-1]
+
+    assert event_logger._to_model(event).timestamp.isoformat() == event["timestamp"]